@@ -0,0 +1,76 @@
+"""Events hypertable storage policies: chunk interval, compression
+
+Revision ID: 3f9a6c0d8e14
+Revises: 7c1e4b9d2a36
+Create Date: 2026-10-17 14:03:27.551902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a6c0d8e14'
+down_revision: Union[str, None] = '7c1e4b9d2a36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# docs/PERFORMANCE_PLAN.md : compression après 7 jours.
+# Chunks d'un jour : un chunk devient compressible dès qu'il sort de la fenêtre chaude.
+# Pas de rétention ici : drop_chunks seul laisserait hits, incidents, alert_state et
+# rule_hits_daily orphelins ; elle passe par le job events_retention (révision 6d1b8f3e2a95),
+# désactivé par défaut et activé via /admin/storage.
+CHUNK_INTERVAL = "1 day"
+COMPRESS_AFTER = "7 days"
+
+
+def upgrade() -> None:
+    # Ne s'applique qu'aux nouveaux chunks
+    op.execute(f"SELECT set_chunk_time_interval('events', INTERVAL '{CHUNK_INTERVAL}')")
+
+    # segmentby site_code : les requêtes par site (fréquence, timelines) ne décompressent
+    # que les segments du site ; orderby time (puis id, départage du tri keyset).
+    op.execute("""
+        ALTER TABLE events SET (
+            timescaledb.compress,
+            timescaledb.compress_segmentby = 'site_code',
+            timescaledb.compress_orderby = 'time DESC, id DESC'
+        )
+    """)
+    op.execute(f"SELECT add_compression_policy('events', compress_after => INTERVAL '{COMPRESS_AFTER}')")
+
+    # Recherches par id / import_id (fiche event, events d'un import, purge, replay) :
+    # sans index B-tree sur les chunks compressés, exclusion de chunks par plages
+    # min/max (TimescaleDB >= 2.16, ignoré sinon).
+    op.execute("""
+        DO $$
+        BEGIN
+            IF string_to_array(split_part((SELECT extversion FROM pg_extension WHERE extname = 'timescaledb'), '-', 1), '.')::int[]
+               >= ARRAY[2, 16] THEN
+                PERFORM set_config('timescaledb.enable_chunk_skipping', 'on', true);
+                EXECUTE format('ALTER DATABASE %I SET timescaledb.enable_chunk_skipping = on', current_database());
+                PERFORM enable_chunk_skipping('events', 'id');
+                PERFORM enable_chunk_skipping('events', 'import_id');
+            END IF;
+        END
+        $$
+    """)
+
+
+def downgrade() -> None:
+    op.execute("SELECT remove_compression_policy('events', if_exists => TRUE)")
+    op.execute("SELECT decompress_chunk(c, if_compressed => TRUE) FROM show_chunks('events') c")
+    op.execute("ALTER TABLE events SET (timescaledb.compress = false)")
+    op.execute("""
+        DO $$
+        BEGIN
+            IF to_regproc('disable_chunk_skipping') IS NOT NULL THEN
+                PERFORM disable_chunk_skipping('events', 'id', if_not_exists => TRUE);
+                PERFORM disable_chunk_skipping('events', 'import_id', if_not_exists => TRUE);
+            END IF;
+        END
+        $$
+    """)
+    op.execute("SELECT set_chunk_time_interval('events', INTERVAL '7 days')")
@@ -0,0 +1,55 @@
+"""Trigram index on events.normalized_message, backfill of missing values
+
+Revision ID: 5b2d7e9c1f48
+Revises: 3f9a6c0d8e14
+Create Date: 2026-10-17 17:41:09.310476
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.text import normalize_text
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2d7e9c1f48'
+down_revision: Union[str, None] = '3f9a6c0d8e14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    # Les filtres mot-clé SQL ne lisent plus que normalized_message : les events
+    # insérés sans (parsers PDF / TSV) reçoivent normalize_text(raw_message), comme à l'évaluation Python.
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(sa.text(
+            "SELECT id, raw_message FROM events WHERE normalized_message IS NULL AND id > :last_id "
+            "ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": BATCH_SIZE}).all()
+        if not rows:
+            break
+        conn.execute(
+            sa.text("UPDATE events SET normalized_message = :message WHERE id = :id"),
+            [{"id": r.id, "message": normalize_text(r.raw_message)} for r in rows],
+        )
+        last_id = rows[-1].id
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # B-tree (migration initiale / 13_normalized_message.sql) : inutilisable pour LIKE '%kw%'
+    op.execute("DROP INDEX IF EXISTS ix_events_normalized_message")
+    op.execute("DROP INDEX IF EXISTS ix_events_normalized_message_btree")
+    op.create_index(
+        'ix_events_normalized_message_trgm', 'events', ['normalized_message'],
+        unique=False, postgresql_using='gin', postgresql_ops={'normalized_message': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_normalized_message_trgm', table_name='events')
+    op.create_index(op.f('ix_events_normalized_message'), 'events', ['normalized_message'], unique=False)
@@ -0,0 +1,119 @@
+"""Events retention job: drop old chunks with their hits, incidents and alert state
+
+Revision ID: 6d1b8f3e2a95
+Revises: a4c7e2d91b36
+Create Date: 2026-10-17 20:48:13.902457
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6d1b8f3e2a95'
+down_revision: Union[str, None] = 'a4c7e2d91b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Politique native posée par une version précédente de 3f9a6c0d8e14 : elle supprimait
+    # les chunks sans leurs dépendances. La rétention passe désormais par events_retention.
+    op.execute("SELECT remove_retention_policy('events', if_exists => TRUE)")
+
+    # Job TimescaleDB (add_job, config {"drop_after": "90 days"}), planifié par
+    # app/services/storage_policies.update_policies ; aucun par défaut.
+    # Borne = fin du chunk le plus récent entièrement plus vieux que drop_after : exactement
+    # les events que drop_chunks supprime. Dans la même transaction :
+    #   - hits de ces events supprimés, jours de rule_hits_daily concernés recalculés ;
+    #   - incidents clos avant la borne supprimés, open_event_id des incidents ouverts
+    #     avant la borne (event supprimé) remis à NULL ;
+    #   - drop_chunks, puis alert_state / alert_disparition_state recalculés pour les sites
+    #     touchés (comme alert_state.refresh_sites).
+    op.execute("""
+        CREATE OR REPLACE PROCEDURE events_retention(job_id INT, config JSONB)
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            v_drop_after INTERVAL := (config->>'drop_after')::interval;
+            v_boundary TIMESTAMPTZ;
+            v_sites TEXT[];
+            v_days TIMESTAMPTZ[];
+            v_day TIMESTAMPTZ;
+            v_hits BIGINT;
+            v_incidents BIGINT;
+        BEGIN
+            IF v_drop_after IS NULL THEN
+                RAISE EXCEPTION 'events_retention: config.drop_after is required';
+            END IF;
+
+            SELECT max(range_end) INTO v_boundary
+            FROM timescaledb_information.chunks
+            WHERE hypertable_name = 'events' AND range_end <= now() - v_drop_after;
+            IF v_boundary IS NULL THEN
+                RETURN;
+            END IF;
+
+            SELECT array_agg(DISTINCT site_code) INTO v_sites
+            FROM events WHERE time < v_boundary AND site_code IS NOT NULL;
+
+            WITH purged AS (
+                DELETE FROM event_rule_hits erh
+                USING events e
+                WHERE e.id = erh.event_id AND e.time < v_boundary
+                RETURNING erh.created_at
+            )
+            SELECT count(*), array_agg(DISTINCT time_bucket(INTERVAL '1 day', created_at))
+            INTO v_hits, v_days FROM purged;
+
+            IF to_regclass('rule_hits_daily') IS NOT NULL THEN
+                FOREACH v_day IN ARRAY coalesce(v_days, '{}') LOOP
+                    DELETE FROM rule_hits_daily WHERE day = v_day;
+                    INSERT INTO rule_hits_daily
+                    SELECT time_bucket(INTERVAL '1 day', erh.created_at),
+                           erh.rule_id, erh.rule_name, i.provider_id,
+                           count(erh.id), count(DISTINCT e.site_code), max(erh.created_at)
+                    FROM event_rule_hits erh
+                    JOIN events e ON e.id = erh.event_id
+                    JOIN imports i ON i.id = e.import_id
+                    WHERE erh.created_at >= v_day AND erh.created_at < v_day + INTERVAL '1 day'
+                    GROUP BY 1, 2, 3, 4;
+                END LOOP;
+            END IF;
+
+            DELETE FROM incidents WHERE status = 'CLOSED' AND closed_at < v_boundary;
+            GET DIAGNOSTICS v_incidents = ROW_COUNT;
+            -- opened_at / closed_at = heure de l'event d'ouverture / de fermeture
+            UPDATE incidents SET open_event_id = NULL
+            WHERE opened_at < v_boundary AND open_event_id IS NOT NULL;
+
+            PERFORM drop_chunks('events', older_than => v_boundary);
+
+            IF v_sites IS NOT NULL THEN
+                DELETE FROM alert_state WHERE site_code = ANY(v_sites);
+                INSERT INTO alert_state (rule_name, site_code, zone_id, first_hit_time, last_hit_time, last_event_id, count_hits)
+                SELECT erh.rule_name, e.site_code, erh.hit_metadata->>'zone_id', MIN(e.time), MAX(e.time), MAX(e.id), COUNT(erh.id)
+                FROM event_rule_hits erh
+                JOIN events e ON e.id = erh.event_id
+                WHERE e.site_code = ANY(v_sites)
+                GROUP BY 1, 2, 3;
+
+                DELETE FROM alert_disparition_state WHERE site_code = ANY(v_sites);
+                INSERT INTO alert_disparition_state (site_code, zone_id, last_disp_time)
+                SELECT site_code, zone_id::text, MAX(time)
+                FROM events
+                WHERE site_code = ANY(v_sites) AND normalized_type LIKE '%DISPARITION%'
+                GROUP BY 1, 2;
+            END IF;
+
+            RAISE LOG '[METRIC] events_retention boundary=% hits=% incidents=% sites=%',
+                v_boundary, v_hits, v_incidents, coalesce(array_length(v_sites, 1), 0);
+        END
+        $$
+    """)
+
+
+def downgrade() -> None:
+    op.execute("SELECT delete_job(job_id) FROM timescaledb_information.jobs WHERE proc_name = 'events_retention'")
+    op.execute("DROP PROCEDURE IF EXISTS events_retention(INT, JSONB)")
@@ -0,0 +1,123 @@
+"""Dashboard rollups: continuous aggregate on events, daily import / rule-hit views
+
+Revision ID: 7c1e4b9d2a36
+Revises: 519fc267ffb9
+Create Date: 2026-10-17 09:12:41.208113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e4b9d2a36'
+down_revision: Union[str, None] = '519fc267ffb9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Events par heure / site / type : continuous aggregate (events est une hypertable).
+    # materialized_only = false : le bucket ouvert est complété en temps réel depuis events.
+    op.execute("""
+        CREATE MATERIALIZED VIEW events_hourly_site_type
+        WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+        SELECT time_bucket(INTERVAL '1 hour', time) AS bucket,
+               site_code,
+               normalized_type,
+               count(*) AS events,
+               min(time) AS first_time,
+               max(time) AS last_time
+        FROM events
+        GROUP BY bucket, site_code, normalized_type
+        WITH NO DATA
+    """)
+    # start_offset NULL : les imports d'historique insèrent loin dans le passé, les
+    # régions invalidées sont recalculées quelle que soit leur ancienneté.
+    op.execute("""
+        SELECT add_continuous_aggregate_policy('events_hourly_site_type',
+            start_offset => NULL,
+            end_offset => INTERVAL '1 hour',
+            schedule_interval => INTERVAL '30 minutes')
+    """)
+
+    # imports / event_rule_hits ne sont pas des hypertables : vues matérialisées
+    # classiques, rafraîchies par un job TimescaleDB (voir app/services/rollups.py).
+    op.execute("""
+        CREATE MATERIALIZED VIEW import_stats_daily AS
+        SELECT time_bucket(INTERVAL '1 day', created_at) AS day,
+               provider_id,
+               count(id) AS total_imports,
+               count(DISTINCT source_message_id) AS total_emails,
+               count(*) FILTER (WHERE filename ILIKE '%.xls%') AS total_xls,
+               count(*) FILTER (WHERE filename ILIKE '%.pdf%') AS total_pdf,
+               sum(events_count) AS total_events,
+               sum(nullif(jsonb_extract_path_text(import_metadata, 'integrity_check', 'received_rows'), '')::numeric)
+                   AS integrity_numerator,
+               sum(nullif(jsonb_extract_path_text(import_metadata, 'integrity_check', 'expected_rows'), '')::numeric)
+                   AS integrity_denominator,
+               count(*) FILTER (WHERE filename ILIKE '%.xls%'
+                                  AND jsonb_extract_path_text(import_metadata, 'pdf_support') IS NULL) AS missing_pdf
+        FROM imports
+        GROUP BY 1, 2
+    """)
+    op.execute("CREATE UNIQUE INDEX ux_import_stats_daily ON import_stats_daily (day, provider_id) NULLS NOT DISTINCT")
+
+    op.execute("""
+        CREATE MATERIALIZED VIEW rule_hits_daily AS
+        SELECT time_bucket(INTERVAL '1 day', erh.created_at) AS day,
+               erh.rule_id,
+               erh.rule_name,
+               i.provider_id,
+               count(erh.id) AS total_triggers,
+               count(DISTINCT e.site_code) AS distinct_sites,
+               max(erh.created_at) AS last_trigger_at
+        FROM event_rule_hits erh
+        JOIN events e ON e.id = erh.event_id
+        JOIN imports i ON i.id = e.import_id
+        GROUP BY 1, 2, 3, 4
+    """)
+    op.execute(
+        "CREATE UNIQUE INDEX ux_rule_hits_daily ON rule_hits_daily (day, rule_id, rule_name, provider_id) NULLS NOT DISTINCT"
+    )
+
+    op.create_table(
+        'rollup_refresh_log',
+        sa.Column('view_name', sa.String(length=100), primary_key=True),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    # now() = début de transaction, antérieur à l'instantané du REFRESH : un jour n'est
+    # considéré couvert que si toutes ses lignes étaient visibles du rafraîchissement.
+    op.execute("""
+        CREATE OR REPLACE PROCEDURE refresh_daily_rollups(job_id INT, config JSONB)
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            REFRESH MATERIALIZED VIEW CONCURRENTLY import_stats_daily;
+            REFRESH MATERIALIZED VIEW CONCURRENTLY rule_hits_daily;
+            INSERT INTO rollup_refresh_log (view_name, refreshed_at)
+            VALUES ('import_stats_daily', now()), ('rule_hits_daily', now())
+            ON CONFLICT (view_name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at;
+        END
+        $$
+    """)
+    op.execute("""
+        INSERT INTO rollup_refresh_log (view_name, refreshed_at)
+        VALUES ('import_stats_daily', now()), ('rule_hits_daily', now())
+    """)
+    op.execute("SELECT add_job('refresh_daily_rollups', INTERVAL '1 hour')")
+
+    # Matérialisation initiale hors transaction (refresh_continuous_aggregate l'exige)
+    with op.get_context().autocommit_block():
+        op.execute("CALL refresh_continuous_aggregate('events_hourly_site_type', NULL, now() - INTERVAL '1 hour')")
+
+
+def downgrade() -> None:
+    op.execute("SELECT delete_job(job_id) FROM timescaledb_information.jobs WHERE proc_name = 'refresh_daily_rollups'")
+    op.execute("DROP PROCEDURE IF EXISTS refresh_daily_rollups(INT, JSONB)")
+    op.drop_table('rollup_refresh_log')
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS rule_hits_daily")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS import_stats_daily")
+    op.execute("SELECT remove_continuous_aggregate_policy('events_hourly_site_type', if_exists => TRUE)")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS events_hourly_site_type")
@@ -0,0 +1,82 @@
+"""Materialized alert state: alert_state / alert_disparition_state, full backfill
+
+Revision ID: 8e3a1f5c2b70
+Revises: 5b2d7e9c1f48
+Create Date: 2026-10-17 19:22:05.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e3a1f5c2b70'
+down_revision: Union[str, None] = '5b2d7e9c1f48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # IF NOT EXISTS : les bases passées par l'ancien script migrations/17_alert_state.sql (retiré) ont les tables
+    # NULLS NOT DISTINCT (PostgreSQL >= 15) : zone_id NULL = une seule clé
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS alert_state (
+            id SERIAL PRIMARY KEY,
+            rule_name VARCHAR(100) NOT NULL,
+            site_code VARCHAR(50) NOT NULL,
+            zone_id TEXT,
+            first_hit_time TIMESTAMPTZ NOT NULL,
+            last_hit_time TIMESTAMPTZ NOT NULL,
+            last_event_id BIGINT NOT NULL,
+            count_hits INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """)
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_alert_state_key ON alert_state (rule_name, site_code, zone_id) NULLS NOT DISTINCT"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_alert_state_site ON alert_state (site_code)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_alert_state_last_hit_time ON alert_state (last_hit_time)")
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS alert_disparition_state (
+            id SERIAL PRIMARY KEY,
+            site_code VARCHAR(50) NOT NULL,
+            zone_id TEXT,
+            last_disp_time TIMESTAMPTZ NOT NULL
+        )
+    """)
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_alert_disparition_state_key "
+        "ON alert_disparition_state (site_code, zone_id) NULLS NOT DISTINCT"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_alert_disparition_state_last_disp_time ON alert_disparition_state (last_disp_time)"
+    )
+
+    # Backfill = alert_state.rebuild() : état effacé puis recalculé en entier, pour
+    # corriger aussi les lignes déjà présentes (posées par l'ancien script SQL)
+    op.execute("DELETE FROM alert_state")
+    op.execute("""
+        INSERT INTO alert_state (rule_name, site_code, zone_id, first_hit_time, last_hit_time, last_event_id, count_hits)
+        SELECT erh.rule_name, e.site_code, erh.hit_metadata->>'zone_id', MIN(e.time), MAX(e.time), MAX(e.id), COUNT(erh.id)
+        FROM event_rule_hits erh
+        JOIN events e ON e.id = erh.event_id
+        WHERE e.site_code IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+    op.execute("DELETE FROM alert_disparition_state")
+    op.execute("""
+        INSERT INTO alert_disparition_state (site_code, zone_id, last_disp_time)
+        SELECT site_code, zone_id::text, MAX(time)
+        FROM events
+        WHERE site_code IS NOT NULL AND normalized_type LIKE '%DISPARITION%'
+        GROUP BY 1, 2
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS alert_disparition_state")
+    op.execute("DROP TABLE IF EXISTS alert_state")
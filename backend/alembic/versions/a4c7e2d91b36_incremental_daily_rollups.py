@@ -0,0 +1,155 @@
+"""Incremental daily rollups: import_stats_daily / rule_hits_daily as tables refreshed by day
+
+Revision ID: a4c7e2d91b36
+Revises: 8e3a1f5c2b70
+Create Date: 2026-10-17 20:04:51.637219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c7e2d91b36'
+down_revision: Union[str, None] = '8e3a1f5c2b70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Jours recalculés à chaque passage en plus de ceux touchés depuis le précédent :
+# imports mis à jour après création (statut, events_count, contrôle d'intégrité),
+# transactions longues commitées après le passage précédent.
+RECENT_DAYS = 3
+
+IMPORT_STATS_SELECT = """
+    SELECT time_bucket(INTERVAL '1 day', created_at) AS day,
+           provider_id,
+           count(id) AS total_imports,
+           count(DISTINCT source_message_id) AS total_emails,
+           count(*) FILTER (WHERE filename ILIKE '%.xls%') AS total_xls,
+           count(*) FILTER (WHERE filename ILIKE '%.pdf%') AS total_pdf,
+           sum(events_count) AS total_events,
+           sum(nullif(jsonb_extract_path_text(import_metadata, 'integrity_check', 'received_rows'), '')::numeric)
+               AS integrity_numerator,
+           sum(nullif(jsonb_extract_path_text(import_metadata, 'integrity_check', 'expected_rows'), '')::numeric)
+               AS integrity_denominator,
+           count(*) FILTER (WHERE filename ILIKE '%.xls%'
+                              AND jsonb_extract_path_text(import_metadata, 'pdf_support') IS NULL) AS missing_pdf
+    FROM imports
+"""
+
+RULE_HITS_SELECT = """
+    SELECT time_bucket(INTERVAL '1 day', erh.created_at) AS day,
+           erh.rule_id,
+           erh.rule_name,
+           i.provider_id,
+           count(erh.id) AS total_triggers,
+           count(DISTINCT e.site_code) AS distinct_sites,
+           max(erh.created_at) AS last_trigger_at
+    FROM event_rule_hits erh
+    JOIN events e ON e.id = erh.event_id
+    JOIN imports i ON i.id = e.import_id
+"""
+
+
+def upgrade() -> None:
+    op.execute("SELECT delete_job(job_id) FROM timescaledb_information.jobs WHERE proc_name = 'refresh_daily_rollups'")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS rule_hits_daily")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS import_stats_daily")
+
+    # Mêmes noms et colonnes que les vues : lectures (app/services/rollups.py) inchangées
+    op.execute("""
+        CREATE TABLE import_stats_daily (
+            day TIMESTAMPTZ NOT NULL,
+            provider_id INTEGER,
+            total_imports BIGINT NOT NULL,
+            total_emails BIGINT NOT NULL,
+            total_xls BIGINT NOT NULL,
+            total_pdf BIGINT NOT NULL,
+            total_events BIGINT,
+            integrity_numerator NUMERIC,
+            integrity_denominator NUMERIC,
+            missing_pdf BIGINT NOT NULL
+        )
+    """)
+    op.execute("CREATE UNIQUE INDEX ux_import_stats_daily ON import_stats_daily (day, provider_id) NULLS NOT DISTINCT")
+    op.execute("""
+        CREATE TABLE rule_hits_daily (
+            day TIMESTAMPTZ NOT NULL,
+            rule_id INTEGER NOT NULL,
+            rule_name VARCHAR(100) NOT NULL,
+            provider_id INTEGER,
+            total_triggers BIGINT NOT NULL,
+            distinct_sites BIGINT NOT NULL,
+            last_trigger_at TIMESTAMPTZ NOT NULL
+        )
+    """)
+    op.execute(
+        "CREATE UNIQUE INDEX ux_rule_hits_daily ON rule_hits_daily (day, rule_id, rule_name, provider_id) NULLS NOT DISTINCT"
+    )
+
+    # Seuls les jours depuis le passage précédent (created_at >= watermark, arrondi au jour)
+    # et les `recent_days` derniers jours sont effacés puis recalculés ; les jours plus
+    # anciens restent figés. config {"full": true} : recalcul de tout l'historique.
+    # now() = début de transaction, antérieur aux lignes lues : un jour n'est considéré
+    # couvert que si toutes ses lignes étaient visibles du rafraîchissement.
+    op.execute(f"""
+        CREATE OR REPLACE PROCEDURE refresh_daily_rollups(job_id INT, config JSONB)
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            v_recent INTERVAL := make_interval(days => coalesce((config->>'recent_days')::int, {RECENT_DAYS}));
+            v_since TIMESTAMPTZ;
+            v_from TIMESTAMPTZ := '-infinity';
+        BEGIN
+            SELECT min(refreshed_at) INTO v_since
+            FROM rollup_refresh_log WHERE view_name IN ('import_stats_daily', 'rule_hits_daily');
+            IF NOT coalesce((config->>'full')::boolean, false) AND v_since IS NOT NULL THEN
+                v_from := time_bucket(INTERVAL '1 day', least(v_since, now() - v_recent));
+            END IF;
+
+            DELETE FROM import_stats_daily WHERE day >= v_from;
+            INSERT INTO import_stats_daily
+            {IMPORT_STATS_SELECT}
+            WHERE created_at >= v_from
+            GROUP BY 1, 2;
+
+            DELETE FROM rule_hits_daily WHERE day >= v_from;
+            INSERT INTO rule_hits_daily
+            {RULE_HITS_SELECT}
+            WHERE erh.created_at >= v_from
+            GROUP BY 1, 2, 3, 4;
+
+            INSERT INTO rollup_refresh_log (view_name, refreshed_at)
+            VALUES ('import_stats_daily', now()), ('rule_hits_daily', now())
+            ON CONFLICT (view_name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at;
+        END
+        $$
+    """)
+    op.execute("""CALL refresh_daily_rollups(NULL, '{"full": true}')""")
+    op.execute(f"""SELECT add_job('refresh_daily_rollups', INTERVAL '1 hour', config => '{{"recent_days": {RECENT_DAYS}}}')""")
+
+
+def downgrade() -> None:
+    op.execute("SELECT delete_job(job_id) FROM timescaledb_information.jobs WHERE proc_name = 'refresh_daily_rollups'")
+    op.execute("DROP TABLE IF EXISTS rule_hits_daily")
+    op.execute("DROP TABLE IF EXISTS import_stats_daily")
+    op.execute(f"CREATE MATERIALIZED VIEW import_stats_daily AS {IMPORT_STATS_SELECT} GROUP BY 1, 2")
+    op.execute("CREATE UNIQUE INDEX ux_import_stats_daily ON import_stats_daily (day, provider_id) NULLS NOT DISTINCT")
+    op.execute(f"CREATE MATERIALIZED VIEW rule_hits_daily AS {RULE_HITS_SELECT} GROUP BY 1, 2, 3, 4")
+    op.execute(
+        "CREATE UNIQUE INDEX ux_rule_hits_daily ON rule_hits_daily (day, rule_id, rule_name, provider_id) NULLS NOT DISTINCT"
+    )
+    op.execute("""
+        CREATE OR REPLACE PROCEDURE refresh_daily_rollups(job_id INT, config JSONB)
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            REFRESH MATERIALIZED VIEW CONCURRENTLY import_stats_daily;
+            REFRESH MATERIALIZED VIEW CONCURRENTLY rule_hits_daily;
+            INSERT INTO rollup_refresh_log (view_name, refreshed_at)
+            VALUES ('import_stats_daily', now()), ('rule_hits_daily', now())
+            ON CONFLICT (view_name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at;
+        END
+        $$
+    """)
+    op.execute("SELECT add_job('refresh_daily_rollups', INTERVAL '1 hour')")
@@ -0,0 +1,84 @@
+"""Per-day refresh of import_stats_daily / rule_hits_daily for app-side mutations
+
+Revision ID: c5e8b1a3f762
+Revises: 6d1b8f3e2a95
+Create Date: 2026-10-17 22:16:40.527391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e8b1a3f762'
+down_revision: Union[str, None] = '6d1b8f3e2a95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Mêmes agrégats que refresh_daily_rollups (révision a4c7e2d91b36)
+IMPORT_STATS_SELECT = """
+    SELECT time_bucket(INTERVAL '1 day', created_at) AS day,
+           provider_id,
+           count(id) AS total_imports,
+           count(DISTINCT source_message_id) AS total_emails,
+           count(*) FILTER (WHERE filename ILIKE '%.xls%') AS total_xls,
+           count(*) FILTER (WHERE filename ILIKE '%.pdf%') AS total_pdf,
+           sum(events_count) AS total_events,
+           sum(nullif(jsonb_extract_path_text(import_metadata, 'integrity_check', 'received_rows'), '')::numeric)
+               AS integrity_numerator,
+           sum(nullif(jsonb_extract_path_text(import_metadata, 'integrity_check', 'expected_rows'), '')::numeric)
+               AS integrity_denominator,
+           count(*) FILTER (WHERE filename ILIKE '%.xls%'
+                              AND jsonb_extract_path_text(import_metadata, 'pdf_support') IS NULL) AS missing_pdf
+    FROM imports
+"""
+
+RULE_HITS_SELECT = """
+    SELECT time_bucket(INTERVAL '1 day', erh.created_at) AS day,
+           erh.rule_id,
+           erh.rule_name,
+           i.provider_id,
+           count(erh.id) AS total_triggers,
+           count(DISTINCT e.site_code) AS distinct_sites,
+           max(erh.created_at) AS last_trigger_at
+    FROM event_rule_hits erh
+    JOIN events e ON e.id = erh.event_id
+    JOIN imports i ON i.id = e.import_id
+"""
+
+
+def upgrade() -> None:
+    # refresh_daily_rollups ne revient jamais sur les jours anciens : replay, reprocess,
+    # purge / reparse d'import appellent cette procédure (app/services/rollups.refresh_days)
+    # dans leur transaction pour les jours dont ils ont supprimé ou modifié des lignes.
+    # Jours = débuts de jour UTC (time_bucket), distincts.
+    op.execute(f"""
+        CREATE OR REPLACE PROCEDURE refresh_rollup_days(import_days TIMESTAMPTZ[], hit_days TIMESTAMPTZ[])
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF cardinality(import_days) > 0 THEN
+                DELETE FROM import_stats_daily WHERE day = ANY(import_days);
+                INSERT INTO import_stats_daily
+                {IMPORT_STATS_SELECT}
+                JOIN unnest(import_days) AS d(bucket)
+                  ON created_at >= d.bucket AND created_at < d.bucket + INTERVAL '1 day'
+                GROUP BY 1, 2;
+            END IF;
+
+            IF cardinality(hit_days) > 0 THEN
+                DELETE FROM rule_hits_daily WHERE day = ANY(hit_days);
+                INSERT INTO rule_hits_daily
+                {RULE_HITS_SELECT}
+                JOIN unnest(hit_days) AS d(bucket)
+                  ON erh.created_at >= d.bucket AND erh.created_at < d.bucket + INTERVAL '1 day'
+                GROUP BY 1, 2, 3, 4;
+            END IF;
+        END
+        $$
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP PROCEDURE IF EXISTS refresh_rollup_days(TIMESTAMPTZ[], TIMESTAMPTZ[])")
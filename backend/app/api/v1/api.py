@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends
 from app.api.v1.endpoints import (
     imports, events, alerts, settings, utils, login, users, debug, connections,
     admin_unmatched, admin_profiles, admin_sandbox, admin_reprocess, admin_business, admin_providers,
-    admin_config, admin_test_ingest, health, rules, clients, client_site, ingestion
+    admin_config, admin_storage, admin_test_ingest, health, rules, clients, client_site, ingestion
 )
 from app.auth import deps
 
@@ -30,4 +30,5 @@ api_router.include_router(admin_reprocess.router, prefix="/admin/reprocess", tag
 api_router.include_router(admin_business.router, prefix="/admin/business", tags=["admin-business"], dependencies=[Depends(deps.get_current_active_admin)])
 api_router.include_router(admin_providers.router, prefix="/admin/providers", tags=["admin-providers"], dependencies=[Depends(deps.get_current_active_admin)])
 api_router.include_router(admin_config.router, prefix="/admin/config", tags=["admin-config"], dependencies=[Depends(deps.get_current_active_admin)])
+api_router.include_router(admin_storage.router, prefix="/admin/storage", tags=["admin-storage"], dependencies=[Depends(deps.get_current_active_admin)])
 api_router.include_router(admin_test_ingest.router, prefix="/admin", tags=["admin-test"], dependencies=[Depends(deps.get_current_active_admin)])
@@ -10,6 +10,7 @@ from app.schemas.monitoring_provider import (
     MonitoringProviderSchema,
     SmtpProviderRuleSchema
 )
+from app.services.smtp_rule_index import smtp_rule_index
 
 router = APIRouter()
 
@@ -113,6 +114,7 @@ async def create_provider_rule(
     rule = SmtpProviderRule(**rule_data)
     db.add(rule)
     await db.commit()
+    await smtp_rule_index.publish_invalidation()
     await db.refresh(rule)
     return rule
 
@@ -136,6 +138,7 @@ async def update_rule(
         setattr(rule, field, value)
             
     await db.commit()
+    await smtp_rule_index.publish_invalidation()
     await db.refresh(rule)
     return rule
 
@@ -149,4 +152,5 @@ async def delete_rule(
     stmt = delete(SmtpProviderRule).where(SmtpProviderRule.id == rule_id)
     await db.execute(stmt)
     await db.commit()
+    await smtp_rule_index.publish_invalidation()
     return {"status": "success"}
@@ -0,0 +1,81 @@
+from typing import Any, Dict, List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth import deps
+from app.db.models import User
+from app.schemas.admin import StorageChunkOut, StoragePoliciesUpdate, StorageSummaryOut
+from app.services import storage_policies
+from app.services.repository import AdminRepository
+from app.services.storage_policies import StorageUnavailable
+
+router = APIRouter()
+
+
+@router.get("/", response_model=StorageSummaryOut)
+async def get_storage_summary(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """Chunk interval, compression settings, active policies and overall compression ratio of events."""
+    try:
+        return await storage_policies.get_summary(db)
+    except StorageUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/chunks", response_model=List[StorageChunkOut])
+async def list_storage_chunks(
+    limit: int = Query(200, ge=1, le=5000),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """Per-chunk size and compression ratio, most recent first."""
+    try:
+        return await storage_policies.list_chunks(db, limit=limit)
+    except StorageUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.put("/policies", response_model=StorageSummaryOut)
+async def update_storage_policies(
+    policies_in: StoragePoliciesUpdate,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """
+    Adjust chunk interval, compression and retention policies.
+    0 removes a policy; omitted fields are left unchanged.
+    """
+    data = policies_in.model_dump(exclude_unset=True)
+    try:
+        current = await storage_policies.get_summary(db)
+        compress_after = data.get("compress_after_days",
+                                  (current["compression_policy"] or {}).get("after_days"))
+        retention = data.get("retention_days", (current["retention_policy"] or {}).get("after_days"))
+        if compress_after and retention and retention <= compress_after:
+            raise HTTPException(status_code=400, detail="retention_days must exceed compress_after_days")
+
+        await storage_policies.update_policies(db, **data)
+        await AdminRepository(db).create_audit_log(
+            user_id=current_user.id,
+            action="UPDATE_STORAGE_POLICIES",
+            target_type="HYPERTABLE",
+            target_id=storage_policies.HYPERTABLE,
+            payload=data,
+        )
+        await db.commit()
+        return await storage_policies.get_summary(db)
+    except StorageUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/plans")
+async def explain_storage_plans(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Dict[str, Any]:
+    """EXPLAIN of the hot event queries on the oldest events: do they stay index-friendly once compressed?"""
+    try:
+        return await storage_policies.explain_hot_queries(db)
+    except StorageUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
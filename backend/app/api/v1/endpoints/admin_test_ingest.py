@@ -12,6 +12,7 @@ from app.auth import deps
 from app.db.models import User, ImportLog, MonitoringProvider
 from app.schemas.admin import TestIngestResultOut
 from app.parsers.factory import ParserFactory
+from app.parsers.executor import parser_executor
 from app.ingestion.profile_manager import ProfileManager
 from app.ingestion.profile_matcher import ProfileMatcher
 from app.ingestion.utils import detect_file_format, get_file_probe
@@ -138,7 +139,8 @@ async def admin_test_ingest(
         # Convert List[MappingRule] to Dict for parsers
         mapping_dict = {m.target: m.source for m in matched_profile.mapping}
         
-        excel_events = parser.parse(
+        excel_events = await parser_executor.parse(
+            parser,
             str(excel_path), 
             source_timezone="Europe/Paris",
             parser_config={
@@ -153,7 +155,7 @@ async def admin_test_ingest(
             # For PDF, we try to use the PDF parser if it matches the profile or extension
             pdf_parser = ParserFactory.get_parser(".pdf")
             if pdf_parser:
-                pdf_events = pdf_parser.parse(str(pdf_path), source_timezone="Europe/Paris")
+                pdf_events = await parser_executor.parse(pdf_parser, str(pdf_path), source_timezone="Europe/Paris")
 
         # 6. Store Data
         repo = EventRepository(db)
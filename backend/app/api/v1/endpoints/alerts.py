@@ -1,14 +1,18 @@
 import logging
 from datetime import datetime
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 from app.db.session import get_db
 from app.db.models import AlertRule, Event, ReplayJob, User, RuleCondition, EventRuleHit, MonitoringProvider, ImportLog
 from app.schemas.response_models import AlertRuleOut, AlertRuleCreate, AlertRuleUpdate, AlertListResponse, AlertListItem
 from app.services.alerting import AlertingService
-from app.services.repository import EventRepository
+from app.services.repository import EventRepository, AdminRepository
+from app.services import alert_state, rollups
+from app.services.pagination import (
+    COUNT_PATTERN, PAGINATION_PATTERN, InvalidCursor, count_rows, fetch_keyset_page,
+)
 from app.auth.deps import get_current_operator_or_admin
 
 router = APIRouter()
@@ -24,11 +28,15 @@ async def list_alerts(
     site_code: Optional[str] = None,
     sort_by: str = "created_at",
     sort_order: str = "desc",
+    pagination: str = Query("offset", pattern=PAGINATION_PATTERN),
+    cursor: Optional[str] = None,
+    count: str = Query("exact", pattern=COUNT_PATTERN),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_operator_or_admin)
 ) -> Any:
     """
     Phase 3: Paginated & Filtered alerts list.
+    pagination=cursor : keyset sur (created_at, id) du hit (sort_by=created_at|id), `next_cursor`.
     """
     from sqlalchemy import desc, asc, func
 
@@ -64,9 +72,28 @@ async def list_alerts(
         stmt = stmt.where(Event.site_code == site_code)
 
     # Total count
-    count_stmt = select(func.count()).select_from(stmt.subquery())
-    total_res = await db.execute(count_stmt)
-    total = total_res.scalar() or 0
+    total = await count_rows(db, stmt, count)
+
+    if pagination == "cursor":
+        if sort_by == "id":
+            keys, key_of = [EventRuleHit.id], lambda r: (r.hit_id,)
+        elif sort_by == "created_at":
+            keys, key_of = [EventRuleHit.created_at, EventRuleHit.id], lambda r: (r.created_at, r.hit_id)
+        else:
+            raise HTTPException(status_code=400, detail="pagination=cursor supports sort_by=created_at|id")
+        try:
+            items, next_cursor = await fetch_keyset_page(
+                db, stmt, keys, sort_order == "desc", cursor, limit, key_of=key_of,
+            )
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {
+            "items": items,
+            "total": total,
+            "page": page,
+            "limit": limit,
+            "next_cursor": next_cursor
+        }
 
     # Sorting
     order_col = getattr(EventRuleHit, sort_by, EventRuleHit.created_at)
@@ -96,7 +123,7 @@ async def get_active_alerts(
     current_user: User = Depends(get_current_operator_or_admin)
 ) -> Any:
     """Get currently active alerts."""
-    repo = EventRepository(db)
+    repo = AdminRepository(db)
     return await repo.get_active_alerts(skip=skip, limit=limit)
 
 @router.get("/archived", response_model=List[Any])
@@ -108,7 +135,7 @@ async def get_archived_alerts(
     current_user: User = Depends(get_current_operator_or_admin)
 ) -> Any:
     """Get archived alerts for the last N days."""
-    repo = EventRepository(db)
+    repo = AdminRepository(db)
     return await repo.get_archived_alerts(days=days, skip=skip, limit=limit)
 
 
@@ -402,6 +429,7 @@ async def reprocess_alerts_task(db: AsyncSession, job_id: int):
         return
         
     alerting_service = AlertingService()
+    rule_plans = alerting_service.compile_rules(active_rules)
     
     # 2. Iterate ALL events (Batch Processing)
     batch_size = 1000
@@ -429,6 +457,7 @@ async def reprocess_alerts_task(db: AsyncSession, job_id: int):
             
             # Phase 2.0: Strategy REPLACE - Clear previous hits for these events
             event_ids = [e.id for e in events]
+            hit_days = await rollups.days_of_hits(db, EventRuleHit.event_id.in_(event_ids))
             await db.execute(
                 delete(EventRuleHit).where(EventRuleHit.event_id.in_(event_ids))
             )
@@ -449,7 +478,7 @@ async def reprocess_alerts_task(db: AsyncSession, job_id: int):
                 simulated_event.id = db_event.id
                 
                 # Check alerts
-                await alerting_service.check_and_trigger_alerts(simulated_event, active_rules, repo=repo)
+                await alerting_service.check_and_trigger_alerts(simulated_event, rule_plans, repo=repo)
                 
                 # If modified to CRITICAL, update DB
                 if simulated_event.status == 'CRITICAL' and db_event.severity != 'CRITICAL':
@@ -457,6 +486,10 @@ async def reprocess_alerts_task(db: AsyncSession, job_id: int):
                     batch_updates += 1
                     alerts_triggered += 1
                     
+            # Hits de la tranche remplacés : état exact des sites concernés
+            await alert_state.refresh_hits(db, {e.site_code for e in events if e.site_code})
+            await rollups.refresh_days(db, hit_days=hit_days)
+
             # Commit batch & Update Job
             total_processed += len(events)
             job.events_scanned = total_processed
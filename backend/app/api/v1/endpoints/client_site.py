@@ -9,6 +9,7 @@ from app.db.session import get_db
 from app.db.models import Event, EventRuleHit, MonitoringProvider, ImportLog, SiteConnection, User
 from app.schemas.response_models import ClientSiteSummaryOut, EventListOut, AlertListResponse, EventOut, AlertListItem
 from app.auth.deps import get_current_user
+from app.services.repository import EventRepository
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -46,19 +47,10 @@ async def get_site_summary(
     date_limit = datetime.utcnow() - timedelta(days=days)
 
     # 2. KPIs
-    # Events Count
-    count_evt = await db.execute(
-        select(func.count(Event.id))
-        .where(Event.site_code == site_code, Event.time >= date_limit)
-    )
-    events_count = count_evt.scalar() or 0
-
-    # Last Event
-    last_evt_stmt = await db.execute(
-        select(func.max(Event.time))
-        .where(Event.site_code == site_code)
-    )
-    last_event_at = last_evt_stmt.scalar()
+    # Events Count / Last Event / Total (continuous aggregate horaire si disponible)
+    event_stats = await EventRepository(db).get_site_event_stats(site_code, date_limit)
+    events_count = event_stats["events_count"]
+    last_event_at = event_stats["last_event_at"]
 
     # Alerts Count
     count_alrt_stmt = (
@@ -103,8 +95,7 @@ async def get_site_summary(
     events_items = evt_res.scalars().all()
     
     # Total events for this site (not just the last N days for the list)
-    total_evts_stmt = await db.execute(select(func.count(Event.id)).where(Event.site_code == site_code))
-    total_events = total_evts_stmt.scalar() or 0
+    total_events = event_stats["total_events"]
 
     # Alerts timeline
     alrt_skip = (alerts_page - 1) * limit
@@ -6,7 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.db.models import User
 from app.schemas.response_models import ClientReportOut
-from app.services.repository import EventRepository
+from app.services.repository import AdminRepository
 from app.auth.deps import get_current_user
 
 router = APIRouter()
@@ -22,7 +22,7 @@ async def get_client_report(
     """
     Get a consolidated chronological report for a specific client.
     """
-    repo = EventRepository(db)
+    repo = AdminRepository(db)
     report = await repo.get_client_report(site_code=site_code, days=days)
     
     if not report:
@@ -11,6 +11,10 @@ from pydantic import BaseModel
 from app.db.session import get_db
 from app.db.models import MonitoringProvider, SmtpProviderRule, SiteConnection, User
 from app.auth.deps import get_current_user, get_current_operator_or_admin
+from app.services.smtp_rule_index import smtp_rule_index
+from app.services.pagination import (
+    COUNT_PATTERN, PAGINATION_PATTERN, InvalidCursor, count_rows, fetch_keyset_page,
+)
 
 router = APIRouter()
 
@@ -42,9 +46,10 @@ class SiteConnectionOut(BaseModel):
 
 class ConnectionListResponse(BaseModel):
     connections: List[SiteConnectionOut]
-    total: int
+    total: Optional[int] = None  # None si count=none
     page: int
     limit: int
+    next_cursor: Optional[str] = None  # pagination=cursor
 
 class GrowthItem(BaseModel):
     period: str  # YYYY-MM or YYYY
@@ -175,6 +180,9 @@ async def list_connections(
     limit: int = Query(50, ge=1, le=500, description="Items per page"),
     sort_by: str = Query("client_name", description="Sort field: client_name or code_site"),
     sort_order: str = Query("asc", description="Sort direction: asc or desc"),
+    pagination: str = Query("offset", pattern=PAGINATION_PATTERN, description="offset (page) or cursor (keyset on sort field, id)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (pagination=cursor)"),
+    count: str = Query("exact", pattern=COUNT_PATTERN, description="Total: exact, estimate (planner) or none"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> Any:
@@ -195,9 +203,7 @@ async def list_connections(
         )
 
     # Count total
-    count_stmt = select(func.count()).select_from(base_stmt.subquery())
-    total_result = await db.execute(count_stmt)
-    total = total_result.scalar() or 0
+    total = await count_rows(db, base_stmt, count)
 
     # Resolve sort column
     sort_col_map = {
@@ -212,10 +218,23 @@ async def list_connections(
     # Secondary sort always stable
     secondary = SiteConnection.code_site.asc()
 
-    skip = (page - 1) * limit
-    stmt = base_stmt.order_by(order_expr, secondary).offset(skip).limit(limit)
-    result = await db.execute(stmt)
-    rows = result.all()
+    next_cursor = None
+    if pagination == "cursor":
+        # Clé unique (tri, id) ; client_name nullable ramené à '' pour la comparaison de lignes
+        sort_field = sort_by if sort_by in sort_col_map else "client_name"
+        sort_key = func.coalesce(sort_col, '') if sort_field == "client_name" else sort_col
+        try:
+            rows, next_cursor = await fetch_keyset_page(
+                db, base_stmt, [sort_key, SiteConnection.id], sort_order.lower() != "asc", cursor, limit,
+                key_of=lambda r: (r[0].client_name or '' if sort_field == "client_name" else getattr(r[0], sort_field), r[0].id),
+            )
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        skip = (page - 1) * limit
+        stmt = base_stmt.order_by(order_expr, secondary).offset(skip).limit(limit)
+        result = await db.execute(stmt)
+        rows = result.all()
 
     connections = [
         SiteConnectionOut(
@@ -230,7 +249,7 @@ async def list_connections(
         for sc, mp in rows
     ]
 
-    return ConnectionListResponse(connections=connections, total=total, page=page, limit=limit)
+    return ConnectionListResponse(connections=connections, total=total, page=page, limit=limit, next_cursor=next_cursor)
 
 
 @router.get("/growth", response_model=GrowthResponse)
@@ -306,6 +325,7 @@ async def create_provider(
     provider = MonitoringProvider(**provider_data)
     db.add(provider)
     await db.commit()
+    await smtp_rule_index.publish_invalidation()
     await db.refresh(provider)
     return ProviderOut.model_validate(provider)
 
@@ -334,6 +354,7 @@ async def update_provider(
             setattr(provider, field, value)
         
     await db.commit()
+    await smtp_rule_index.publish_invalidation()
     await db.refresh(provider)
     return ProviderOut.model_validate(provider)
 
@@ -358,6 +379,7 @@ async def delete_provider(
         
     await db.delete(provider)
     await db.commit()
+    await smtp_rule_index.publish_invalidation()
     return {"status": "deleted", "provider_id": provider_id}
 
 
@@ -407,6 +429,7 @@ async def create_provider_rule(
     )
     db.add(rule)
     await db.commit()
+    await smtp_rule_index.publish_invalidation()
     await db.refresh(rule)
     return SmtpRuleOut.model_validate(rule)
 
@@ -445,6 +468,7 @@ async def update_provider_rule(
         rule.is_active = rule_in.is_active
         
     await db.commit()
+    await smtp_rule_index.publish_invalidation()
     await db.refresh(rule)
     return SmtpRuleOut.model_validate(rule)
 
@@ -473,4 +497,5 @@ async def delete_provider_rule(
     
     await db.delete(rule)
     await db.commit()
+    await smtp_rule_index.publish_invalidation()
     return {"status": "deleted", "rule_id": rule_id}
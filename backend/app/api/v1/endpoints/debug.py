@@ -44,7 +44,8 @@ async def debug_resolve_provider(
     from app.db.models import MonitoringProvider
     
     resolver = ProviderResolver()
-    provider_id = await resolver.resolve_provider(email, db)
+    rule = await resolver.resolve_provider(email, db)
+    provider_id = rule.provider_id if rule else None
     
     if provider_id:
         provider = await resolver.get_provider_by_id(provider_id, db)
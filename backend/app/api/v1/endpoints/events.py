@@ -1,26 +1,50 @@
-from typing import List, Any
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
 from app.db.session import get_db
 from app.db.models import Event
 from app.schemas.response_models import EventOut, EventDetailOut
 from app.services.repository import EventRepository
+from app.services.pagination import (
+    COUNT_PATTERN, PAGINATION_PATTERN, InvalidCursor, count_rows, fetch_keyset_page,
+)
 
 router = APIRouter()
 
 @router.get("/", response_model=List[EventOut])
 async def read_events(
+    response: Response,
     skip: int = 0,
     limit: int = 50,
+    pagination: str = Query("offset", pattern=PAGINATION_PATTERN),
+    cursor: Optional[str] = None,
+    count: str = Query("none", pattern=COUNT_PATTERN),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     """
     Retrieve latest events.
+    pagination=cursor : keyset sur (time, id), page suivante via l'en-tête X-Next-Cursor.
+    count=exact|estimate : total dans l'en-tête X-Total-Count.
     """
-    stmt = select(Event).order_by(desc(Event.time)).offset(skip).limit(limit)
-    result = await db.execute(stmt)
-    events = result.scalars().all()
+    if pagination == "cursor":
+        try:
+            events, next_cursor = await fetch_keyset_page(
+                db, select(Event), [Event.time, Event.id], True, cursor, limit,
+                key_of=lambda e: (e.time, e.id), scalars=True,
+            )
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+    else:
+        stmt = select(Event).order_by(desc(Event.time)).offset(skip).limit(limit)
+        result = await db.execute(stmt)
+        events = result.scalars().all()
+
+    total = await count_rows(db, select(Event), count)
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
     
     # 3. Fetch Rule Hits (Phase 1)
     repo = EventRepository(db)
@@ -117,6 +117,7 @@ class SystemComponentStatus(BaseModel):
     status: str # OK, WARN, CRIT
     details: Optional[str] = None
     age_seconds: Optional[float] = None
+    concurrency: Optional[Dict[str, Any]] = None
 
 class SystemHealthSchema(BaseModel):
     status: str
@@ -166,6 +167,8 @@ async def get_system_health(
                 age = (datetime.now() - hb_ts).total_seconds()
                 
                 health["worker"]["age_seconds"] = age
+                if "concurrency" in hb_data:
+                    health["worker"]["concurrency"] = hb_data["concurrency"]
                 if age > 120:
                     health["worker"]["status"] = "CRIT"
                     health["worker"]["details"] = f"Heartbeat is too old: {age}s"
@@ -1,13 +1,16 @@
 from datetime import datetime
 import os
 from typing import List, Any, Optional
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
 from app.db.session import get_db
 from app.db.models import ImportLog, Event, MonitoringProvider
 from app.schemas.response_models import ImportLogOut, ImportListOut, EventOut, EventListOut, ImportQualitySummary
 from app.services.repository import EventRepository
+from app.services.pagination import (
+    COUNT_PATTERN, PAGINATION_PATTERN, InvalidCursor, count_rows, fetch_keyset_page,
+)
 
 router = APIRouter()
 
@@ -18,13 +21,16 @@ async def read_imports(
     status: Optional[str] = None,
     date_from: Optional[datetime] = None,
     date_to: Optional[datetime] = None,
+    pagination: str = Query("offset", pattern=PAGINATION_PATTERN),
+    cursor: Optional[str] = None,
+    count: str = Query("exact", pattern=COUNT_PATTERN),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     """
     Retrieve file import history with filters and pagination.
+    pagination=cursor : keyset sur (created_at, id), page suivante via `next_cursor`.
+    count=exact|estimate|none : total exact, estimé par le planner, ou absent.
     """
-    from sqlalchemy import func
-    
     # Base query for filter counting and data fetching
     base_stmt = select(ImportLog)
     
@@ -36,14 +42,22 @@ async def read_imports(
         base_stmt = base_stmt.where(ImportLog.created_at <= date_to)
 
     # Count Total
-    count_stmt = select(func.count()).select_from(base_stmt.subquery())
-    total_result = await db.execute(count_stmt)
-    total = total_result.scalar() or 0
+    total = await count_rows(db, base_stmt, count)
 
     # Fetch Data
-    stmt = base_stmt.order_by(desc(ImportLog.created_at)).offset(skip).limit(limit)
-    result = await db.execute(stmt)
-    logs = result.scalars().all()
+    next_cursor = None
+    if pagination == "cursor":
+        try:
+            logs, next_cursor = await fetch_keyset_page(
+                db, base_stmt, [ImportLog.created_at, ImportLog.id], True, cursor, limit,
+                key_of=lambda log: (log.created_at, log.id), scalars=True,
+            )
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        stmt = base_stmt.order_by(desc(ImportLog.created_at)).offset(skip).limit(limit)
+        result = await db.execute(stmt)
+        logs = result.scalars().all()
     
     # Fetch Monitoring Providers for thresholds (Phase 5)
     providers_stmt = select(MonitoringProvider)
@@ -159,7 +173,8 @@ async def read_imports(
 
     return {
         "imports": processed_logs,
-        "total": total
+        "total": total,
+        "next_cursor": next_cursor
     }
 
 @router.get("/{id}/quality-report")
@@ -194,10 +209,14 @@ async def read_import_events(
     rule_name: Optional[str] = None,
     action_filter: Optional[str] = None,
     code_filter: Optional[str] = None,
+    pagination: str = Query("offset", pattern=PAGINATION_PATTERN),
+    cursor: Optional[str] = None,
+    count: str = Query("exact", pattern=COUNT_PATTERN),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     """
     Retrieve events for a specific import job with filters, pagination, and sorting.
+    pagination=cursor : keyset sur (colonne de tri, id), page suivante via `next_cursor`.
     """
     from sqlalchemy import func
 
@@ -221,9 +240,7 @@ async def read_import_events(
         base_stmt = base_stmt.where(Event.raw_code.ilike(f"%{code_filter}%"))
 
     # Count Total (Efficient)
-    count_stmt = select(func.count()).select_from(base_stmt.subquery())
-    total_result = await db.execute(count_stmt)
-    total = total_result.scalar() or 0
+    total = await count_rows(db, base_stmt, count)
 
     # Sorting
     sort_column = Event.time
@@ -233,16 +250,33 @@ async def read_import_events(
         sort_column = Event.site_code
     elif sort_by == 'id':
         sort_column = Event.id
-    
-    if order.lower() == 'desc':
-        base_stmt = base_stmt.order_by(desc(sort_column))
+
+    next_cursor = None
+    if pagination == "cursor":
+        # Clé unique (tri, id) ; severity / site_code nullables ramenés à '' pour la comparaison de lignes
+        if sort_by == 'id':
+            keys, key_of = [Event.id], lambda e: (e.id,)
+        elif sort_by in ('severity', 'site_code'):
+            keys = [func.coalesce(sort_column, ''), Event.id]
+            key_of = lambda e: (getattr(e, sort_by) or '', e.id)
+        else:
+            keys, key_of = [Event.time, Event.id], lambda e: (e.time, e.id)
+        try:
+            events, next_cursor = await fetch_keyset_page(
+                db, base_stmt, keys, order.lower() == 'desc', cursor, limit, key_of=key_of, scalars=True,
+            )
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
     else:
-        base_stmt = base_stmt.order_by(sort_column.asc())
+        if order.lower() == 'desc':
+            base_stmt = base_stmt.order_by(desc(sort_column))
+        else:
+            base_stmt = base_stmt.order_by(sort_column.asc())
 
-    # Fetch Page
-    stmt = base_stmt.offset(skip).limit(limit)
-    result = await db.execute(stmt)
-    events = result.scalars().all()
+        # Fetch Page
+        stmt = base_stmt.offset(skip).limit(limit)
+        result = await db.execute(stmt)
+        events = result.scalars().all()
     
     # 3. Fetch Rule Hits (Phase 1)
     repo = EventRepository(db)
@@ -257,7 +291,8 @@ async def read_import_events(
 
     return {
         "events": processed_events,
-        "total": total
+        "total": total,
+        "next_cursor": next_cursor
     }
 
 from fastapi import HTTPException
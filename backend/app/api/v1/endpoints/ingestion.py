@@ -10,6 +10,7 @@ from app.auth import deps
 from app.db.models import ImportLog, Event, User, MonitoringProvider
 from app.services.repository import EventRepository, AdminRepository
 from app.parsers.factory import ParserFactory
+from app.parsers.executor import parser_executor
 from app.ingestion.profile_manager import ProfileManager
 from app.ingestion.profile_matcher import ProfileMatcher
 from app.ingestion.worker import detect_file_format
@@ -128,13 +129,15 @@ async def replay_last_48h(
                 await admin_repo.delete_import_data(imp_id)
                 
                 # Re-parse
-                parsed_events = parser.parse(
+                parsed_events = await parser_executor.parse(
+                    parser,
                     str(file_path),
                     source_timezone=matched_profile.source_timezone,
                     parser_config={
                         "mapping": matched_profile.mapping,
                         "action_config": matched_profile.action_config
-                    }
+                    },
+                    profile=matched_profile
                 )
                 
                 # Import mapping into schema-aware list
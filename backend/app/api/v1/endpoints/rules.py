@@ -7,6 +7,7 @@ from sqlalchemy import select
 from app.db.session import get_db
 from app.db.models import AlertRule
 from app.services.repository import EventRepository
+from app.services.pagination import COUNT_PATTERN, PAGINATION_PATTERN, InvalidCursor
 from pydantic import BaseModel
 from app.core.config import settings
 from app.schemas.response_models import ReplayResult
@@ -42,9 +43,10 @@ class RuleHitDrillDownRow(BaseModel):
 
 class RuleHitDrillDownResponse(BaseModel):
     items: List[RuleHitDrillDownRow]
-    total: int
+    total: Optional[int] = None  # None si count=none
     page: int
     limit: int
+    next_cursor: Optional[str] = None  # pagination=cursor
 
 
 class ActiveRuleOut(BaseModel):
@@ -159,13 +161,22 @@ async def get_rule_hits_drilldown(
     rule_id: int,
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=100),
+    pagination: str = Query("offset", pattern=PAGINATION_PATTERN),
+    cursor: Optional[str] = None,
+    count: str = Query("exact", pattern=COUNT_PATTERN),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     """
     Drill-down: Get detailed event information for rule monitoring hits.
+    pagination=cursor : keyset sur (matched_at, id du hit), page suivante via `next_cursor`.
     """
     repo = EventRepository(db)
-    items, total = await repo.get_events_for_rule(rule_id, page, limit)
+    try:
+        items, total, next_cursor = await repo.get_events_for_rule(
+            rule_id, page, limit, cursor=cursor, pagination=pagination, count=count
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
         "items": [
@@ -182,6 +193,7 @@ async def get_rule_hits_drilldown(
         ],
         "total": total,
         "page": page,
-        "limit": limit
+        "limit": limit,
+        "next_cursor": next_cursor
     }
 
@@ -9,6 +9,7 @@ from email.mime.text import MIMEText
 
 from app.db.session import get_db
 from app.db.models import Setting
+from app.services.settings_cache import settings_cache
 
 router = APIRouter()
 
@@ -56,6 +57,8 @@ async def update_settings(
             db.add(Setting(key=key, value=str(value), description="User Defined"))
     
     await db.commit()
+    # Autres process (worker, autres replicas API) : rechargement au prochain accès
+    await settings_cache.publish_invalidation(settings.keys())
     return {"status": "updated"}
 
 @router.post("/test-imap")
@@ -65,23 +65,25 @@ class Settings(BaseSettings):
     MONITORING: Dict[str, Any] = app_config.get('monitoring', {})
 
     async def get_monitoring_settings(self, db_session) -> Dict[str, Any]:
-        from app.db.models import Setting
-        from sqlalchemy import select
+        from app.services.settings_cache import settings_cache
+        import copy
         import json
         
-        merged = dict(self.MONITORING)
-        result = await db_session.execute(select(Setting).where(Setting.key.like("monitoring.%")))
-        for item in result.scalars().all():
-            parts = item.key.split('.')
+        # Copie profonde : les overrides DB ne doivent pas s'incruster dans self.MONITORING
+        merged = copy.deepcopy(self.MONITORING)
+        db_values = await settings_cache.get_all(db_session)
+        for key, value in db_values.items():
+            if not key.startswith("monitoring."): continue
+            parts = key.split('.')
             if len(parts) < 2: continue
             curr = merged
             for part in parts[1:-1]:
                 if part not in curr: curr[part] = {}
                 curr = curr[part]
             try:
-                val = json.loads(item.value)
+                val = json.loads(value)
             except:
-                val = item.value
+                val = value
             curr[parts[-1]] = val
         return merged
 
@@ -39,6 +39,7 @@ class Event(Base):
     __tablename__ = "events"
     
     # TimescaleDB hypertable - primary key logic handled by partition
+    # Chunks / compression / rétention : alembic 3f9a6c0d8e14, app/services/storage_policies.py
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True) 
     time: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
     
@@ -50,7 +51,7 @@ class Event(Base):
     client_name: Mapped[Optional[str]] = mapped_column(String(255))
     weekday_label: Mapped[Optional[str]] = mapped_column(String(20))
     raw_message: Mapped[Optional[str]] = mapped_column(Text)
-    normalized_message: Mapped[Optional[str]] = mapped_column(Text, index=True)
+    normalized_message: Mapped[Optional[str]] = mapped_column(Text)
     raw_code: Mapped[Optional[str]] = mapped_column(String(50))
     normalized_code: Mapped[Optional[str]] = mapped_column(String(50), index=True)
     normalized_type: Mapped[Optional[str]] = mapped_column(String(100), index=True)
@@ -72,6 +73,9 @@ class Event(Base):
         Index('ix_events_site_time', 'site_code', 'time'),
         Index('ix_events_site_severity_time', 'site_code', 'severity', 'time'),
         Index('ix_events_site_type_time', 'site_code', 'normalized_type', 'time'),
+        # Filtres mot-clé (LIKE '%kw%' sur le message normalisé) : requiert pg_trgm
+        Index('ix_events_normalized_message_trgm', 'normalized_message',
+              postgresql_using='gin', postgresql_ops={'normalized_message': 'gin_trgm_ops'}),
     )
 
 class ImportLog(Base):
@@ -235,6 +239,41 @@ class EventRuleHit(Base):
         Index('ix_event_rule_hit_unique', 'event_id', 'rule_id', unique=True),
     )
 
+class AlertState(Base):
+    """
+    État matérialisé des alertes : un agrégat des hits par (règle, site, zone),
+    tenu à jour à l'écriture des hits (voir app.services.alert_state).
+    """
+    __tablename__ = "alert_state"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    rule_name: Mapped[str] = mapped_column(String(100))
+    site_code: Mapped[str] = mapped_column(String(50))
+    zone_id: Mapped[Optional[str]] = mapped_column(Text)  # hit_metadata->>'zone_id'
+    first_hit_time: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    last_hit_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+    last_event_id: Mapped[int] = mapped_column(BigInteger)
+    count_hits: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('ux_alert_state_key', 'rule_name', 'site_code', 'zone_id', unique=True, postgresql_nulls_not_distinct=True),
+        Index('ix_alert_state_site', 'site_code'),
+    )
+
+class AlertDisparitionState(Base):
+    """Dernière DISPARITION par (site, zone) : ferme les alertes dont le dernier hit est antérieur."""
+    __tablename__ = "alert_disparition_state"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    site_code: Mapped[str] = mapped_column(String(50))
+    zone_id: Mapped[Optional[str]] = mapped_column(Text)  # events.zone_id::text
+    last_disp_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+
+    __table_args__ = (
+        Index('ux_alert_disparition_state_key', 'site_code', 'zone_id', unique=True, postgresql_nulls_not_distinct=True),
+    )
+
 # Phase 3: Compteurs Raccordements par Télésurveilleur
 
 class MonitoringProvider(Base):
@@ -11,9 +11,10 @@ from pathlib import Path
 from typing import Iterable, List, Tuple, Optional
 
 from sqlalchemy import select
-from app.db.models import Setting, ImportLog, EmailBookmark
+from app.db.models import ImportLog, EmailBookmark
 from app.db.session import AsyncSessionLocal
 from app.ingestion.adapters.base import BaseAdapter, AdapterItem
+from app.services.settings_cache import settings_cache
 from app.core.config import settings
 
 logger = logging.getLogger("email-adapter")
@@ -44,9 +45,7 @@ class EmailAdapter(BaseAdapter):
         return final_dest
 
     async def _get_imap_config(self) -> dict:
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(select(Setting))
-            return {s.key: s.value for s in result.scalars().all()}
+        return await settings_cache.get_all()
 
     async def _get_last_uid(self, folder: str) -> int:
         async with AsyncSessionLocal() as session:
@@ -1,6 +1,7 @@
 import hashlib
 import redis.asyncio as redis
 from datetime import datetime
+from typing import List
 from app.ingestion.models import NormalizedEvent
 from app.core.config import settings
 
@@ -19,14 +20,46 @@ else
 end
 """
 
+# Batch variant: KEYS = [raw_1, burst_1, raw_2, burst_2, ...], ARGV = [raw_ttl, burst_ttl].
+# Same per-event logic as LUA_DEDUP_SCRIPT (raw first, burst only if raw is new),
+# applied in order inside one atomic call, so intra-batch duplicates behave as in the loop.
+LUA_DEDUP_BATCH_SCRIPT = """
+local raw_ttl = tonumber(ARGV[1])
+local burst_ttl = tonumber(ARGV[2])
+local flags = {}
+
+local function check(key, ttl)
+    if redis.call("EXISTS", key) == 1 then
+        redis.call("INCR", key)
+        redis.call("EXPIRE", key, ttl)
+        return 1
+    end
+    redis.call("SET", key, 1)
+    redis.call("EXPIRE", key, ttl)
+    return 0
+end
+
+for i = 1, #KEYS, 2 do
+    local dup = check(KEYS[i], raw_ttl)
+    if dup == 0 then
+        dup = check(KEYS[i + 1], burst_ttl)
+    end
+    flags[#flags + 1] = dup
+end
+return flags
+"""
+
 class DeduplicationService:
     def __init__(self, redis_client: redis.Redis):
         self.redis = redis_client
         self.script = self.redis.register_script(LUA_DEDUP_SCRIPT)
+        self.batch_script = self.redis.register_script(LUA_DEDUP_BATCH_SCRIPT)
         
         # Config
         self.burst_window = settings.INGESTION.get('burst_window_seconds', 10)
         self.raw_window = 60 # Safety anti-spam window
+        # Events per EVALSHA in check_batch (bounds the time Redis is blocked by one script)
+        self.batch_size = settings.INGESTION.get('dedup_batch_size', 1000)
 
     def _generate_burst_key(self, event: NormalizedEvent) -> str:
         """
@@ -80,3 +113,20 @@ class DeduplicationService:
             return True
             
         return False
+
+    async def check_batch(self, events: List[NormalizedEvent]) -> List[bool]:
+        """
+        Duplicate flags for a whole import, same order and semantics as calling
+        is_duplicate() on each event in sequence (including duplicates inside the batch).
+        One EVALSHA per `batch_size` events instead of up to two per event.
+        """
+        flags: List[bool] = []
+        for start in range(0, len(events), self.batch_size):
+            chunk = events[start:start + self.batch_size]
+            keys = []
+            for event in chunk:
+                keys.append(self._generate_raw_key(event))
+                keys.append(self._generate_burst_key(event))
+            result = await self.batch_script(keys=keys, args=[self.raw_window, self.burst_window])
+            flags.extend(int(r) == 1 for r in result)
+        return flags
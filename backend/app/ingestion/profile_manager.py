@@ -1,28 +1,114 @@
 import logging
+import re
 import yaml
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Pattern, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
 from app.db.models import DBIngestionProfile
 from app.core.config import settings
 from app.schemas.ingestion_profile import IngestionProfile, DetectionRules, NormalizationRule
 
 logger = logging.getLogger("profile-manager")
 
+
+@lru_cache(maxsize=256)
+def compile_filename_regex(pattern: str) -> Optional[Pattern]:
+    """Regex de nom de fichier (IGNORECASE), compilée une fois. Regex invalide → None (jamais de match)."""
+    try:
+        return re.compile(pattern, re.IGNORECASE)
+    except re.error as e:
+        logger.error(f"Regex de nom de fichier invalide '{pattern}': {e}")
+        return None
+
+
+def filename_matches(pattern: Optional[str], filename: str) -> bool:
+    if not pattern:
+        return False
+    compiled = compile_filename_regex(pattern)
+    return compiled is not None and compiled.search(filename) is not None
+
+
 class ProfileManager:
+    """
+    Registre des profils d'ingestion.
+
+    `load_profiles` ne reconstruit le registre que si la source a changé : empreinte DB
+    (nombre de profils, max(updated_at), somme des version_number) et, en mode
+    DB_FALLBACK_YAML, (nom, mtime, taille) des fichiers YAML. Sinon le registre courant
+    est conservé : pas de re-validation Pydantic ni de re-parsing YAML par fichier ingéré.
+    """
     def __init__(self, profiles_dir: str = "profiles"):
         self.profiles_dir = Path(profiles_dir)
         self.profiles: Dict[str, IngestionProfile] = {}
         self.invalid_profiles: List[str] = []
+        self.reloads = 0
+
+    @property
+    def profiles(self) -> Dict[str, IngestionProfile]:
+        return self._profiles
+
+    @profiles.setter
+    def profiles(self, profiles: Dict[str, IngestionProfile]):
+        # Registre affecté directement (tests, filtres) : dérivés recalculés, prochain load complet
+        by_priority = sorted(profiles.values(), key=lambda p: p.priority, reverse=True)
+        for p in by_priority:
+            if p.filename_regex:
+                compile_filename_regex(p.filename_regex)
+            if p.detection.filename_pattern:
+                compile_filename_regex(p.detection.filename_pattern)
+        self._profiles = profiles
+        self._by_priority = by_priority
+        self._signature = None
+
+    def invalidate(self):
+        self._signature = None
+
+    async def _signature_of(self, db: Optional[AsyncSession]) -> Optional[Tuple]:
+        mode = settings.PROFILE_SOURCE_MODE
+        db_part = None
+        if db:
+            stmt = select(
+                func.count(),
+                func.count().filter(DBIngestionProfile.is_active == True),
+                func.max(DBIngestionProfile.updated_at),
+                func.sum(DBIngestionProfile.version_number),
+            ).select_from(DBIngestionProfile)
+            try:
+                db_part = tuple((await db.execute(stmt)).one())
+            except Exception as e:
+                logger.error(f"Erreur lors de la lecture de la version des profils : {e}")
+                return None
+
+        yaml_part = None
+        if mode == "DB_FALLBACK_YAML" and self.profiles_dir.exists():
+            yaml_part = []
+            for yaml_file in sorted(self.profiles_dir.glob("*.yaml")):
+                try:
+                    st = yaml_file.stat()
+                except OSError:
+                    return None
+                yaml_part.append((yaml_file.name, st.st_mtime_ns, st.st_size))
+            yaml_part = tuple(yaml_part)
+
+        return (mode, db is not None, db_part, yaml_part)
 
     async def load_profiles(self, db: Optional[AsyncSession] = None):
         """
         Loads profiles according to settings.PROFILE_SOURCE_MODE.
         DB profiles always prevail over YAML if they exist.
+        Le registre est reconstruit à part puis substitué en une fois, pour que les
+        ingestions concurrentes ne voient jamais un registre vide ou partiel.
+        Rechargement uniquement si l'empreinte DB / YAML a changé depuis le dernier chargement.
         """
-        self.profiles = {}
-        self.invalid_profiles = []
+        signature = await self._signature_of(db)
+        if signature is not None and signature == self._signature:
+            logger.debug(f"Profils inchangés ({len(self.profiles)}), registre conservé.")
+            return
+
+        profiles: Dict[str, IngestionProfile] = {}
+        invalid_profiles: List[str] = []
         
         mode = settings.PROFILE_SOURCE_MODE
         
@@ -71,12 +157,12 @@ class ProfileManager:
                         "filename_regex": getattr(model, "filename_regex", None),
                     }
                     p = IngestionProfile(**profile_data)
-                    self.profiles[p.profile_id] = p
+                    profiles[p.profile_id] = p
                     db_profiles_count += 1
                     logger.debug(f"Profil DB chargé : {p.profile_id}")
                 except Exception as e:
                     logger.error(f"Erreur conversion profil DB '{model.profile_id}': {e}")
-                    self.invalid_profiles.append(model.profile_id)
+                    invalid_profiles.append(model.profile_id)
 
             logger.info(f"{db_profiles_count} profils chargés depuis la BASE DE DONNÉES.")
 
@@ -90,14 +176,14 @@ class ProfileManager:
                             if not data: continue
                             
                             p = IngestionProfile(**data)
-                            if p.profile_id not in self.profiles:
-                                self.profiles[p.profile_id] = p
+                            if p.profile_id not in profiles:
+                                profiles[p.profile_id] = p
                                 logger.info(f"Profil chargé depuis YAML : {p.profile_id} ({yaml_file.name})")
                             else:
                                 logger.debug(f"Profil YAML '{p.profile_id}' ignoré car déjà présent en DB.")
                     except Exception as e:
                         logger.error(f"Erreur YAML {yaml_file.name} : {e}")
-                        self.invalid_profiles.append(str(yaml_file))
+                        invalid_profiles.append(str(yaml_file))
         elif mode == "DB_FALLBACK_YAML" and db_profiles_count > 0:
             # DB had profiles — still try YAML for any profile_id not yet in DB
             if self.profiles_dir.exists():
@@ -107,16 +193,20 @@ class ProfileManager:
                             data = yaml.safe_load(f)
                             if not data: continue
                             p = IngestionProfile(**data)
-                            if p.profile_id not in self.profiles:
-                                self.profiles[p.profile_id] = p
+                            if p.profile_id not in profiles:
+                                profiles[p.profile_id] = p
                                 logger.info(f"Profil chargé depuis YAML (complément DB) : {p.profile_id}")
                             else:
                                 logger.debug(f"Profil YAML '{p.profile_id}' ignoré (DB prioritaire).")
                     except Exception as e:
                         logger.error(f"Erreur YAML {yaml_file.name} : {e}")
-                        self.invalid_profiles.append(str(yaml_file))
+                        invalid_profiles.append(str(yaml_file))
 
 
+        self.profiles = profiles
+        self.invalid_profiles = invalid_profiles
+        self._signature = signature
+        self.reloads += 1
         logger.info(f"Total profils actifs : {len(self.profiles)}")
 
     def get_profile(self, profile_id: str) -> Optional[IngestionProfile]:
@@ -124,3 +214,7 @@ class ProfileManager:
 
     def list_profiles(self) -> List[IngestionProfile]:
         return list(self.profiles.values())
+
+    def list_by_priority(self) -> List[IngestionProfile]:
+        """Profils triés par priorité décroissante (ordre stable), calculé au chargement."""
+        return list(self._by_priority)
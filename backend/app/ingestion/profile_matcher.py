@@ -1,9 +1,8 @@
-import re
 import logging
 from typing import List, Tuple, Optional
 from pathlib import Path
 from app.schemas.ingestion_profile import IngestionProfile
-from app.ingestion.profile_manager import ProfileManager
+from app.ingestion.profile_manager import ProfileManager, filename_matches
 
 logger = logging.getLogger("profile-matcher")
 
@@ -49,7 +48,7 @@ class ProfileMatcher:
             
             # 2. Filename pattern matching (+5.0)
             if profile.detection.filename_pattern:
-                if re.search(profile.detection.filename_pattern, filename, re.IGNORECASE):
+                if filename_matches(profile.detection.filename_pattern, filename):
                     score += 5.0
                     details.append(f"Filename pattern '{profile.detection.filename_pattern}' match (+5.0)")
             
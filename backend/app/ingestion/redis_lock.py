@@ -1,4 +1,6 @@
+import asyncio
 import logging
+import time
 from typing import Optional
 import redis.asyncio as redis
 from app.core.config import settings
@@ -20,6 +22,18 @@ class RedisLock:
             return True
         return False
 
+    async def acquire_wait(self, key: str, value: str, ttl_seconds: int = 30, timeout: float = 30.0, poll: float = 0.05) -> bool:
+        """
+        Acquire the lock, waiting up to `timeout` seconds for the current holder.
+        Short sections only (check-then-act): the TTL bounds a crashed holder.
+        """
+        deadline = time.monotonic() + timeout
+        while not await self.acquire(key, value, ttl_seconds):
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(poll)
+        return True
+
     async def release(self, key: str, value: str):
         """
         Release a lock safely. 
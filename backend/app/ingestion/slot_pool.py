@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger("ingestion-slots")
+
+
+class IngestionSlotPool:
+    """
+    Pool de slots bornant la concurrence du worker d'ingestion.
+
+    Chaque unité de travail (groupe email ou fichier orphelin) occupe un slot
+    numéroté le temps de son exécution. Le pool mesure le temps d'occupation de
+    chaque slot pour exposer l'utilisation dans le heartbeat Redis et aider à
+    dimensionner `ingestion.max_concurrency`.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, int(size))
+        self._free: asyncio.Queue = asyncio.Queue()
+        for slot_id in range(self.size):
+            self._free.put_nowait(slot_id)
+
+        self._busy_since: Dict[int, float] = {}
+        self._busy_seconds: List[float] = [0.0] * self.size
+        self._items_done: List[int] = [0] * self.size
+        self._window_start = time.monotonic()
+        # Dernier signe de vie du scheduler (slot pris / rendu, fin de cycle de poll)
+        self.last_progress = time.monotonic()
+
+    def mark_progress(self) -> None:
+        self.last_progress = time.monotonic()
+
+    def stalled_for(self) -> float:
+        """Secondes écoulées depuis le dernier progrès."""
+        return time.monotonic() - self.last_progress
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._busy_since)
+
+    async def run(self, job: Callable[[], Awaitable[Any]], label: str = "") -> Any:
+        """Attend un slot libre puis exécute `job()` dessus."""
+        slot_id = await self._free.get()
+        self._busy_since[slot_id] = time.monotonic()
+        self.mark_progress()
+        logger.debug(f"[SLOT] acquire slot={slot_id} job={label}")
+        try:
+            return await job()
+        finally:
+            started = self._busy_since.pop(slot_id)
+            self._busy_seconds[slot_id] += time.monotonic() - started
+            self._items_done[slot_id] += 1
+            self._free.put_nowait(slot_id)
+            self.mark_progress()
+            logger.debug(f"[SLOT] release slot={slot_id} job={label}")
+
+    async def run_all(self, jobs: List[Callable[[], Awaitable[Any]]], labels: Optional[List[str]] = None) -> List[Any]:
+        """
+        Exécute tous les jobs avec au plus `size` en parallèle.
+        Les exceptions sont retournées (pas levées) pour qu'un job en échec n'annule pas les autres.
+        """
+        labels = labels or [""] * len(jobs)
+        return await asyncio.gather(
+            *(self.run(job, label) for job, label in zip(jobs, labels)),
+            return_exceptions=True
+        )
+
+    def snapshot(self, reset: bool = True) -> Dict[str, Any]:
+        """
+        Utilisation par slot depuis le dernier snapshot (0.0 -> 1.0).
+        Le temps des jobs encore en cours est compté jusqu'à maintenant.
+        """
+        now = time.monotonic()
+        window = max(now - self._window_start, 1e-6)
+
+        slots = []
+        for slot_id in range(self.size):
+            busy = self._busy_seconds[slot_id]
+            if slot_id in self._busy_since:
+                busy += now - max(self._busy_since[slot_id], self._window_start)
+            slots.append({
+                "slot": slot_id,
+                "busy": slot_id in self._busy_since,
+                "utilization": round(min(busy / window, 1.0), 3),
+                "items": self._items_done[slot_id],
+            })
+
+        data = {
+            "max_concurrency": self.size,
+            "in_flight": self.in_flight,
+            "window_seconds": round(window, 1),
+            "utilization": round(sum(s["utilization"] for s in slots) / self.size, 3),
+            "slots": slots,
+        }
+
+        if reset:
+            self._window_start = now
+            self._busy_seconds = [0.0] * self.size
+            self._items_done = [0] * self.size
+            for slot_id in self._busy_since:
+                self._busy_since[slot_id] = max(self._busy_since[slot_id], now)
+
+        return data
@@ -18,10 +18,12 @@ from app.db.models import ImportLog, Event
 from app.parsers.factory import ParserFactory
 from app.parsers.excel_parser import ExcelParser
 from app.parsers.pdf_parser import PdfParser
+from app.parsers.executor import parser_executor
 from app.ingestion.deduplication import DeduplicationService
 from app.db.session import AsyncSessionLocal
 from app.services.repository import EventRepository
 from app.services.alerting import AlertingService
+from app.services.alert_plan import frequency_horizon, sequence_window
 from app.services.incident_service import IncidentService
 from app.services.tagging_service import TaggingService
 from app.services.email_fetcher import EmailFetcher
@@ -30,14 +32,16 @@ from app.services.archiver import ArchiverService
 from app.services.provider_resolver import ProviderResolver
 from app.services.classification_service import ClassificationService
 from app.services.business_rules import BusinessRuleEngine
+from app.services import cache_bus, alert_state
 from app.services.pdf_match_service import PdfMatchService
 
 # Phase B1: New Imports
 from app.ingestion.adapters.registry import AdapterRegistry
 from app.ingestion.adapters.base import BaseAdapter, AdapterItem
-from app.ingestion.profile_manager import ProfileManager
+from app.ingestion.profile_manager import ProfileManager, filename_matches
 from app.ingestion.profile_matcher import ProfileMatcher
 from app.ingestion.redis_lock import RedisLock
+from app.ingestion.slot_pool import IngestionSlotPool
 from app.ingestion.utils import compute_sha256, get_file_probe, detect_file_format
 
 # Register Parsers
@@ -64,10 +68,59 @@ profile_matcher = ProfileMatcher(profile_manager)
 
 
 
-async def process_ingestion_item(adapter: BaseAdapter, item: AdapterItem, redis_lock: RedisLock, redis_client, poll_run_id: str = "", existing_import_id: int = None) -> Optional[int]:
+async def _create_import_log_within_quota(
+    session, repo: EventRepository, redis_lock: RedisLock, adapter: BaseAdapter, item: AdapterItem,
+    monitoring_provider, resolved_provider_id: Optional[int], provider_code: str,
+) -> ImportLog:
+    """
+    Quota journalier (V3) : comptage + création de l'ImportLog sérialisés par provider
+    (verrou Redis, partagé entre groupes concurrents et workers) et committés avant
+    libération, pour que le groupe suivant compte ce lot. Retourne l'ImportLog créé,
+    en statut DAILY_QUOTA_EXCEEDED (déjà acquitté) si le quota est atteint.
+    """
+    if not monitoring_provider:
+        return await repo.create_import_log(
+            item.filename, file_hash=item.sha256, provider_id=resolved_provider_id, import_metadata=item.metadata
+        )
+
+    quota_key = f"ingestion:lock:quota:{monitoring_provider.id}"
+    quota_token = str(uuid.uuid4())
+    if not await redis_lock.acquire_wait(quota_key, quota_token):
+        raise RuntimeError(f"Quota lock timeout for provider {provider_code}")
+    try:
+        max_quota = monitoring_provider.max_emails_per_day if monitoring_provider.max_emails_per_day is not None else 10
+        current_count = await repo.count_imports_today_tz(monitoring_provider.id)
+        import_log = await repo.create_import_log(
+            item.filename,
+            file_hash=item.sha256,
+            provider_id=resolved_provider_id,
+            import_metadata=item.metadata
+        )
+        if current_count >= max_quota:
+            logger.warning(f"[QUOTA_EXCEEDED] Provider={provider_code} Count={current_count} Max={max_quota} msg_id={item.source_message_id} file={item.filename}")
+            import_log.status = "DAILY_QUOTA_EXCEEDED"
+            import_log.source_message_id = item.source_message_id
+            import_log.error_message = f"DAILY_QUOTA_EXCEEDED: Quota of {max_quota} emails reached for today (Paris Time)."
+        await session.commit()
+    finally:
+        await redis_lock.release(quota_key, quota_token)
+
+    if import_log.status == "DAILY_QUOTA_EXCEEDED":
+        # Ack as unmatched/ignored to clear from inbox but not count as success
+        archive_path = await adapter.ack_unmatched(item, "DAILY_QUOTA_EXCEEDED")
+        if archive_path:
+            import_log.archive_path = str(archive_path)
+            import_log.archive_status = "ARCHIVED"
+            await session.commit()
+    return import_log
+
+
+async def process_ingestion_item(adapter: BaseAdapter, item: AdapterItem, redis_lock: RedisLock, redis_client, poll_run_id: str = "", existing_import_id: int = None, collect_events: bool = True) -> Optional[int]:
     """
     Refactored ingestion pipeline (Phase 3).
     Handles: Hash -> Lock -> Profile Match -> Parse -> DB -> Archive -> Unlock.
+    `collect_events` : renvoyer les events parsés d'un XLS / PDF (contrôle d'intégrité
+    d'un groupe email) ; sinon seuls des compteurs sont conservés d'un lot à l'autre.
     """
     file_path = Path(item.path)
     ext = file_path.suffix.lower().lstrip('.')
@@ -135,37 +188,11 @@ async def process_ingestion_item(adapter: BaseAdapter, item: AdapterItem, redis_
                 return import_log.id, []
 
             if not import_log:
-                # NEW: Daily Quota Check (V3)
-                if monitoring_provider:
-                    max_quota = monitoring_provider.max_emails_per_day if monitoring_provider.max_emails_per_day is not None else 10
-                    current_count = await repo.count_imports_today_tz(monitoring_provider.id)
-                    
-                    if current_count >= max_quota:
-                        logger.warning(f"[QUOTA_EXCEEDED] Provider={provider_code} Count={current_count} Max={max_quota} msg_id={item.source_message_id} file={item.filename}")
-                        import_log = await repo.create_import_log(
-                            item.filename, 
-                            file_hash=item.sha256, 
-                            provider_id=resolved_provider_id,
-                            import_metadata=item.metadata
-                        )
-                        import_log.status = "DAILY_QUOTA_EXCEEDED"
-                        import_log.source_message_id = item.source_message_id
-                        import_log.error_message = f"DAILY_QUOTA_EXCEEDED: Quota of {max_quota} emails reached for today (Paris Time)."
-                        await session.commit()
-                        # Ack as unmatched/ignored to clear from inbox but not count as success
-                        archive_path = await adapter.ack_unmatched(item, "DAILY_QUOTA_EXCEEDED")
-                        if archive_path:
-                            import_log.archive_path = str(archive_path)
-                            import_log.archive_status = "ARCHIVED"
-                            await session.commit()
-                        return import_log.id, []
-
-                import_log = await repo.create_import_log(
-                    item.filename, 
-                    file_hash=item.sha256, 
-                    provider_id=resolved_provider_id,
-                    import_metadata=item.metadata
+                import_log = await _create_import_log_within_quota(
+                    session, repo, redis_lock, adapter, item, monitoring_provider, resolved_provider_id, provider_code
                 )
+                if import_log.status == "DAILY_QUOTA_EXCEEDED":
+                    return import_log.id, []
             else:
                 logger.info(f"[Ingestion] Grouping with existing ImportLog {import_log.id} via source_message_id {item.source_message_id}")
                 # Update metadata to include second attachment info
@@ -179,13 +206,12 @@ async def process_ingestion_item(adapter: BaseAdapter, item: AdapterItem, redis_
 
             # 5. Profile Matching (Phase 2: Provider + Kind + Filename)
             await profile_manager.load_profiles(session)
-            profiles = profile_manager.list_profiles()
             
             # Phase 2 improvement: Try to find a profile that matches by (provider OR regex) AND format_kind
             matched_profile = None
             
-            # We sort by priority just in case
-            sorted_profiles = sorted(profiles, key=lambda x: x.priority, reverse=True)
+            # Sorted by priority once per registry load
+            sorted_profiles = profile_manager.list_by_priority()
             
             for p in sorted_profiles:
                 # Extension fallback: if detected_kind is UNKNOWN, we check if the profile extension matches
@@ -196,10 +222,7 @@ async def process_ingestion_item(adapter: BaseAdapter, item: AdapterItem, redis_
                 provider_match = (p.provider_code == provider_code)
                 
                 # Case B: Filename regex matches (stronger signal)
-                filename_match = False
-                if p.filename_regex:
-                    if re.search(p.filename_regex, item.filename, re.IGNORECASE):
-                        filename_match = True
+                filename_match = filename_matches(p.filename_regex, item.filename)
                 
                 # Case C: Profile is provider-agnostic (NULL provider_code)
                 agnostic_match = (p.provider_code is None or p.provider_code == "")
@@ -289,7 +312,9 @@ async def process_ingestion_item(adapter: BaseAdapter, item: AdapterItem, redis_
 
             # REPLAY CLEANUP: Delete old events within this transaction if replaying
             if is_replay:
+                replay_sites = await alert_state.sites_of_import(session, import_log.id)
                 await session.execute(delete(Event).where(Event.import_id == import_log.id))
+                await alert_state.refresh_sites(session, replay_sites)
                 logger.info(f"[REPLAY] Cleared previous events for Import {import_log.id}")
             
             try:
@@ -328,8 +353,10 @@ async def process_ingestion_item(adapter: BaseAdapter, item: AdapterItem, redis_
                         
                         # We still parse it for Integrity Check if requested
                         # But we don't insert it as events
-                        parse_result = parser.parse(str(file_path), source_timezone=profile.source_timezone)
-                        events = parse_result if isinstance(parse_result, list) else []
+                        events = await parser_executor.parse(
+                            parser, str(file_path), source_timezone=matched_profile.source_timezone,
+                            profile=matched_profile, sha256=item.sha256
+                        )
                         
                         await adapter.ack_success(item, existing_import_id)
                         return existing_import_id, events
@@ -354,8 +381,30 @@ async def process_ingestion_item(adapter: BaseAdapter, item: AdapterItem, redis_
                 # Phase 3: Convert List[MappingRule] to Dict for parsers
                 mapping_dict = {m.target: m.source for m in matched_profile.mapping}
                 
+                # Companion PDF (PDF Match, Phase 4) : mêmes nom, extension .pdf
+                potential_pdf = file_path.with_suffix('.pdf')
+                pdf_path = potential_pdf if potential_pdf.exists() else None
+
+                # Normalize, Deduplicate, Tag, Insert : par lots au fil du parsing.
+                # D'un lot à l'autre, seuls des compteurs sont gardés ; les events ne sont
+                # retenus que pour le contrôle d'intégrité (XLS / PDF d'un groupe) et le PDF Match.
+                dedup_service = DeduplicationService(redis_client)
+                keep_events = collect_events and ext in ('xls', 'xlsx', 'pdf')
+                keep_unique = bool(pdf_path and monitoring_provider)
+                events = []
+                unique_events = []
+                extracted_count = 0
+                dedup_kept_count = 0
+                inserted_db_count = 0
+                duplicates_count = 0
+                active_rules = await repo.get_active_rules()
+                tagging_service = TaggingService(session)
+
                 # Pass parser_config (Phase 2 deterministic)
-                parse_result = parser.parse(
+                # TSV lu en flux ; les autres parsers passent par le pool de process (pandas / pdfplumber
+                # hors boucle asyncio) et leur résultat est découpé aux mêmes tailles de lot
+                async for batch in parser_executor.iter_batches(
+                    parser,
                     str(file_path), 
                     source_timezone=matched_profile.source_timezone,
                     parser_config={
@@ -363,62 +412,79 @@ async def process_ingestion_item(adapter: BaseAdapter, item: AdapterItem, redis_
                         "action_config": matched_profile.action_config,
                         "provider_code": provider_code,
                         **(matched_profile.parser_config or {})
-                    }
-                )
-                events = parse_result if isinstance(parse_result, list) else []
-
-                logger.info(f"Extracted {len(events)} events using {parser.__class__.__name__} for profile {matched_profile.profile_id}")
-                
-                # Normalize, Deduplicate, Tag, Alert
-                dedup_service = DeduplicationService(redis_client)
-                unique_events = []
-                duplicates_count = 0
-                active_rules = await repo.get_active_rules()
-                tagging_service = TaggingService(session)
-                
-                for event in events:
-                    normalizer.normalize(event)
-                    await tagging_service.tag_event(event) # This includes site code normalization
-                    
-                    is_dup = await dedup_service.is_duplicate(event)
-                    if is_dup:
-                        event.dup_count = 1 # Mark as duplicate (Phase C)
-                        duplicates_count += 1
-                    
-                    if not is_dup or is_replay:
-                        unique_events.append(event)
+                    },
+                    profile=matched_profile,
+                    sha256=item.sha256,
+                ):
+                    for event in batch:
+                        normalizer.normalize(event)
+                        await tagging_service.tag_event(event) # This includes site code normalization
+
+                    # One Redis round-trip per chunk, same ordering semantics as is_duplicate()
+                    dup_flags = await dedup_service.check_batch(batch)
+                    batch_unique = []
+                    for event, is_dup in zip(batch, dup_flags):
+                        if is_dup:
+                            event.dup_count = 1 # Mark as duplicate (Phase C)
+                            duplicates_count += 1
                         
-                # DB Insert & Processing
-                db_events = []
-                inserted_db_count = 0
-                if unique_events:
-                    # Phase Roadmap 11: Create DB objects and flush FIRST so events get IDs
-                    db_events = await repo.create_batch(unique_events, import_id=import_log.id)
-                    await session.flush()
-                    inserted_db_count = len(db_events)
+                        if not is_dup or is_replay:
+                            batch_unique.append(event)
 
+                    # Phase Roadmap 11: Create DB objects and flush FIRST so events get IDs
+                    if batch_unique:
+                        inserted_db_count += len(await repo.create_batch(batch_unique, import_id=import_log.id))
+                        await session.flush()
+                    extracted_count += len(batch)
+                    dedup_kept_count += len(batch_unique)
+                    if keep_events:
+                        events.extend(batch)
+                    if keep_unique:
+                        unique_events.extend(batch_unique)
+
+                logger.info(f"Extracted {extracted_count} events using {parser.__class__.__name__} for profile {matched_profile.profile_id}")
+
+                # Alerting / Business Rules une fois tout l'import inséré (fréquences et séquences
+                # voient les lots suivants), relu par pages depuis la DB ; Incidents sur l'import
+                if inserted_db_count:
                     # Trigger Alerts & Business Rules (now that event.id exists)
-                    alerting_service = AlertingService()
-                    for db_event in db_events:
-                        if db_event.normalized_type != 'OPERATOR_ACTION':
-                            # Phase 2.A: Actualiser le compteur business (raccordement site)
-                            await repo.upsert_site_connection(
-                                provider_id=resolved_provider_id,
-                                code_site=db_event.site_code,
-                                client_name=db_event.client_name,
-                                seen_at=db_event.time
-                            )
-                            await alerting_service.check_and_trigger_alerts(db_event, active_rules, repo=repo)
-
-                    try:
-                        # Phase C: Business Rule Engine (V1)
-                        rule_engine = BusinessRuleEngine(session)
-                        start_rules = time.time()
-                        await rule_engine.evaluate_batch(db_events)
-                        duration_rules = (time.time() - start_rules) * 1000
-                        logger.info(f"[METRIC] rule_engine_duration_ms={duration_rules:.2f} import_id={import_log.id}")
-                    except Exception as rule_err:
-                        logger.error(f"Business rules evaluation failed: {rule_err}")
+                    # Rules compiled once per import (plans cached per worker)
+                    rule_plans = alerting_service.compile_rules(active_rules)
+                    logic_codes = sorted({code for plan in rule_plans if plan.uses_logic for code in plan.condition_codes})
+                    logic_conditions = list((await repo.get_rule_conditions_by_codes(logic_codes)).values()) if logic_codes else []
+                    seq_lookback, seq_delay = sequence_window(rule_plans, logic_conditions)
+                    alerting_horizon = max(frequency_horizon(rule_plans, logic_conditions), seq_lookback)
+                    rule_engine = BusinessRuleEngine(session)
+                    duration_rules = 0.0
+                    page_size = parser_executor.stream_batch_size
+                    last_id = 0
+
+                    while True:
+                        db_events = await repo.get_import_events_page(import_log.id, last_id, page_size)
+                        if not db_events:
+                            break
+                        last_id = db_events[-1].id
+                        business_events = [e for e in db_events if e.normalized_type != 'OPERATOR_ACTION']
+
+                        # Phase 2.A: Actualiser le compteur business (raccordement site), un upsert par page
+                        await repo.upsert_site_connections(resolved_provider_id, business_events)
+
+                        # Fréquences et séquences : une lecture de la tranche (sites de la page x horizon)
+                        await repo.prefetch_alerting_window(business_events, alerting_horizon, seq_delay)
+                        try:
+                            for db_event in business_events:
+                                await alerting_service.check_and_trigger_alerts(db_event, rule_plans, repo=repo)
+                        finally:
+                            repo.release_alerting_window()
+
+                        try:
+                            # Phase C: Business Rule Engine (V1)
+                            start_rules = time.time()
+                            await rule_engine.evaluate_batch(db_events)
+                            duration_rules += (time.time() - start_rules) * 1000
+                        except Exception as rule_err:
+                            logger.error(f"Business rules evaluation failed: {rule_err}")
+                    logger.info(f"[METRIC] rule_engine_duration_ms={duration_rules:.2f} import_id={import_log.id}")
 
                     try:
                         # Exclude from incident reconstruction if handled by incident_service
@@ -429,18 +495,10 @@ async def process_ingestion_item(adapter: BaseAdapter, item: AdapterItem, redis_
 
                 # PDF Match Logic (Phase 4)
                 pdf_match_report = {}
-                # Look for a companion PDF in the same ingestion item or sibling files
-                # (Assuming adapter might group them or we look in the same directory)
-                pdf_path = None
-                # Basic heuristic: if current is .xls/.xlsx, look for .pdf with same name
-                potential_pdf = file_path.with_suffix('.pdf')
-                if potential_pdf.exists():
-                    pdf_path = potential_pdf
-                
-                if pdf_path and monitoring_provider:
+                if keep_unique:
                     try:
                         pdf_parser = PdfParser()
-                        pdf_events = pdf_parser.parse(str(pdf_path))
+                        pdf_events = await parser_executor.parse(pdf_parser, str(pdf_path))
                         
                         pdf_matcher = PdfMatchService()
                         # Pass monitoring_provider converted to dict for config
@@ -464,14 +522,14 @@ async def process_ingestion_item(adapter: BaseAdapter, item: AdapterItem, redis_
                 
                 meta = dict(import_log.import_metadata or {})
                 metrics = {
-                    "extracted": len(events),
-                    "dedup_kept": len(unique_events),
+                    "extracted": extracted_count,
+                    "dedup_kept": dedup_kept_count,
                     "inserted_db": inserted_db_count
                 }
                 meta["metrics"] = metrics
                 import_log.import_metadata = meta
 
-                logger.info(f"[EVENTS_CREATED] import_id={import_log.id} count={inserted_db_count} (extracted={len(events)}, dedup_kept={len(unique_events)})")
+                logger.info(f"[EVENTS_CREATED] import_id={import_log.id} count={inserted_db_count} (extracted={extracted_count}, dedup_kept={dedup_kept_count})")
                 
                 await repo.update_import_log(import_log.id, "SUCCESS", inserted_db_count, duplicates_count)
                 # Phase 2.B: Update monitoring last success
@@ -581,6 +639,132 @@ def compute_integrity_check(xls_events: List[Any], pdf_events: List[Any]) -> dic
         "match_pct": round(match_pct, 3)
     }
 
+async def process_email_group(
+    msg_id: str, group: list, redis_lock: RedisLock, redis_client, poll_run_id: str, parse_times: list
+):
+    """
+    Fusion V1: traite séquentiellement les pièces jointes d'un même email (XLS puis PDF)
+    puis calcule le contrôle d'intégrité. Plusieurs groupes peuvent tourner en parallèle.
+    """
+    logger.info(f"[Group] Processing email group {msg_id} ({len(group)} items)")
+    # Sort: XLS first
+    group.sort(key=lambda x: 0 if x[1].filename.lower().endswith(('.xls', '.xlsx')) else 1)
+    
+    primary_import_id = None
+    events_map = {"xls": [], "pdf": []}
+    
+    for adapter, item in group:
+        # Logic for grouping: pass existing_import_id if already set
+        t_parse_start = time.monotonic()
+        import_id, events = await process_ingestion_item(
+            adapter, item, redis_lock, redis_client, poll_run_id=poll_run_id, 
+            existing_import_id=primary_import_id, collect_events=len(group) > 1
+        )
+        t_parse_end = time.monotonic()
+        parse_ms = (t_parse_end - t_parse_start) * 1000
+        parse_times.append(parse_ms)
+        if len(parse_times) > 100: parse_times.pop(0)
+        
+        if import_id:
+            if not primary_import_id:
+                primary_import_id = import_id
+            
+            ext = item.filename.lower()
+            if ext.endswith(('.xls', '.xlsx')):
+                events_map["xls"].extend(events)
+            elif ext.endswith('.pdf'):
+                events_map["pdf"].extend(events)
+
+    # --- 2. Integrity Check (Phase 6.2) ---
+    if primary_import_id and events_map["xls"] and events_map["pdf"]:
+        logger.info(f"[Integrity] Computing check for Import {primary_import_id}")
+        results = compute_integrity_check(events_map["xls"], events_map["pdf"])
+        
+        # Update primary import metadata
+        from app.db.session import engine, AsyncSession
+        async with AsyncSession(engine) as session:
+            # Roadmap V12: Get monitoring settings
+            mon_settings = await settings.get_monitoring_settings(session)
+            
+            import_log = await session.get(ImportLog, primary_import_id)
+            if import_log:
+                meta = dict(import_log.import_metadata or {})
+                meta["integrity_check"] = results
+                
+                # Logique Phase 1 V12: XLS Source of Truth
+                if mon_settings['integrity']['xls_is_source_of_truth'] and import_log.status == "ERROR":
+                    # If we had an error but XLS is OK, maybe we should reconsider?
+                    # Actually ERROR usually means crash or parser fail.
+                    # But if we are here, it means both XLS and PDF were parsed.
+                    pass
+
+                # UI Warning based on settings
+                warn_pct = mon_settings['integrity'].get('warn_pct', 90) / 100
+                if results['match_pct'] < warn_pct:
+                    logger.warning(f"[Integrity] WARNING: Low match score {results['match_pct']*100}% (Threshold: {warn_pct*100}%)")
+                    meta["integrity_warning"] = True
+                
+                import_log.import_metadata = meta
+                await session.commit()
+                
+        logger.info(f"[Integrity] Result: {results['match_pct']*100}% matched")
+        if results['match_pct'] < 0.9:
+            logger.warning(f"[Integrity] LOW MATCH SCORE: {results['match_pct']*100}% for Import {primary_import_id}")
+
+
+async def process_orphan_item(
+    adapter: BaseAdapter, item: AdapterItem, redis_lock: RedisLock, redis_client, poll_run_id: str, parse_times: list
+):
+    t_parse_start = time.monotonic()
+    await process_ingestion_item(adapter, item, redis_lock, redis_client, poll_run_id=poll_run_id, collect_events=False)
+    parse_times.append((time.monotonic() - t_parse_start) * 1000)
+    if len(parse_times) > 100: parse_times.pop(0)
+
+
+async def heartbeat_loop(redis_client, slot_pool: IngestionSlotPool, parse_times: list, heartbeat_path: Path, interval: int = 30):
+    """
+    Heartbeat Redis indépendant du cycle de poll, pour qu'un cycle long (burst de
+    fichiers) ne rende pas le worker "stale" côté /health.
+    Le fichier du healthcheck docker n'est touché que si le scheduler a progressé
+    (slot pris / rendu, fin de cycle) depuis moins de `heartbeat_stall_seconds` :
+    un worker bloqué redevient détectable.
+    """
+    stall_limit = float(settings.INGESTION.get("heartbeat_stall_seconds", 600))
+    while True:
+        stalled_for = slot_pool.stalled_for()
+        stalled = stalled_for > stall_limit
+        try:
+            heartbeat_data = {
+                "timestamp": datetime.now().isoformat(),
+                "worker_id": os.environ.get("HOSTNAME", "default-worker"),
+                "status": "STALLED" if stalled else "RUNNING",
+                "seconds_since_progress": round(stalled_for, 1),
+            }
+            # Optional: Include simple metrics in heartbeat
+            if parse_times:
+                heartbeat_data["avg_parse_time_ms"] = round(sum(parse_times) / len(parse_times), 2)
+            # Per-slot utilisation since last heartbeat (sizing of ingestion.max_concurrency)
+            heartbeat_data["concurrency"] = slot_pool.snapshot()
+            
+            await redis_client.set("supervision:worker:heartbeat", json.dumps(heartbeat_data), ex=90)
+            logger.info(
+                f"[METRIC] heartbeat_updated in_flight={heartbeat_data['concurrency']['in_flight']} "
+                f"utilization={heartbeat_data['concurrency']['utilization']}"
+            )
+        except Exception as e:
+            logger.error(f"Failed to update Redis heartbeat: {e}")
+
+        if stalled:
+            logger.error(f"[METRIC] event=worker_stalled seconds_since_progress={int(stalled_for)} in_flight={slot_pool.in_flight}")
+        else:
+            try:
+                heartbeat_path.touch()
+            except Exception:
+                pass
+
+        await asyncio.sleep(interval)
+
+
 async def worker_loop():
     logger.info("Starting Supervision Worker (Phase 3: Matcher & Normalization)...")
     
@@ -594,139 +778,87 @@ async def worker_loop():
     registry = AdapterRegistry()
     heartbeat_path = Path("/tmp/worker_heartbeat")
 
-    last_redis_heartbeat = 0
     parse_times = [] # Keep last 100 parse times for moving average
 
-    while True:
-        poll_run_id = str(uuid.uuid4())[:8]
-        t_cycle_start = time.monotonic()
-        
-        # 1. Update Heartbeat (Redis + File)
-        now = time.time()
-        if now - last_redis_heartbeat > 30:
-            try:
-                heartbeat_data = {
-                    "timestamp": datetime.now().isoformat(),
-                    "worker_id": os.environ.get("HOSTNAME", "default-worker"),
-                    "status": "RUNNING"
-                }
-                # Optional: Include simple metrics in heartbeat
-                if parse_times:
-                    heartbeat_data["avg_parse_time_ms"] = round(sum(parse_times) / len(parse_times), 2)
-                
-                await redis_client.set("supervision:worker:heartbeat", json.dumps(heartbeat_data), ex=90)
-                last_redis_heartbeat = now
-                logger.info(f"[METRIC] heartbeat_updated run_id={poll_run_id}")
-            except Exception as e:
-                logger.error(f"Failed to update Redis heartbeat: {e}")
+    # Bounded parallelism: independent email groups / orphans share N slots
+    max_concurrency = int(settings.INGESTION.get("max_concurrency", 4))
+    slot_pool = IngestionSlotPool(max_concurrency)
+    logger.info(f"[CONCURRENCY] max_concurrency={slot_pool.size}")
 
-        # Update Docker healthcheck file
-        heartbeat_path.touch()
+    # Warm parser processes (pandas / pdfplumber pre-imported)
+    try:
+        await parser_executor.warm_up()
+    except Exception as e:
+        logger.error(f"[PARSER_POOL] warm-up failed, parsers will start on demand: {e}")
 
-        logger.info(f"[METRIC] event=poll_cycle_start run_id={poll_run_id}")
+    heartbeat_task = asyncio.create_task(
+        heartbeat_loop(redis_client, slot_pool, parse_times, heartbeat_path)
+    )
+    # Invalidations des caches process publiées par l'API (connexion pub/sub dédiée)
+    cache_listener_task = asyncio.create_task(cache_bus.listen(await get_redis_client()))
 
-        try:
-            items_by_msg = {} # source_message_id -> list[(adapter, item)]
-            orphans = []
-            queue_depth = 0
-            
-            async for adapter, item in registry.poll_all():
-                queue_depth += 1
-                msg_id = item.source_message_id
-                if msg_id:
-                    if msg_id not in items_by_msg:
-                        items_by_msg[msg_id] = []
-                    items_by_msg[msg_id].append((adapter, item))
-                else:
-                    orphans.append((adapter, item))
-            
-            # Store queue_depth in Redis for /health
-            await redis_client.set("supervision:worker:queue_depth", queue_depth, ex=300)
-            
-            # 1. Process Groups (Fusion V1)
-            for msg_id, group in items_by_msg.items():
-                logger.info(f"[Group] Processing email group {msg_id} ({len(group)} items)")
-                # Sort: XLS first
-                group.sort(key=lambda x: 0 if x[1].filename.lower().endswith(('.xls', '.xlsx')) else 1)
+    try:
+        while True:
+            poll_run_id = str(uuid.uuid4())[:8]
+            t_cycle_start = time.monotonic()
+
+            logger.info(f"[METRIC] event=poll_cycle_start run_id={poll_run_id}")
+
+            try:
+                items_by_msg = {} # source_message_id -> list[(adapter, item)]
+                orphans = []
+                queue_depth = 0
                 
-                primary_import_id = None
-                events_map = {"xls": [], "pdf": []}
+                async for adapter, item in registry.poll_all():
+                    queue_depth += 1
+                    msg_id = item.source_message_id
+                    if msg_id:
+                        if msg_id not in items_by_msg:
+                            items_by_msg[msg_id] = []
+                        items_by_msg[msg_id].append((adapter, item))
+                    else:
+                        orphans.append((adapter, item))
                 
-                for adapter, item in group:
-                    # Logic for grouping: pass existing_import_id if already set
-                    t_parse_start = time.monotonic()
-                    import_id, events = await process_ingestion_item(
-                        adapter, item, redis_lock, redis_client, poll_run_id=poll_run_id, 
-                        existing_import_id=primary_import_id
-                    )
-                    t_parse_end = time.monotonic()
-                    parse_ms = (t_parse_end - t_parse_start) * 1000
-                    parse_times.append(parse_ms)
-                    if len(parse_times) > 100: parse_times.pop(0)
-                    
-                    if import_id:
-                        if not primary_import_id:
-                            primary_import_id = import_id
-                        
-                        ext = item.filename.lower()
-                        if ext.endswith(('.xls', '.xlsx')):
-                            events_map["xls"].extend(events)
-                        elif ext.endswith('.pdf'):
-                            events_map["pdf"].extend(events)
-
-                # --- 2. Integrity Check (Phase 6.2) ---
-                if primary_import_id and events_map["xls"] and events_map["pdf"]:
-                    logger.info(f"[Integrity] Computing check for Import {primary_import_id}")
-                    results = compute_integrity_check(events_map["xls"], events_map["pdf"])
-                    
-                    # Update primary import metadata
-                    from app.db.session import engine, AsyncSession
-                    async with AsyncSession(engine) as session:
-                        # Roadmap V12: Get monitoring settings
-                        mon_settings = await settings.get_monitoring_settings(session)
-                        
-                        import_log = await session.get(ImportLog, primary_import_id)
-                        if import_log:
-                            meta = dict(import_log.import_metadata or {})
-                            meta["integrity_check"] = results
-                            
-                            # Logique Phase 1 V12: XLS Source of Truth
-                            if mon_settings['integrity']['xls_is_source_of_truth'] and import_log.status == "ERROR":
-                                # If we had an error but XLS is OK, maybe we should reconsider?
-                                # Actually ERROR usually means crash or parser fail.
-                                # But if we are here, it means both XLS and PDF were parsed.
-                                pass
-
-                            # UI Warning based on settings
-                            warn_pct = mon_settings['integrity'].get('warn_pct', 90) / 100
-                            if results['match_pct'] < warn_pct:
-                                logger.warning(f"[Integrity] WARNING: Low match score {results['match_pct']*100}% (Threshold: {warn_pct*100}%)")
-                                meta["integrity_warning"] = True
-                            
-                            import_log.import_metadata = meta
-                            await session.commit()
-                            
-                    logger.info(f"[Integrity] Result: {results['match_pct']*100}% matched")
-                    if results['match_pct'] < 0.9:
-                        logger.warning(f"[Integrity] LOW MATCH SCORE: {results['match_pct']*100}% for Import {primary_import_id}")
-
-            # 2. Process Isolated Items
-            for adapter, item in orphans:
-                await process_ingestion_item(adapter, item, redis_lock, redis_client, poll_run_id=poll_run_id)
+                # Store queue_depth in Redis for /health
+                await redis_client.set("supervision:worker:queue_depth", queue_depth, ex=300)
+                
+                # 1. Groups (Fusion V1, XLS -> PDF inside a group) + 2. Isolated items.
+                # Each unit runs on its own slot; the per-sha256 RedisLock still guards duplicates.
+                jobs, labels = [], []
+                for msg_id, group in items_by_msg.items():
+                    jobs.append(lambda m=msg_id, g=group: process_email_group(
+                        m, g, redis_lock, redis_client, poll_run_id, parse_times
+                    ))
+                    labels.append(f"group:{msg_id}")
+                for adapter, item in orphans:
+                    jobs.append(lambda a=adapter, i=item: process_orphan_item(
+                        a, i, redis_lock, redis_client, poll_run_id, parse_times
+                    ))
+                    labels.append(f"file:{item.filename}")
+
+                results = await slot_pool.run_all(jobs, labels)
+                for label, res in zip(labels, results):
+                    if isinstance(res, Exception):
+                        logger.error(f"[METRIC] event=poll_job_error run_id={poll_run_id} job={label} reason={res}", exc_info=res)
 
-        except Exception as e:
-            logger.error(f"[METRIC] event=poll_cycle_error run_id={poll_run_id} reason={e}", exc_info=True)
+            except Exception as e:
+                logger.error(f"[METRIC] event=poll_cycle_error run_id={poll_run_id} reason={e}", exc_info=True)
 
-        elapsed_ms = int((time.monotonic() - t_cycle_start) * 1000)
-        logger.info(f"[METRIC] event=poll_cycle_done run_id={poll_run_id} duration_ms={elapsed_ms}")
-        
-        # Write heartbeat
-        try:
-            heartbeat_path.touch()
-        except:
-            pass
+            elapsed_ms = int((time.monotonic() - t_cycle_start) * 1000)
+            logger.info(f"[METRIC] event=poll_cycle_done run_id={poll_run_id} duration_ms={elapsed_ms} jobs={queue_depth}")
             
-        await asyncio.sleep(5)
+            # Write heartbeat
+            slot_pool.mark_progress()
+            try:
+                heartbeat_path.touch()
+            except:
+                pass
+                
+            await asyncio.sleep(5)
+    finally:
+        heartbeat_task.cancel()
+        cache_listener_task.cancel()
+        parser_executor.shutdown()
 
 async def main():
     logger.info("Starting Refactored worker service (V3.1)...")
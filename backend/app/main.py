@@ -102,6 +102,21 @@ async def init_tables():
             else:
                 logger.debug("Admin users already exist. Skipping seed.")
 
+@app.on_event("startup")
+async def start_cache_bus_listener():
+    # Invalidations des caches process publiées par les autres process (API, worker)
+    import asyncio
+    from app.db.redis import get_redis_client
+    from app.services import cache_bus
+
+    app.state.cache_listener = asyncio.create_task(cache_bus.listen(await get_redis_client()))
+
+@app.on_event("shutdown")
+async def stop_cache_bus_listener():
+    task = getattr(app.state, "cache_listener", None)
+    if task:
+        task.cancel()
+
 @app.get("/health")
 def health_check():
     return {"status": "ok", "version": "12.0.1"}
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterator, List
 from app.ingestion.models import NormalizedEvent
 
 class BaseParser(ABC):
@@ -14,6 +14,16 @@ class BaseParser(ABC):
         """
         pass
 
+    # True si iter_events() lit réellement le fichier au fil de l'eau
+    streaming = False
+
+    def iter_events(self, file_path: str, source_timezone: str = "UTC", parser_config: dict = None) -> Iterator[NormalizedEvent]:
+        """
+        Events produits un par un. Par défaut : le résultat de parse() ;
+        les parsers `streaming` le surchargent par une lecture incrémentale.
+        """
+        yield from self.parse(file_path, source_timezone=source_timezone, parser_config=parser_config)
+
     @abstractmethod
     def supported_extensions(self) -> List[str]:
         """
@@ -9,6 +9,33 @@ from app.ingestion.models import NormalizedEvent
 from app.utils.text import normalize_text, clean_excel_value
 from app.ingestion.normalizer import normalize_site_code, normalize_site_code_full
 
+# Extraction du code depuis le message (profils à mapping)
+CODE_LEADING_PATTERN = r'^(\d{2,6})\s+'            # "1234  MESSAGE..." (début de supervision)
+CODE_DOLLAR_PATTERN = r'\$([^\s,\t;()[\]]+)'      # "... $CODE" (dans le message)
+CODE_DIGITS_PATTERN = r'\b(\d{4})\b'               # "MISE EN SERVICE 0003"
+_CODE_DOLLAR_RE = re.compile(CODE_DOLLAR_PATTERN)
+_CODE_DIGITS_RE = re.compile(CODE_DIGITS_PATTERN)
+
+# Formats de date testés dans l'ordre, avec leur forme canonique (zéro-paddée) :
+# seules les valeurs canoniques passent par to_datetime vectorisé, le reste par strptime
+DATETIME_FORMATS = (
+    ("%d/%m/%Y %H:%M:%S", r"[0-9]{2}/[0-9]{2}/[0-9]{4} [0-9]{2}:[0-9]{2}:[0-9]{2}"),
+    ("%Y-%m-%d %H:%M:%S", r"[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}"),
+    ("%d/%m/%Y %H:%M", r"[0-9]{2}/[0-9]{2}/[0-9]{4} [0-9]{2}:[0-9]{2}"),
+)
+
+
+def _resolve_column(source) -> int:
+    """Lettre (A, B, ...) ou index de colonne ; lève une exception si inexploitable."""
+    if isinstance(source, str) and len(source) == 1 and source.isalpha():
+        return ord(source.upper()) - ord('A')
+    return int(source)
+
+
+def _is_blank(val) -> bool:
+    return not val or str(val).lower() == 'nan'
+
+
 class ExcelParser(BaseParser):
     """
     Parses 'Pseudo-Excel' files (YPSILON.xls) which are actually Tab-Separated Values (TSV)
@@ -92,207 +119,29 @@ class ExcelParser(BaseParser):
             else:
                 logger.warning(f" [XLSX_RAW_ROWS_CONTENT_SAMPLE] EMPTY DATAFRAME")
             
-            # Context trackers (Inheritance)
-            ctx_site_code = None
-            ctx_site_code_raw = None
-            ctx_client_name = None
-            ctx_day = None
-            ctx_date = None
-            last_ts = None # For HISTO operator actions
-
-            for idx, row_series in df.iterrows():
-                row = []
-                for val in row_series.tolist():
-                    if val is None or (isinstance(val, float) and pd.isna(val)):
-                        row.append("")
-                    else:
-                        row.append(val)
-
-                row_idx = idx + 1
-                
-                # Ignore Row 1 (Header/MetaData)
-                if row_idx == 1:
-                    continue
-                if mapping:
-                    # Helper to get by index or letter
-                    def get_val(key):
-                        idx_val = mapping.get(key)
-                        if idx_val is None: return None
-                        try:
-                            if isinstance(idx_val, str) and len(idx_val) == 1 and idx_val.isalpha():
-                                idx = ord(idx_val.upper()) - ord('A')
-                            else:
-                                idx = int(idx_val)
-                            return row[idx] if idx < len(row) else ""
-                        except Exception as e: 
-                            logger.error(f"get_val error for {key}: {e}")
-                            return ""
-
-                    # Site code logic (Propagation if empty)
-                    current_site = str(get_val("site_code")).strip()
-                    if current_site and current_site.lower() != 'nan' and current_site != "":
-                        # CORS / YPSILON specific: Strip leading zeros for consistency with PDF
-                        ctx_site_code_raw = current_site
-                        # normalize_site_code_full handles digit extraction + leading zero strip
-                        ctx_site_code, _ = normalize_site_code_full(current_site)
-                        metrics["site_blocks_detected"] += 1
-                    
-                    if not ctx_site_code:
-                        # Only skip if we really have no context and this isn't a header-only row
-                        # Check all possible time keys
-                        if get_val("timestamp") or get_val("date_time") or get_val("date"):
-                            record_skip("NO_SITE_CONTEXT", row_idx, row)
-                        continue
-
-                    # Client name logic (Propagation if empty) - CORS Specific
-                    current_client = str(get_val("client_name") or "").strip()
-                    if current_client and current_client.lower() != 'nan' and current_client != "":
-                        ctx_client_name = current_client
-                        # Also capture address if possible for context
-                        # Col C = index 2
-                        if len(row) > 2 and row[2] and str(row[2]).lower() != 'nan':
-                            ctx_address = str(row[2]).strip()
-
-                    # 2. Date/Time (Priority: Col G index 6 for CORS Security)
-                    # Col G is normally index 6, Col J is normally index 9
-                    raw_dt = get_val("timestamp") or get_val("date_time")
-                    is_operator_action = False
-                    
-                    if not raw_dt or str(raw_dt).lower() == 'nan':
-                        # Try Operator Action: Col J (index 9)
-                        op_dt = row[9] if len(row) > 9 else None
-                        if op_dt and str(op_dt).lower() != 'nan' and str(op_dt).strip() != "":
-                            raw_dt = op_dt
-                            is_operator_action = True
-                    
-                    if not raw_dt or str(raw_dt).lower() == 'nan':
-                        metrics["missing_time_count"] += 1
-                        record_skip("MISSING_DATE_TIME", row_idx, row)
-                        continue
-                    
-                    # Parse Date (Robust)
-                    dt = None
-                    try:
-                        if isinstance(raw_dt, datetime):
-                            dt = raw_dt
-                        else:
-                            for fmt in ["%d/%m/%Y %H:%M:%S", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M"]:
-                                try:
-                                    dt = datetime.strptime(str(raw_dt).strip(), fmt)
-                                    break
-                                except: continue
-                    except: pass
-
-                    if not dt:
-                        record_skip("DATE_PARSE_ERROR", row_idx, str(raw_dt))
+            # Même contenu que `row_series.tolist()` de df.iterrows() (qui itère sur df.values),
+            # sans construire une Series par ligne ; NaN/None → ""
+            rows = [
+                ["" if val is None or (isinstance(val, float) and val != val) else val for val in raw_row]
+                for raw_row in df.values.tolist()
+            ]
+
+            if mapping:
+                events = self._parse_mapped(rows, len(df.columns), mapping, action_config, file_path, metrics, record_skip, logger)
+            else:
+                # Context trackers (Inheritance)
+                ctx_site_code = None
+                ctx_site_code_raw = None
+                ctx_client_name = None
+                ctx_day = None
+                ctx_date = None
+                last_ts = None # For HISTO operator actions
+
+                for idx, row in enumerate(rows):
+                    row_idx = idx + 1
+                    # Ignore Row 1 (Header/MetaData)
+                    if row_idx == 1:
                         continue
-
-                    # Msg / Code / Action (Support raw_message/raw_code as priority)
-                    msg = str(get_val("raw_message") or get_val("message") or "")
-                    code = str(get_val("raw_code") or get_val("code") or "")
-                    
-                    # Robust Code Extraction from Message if empty (e.g. CORS standard)
-                    if (not code or code.lower() == 'nan' or code == "") and msg:
-                        # Pattern A: "1234  MESSAGE..." (Supervision Start)
-                        match_code = re.match(r'^(\d{2,6})\s+', msg)
-                        if match_code:
-                            code = match_code.group(1)
-                        else:
-                            # Pattern B: "... $CODE" (Inside message)
-                            match_code_dollar = re.search(r'\$([^\s,\t;()[\]]+)', msg)
-                            if match_code_dollar:
-                                code = "$" + match_code_dollar.group(1)
-                            else:
-                                # Pattern C: "MISE EN SERVICE 0003" (4 digits)
-                                match_code_digits = re.search(r'\b(\d{4})\b', msg)
-                                if match_code_digits:
-                                    code = match_code_digits.group(1)
-                    
-                    # If Operator Action, use Col M (index 12) for detail text
-                    if is_operator_action:
-                        msg = row[12] if len(row) > 12 else msg
-                        action = "OPERATOR_ACTION"
-                    else:
-                        action = get_val("action")
-
-                    mode = action_config.get("mode", "NONE")
-                    if mode == "COLUMN":
-                        if not action:
-                            action = "INFO" # Fallback if col mapped but empty
-                    elif mode == "REGEX_DERIVE":
-                        source = msg if action_config.get("source_field") == "message" else code
-                        action = None
-                        for reg in action_config.get("regex_app", []):
-                            if re.search(reg, source, re.IGNORECASE):
-                                action = "APPARITION"; break
-                        if not action:
-                            for reg in action_config.get("regex_dis", []):
-                                if re.search(reg, source, re.IGNORECASE):
-                                    action = "DISPARITION"; break
-                    
-                    if not action or str(action).lower() == 'nan' or action == "":
-                        # Smart derivative if empty
-                        action = "INFO"
-                        m_upper = msg.upper()
-                        if "APPARITION" in m_upper or "ALARM" in m_upper or "INTRUSION" in m_upper: action = "APPARITION"
-                        elif "DISPARITION" in m_upper or "RETARD" in m_upper: action = "DISPARITION"
-                        elif "MISE EN SERVICE" in m_upper: action = "MISE EN SERVICE"
-                        elif "MISE HORS SERVICE" in m_upper: action = "MISE HORS SERVICE"
-                        elif "TEST CYCLIQUE" in m_upper: action = "TEST CYCLIQUE"
-
-                    # Smart code fallback if empty
-                    if (not code or code.lower() == 'nan' or code == "") and msg:
-                        # Pattern B: "... $CODE" (Inside message)
-                        match_code_dollar = re.search(r'\$([^\s,\t;()[\]]+)', msg)
-                        if match_code_dollar:
-                            code = "$" + match_code_dollar.group(1)
-                        else:
-                            # Pattern C: "MISE EN SERVICE 0003" (4 digits)
-                            match_code_digits = re.search(r'\b(\d{4})\b', msg)
-                            if match_code_digits:
-                                code = match_code_digits.group(1)
-
-                    # Business Logic mapping
-                    # Severity/Status: INFO, WARN, CRITICAL
-                    # NormalizedType: APPARITION, DISPARITION, ...
-                    
-                    norm_type = "UNKNOWN"
-                    if is_operator_action:
-                        norm_type = "OPERATOR_ACTION"
-                        severity = "INFO"
-                    elif action in ["APPARITION", "DISPARITION", "ALARM", "MISE EN SERVICE", "MISE HORS SERVICE", "TEST CYCLIQUE", "RETARD", "ALERTE"]:
-                        norm_type = action
-                        if action == "ALARM": severity = "CRITICAL"
-                        else: severity = "INFO"
-                    else:
-                        severity = action or "INFO"
-                    
-                    if norm_type == "GENERIC":
-                        metrics["missing_action_count"] += 1
-
-                    n_code = self._normalize_code(code)
-                    if n_code:
-                        metrics["with_code_count"] += 1
-
-                    evt = NormalizedEvent(
-                        timestamp=dt,
-                        site_code=ctx_site_code,
-                        site_code_raw=ctx_site_code_raw,
-                        client_name=ctx_client_name,
-                        event_type=norm_type,
-                        normalized_type=norm_type,
-                        raw_message=msg,
-                        raw_code=code,
-                        normalized_code=n_code,
-                        status=severity,
-                        source_file=file_path,
-                        row_index=row_idx,
-                        raw_data=json.dumps([str(x) for x in row]),
-                        tenant_id="default"
-                    )
-                    events.append(evt)
-                    metrics["events_created"] += 1
-                else:
                     # Backward compatibility for existing logic if mapping empty (Phase transition)
                     try:
                         processed = self._process_row(row, row_idx, file_path, ctx_site_code, ctx_site_code_raw, ctx_client_name, ctx_day, ctx_date, is_histo, source_timezone, provider_code=provider_code, last_ts=last_ts)
@@ -314,6 +163,222 @@ class ExcelParser(BaseParser):
             
         return events
 
+    def _parse_mapped(self, rows, n_cols, mapping, action_config, file_path, metrics, record_skip, logger) -> List[NormalizedEvent]:
+        """
+        Profils à mapping, en colonnes : contexte site / client propagé par ffill,
+        timestamps parsés par to_datetime vectorisé, codes extraits par str.extract.
+        Les events (et les lignes ignorées) sont ensuite émis dans l'ordre des lignes.
+        """
+        import pandas as pd
+
+        n = len(rows)
+
+        def column(key) -> list:
+            source = mapping.get(key)
+            if source is None:
+                return [None] * n
+            try:
+                idx = _resolve_column(source)
+                if idx >= n_cols:
+                    return [""] * n
+                if idx < -n_cols:
+                    raise IndexError("list index out of range")
+                return [row[idx] for row in rows]
+            except Exception as e:
+                logger.error(f"get_val error for {key}: {e}")
+                return [""] * n
+
+        # 1. Contexte site : une ligne "bloc" par site_code renseigné, propagé vers le bas
+        site_values = column("site_code")
+        current_site = [str(v).strip() for v in site_values]
+        site_rows = [i for i in range(1, n) if current_site[i] and current_site[i].lower() != 'nan']
+        metrics["site_blocks_detected"] += len(site_rows)
+        site_code_at = {i: normalize_site_code_full(current_site[i])[0] for i in site_rows}
+        site_block = pd.Series([float(i) if i in site_code_at else float('nan') for i in range(n)]).ffill()
+        site_block = [None if b != b else int(b) for b in site_block.tolist()]
+        has_site = [b is not None and bool(site_code_at[b]) for b in site_block]
+
+        # 2. Contexte client : seules les lignes avec un site en contexte le mettent à jour
+        client_values = column("client_name")
+        current_client = [str(v or "").strip() for v in client_values]
+        client_block = pd.Series([
+            float(i) if i > 0 and has_site[i] and current_client[i] and current_client[i].lower() != 'nan' else float('nan')
+            for i in range(n)
+        ]).ffill()
+        client_block = [None if b != b else int(b) for b in client_block.tolist()]
+
+        # 3. Date/heure : colonne mappée, sinon horodatage d'action opérateur (col J)
+        ts_values, date_time_values, date_values = column("timestamp"), column("date_time"), column("date")
+        op_values = [row[9] for row in rows] if n_cols > 9 else [None] * n
+        raw_dts = [None] * n
+        is_operator = [False] * n
+        candidates = []
+        for i in range(1, n):
+            if not has_site[i]:
+                continue
+            raw_dt = ts_values[i] or date_time_values[i]
+            if _is_blank(raw_dt):
+                op_dt = op_values[i]
+                if op_dt and str(op_dt).lower() != 'nan' and str(op_dt).strip() != "":
+                    raw_dt = op_dt
+                    is_operator[i] = True
+            if not _is_blank(raw_dt):
+                raw_dts[i] = raw_dt
+                candidates.append(i)
+
+        parsed = self._parse_datetimes([raw_dts[i] for i in candidates])
+        dts = dict(zip(candidates, parsed))
+
+        # 4. Message / code ; code extrait du message (A : en tête, B : $CODE, C : 4 chiffres)
+        msg_values = [v or m for v, m in zip(column("raw_message"), column("message"))]
+        code_values = [v or c for v, c in zip(column("raw_code"), column("code"))]
+        msgs = {i: str(msg_values[i] or "") for i in candidates}
+        codes = {i: str(code_values[i] or "") for i in candidates}
+        to_extract = [i for i in candidates if _is_blank(codes[i]) and msgs[i]]
+        if to_extract:
+            texts = pd.Series([msgs[i] for i in to_extract], dtype=object)
+            leading = texts.str.extract(CODE_LEADING_PATTERN, expand=False)
+            dollar = texts.str.extract(CODE_DOLLAR_PATTERN, expand=False)
+            digits = texts.str.extract(CODE_DIGITS_PATTERN, expand=False)
+            extracted = leading.where(leading.notna(), "$" + dollar).fillna(digits)
+            for i, code in zip(to_extract, extracted.tolist()):
+                if isinstance(code, str):
+                    codes[i] = code
+
+        action_values = column("action")
+        mode = action_config.get("mode", "NONE")
+        events = []
+
+        # 5. Émission dans l'ordre des lignes (mêmes skips et métriques que le parcours ligne à ligne)
+        for i in range(1, n):
+            row = rows[i]
+            row_idx = i + 1
+            if not has_site[i]:
+                if ts_values[i] or date_time_values[i] or date_values[i]:
+                    record_skip("NO_SITE_CONTEXT", row_idx, row)
+                continue
+            if i not in dts:
+                metrics["missing_time_count"] += 1
+                record_skip("MISSING_DATE_TIME", row_idx, row)
+                continue
+            dt = dts[i]
+            if not dt:
+                record_skip("DATE_PARSE_ERROR", row_idx, str(raw_dts[i]))
+                continue
+
+            msg, code = msgs[i], codes[i]
+
+            # If Operator Action, use Col M (index 12) for detail text
+            if is_operator[i]:
+                msg = row[12] if len(row) > 12 else msg
+                action = "OPERATOR_ACTION"
+            else:
+                action = action_values[i]
+
+            if mode == "COLUMN":
+                if not action:
+                    action = "INFO" # Fallback if col mapped but empty
+            elif mode == "REGEX_DERIVE":
+                source = msg if action_config.get("source_field") == "message" else code
+                action = None
+                for reg in action_config.get("regex_app", []):
+                    if re.search(reg, source, re.IGNORECASE):
+                        action = "APPARITION"; break
+                if not action:
+                    for reg in action_config.get("regex_dis", []):
+                        if re.search(reg, source, re.IGNORECASE):
+                            action = "DISPARITION"; break
+
+            if not action or str(action).lower() == 'nan' or action == "":
+                # Smart derivative if empty
+                action = "INFO"
+                m_upper = msg.upper()
+                if "APPARITION" in m_upper or "ALARM" in m_upper or "INTRUSION" in m_upper: action = "APPARITION"
+                elif "DISPARITION" in m_upper or "RETARD" in m_upper: action = "DISPARITION"
+                elif "MISE EN SERVICE" in m_upper: action = "MISE EN SERVICE"
+                elif "MISE HORS SERVICE" in m_upper: action = "MISE HORS SERVICE"
+                elif "TEST CYCLIQUE" in m_upper: action = "TEST CYCLIQUE"
+
+            # Smart code fallback if empty (message remplacé par le détail opérateur)
+            if _is_blank(code) and msg:
+                match_code_dollar = _CODE_DOLLAR_RE.search(msg)
+                if match_code_dollar:
+                    code = "$" + match_code_dollar.group(1)
+                else:
+                    match_code_digits = _CODE_DIGITS_RE.search(msg)
+                    if match_code_digits:
+                        code = match_code_digits.group(1)
+
+            norm_type = "UNKNOWN"
+            if is_operator[i]:
+                norm_type = "OPERATOR_ACTION"
+                severity = "INFO"
+            elif action in ["APPARITION", "DISPARITION", "ALARM", "MISE EN SERVICE", "MISE HORS SERVICE", "TEST CYCLIQUE", "RETARD", "ALERTE"]:
+                norm_type = action
+                if action == "ALARM": severity = "CRITICAL"
+                else: severity = "INFO"
+            else:
+                severity = action or "INFO"
+
+            n_code = self._normalize_code(code)
+            if n_code:
+                metrics["with_code_count"] += 1
+
+            client_row = client_block[i]
+            events.append(NormalizedEvent(
+                timestamp=dt,
+                site_code=site_code_at[site_block[i]],
+                site_code_raw=current_site[site_block[i]],
+                client_name=current_client[client_row] if client_row is not None else None,
+                event_type=norm_type,
+                normalized_type=norm_type,
+                raw_message=msg,
+                raw_code=code,
+                normalized_code=n_code,
+                status=severity,
+                source_file=file_path,
+                row_index=row_idx,
+                raw_data=json.dumps([str(x) for x in row]),
+                tenant_id="default"
+            ))
+            metrics["events_created"] += 1
+
+        return events
+
+    @staticmethod
+    def _parse_datetimes(values: list) -> list:
+        """
+        datetime déjà typé conservé ; chaînes parsées avec le premier format de DATETIME_FORMATS
+        qui convient (même résultat que strptime). None si aucun format ne convient.
+        """
+        import pandas as pd
+
+        out = [v if isinstance(v, datetime) else None for v in values]
+        pending = [i for i, v in enumerate(values) if out[i] is None]
+        if not pending:
+            return out
+        texts = pd.Series([str(values[i]).strip() for i in pending], index=pending, dtype=object)
+
+        for fmt, canonical in DATETIME_FORMATS:
+            subset = texts[texts.str.fullmatch(canonical)]
+            if subset.empty:
+                continue
+            parsed = pd.to_datetime(subset, format=fmt, errors="coerce")
+            for i, ts in zip(subset.index, parsed.tolist()):
+                if ts is not pd.NaT:
+                    out[i] = ts.to_pydatetime()
+            texts = texts[[out[i] is None for i in texts.index]]
+
+        # Formes non canoniques (non zéro-paddées...) ou hors bornes pandas : strptime
+        for i, text in texts.items():
+            for fmt, _ in DATETIME_FORMATS:
+                try:
+                    out[i] = datetime.strptime(text, fmt)
+                    break
+                except ValueError:
+                    continue
+        return out
+
     def _process_row(self, clean_row, row_idx, file_path, ctx_site_code, ctx_site_code_raw, ctx_client_name, ctx_day, ctx_date, is_histo=False, source_timezone="UTC", is_efi=False, provider_code=None, last_ts=None):
         if is_histo:
             return self._process_row_histo(clean_row, row_idx, file_path, ctx_site_code, ctx_site_code_raw, ctx_client_name, ctx_day, ctx_date, source_timezone, provider_code=provider_code, last_ts=last_ts)
@@ -0,0 +1,284 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Type
+
+from app.core.config import settings
+from app.ingestion.models import NormalizedEvent
+from app.parsers.base import BaseParser
+from app.parsers.excel_parser import ExcelParser
+from app.parsers.pdf_parser import PdfParser, extract_page_texts, page_ranges
+from app.parsers.tsv_parser import TsvParser
+from app.parsers.parse_cache import parse_cache
+
+logger = logging.getLogger("parser-executor")
+
+# Parsers exécutables hors process : la classe est ré-instanciée côté worker
+_POOL_PARSERS: Dict[str, Type[BaseParser]] = {
+    cls.__name__: cls for cls in (ExcelParser, PdfParser, TsvParser)
+}
+_NATIVE_PARSE = {cls: cls.parse for cls in _POOL_PARSERS.values()}
+
+
+_NATIVE_ITER = {cls: cls.iter_events for cls in _POOL_PARSERS.values()}
+
+
+class ParseTimeoutError(TimeoutError):
+    """Le parsing d'un fichier a dépassé `parser_pool.timeout_seconds`."""
+
+
+def _warm_worker():
+    """Initializer des process du pool : pré-charge les libs lourdes une seule fois."""
+    import pandas  # noqa: F401
+    import openpyxl  # noqa: F401
+    import pdfplumber  # noqa: F401
+    logging.getLogger("parser-executor").info(f"[PARSER_POOL] worker warm pid={multiprocessing.current_process().pid}")
+
+
+def _next_batch(events: Iterator[NormalizedEvent], size: int) -> List[NormalizedEvent]:
+    return list(itertools.islice(events, size))
+
+
+def _ping() -> int:
+    return multiprocessing.current_process().pid
+
+
+def _run_parse(
+    parser_name: str, file_path: str, source_timezone: str, parser_config: Optional[dict]
+) -> Tuple[List[NormalizedEvent], Dict[str, Any]]:
+    """Point d'entrée exécuté dans le process fils. Entrées et sorties picklables."""
+    parser = _POOL_PARSERS[parser_name]()
+    result = parser.parse(file_path, source_timezone=source_timezone, parser_config=parser_config)
+    events = result if isinstance(result, list) else []
+    return events, getattr(parser, "last_metrics", {}) or {}
+
+
+def _run_parse_pages(
+    parser_name: str, file_path: str, page_texts: List[Optional[str]], source_timezone: str, parser_config: Optional[dict]
+) -> Tuple[List[NormalizedEvent], Dict[str, Any]]:
+    """Assemblage d'un PDF dont les pages ont été extraites par tranches dans le pool."""
+    parser = _POOL_PARSERS[parser_name]()
+    events = parser.parse_page_texts(page_texts, file_path, source_timezone=source_timezone, parser_config=parser_config)
+    return events, getattr(parser, "last_metrics", {}) or {}
+
+
+class ParserExecutor:
+    """
+    Couche d'exécution des parsers (pandas / pdfplumber) hors de la boucle asyncio.
+
+    Les appels `parse()` sont envoyés à un ProcessPoolExecutor de workers chauds ;
+    un parsing qui dépasse le timeout fait tuer le pool puis le recréer. Les
+    métriques du parser fils sont recopiées dans `parser.last_metrics` pour que
+    les appelants existants restent inchangés.
+
+    PDF volumineux : les tranches de pages sont extraites en parallèle par les
+    process du même pool (pas de pool imbriqué), puis assemblées dans l'ordre.
+    """
+
+    def __init__(self):
+        conf = settings.INGESTION.get("parser_pool", {}) or {}
+        self.enabled = bool(conf.get("enabled", True))
+        self.max_workers = int(conf.get("max_workers", 2))
+        self.timeout_seconds = float(conf.get("timeout_seconds", 300))
+        self.stream_batch_size = int(settings.INGESTION.get("stream_batch_size", 5000))
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+            )
+            logger.info(f"[PARSER_POOL] started max_workers={self.max_workers} timeout_s={self.timeout_seconds}")
+        return self._pool
+
+    def _kill_pool(self):
+        """Termine les process (y compris un parse bloqué) ; le pool sera recréé au prochain appel."""
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        for proc in list((getattr(pool, "_processes", None) or {}).values()):
+            try:
+                proc.kill()
+            except Exception:
+                pass
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _runs_in_pool(self, parser: BaseParser) -> bool:
+        # Un parser inconnu ou patché à l'exécution ne peut pas être reproduit dans un fils
+        cls = type(parser)
+        return self.enabled and cls in _NATIVE_PARSE and cls.parse is _NATIVE_PARSE[cls]
+
+    def _cacheable(self, parser: BaseParser) -> bool:
+        cls = type(parser)
+        return parse_cache.enabled and cls in _NATIVE_PARSE and cls.parse is _NATIVE_PARSE[cls]
+
+    async def parse(
+        self,
+        parser: BaseParser,
+        file_path: str,
+        source_timezone: str = "UTC",
+        parser_config: dict = None,
+        timeout: Optional[float] = None,
+        profile=None,
+        sha256: Optional[str] = None,
+    ) -> List[NormalizedEvent]:
+        """
+        Parse via le cache de résultats (sha256, parser, profile_id, version du profil) :
+        un fichier déjà parsé avec le même profil n'est pas re-parsé (replays, PDF compagnon).
+        """
+        if not self._cacheable(parser):
+            return await self._parse(parser, file_path, source_timezone, parser_config, timeout)
+
+        key = await asyncio.to_thread(
+            parse_cache.key_for, parser, str(file_path), source_timezone, parser_config, profile, sha256
+        )
+        cached = await asyncio.to_thread(parse_cache.get, key)
+        if cached is not None:
+            events, parser.last_metrics = cached
+            return events
+
+        events = await self._parse(parser, file_path, source_timezone, parser_config, timeout)
+        await asyncio.to_thread(parse_cache.put, key, events, getattr(parser, "last_metrics", None))
+        return events
+
+    async def _parse(
+        self,
+        parser: BaseParser,
+        file_path: str,
+        source_timezone: str = "UTC",
+        parser_config: dict = None,
+        timeout: Optional[float] = None,
+    ) -> List[NormalizedEvent]:
+        if not self._runs_in_pool(parser):
+            result = parser.parse(file_path, source_timezone=source_timezone, parser_config=parser_config)
+            return result if isinstance(result, list) else []
+
+        timeout = timeout or self.timeout_seconds
+        parser_name = type(parser).__name__
+        t0 = time.monotonic()
+        # 2 attempts: a parse may land on a pool killed by another file's timeout
+        for attempt in (1, 2):
+            try:
+                events, metrics = await asyncio.wait_for(
+                    self._run_in_pool(parser_name, str(file_path), source_timezone, parser_config), timeout=timeout
+                )
+                break
+            except asyncio.TimeoutError:
+                logger.error(f"[PARSER_POOL] timeout parser={parser_name} file={file_path} timeout_s={timeout}")
+                self._kill_pool()
+                raise ParseTimeoutError(f"{parser_name} timed out after {timeout}s on {file_path}")
+            except BrokenProcessPool:
+                logger.error(f"[PARSER_POOL] broken pool parser={parser_name} file={file_path} attempt={attempt}")
+                self._kill_pool()
+                if attempt == 2:
+                    raise
+
+        parser.last_metrics = metrics
+        logger.info(f"[METRIC] parser_pool_parse_ms={(time.monotonic() - t0) * 1000:.1f} parser={parser_name} events={len(events)}")
+        return events
+
+    async def _run_in_pool(
+        self, parser_name: str, file_path: str, source_timezone: str, parser_config: Optional[dict]
+    ) -> Tuple[List[NormalizedEvent], Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        workers = min(self.max_workers, int(settings.INGESTION.get("pdf_extract_workers", 4)))
+        if parser_name == PdfParser.__name__ and workers > 1:
+            min_pages = int(settings.INGESTION.get("pdf_parallel_min_pages", 20))
+            ranges = await loop.run_in_executor(pool, page_ranges, file_path, workers, min_pages)
+            if ranges:
+                chunks = await asyncio.gather(*(
+                    loop.run_in_executor(pool, extract_page_texts, file_path, start, stop) for start, stop in ranges
+                ))
+                logger.info(f"[METRIC] pdf_parallel_extract pages={ranges[-1][1]} ranges={len(ranges)}")
+                page_texts = [text for chunk in chunks for text in chunk]
+                return await loop.run_in_executor(
+                    pool, _run_parse_pages, parser_name, file_path, page_texts, source_timezone, parser_config
+                )
+        return await loop.run_in_executor(pool, _run_parse, parser_name, file_path, source_timezone, parser_config)
+
+    def _streams(self, parser: BaseParser) -> bool:
+        cls = type(parser)
+        return bool(cls.streaming) and cls in _NATIVE_ITER and cls.iter_events is _NATIVE_ITER[cls]
+
+    async def iter_batches(
+        self,
+        parser: BaseParser,
+        file_path: str,
+        source_timezone: str = "UTC",
+        parser_config: dict = None,
+        batch_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        profile=None,
+        sha256: Optional[str] = None,
+    ) -> AsyncIterator[List[NormalizedEvent]]:
+        """
+        Events par lots de `batch_size` (`ingestion.stream_batch_size`).
+
+        Parser `streaming` (TSV) : le générateur avance dans un thread, un lot à la fois,
+        le fichier n'est jamais chargé en entier (pas de cache de résultats : parsing peu coûteux).
+        Autres parsers : parse() (cache, pool) puis découpage.
+        Le timeout ne compte que le temps passé à produire les lots, pas celui du
+        consommateur entre deux lots (insertion, alerting).
+        `parser.last_metrics` est à jour une fois l'itération terminée.
+        """
+        batch_size = batch_size or self.stream_batch_size
+        if not self._streams(parser):
+            events = await self.parse(
+                parser, file_path, source_timezone, parser_config, timeout=timeout, profile=profile, sha256=sha256
+            )
+            for start in range(0, len(events), batch_size):
+                yield events[start:start + batch_size]
+            return
+
+        timeout = timeout or self.timeout_seconds
+        parse_seconds = 0.0
+        events = parser.iter_events(str(file_path), source_timezone=source_timezone, parser_config=parser_config)
+        batches = 0
+        try:
+            while True:
+                remaining = timeout - parse_seconds
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                t0 = time.monotonic()
+                batch = await asyncio.wait_for(asyncio.to_thread(_next_batch, events, batch_size), timeout=remaining)
+                parse_seconds += time.monotonic() - t0
+                if not batch:
+                    break
+                batches += 1
+                yield batch
+        except asyncio.TimeoutError:
+            logger.error(f"[PARSER_STREAM] timeout parser={type(parser).__name__} file={file_path} timeout_s={timeout}")
+            raise ParseTimeoutError(f"{type(parser).__name__} timed out after {timeout}s on {file_path}")
+        finally:
+            try:
+                events.close()
+            except ValueError:
+                pass  # lot encore en cours dans le thread après un timeout : le générateur sera collecté
+        logger.info(
+            f"[METRIC] parser_stream_batches={batches} batch_size={batch_size} "
+            f"parse_ms={parse_seconds * 1000:.1f} parser={type(parser).__name__}"
+        )
+
+    async def warm_up(self):
+        """Démarre les process du pool au lancement du worker plutôt qu'au premier fichier."""
+        if not self.enabled:
+            return
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        pids = await asyncio.gather(*(loop.run_in_executor(pool, _ping) for _ in range(self.max_workers)))
+        logger.info(f"[PARSER_POOL] warm pids={sorted(set(pids))}")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+parser_executor = ParserExecutor()
@@ -0,0 +1,203 @@
+"""
+Cache des résultats de parsing, adressé par le contenu du fichier.
+
+Clé : (sha256 du fichier, classe du parser, profile_id, version du profil), complétée
+par une empreinte du fuseau / parser_config passés et du code source du parser, de
+sorte qu'un profil ou un parser modifié ne relise jamais un résultat périmé.
+
+Stockage : un fichier gzip par entrée sous `<ARCHIVE_PATH>/.parse_cache/` (ou
+`ingestion.parse_cache.dir`), events rangés par colonnes (une liste par champ,
+`{"const": v}` si la valeur est la même pour toutes les lignes) + `last_metrics`.
+Éviction : au-delà de `max_bytes`, les entrées les moins récemment utilisées
+(mtime, rafraîchi à chaque lecture) sont supprimées.
+"""
+import gzip
+import hashlib
+import inspect
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import pytz
+
+from app.core.config import settings
+from app.ingestion.models import NormalizedEvent
+from app.ingestion.utils import compute_sha256
+
+logger = logging.getLogger("parse-cache")
+
+CACHE_FORMAT = 1
+_FIELDS = list(NormalizedEvent.model_fields)
+
+
+class ParseCacheKey(NamedTuple):
+    sha256: str
+    parser: str
+    profile_id: Optional[str]
+    profile_version: Optional[int]
+    digest: str
+
+    @property
+    def filename(self) -> str:
+        raw = "|".join(str(part) for part in self)
+        return hashlib.sha256(raw.encode()).hexdigest() + ".json.gz"
+
+
+@lru_cache(maxsize=None)
+def _parser_fingerprint(parser_cls: type) -> str:
+    """Empreinte du module du parser : un déploiement qui modifie le parser invalide ses entrées."""
+    try:
+        with open(inspect.getsourcefile(parser_cls), "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()[:16]
+    except (OSError, TypeError):
+        return "unknown"
+
+
+def _encode_events(events: List[NormalizedEvent]) -> Dict[str, Any]:
+    rows = [e.model_dump(mode="json") for e in events]
+    columns = {}
+    for field in _FIELDS:
+        values = [row[field] for row in rows]
+        if values and all(v == values[0] for v in values):
+            columns[field] = {"const": values[0]}
+        else:
+            columns[field] = values
+    return columns
+
+
+def _decode_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if value is None:
+        return None
+    ts = datetime.fromisoformat(value)
+    # Les parsers normalisent en pytz.UTC : même objet qu'un parsing à froid
+    if ts.tzinfo is not None and ts.utcoffset().total_seconds() == 0:
+        ts = ts.replace(tzinfo=pytz.UTC)
+    return ts
+
+
+def _decode_events(columns: Dict[str, Any], count: int) -> List[NormalizedEvent]:
+    expanded = {
+        field: [values["const"]] * count if isinstance(values, dict) else values
+        for field, values in columns.items()
+    }
+    expanded["timestamp"] = [_decode_timestamp(v) for v in expanded["timestamp"]]
+    return [
+        NormalizedEvent(**{field: expanded[field][i] for field in expanded})
+        for i in range(count)
+    ]
+
+
+class ParseCache:
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None, enabled: Optional[bool] = None):
+        conf = settings.INGESTION.get("parse_cache", {}) or {}
+        self.enabled = bool(conf.get("enabled", True)) if enabled is None else enabled
+        self.directory = Path(directory or conf.get("dir") or Path(settings.ARCHIVE_PATH) / ".parse_cache")
+        self.max_bytes = int(max_bytes if max_bytes is not None else conf.get("max_bytes", 512 * 1024 * 1024))
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(
+        self,
+        parser,
+        file_path: str,
+        source_timezone: str = "UTC",
+        parser_config: Optional[dict] = None,
+        profile=None,
+        sha256: Optional[str] = None,
+    ) -> ParseCacheKey:
+        config = json.dumps(
+            [source_timezone, parser_config or {}, _parser_fingerprint(type(parser)), CACHE_FORMAT],
+            sort_keys=True,
+            default=str,
+        )
+        return ParseCacheKey(
+            sha256=sha256 or compute_sha256(Path(file_path)),
+            parser=type(parser).__name__,
+            profile_id=getattr(profile, "profile_id", None),
+            profile_version=getattr(profile, "version_number", None),
+            digest=hashlib.sha256(config.encode()).hexdigest()[:16],
+        )
+
+    def _path(self, key: ParseCacheKey) -> Path:
+        name = key.filename
+        return self.directory / name[:2] / name
+
+    def get(self, key: ParseCacheKey) -> Optional[Tuple[List[NormalizedEvent], Dict[str, Any]]]:
+        """(events, last_metrics) ou None. Les events sont des objets neufs à chaque lecture."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                payload = json.load(f)
+            events = _decode_events(payload["columns"], payload["count"])
+            os.utime(path)  # LRU : mtime = dernière utilisation
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"[PARSE_CACHE] unreadable entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.info(f"[METRIC] parse_cache_hit parser={key.parser} profile={key.profile_id} events={len(events)}")
+        return events, payload.get("metrics") or {}
+
+    def put(self, key: ParseCacheKey, events: List[NormalizedEvent], metrics: Optional[Dict[str, Any]] = None) -> None:
+        if not self.enabled:
+            return
+        path = self._path(key)
+        payload = {
+            "format": CACHE_FORMAT,
+            "key": key._asdict(),
+            "count": len(events),
+            "metrics": metrics or {},
+            "columns": _encode_events(events),
+        }
+        tmp = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Écriture atomique : un lecteur concurrent ne voit jamais une entrée partielle
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(json.dumps(payload, default=str).encode("utf-8"))
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.warning(f"[PARSE_CACHE] write failed {path.name}: {e}")
+            if tmp:
+                Path(tmp).unlink(missing_ok=True)
+            return
+        self.evict()
+
+    def evict(self) -> int:
+        """Supprime les entrées les plus anciennes jusqu'à repasser sous `max_bytes`. Retourne le nombre supprimé."""
+        entries = []
+        total = 0
+        for path in self.directory.glob("*/*.json.gz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        logger.info(f"[METRIC] parse_cache_evicted entries={removed} bytes_after={total}")
+        return removed
+
+
+parse_cache = ParseCache()
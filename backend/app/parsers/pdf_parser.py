@@ -1,7 +1,7 @@
 import re
 import pytz
 from datetime import datetime
-from typing import List
+from typing import List, Optional, Tuple
 from app.parsers.base import BaseParser
 from app.ingestion.models import NormalizedEvent
 from app.ingestion.normalizer import normalize_site_code_full
@@ -15,6 +15,69 @@ try:
 except ImportError:
     pdfplumber = None
 
+# Site: "C-69000 NOM CLIENT" or "00032009 NOM CLIENT" or "SITE : 00032308 NOM CLIENT"
+SITE_CODE_C_PATTERN = r'(?:SITE\s*:\s*)?(C-\d+)\s+(.*)'
+SITE_CODE_NUM_PATTERN = r'(?:SITE\s*:\s*)?(\d{8,})\s+(.*)'
+# Event Header: "Mar 27/01/2026 16:24:25 TYPE" OR "LU02/02/2026 09:37:02..."
+# Captures Day, Date, Time, and potential Code prefix
+EVENT_HEADER_PATTERN = r'(Lun|Mar|Mer|Jeu|Ven|Sam|Dim|LU|MA|ME|JE|VE|SA|DI|Di|Lu|Ma|Me|Je|Ve|Sa)\s*(\d{2}/\d{2}/\d{4})\s*(\d{2}:\d{2}:\d{2})\s*(.*)'
+# Sub Event: "16:24:28 Message..."
+SUB_EVENT_PATTERN = r'(\d{2}:\d{2}:\d{2})\s+(.*)'
+
+RE_SITE_CODE_C = re.compile(rf'^{SITE_CODE_C_PATTERN}$')
+RE_SITE_CODE_NUM = re.compile(rf'^{SITE_CODE_NUM_PATTERN}$')
+RE_EVENT_HEADER = re.compile(rf'^{EVENT_HEADER_PATTERN}$')
+RE_SUB_EVENT = re.compile(rf'^{SUB_EVENT_PATTERN}$')
+RE_HEADER_CODE = re.compile(r'\$([\w-]+)|([A-Z0-9]{4,})')
+
+# Dispatch en un seul match par ligne : alternatives testées dans l'ordre du parcours
+# d'origine (site C-, site numérique, en-tête d'event, sous-event) ; lastgroup = type de ligne
+LINE_KINDS = (
+    ("site_c", SITE_CODE_C_PATTERN),
+    ("site_num", SITE_CODE_NUM_PATTERN),
+    ("header", EVENT_HEADER_PATTERN),
+    ("sub", SUB_EVENT_PATTERN),
+)
+RE_LINE_DISPATCH = re.compile(
+    '^(?:' + '|'.join(f'(?P<{kind}>{pattern})' for kind, pattern in LINE_KINDS) + ')$'
+)
+# Groupes de chaque alternative dans le match combiné : (premier index, nombre)
+_LINE_GROUPS = {
+    kind: (RE_LINE_DISPATCH.groupindex[kind] + 1, re.compile(pattern).groups) for kind, pattern in LINE_KINDS
+}
+
+ACTION_KEYWORDS = ["APPARITION", "DISPARITION", "RETARD", "ALERTE", "MISE EN SERVICE", "MISE HORS SERVICE", "TEST CYCLIQUE"]
+
+
+def dispatch_line(line: str):
+    """(type de ligne, groupes de l'alternative) ou (None, None) si aucun motif ne correspond."""
+    match = RE_LINE_DISPATCH.match(line)
+    if not match:
+        return None, None
+    kind = match.lastgroup
+    first, count = _LINE_GROUPS[kind]
+    return kind, match.group(*range(first, first + count))
+
+
+def extract_page_texts(file_path: str, start: int, stop: int) -> List[Optional[str]]:
+    """Texte des pages [start, stop) ; exécuté par un process du pool de ParserExecutor."""
+    with pdfplumber.open(file_path) as pdf:
+        return [page.extract_text() for page in pdf.pages[start:stop]]
+
+
+def page_ranges(file_path: str, workers: int, min_pages: int) -> List[Tuple[int, int]]:
+    """
+    Tranches de pages contiguës pour une extraction en parallèle sur `workers` process,
+    ou [] pour un PDF de moins de `min_pages` pages.
+    """
+    with pdfplumber.open(file_path) as pdf:
+        total_pages = len(pdf.pages)
+    workers = min(workers, total_pages)
+    if workers < 2 or total_pages < min_pages:
+        return []
+    step = -(-total_pages // workers)
+    return [(start, min(start + step, total_pages)) for start in range(0, total_pages, step)]
+
 class PdfParser(BaseParser):
     """
     Parses PDF reports (YPSILON.pdf).
@@ -29,7 +92,16 @@ class PdfParser(BaseParser):
             error_msg = "pdfplumber module is not installed. Impossible to parse PDF."
             logger.error(error_msg)
             raise ImportError(error_msg)
+        return self.parse_page_texts(self._extract_texts(file_path), file_path, source_timezone, parser_config)
 
+    def parse_page_texts(
+        self, page_texts: List[Optional[str]], file_path: str, source_timezone: str = "UTC", parser_config: dict = None
+    ) -> List[NormalizedEvent]:
+        """
+        Machine à états sur le texte des pages, dans l'ordre. Le texte peut venir
+        d'extractions par tranches en parallèle (ParserExecutor) : le contexte
+        site / date est conservé d'une page à l'autre.
+        """
         events = []
         current_site_code = None
         current_site_code_raw = None
@@ -37,189 +109,169 @@ class PdfParser(BaseParser):
         current_site_secondary = None
         last_event_date = None
         
-        # Regex Patterns
-        # Site: "C-69000 NOM CLIENT" or "00032009 NOM CLIENT" or "SITE : 00032308 NOM CLIENT"
-        RE_SITE_CODE_C = r'^(?:SITE\s*:\s*)?(C-\d+)\s+(.*)$'
-        RE_SITE_CODE_NUM = r'^(?:SITE\s*:\s*)?(\d{8,})\s+(.*)$'
-        
-        # Event Header: "Mar 27/01/2026 16:24:25 TYPE" OR "LU02/02/2026 09:37:02..."
-        # Regex updated to capture Day, Date, Time, and potential Code prefix
-        RE_EVENT_HEADER = r'^(Lun|Mar|Mer|Jeu|Ven|Sam|Dim|LU|MA|ME|JE|VE|SA|DI|Di|Lu|Ma|Me|Je|Ve|Sa)\s*(\d{2}/\d{2}/\d{4})\s*(\d{2}:\d{2}:\d{2})\s*(.*)$'
-        
-        # Sub Event: "16:24:28 Message..."
-        RE_SUB_EVENT = r'^(\d{2}:\d{2}:\d{2})\s+(.*)$'
-        
         try:
-            with pdfplumber.open(file_path) as pdf:
-                total_pages = len(pdf.pages)
-                total_text_len = 0
-                debug_lines = []
+            total_text_len = 0
+            debug_lines = []
+
+            # Assemblage séquentiel : site / date courants conservés d'une page à l'autre
+            for text in page_texts:
+                if not text: 
+                    continue
                 
-                logger.info(f"PDF Debug: Starting parse of {file_path} (Pages: {total_pages})")
+                text_len = len(text)
+                total_text_len += text_len
+                
+                # Capture first 20 lines for debug
+                if len(debug_lines) < 20:
+                    lines = text.split('\n')
+                    debug_lines.extend(lines[:20 - len(debug_lines)])
 
-                for page_num, page in enumerate(pdf.pages):
-                    text = page.extract_text()
-                    if not text: 
-                        continue
-                    
-                    text_len = len(text)
-                    total_text_len += text_len
+                for line in text.split('\n'):
+                    line = line.strip()
+                    if not line: continue
                     
-                    # Capture first 20 lines for debug
-                    if len(debug_lines) < 20:
-                        lines = text.split('\n')
-                        debug_lines.extend(lines[:20 - len(debug_lines)])
-
-                    for line in text.split('\n'):
-                        line = line.strip()
-                        if not line: continue
-                        
-                        # 1. Detect Site
-                        match_c = re.match(RE_SITE_CODE_C, line)
-                        match_num = re.match(RE_SITE_CODE_NUM, line)
-                        
-                        if match_c:
-                            current_site_code, current_site_code_raw = normalize_site_code_full(match_c.group(1))
-                            current_site_name = match_c.group(2).strip()
+                    kind, groups = dispatch_line(line)
+
+                    # 1. Detect Site
+                    if kind == "site_c":
+                        current_site_code, current_site_code_raw = normalize_site_code_full(groups[0])
+                        current_site_name = groups[1].strip()
+                        current_site_secondary = None
+                        continue
+                    elif kind == "site_num":
+                        # If line explicitly says "SITE :", it's a primary site reset
+                        is_site_header = line.upper().startswith("SITE")
+                        if is_site_header or not current_site_code:
+                            current_site_code, current_site_code_raw = normalize_site_code_full(groups[0])
+                            current_site_name = groups[1].strip()
                             current_site_secondary = None
-                            continue
-                        elif match_num:
-                            # If line explicitly says "SITE :", it's a primary site reset
-                            is_site_header = line.upper().startswith("SITE")
-                            if is_site_header or not current_site_code:
-                                current_site_code, current_site_code_raw = normalize_site_code_full(match_num.group(1))
-                                current_site_name = match_num.group(2).strip()
-                                current_site_secondary = None
-                            else:
-                                current_site_secondary = match_num.group(1)
-                            continue
-
-                        if not current_site_code: continue
-
-                        # 2. Detect Event Header (Security Event)
-                        match_header = re.match(RE_EVENT_HEADER, line)
-                        if match_header:
-                            day_label = match_header.group(1).upper()[:3]
-                            date_str = match_header.group(2)
-                            time_str = match_header.group(3)
-                            remainder = match_header.group(4).strip()
+                        else:
+                            current_site_secondary = groups[0]
+                        continue
+
+                    if not current_site_code: continue
+
+                    # 2. Detect Event Header (Security Event)
+                    if kind == "header":
+                        day_label = groups[0].upper()[:3]
+                        date_str = groups[1]
+                        time_str = groups[2]
+                        remainder = groups[3].strip()
+                        
+                        try:
+                            ts_naive = datetime.strptime(f"{date_str} {time_str}", "%d/%m/%Y %H:%M:%S")
+                            last_event_date = ts_naive
                             
-                            try:
-                                ts_naive = datetime.strptime(f"{date_str} {time_str}", "%d/%m/%Y %H:%M:%S")
-                                last_event_date = ts_naive
-                                
-                                # Action & Code Extraction
-                                norm_type = "INFO"
-                                severity = "INFO"
-                                alarm_code = None
-                                msg = remainder
-                                
-                                # Priority keywords for SPGO actions
-                                upper_rem = remainder.upper()
-                                # Split remainder if it looks like "CODE ACTION MESSAGE"
-                                # Pattern: X330 APPARITION ...
-                                parts = remainder.split(' ', 2)
-                                potential_code = parts[0] if len(parts) > 0 else None
-                                potential_action = parts[1] if len(parts) > 1 else None
+                            # Action & Code Extraction
+                            norm_type = "INFO"
+                            severity = "INFO"
+                            alarm_code = None
+                            msg = remainder
+                            
+                            # Priority keywords for SPGO actions
+                            upper_rem = remainder.upper()
+                            # Split remainder if it looks like "CODE ACTION MESSAGE"
+                            # Pattern: X330 APPARITION ...
+                            parts = remainder.split(' ', 2)
+                            potential_code = parts[0] if len(parts) > 0 else None
+                            potential_action = parts[1] if len(parts) > 1 else None
+                            
+                            if potential_action and potential_action.upper() in ACTION_KEYWORDS:
+                                alarm_code = potential_code
+                                norm_type = potential_action.upper()
+                                msg = parts[2] if len(parts) > 2 else ""
+                                if norm_type == "APPARITION": severity = "CRITICAL"
+                            elif potential_code and potential_code.upper() in ACTION_KEYWORDS:
+                                # Case where code is missing but action is first
+                                norm_type = potential_code.upper()
+                                msg = remainder[len(norm_type):].strip()
+                                if norm_type == "APPARITION": severity = "CRITICAL"
+                            else:
+                                # Fallback keywords
+                                if "APPARITION" in upper_rem: norm_type = "APPARITION"; severity = "CRITICAL"
+                                elif "DISPARITION" in upper_rem: norm_type = "DISPARITION"
                                 
-                                if potential_action and potential_action.upper() in ["APPARITION", "DISPARITION", "RETARD", "ALERTE", "MISE EN SERVICE", "MISE HORS SERVICE", "TEST CYCLIQUE"]:
-                                    alarm_code = potential_code
-                                    norm_type = potential_action.upper()
-                                    msg = parts[2] if len(parts) > 2 else ""
-                                    if norm_type == "APPARITION": severity = "CRITICAL"
-                                elif potential_code and potential_code.upper() in ["APPARITION", "DISPARITION", "RETARD", "ALERTE", "MISE EN SERVICE", "MISE HORS SERVICE", "TEST CYCLIQUE"]:
-                                    # Case where code is missing but action is first
-                                    norm_type = potential_code.upper()
-                                    msg = remainder[len(norm_type):].strip()
-                                    if norm_type == "APPARITION": severity = "CRITICAL"
-                                else:
-                                    # Fallback keywords
-                                    if "APPARITION" in upper_rem: norm_type = "APPARITION"; severity = "CRITICAL"
-                                    elif "DISPARITION" in upper_rem: norm_type = "DISPARITION"
-                                    
-                                    # Try to extract code anyway
-                                    match_code = re.search(r'\$([\w-]+)|([A-Z0-9]{4,})', remainder)
-                                    if match_code:
-                                        alarm_code = match_code.group(0)
-
-                                event = NormalizedEvent(
-                                    timestamp=self._normalize_timestamp(ts_naive, source_timezone),
-                                    site_code=current_site_code,
-                                    site_code_raw=current_site_code_raw,
-                                    client_name=current_site_name,
-                                    secondary_code=current_site_secondary,
-                                    weekday_label=day_label,
-                                    event_type=norm_type,
-                                    normalized_type=norm_type,
-                                    raw_message=msg,
-                                    raw_code=alarm_code,
-                                    status=severity,
-                                    source_file=file_path,
-                                    tenant_id="default"
-                                )
-                                events.append(event)
-                            except ValueError:
-                                pass
-                            continue
+                                # Try to extract code anyway
+                                match_code = RE_HEADER_CODE.search(remainder)
+                                if match_code:
+                                    alarm_code = match_code.group(0)
+
+                            event = NormalizedEvent(
+                                timestamp=self._normalize_timestamp(ts_naive, source_timezone),
+                                site_code=current_site_code,
+                                site_code_raw=current_site_code_raw,
+                                client_name=current_site_name,
+                                secondary_code=current_site_secondary,
+                                weekday_label=day_label,
+                                event_type=norm_type,
+                                normalized_type=norm_type,
+                                raw_message=msg,
+                                raw_code=alarm_code,
+                                status=severity,
+                                source_file=file_path,
+                                tenant_id="default"
+                            )
+                            events.append(event)
+                        except ValueError:
+                            pass
+                        continue
+                    
+                    # 3. Detect Sub Event (Operator Note in SPGO)
+                    if kind == "sub" and last_event_date:
+                        time_str, message = groups
                         
-                        # 3. Detect Sub Event (Operator Note in SPGO)
-                        match_sub = re.match(RE_SUB_EVENT, line)
-                        if match_sub and last_event_date:
-                            time_str = match_sub.group(1)
-                            message = match_sub.group(2)
+                        try:
+                            t_part = datetime.strptime(time_str, "%H:%M:%S").time()
+                            full_ts = datetime.combine(last_event_date.date(), t_part)
                             
-                            try:
-                                t_part = datetime.strptime(time_str, "%H:%M:%S").time()
-                                full_ts = datetime.combine(last_event_date.date(), t_part)
-                                
-                                sub_event = NormalizedEvent(
-                                    timestamp=self._normalize_timestamp(full_ts, source_timezone),
-                                    site_code=current_site_code,
-                                    site_code_raw=current_site_code_raw,
-                                    client_name=current_site_name,
-                                    secondary_code=current_site_secondary,
-                                    event_type="OPERATOR_NOTE",
-                                    normalized_type="OPERATOR_NOTE",
-                                    raw_message=message,
-                                    status="INFO",
-                                    source_file=file_path,
-                                    tenant_id="default"
-                                )
-                                events.append(sub_event)
-                            except ValueError:
-                                pass
-                            continue
-
-                # Post-processing Debug Logs
-                logger.info(f"PDF Debug: Finished {file_path}. Total Text Length: {total_text_len} chars.")
-                
-                if total_text_len < 200:
-                    logger.warning(f"PDF WARNING: {file_path} seems empty or scanned image (Text len < 200).")
-                    # Synthetic event for visibility
-                    events.append(NormalizedEvent(
-                        timestamp=datetime.now(pytz.UTC),
-                        site_code="SYSTEM",
-                        event_type="PARSING_ERROR",
-                        raw_message=f"PDF seems empty or scanned (Text len: {total_text_len}). OCR required?",
-                        status="new",
-                        source_file=file_path,
-                        tenant_id="default-tenant"
-                    ))
-                elif len(events) == 0:
-                     events.append(NormalizedEvent(
-                        timestamp=datetime.now(),
-                        site_code="SYSTEM",
-                        event_type="PARSING_WARNING",
-                        raw_message=f"Text extracted ({total_text_len} chars) but no events matched regex patterns. Check format.",
-                        status="new",
-                        source_file=file_path,
-                        tenant_id="default-tenant"
-                    ))
-                
-                if settings.INGESTION.get('pdf_debug', False):
-                    logger.info("PDF DEBUG: First 20 lines extracted:")
-                    for i, l in enumerate(debug_lines):
-                        logger.info(f"[{i:02d}] {l}")
+                            sub_event = NormalizedEvent(
+                                timestamp=self._normalize_timestamp(full_ts, source_timezone),
+                                site_code=current_site_code,
+                                site_code_raw=current_site_code_raw,
+                                client_name=current_site_name,
+                                secondary_code=current_site_secondary,
+                                event_type="OPERATOR_NOTE",
+                                normalized_type="OPERATOR_NOTE",
+                                raw_message=message,
+                                status="INFO",
+                                source_file=file_path,
+                                tenant_id="default"
+                            )
+                            events.append(sub_event)
+                        except ValueError:
+                            pass
+                        continue
+
+            # Post-processing Debug Logs
+            logger.info(f"PDF Debug: Finished {file_path}. Total Text Length: {total_text_len} chars.")
+            
+            if total_text_len < 200:
+                logger.warning(f"PDF WARNING: {file_path} seems empty or scanned image (Text len < 200).")
+                # Synthetic event for visibility
+                events.append(NormalizedEvent(
+                    timestamp=datetime.now(pytz.UTC),
+                    site_code="SYSTEM",
+                    event_type="PARSING_ERROR",
+                    raw_message=f"PDF seems empty or scanned (Text len: {total_text_len}). OCR required?",
+                    status="new",
+                    source_file=file_path,
+                    tenant_id="default-tenant"
+                ))
+            elif len(events) == 0:
+                 events.append(NormalizedEvent(
+                    timestamp=datetime.now(),
+                    site_code="SYSTEM",
+                    event_type="PARSING_WARNING",
+                    raw_message=f"Text extracted ({total_text_len} chars) but no events matched regex patterns. Check format.",
+                    status="new",
+                    source_file=file_path,
+                    tenant_id="default-tenant"
+                ))
+            
+            if settings.INGESTION.get('pdf_debug', False):
+                logger.info("PDF DEBUG: First 20 lines extracted:")
+                for i, l in enumerate(debug_lines):
+                    logger.info(f"[{i:02d}] {l}")
 
 
         except Exception as e:
@@ -230,6 +282,12 @@ class PdfParser(BaseParser):
             
         return events
 
+    def _extract_texts(self, file_path: str) -> List[Optional[str]]:
+        """Texte de chaque page, dans l'ordre (extraction séquentielle)."""
+        with pdfplumber.open(file_path) as pdf:
+            logger.info(f"PDF Debug: Starting parse of {file_path} (Pages: {len(pdf.pages)})")
+            return [page.extract_text() for page in pdf.pages]
+
     def _normalize_timestamp(self, ts: datetime, source_timezone: str) -> datetime:
         """
         Converts a naive or local datetime to timezone-aware UTC.
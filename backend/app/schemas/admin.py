@@ -73,3 +73,40 @@ class TestIngestResultOut(BaseModel):
     time_null: int
     pdf_match_ratio: float = 0.0
     status: Literal["SUCCESS", "BASELINE_FAILED", "FAILED"]
+
+class StoragePolicyOut(BaseModel):
+    job_id: int
+    after_days: Optional[float]
+    schedule_interval: str
+    last_run_status: Optional[str]
+    next_start: Optional[datetime]
+
+class StorageSummaryOut(BaseModel):
+    hypertable: str
+    chunk_time_interval_days: Optional[float]
+    compression_segmentby: List[str]
+    compression_orderby: List[str]
+    compression_policy: Optional[StoragePolicyOut]
+    retention_policy: Optional[StoragePolicyOut]
+    total_bytes: Optional[int]
+    total_chunks: Optional[int]
+    compressed_chunks: Optional[int]
+    before_compression_bytes: Optional[int]
+    after_compression_bytes: Optional[int]
+    compression_ratio: Optional[float]
+
+class StorageChunkOut(BaseModel):
+    chunk_name: str
+    range_start: Optional[datetime]
+    range_end: Optional[datetime]
+    is_compressed: bool
+    total_bytes: Optional[int]
+    before_compression_bytes: Optional[int]
+    after_compression_bytes: Optional[int]
+    compression_ratio: Optional[float]
+
+class StoragePoliciesUpdate(BaseModel):
+    """None = inchangé, 0 = politique supprimée."""
+    chunk_time_interval_days: Optional[int] = Field(None, ge=1, le=365)
+    compress_after_days: Optional[int] = Field(None, ge=0, le=3650)
+    retention_days: Optional[int] = Field(None, ge=0, le=3650)
@@ -42,7 +42,8 @@ class ImportLogOut(BaseModel):
 
 class ImportListOut(BaseModel):
     imports: List[ImportLogOut]
-    total: int
+    total: Optional[int] = None  # None si count=none
+    next_cursor: Optional[str] = None  # pagination=cursor
 
 class TriggeredRuleSummary(BaseModel):
     id: int
@@ -79,7 +80,8 @@ class EventOut(BaseModel):
 
 class EventListOut(BaseModel):
     events: List[EventOut]
-    total: int
+    total: Optional[int] = None  # None si count=none
+    next_cursor: Optional[str] = None  # pagination=cursor
 
 class TimeScopeEnum(str, Enum):
     NONE = "NONE"
@@ -203,9 +205,10 @@ class AlertListItem(BaseModel):
 
 class AlertListResponse(BaseModel):
     items: List[AlertListItem]
-    total: int
+    total: Optional[int] = None  # None si count=none
     page: int
     limit: int
+    next_cursor: Optional[str] = None  # pagination=cursor
 
 class EventDetailOut(BaseModel):
     id: int
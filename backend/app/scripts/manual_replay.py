@@ -8,6 +8,7 @@ from app.db.session import AsyncSessionLocal
 from app.db.models import ImportLog, MonitoringProvider
 from app.services.repository import EventRepository, AdminRepository
 from app.parsers.factory import ParserFactory
+from app.parsers.executor import parser_executor
 from app.ingestion.worker import detect_file_format
 from app.services.pdf_match_service import PdfMatchService
 from app.parsers.pdf_parser import PdfParser
@@ -90,13 +91,15 @@ async def run_manual_replay():
                 await admin_repo.delete_import_data(imp.id)
                 
                 logger.info(f"Parsing file {file_path}")
-                parsed_events = parser.parse(
+                parsed_events = await parser_executor.parse(
+                    parser,
                     str(file_path),
                     source_timezone=matched_profile.source_timezone,
                     parser_config={
                         "mapping": matched_profile.mapping,
                         "action_config": matched_profile.action_config
-                    }
+                    },
+                    profile=matched_profile
                 )
                 
                 logger.info(f"Inserting {len(parsed_events)} events")
@@ -108,7 +111,7 @@ async def run_manual_replay():
                 if potential_pdf.exists() and monitoring_provider:
                     logger.info(f"Found PDF companion, starting match report")
                     pdf_parser = PdfParser()
-                    pdf_events = pdf_parser.parse(str(potential_pdf))
+                    pdf_events = await parser_executor.parse(pdf_parser, str(potential_pdf))
                     pdf_matcher = PdfMatchService()
                     provider_conf = {
                         "code": monitoring_provider.code,
@@ -0,0 +1,41 @@
+"""
+Reconstruit alert_state / alert_disparition_state depuis event_rule_hits et events.
+
+    python -m app.scripts.rebuild_alert_state           # backfill complet
+    python -m app.scripts.rebuild_alert_state --check   # contrôle de cohérence seul (exit 1 si divergence)
+"""
+import os
+import sys
+import asyncio
+import argparse
+import logging
+
+# Add app to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import AsyncSessionLocal
+from app.services import alert_state
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("rebuild-alert-state")
+
+async def rebuild_alert_state(check_only: bool = False) -> int:
+    async with AsyncSessionLocal() as session:
+        drift = await alert_state.check(session)
+        logger.info(f"Drift before rebuild: {drift}")
+        if check_only:
+            return 1 if any(drift.values()) else 0
+
+        counts = await alert_state.rebuild(session)
+        await session.commit()
+        logger.info(f"Rebuilt alert_state: {counts}")
+
+        drift = await alert_state.check(session)
+        logger.info(f"Drift after rebuild: {drift}")
+        return 1 if any(drift.values()) else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="Compare only, do not rebuild")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(rebuild_alert_state(check_only=args.check)))
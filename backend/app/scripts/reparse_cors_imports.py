@@ -11,7 +11,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.db.session import AsyncSessionLocal
 from app.db.models import ImportLog, Event, SiteConnection
 from app.parsers.pdf_parser import PdfParser
+from app.parsers.executor import parser_executor
 from app.services.repository import EventRepository
+from app.services import alert_state, rollups
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("reparse-cors")
@@ -37,7 +39,7 @@ async def reparse():
             
             # A. Parse events properly with new regex
             try:
-                new_events = parser.parse(file_path)
+                new_events = await parser_executor.parse(parser, file_path)
                 # Filter out pure SYSTEM/PARSING events if we found real data
                 real_events = [e for e in new_events if e.site_code != "SYSTEM"]
                 
@@ -46,8 +48,11 @@ async def reparse():
                     
                     # B. Clear old events for this import
                     # (To avoid duplicates and clean up "SYSTEM" logs)
+                    sites = await alert_state.sites_of_import(session, imp.id)
+                    hit_days = await rollups.days_of_hits(session, Event.import_id == imp.id)
                     stmt_del = delete(Event).where(Event.import_id == imp.id)
                     await session.execute(stmt_del)
+                    await alert_state.refresh_sites(session, sites)
                     
                     # C. Batch Insert new events
                     # We need to map them back to the import_id
@@ -59,6 +64,11 @@ async def reparse():
                     
                     # E. Populate site_connections
                     await repo.populate_site_connections(real_events, imp.provider_id, imp.id)
+
+                    # F. Rollups : events_count de l'import, hits des events supprimés
+                    await rollups.refresh_days(
+                        session, await rollups.days_of_imports(session, ImportLog.id == imp.id), hit_days,
+                    )
                 else:
                     logger.warning(f"No real events found for {imp.filename} even with new parser.")
                     
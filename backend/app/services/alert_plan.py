@@ -0,0 +1,418 @@
+"""
+Plans d'évaluation compilés pour les AlertRule (AlertingService).
+
+Une règle est compilée une seule fois par worker en un `RulePlan` immuable :
+fenêtre horaire déjà parsée, mot-clé déjà normalisé, regex précompilée.
+Le contexte temporel d'un event (heure locale, week-end, férié, message normalisé)
+est calculé une seule fois dans un `EventContext`, partagé par toutes les règles.
+
+Le cache est indexé par id de règle + empreinte des champs : une règle modifiée
+dans un autre process (API) est recompilée au prochain chargement des règles actives,
+et toute écriture ORM d'une AlertRule dans ce process invalide son entrée.
+"""
+import json
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytz
+from sqlalchemy import event as sa_event
+
+from app.core.config import settings
+from app.db.models import AlertRule
+from app.services.calendar_service import CalendarService
+from app.utils.text import normalize_text
+
+logger = logging.getLogger("alerting-engine")
+
+# Champs d'une règle qui influencent son évaluation (empreinte du cache)
+PLAN_FIELDS = (
+    "id", "name", "is_active", "scope_site_code", "time_scope", "schedule_start", "schedule_end",
+    "condition_type", "value", "match_category", "match_keyword",
+    "frequency_count", "frequency_window", "sliding_window_days", "is_open_only",
+    "sequence_enabled", "seq_a_category", "seq_a_keyword", "seq_b_category", "seq_b_keyword",
+    "seq_max_delay_seconds", "seq_lookback_days", "logic_enabled", "logic_tree",
+)
+
+
+@lru_cache(maxsize=8)
+def get_display_tz(name: str):
+    return pytz.timezone(name)
+
+
+def extract_condition_codes(node: dict) -> list:
+    codes = []
+    if "ref" in node:
+        ref = node["ref"]
+        if ref.startswith("cond:"):
+            codes.append(ref.split(":")[1])
+    if "children" in node:
+        for child in node["children"]:
+            codes.extend(extract_condition_codes(child))
+    return list(set(codes))
+
+
+@dataclass(frozen=True)
+class EventContext:
+    """Attributs d'un event utiles à l'évaluation, calculés une fois pour toutes les règles."""
+    evt_dt: datetime            # UTC (ou reference_time_override)
+    local_date: date
+    local_time: time
+    local_hour: int
+    is_weekend: bool
+    is_holiday: bool
+    site_code: Optional[str]
+    message: str                # message normalisé (normalize_text)
+    message_lower: str          # message.lower() : condition KEYWORD (normalized_message stocké tel quel)
+    category: Optional[str]
+    action: str                 # normalized_type / event_type en majuscules
+    status: str                 # status en majuscules
+
+    @classmethod
+    def from_event(cls, event, reference_time_override=None) -> "EventContext":
+        # The base event time is ALWAYS UTC (enforced at ingestion)
+        if reference_time_override:
+            if isinstance(reference_time_override, str):
+                evt_dt = datetime.fromisoformat(reference_time_override.replace('Z', '+00:00'))
+            else:
+                evt_dt = reference_time_override
+        else:
+            evt_dt = getattr(event, 'timestamp', None) or getattr(event, 'time', None)
+
+        if evt_dt.tzinfo is None:
+            evt_dt = pytz.UTC.localize(evt_dt)
+        else:
+            evt_dt = evt_dt.astimezone(pytz.UTC)
+
+        # Local conversion ONLY for schedule-matching (e.g. "Night", "Business Hours")
+        evt_dt_local = evt_dt.astimezone(get_display_tz(settings.DEFAULT_DISPLAY_TIMEZONE))
+        local_date = evt_dt_local.date()
+        message = getattr(event, 'normalized_message', None) or normalize_text(getattr(event, 'raw_message', ''))
+
+        return cls(
+            evt_dt=evt_dt,
+            local_date=local_date,
+            local_time=evt_dt_local.time(),
+            local_hour=evt_dt_local.hour,
+            is_weekend=CalendarService.is_weekend(local_date),
+            is_holiday=CalendarService.is_holiday(local_date),
+            site_code=getattr(event, 'site_code', None),
+            message=message,
+            message_lower=message.lower(),
+            category=getattr(event, 'category', None),
+            action=(getattr(event, 'normalized_type', None) or getattr(event, 'event_type', '')).upper(),
+            status=(getattr(event, 'status', None) or '').upper(),
+        )
+
+
+@dataclass(frozen=True)
+class RulePlan:
+    """Règle d'alerte compilée. Expose `id` / `name` comme l'AlertRule d'origine."""
+    id: Any
+    name: Any
+    is_active: bool
+    scope_site_code: Optional[str]
+
+    # Time scope
+    time_scope: Any
+    has_schedule: bool                       # schedule_start ET schedule_end renseignés
+    window: Optional[Tuple[time, time]]      # None si absent ou invalide (= toujours dans le planning)
+
+    # Conditions (V3 + B1 legacy)
+    condition_type: Any
+    value: Any
+    value_upper: Optional[str]
+    value_lower: Optional[str]  # str(value).lower(), condition KEYWORD : sous-chaîne sans normalize_text (accents, ponctuation)
+    regex: Optional[re.Pattern]
+    regex_error: Optional[str]
+    match_category: Optional[str]
+    match_keyword: Optional[str]
+    norm_keyword: Optional[str]
+
+    # Fréquence / séquence
+    frequency_count: int
+    frequency_window: int
+    sliding_window_days: int
+    is_open_only: bool
+    sequence_enabled: bool
+    seq_a_category: Optional[str]
+    seq_a_keyword: Optional[str]
+    seq_b_category: Optional[str]
+    seq_b_keyword: Optional[str]
+    seq_max_delay_seconds: Any
+    seq_lookback_days: Any
+
+    # Logic tree (Step 7)
+    uses_logic: bool
+    logic_tree: Optional[dict]
+    condition_codes: Tuple[str, ...]
+
+    # --- Predicates ---
+
+    def in_schedule(self, ctx: EventContext) -> bool:
+        if self.window is None:
+            return True
+        start_t, end_t = self.window
+        if start_t <= end_t:
+            return start_t <= ctx.local_time <= end_t
+        # Cross-midnight (ex: 18:00 -> 08:00)
+        return ctx.local_time >= start_t or ctx.local_time <= end_t
+
+    def time_scope_failure(self, ctx: EventContext) -> Optional[str]:
+        """Raison du rejet par le time scope, ou None si l'event est dans le scope."""
+        scope = self.time_scope
+        if scope == 'WEEKEND':
+            return None if ctx.is_weekend else "Not a weekend"
+        if scope == 'HOLIDAYS':
+            return None if ctx.is_holiday else "Not a holiday"
+        if scope == 'NIGHT':
+            # Default 22:00-06-00 if no start/end
+            if not self.has_schedule:
+                in_night = (ctx.local_hour >= 22 or ctx.local_hour < 6)
+            else:
+                in_night = self.in_schedule(ctx)
+            return None if in_night else "Outside night hours (schedule)"
+        if scope == 'BUSINESS_HOURS':
+            if ctx.is_weekend or ctx.is_holiday or not self.in_schedule(ctx):
+                return "Outside business hours"
+            return None
+        if scope == 'OFF_BUSINESS_HOURS':
+            if not ctx.is_weekend and not ctx.is_holiday and self.in_schedule(ctx):
+                return "Inside business hours"
+            return None
+        return None
+
+    def match_condition(self, ctx: EventContext, details: Optional[list] = None) -> bool:
+        """
+        Filtres Action + Catégorie + Mot-clé + B1 legacy.
+        Sans `details`, s'arrête au premier filtre en échec (chemin chaud) ;
+        avec `details`, évalue tout et explique chaque filtre (dry-run).
+        """
+        action_match = ("APPARITION" in ctx.action)
+        if not action_match and details is None:
+            return False
+
+        cat_match = True
+        if self.match_category:
+            cat_match = (ctx.category == self.match_category)
+            if details is None:
+                if not cat_match:
+                    return False
+            elif not cat_match:
+                details.append(f"Category mismatch: {ctx.category} != {self.match_category}")
+            else:
+                details.append(f"Category matched: {self.match_category}")
+
+        key_match = True
+        if self.match_keyword:
+            key_match = (self.norm_keyword in ctx.message)
+            if details is None:
+                if not key_match:
+                    return False
+            elif not key_match:
+                details.append(f"Keyword '{self.norm_keyword}' not found in normalized message")
+            else:
+                details.append(f"Keyword '{self.norm_keyword}' matched")
+
+        legacy_match = True
+        if self.condition_type == 'SEVERITY':
+            legacy_match = (self.value_upper is not None and ctx.status == self.value_upper)
+            if not legacy_match and details is not None:
+                details.append(f"Severity mismatch: {ctx.status} != {self.value}")
+        elif self.condition_type == 'KEYWORD' and not self.match_keyword:  # Only if V3 keyword not set
+            legacy_match = (self.value_lower is not None and self.value_lower in ctx.message_lower)
+            if not legacy_match and details is not None:
+                details.append(f"Condition Keyword '{self.value}' not found")
+        elif self.condition_type == 'REGEX':
+            if self.regex is None:
+                legacy_match = False
+                if details is not None:
+                    details.append(f"Invalid Regex: {self.regex_error}")
+            else:
+                legacy_match = bool(self.regex.search(ctx.message))
+                if not legacy_match and details is not None:
+                    details.append(f"Regex '{self.value}' did not match")
+
+        return action_match and cat_match and key_match and legacy_match
+
+    def may_trigger(self, ctx: EventContext, has_repo: bool) -> bool:
+        """
+        Pré-filtre du chemin chaud : uniquement des tests en mémoire, du moins cher au plus cher.
+        Ne rejette jamais un couple (event, règle) que l'évaluation complète déclencherait.
+        """
+        if self.scope_site_code and self.scope_site_code != ctx.site_code:
+            return False
+        if not (self.uses_logic and has_repo) and not self.match_condition(ctx):
+            return False
+        return self.time_scope_failure(ctx) is None
+
+
+def frequency_horizon(plans: List[RulePlan], conditions=()) -> timedelta:
+    """
+    Plus grande fenêtre de comptage (V3 en jours, B1 en secondes) parmi les plans actifs
+    et les RuleCondition SIMPLE_V3 : profondeur de la tranche à précharger pour un lot.
+    """
+    horizon = timedelta(0)
+    for plan in plans:
+        if not plan.is_active or plan.uses_logic or plan.sequence_enabled:
+            continue
+        if plan.sliding_window_days > 0:
+            if not plan.is_open_only:
+                horizon = max(horizon, timedelta(days=plan.sliding_window_days))
+        elif plan.frequency_count > 1 and plan.frequency_window > 0:
+            horizon = max(horizon, timedelta(seconds=plan.frequency_window))
+    for cond in conditions:
+        payload = getattr(cond, 'payload', None) or {}
+        if getattr(cond, 'type', None) != 'SEQUENCE' and not payload.get("is_open_only", False):
+            horizon = max(horizon, timedelta(days=payload.get("sliding_window_days", 0) or 0))
+    return horizon
+
+
+def sequence_window(plans: List[RulePlan], conditions=()) -> Tuple[timedelta, timedelta]:
+    """(lookback, délai A->B) max parmi les séquences actives : règles et RuleCondition SEQUENCE."""
+    lookback, delay = timedelta(0), timedelta(0)
+    specs = [
+        (plan.seq_lookback_days, plan.seq_max_delay_seconds)
+        for plan in plans
+        if plan.is_active and plan.sequence_enabled and not plan.uses_logic
+    ]
+    specs += [
+        ((getattr(cond, 'payload', None) or {}).get("seq_lookback_days", 2),
+         (getattr(cond, 'payload', None) or {}).get("seq_max_delay_seconds", 0))
+        for cond in conditions
+        if getattr(cond, 'type', None) == 'SEQUENCE'
+    ]
+    for days, seconds in specs:
+        lookback = max(lookback, timedelta(days=days or 0))
+        delay = max(delay, timedelta(seconds=seconds or 0))
+    return lookback, delay
+
+
+def rule_fingerprint(rule) -> tuple:
+    values = []
+    for field in PLAN_FIELDS:
+        value = getattr(rule, field, None)
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value, sort_keys=True, default=str)
+        values.append(value)
+    return tuple(values)
+
+
+def compile_rule(rule) -> RulePlan:
+    rule_id = getattr(rule, 'id', None)
+    r_start = getattr(rule, 'schedule_start', None)
+    r_end = getattr(rule, 'schedule_end', None)
+
+    window = None
+    if r_start and r_end:
+        try:
+            s_h, s_m = map(int, r_start.split(':'))
+            e_h, e_m = map(int, r_end.split(':'))
+            window = (time(s_h, s_m), time(e_h, e_m))
+        except Exception as e:
+            logger.error(f"Schedule error rule {rule_id if rule_id is not None else '?'}: {e}")
+
+    r_type = getattr(rule, 'condition_type', None)
+    r_value = getattr(rule, 'value', None)
+    regex, regex_error = None, None
+    if r_type == 'REGEX':
+        try:
+            regex = re.compile(r_value, re.IGNORECASE)
+        except Exception as e:
+            regex_error = str(e)
+
+    r_key = getattr(rule, 'match_keyword', None)
+    logic_tree = getattr(rule, 'logic_tree', None)
+    uses_logic = bool(getattr(rule, 'logic_enabled', False) and logic_tree)
+
+    return RulePlan(
+        id=rule_id,
+        name=getattr(rule, 'name', None),
+        is_active=getattr(rule, 'is_active', True),
+        scope_site_code=getattr(rule, 'scope_site_code', None),
+        time_scope=getattr(rule, 'time_scope', 'NONE'),
+        has_schedule=bool(r_start and r_end),
+        window=window,
+        condition_type=r_type,
+        value=r_value,
+        value_upper=r_value.upper() if r_value is not None else None,
+        value_lower=str(r_value).lower() if r_value is not None else None,
+        regex=regex,
+        regex_error=regex_error,
+        match_category=getattr(rule, 'match_category', None),
+        match_keyword=r_key,
+        norm_keyword=normalize_text(str(r_key)) if r_key else None,
+        # Ensure defaults for numeric fields
+        frequency_count=getattr(rule, 'frequency_count', 1) or 1,
+        frequency_window=getattr(rule, 'frequency_window', 0) or 0,
+        sliding_window_days=getattr(rule, 'sliding_window_days', 0) or 0,
+        is_open_only=getattr(rule, 'is_open_only', False) or False,
+        sequence_enabled=getattr(rule, 'sequence_enabled', False) or False,
+        seq_a_category=getattr(rule, 'seq_a_category', None),
+        seq_a_keyword=getattr(rule, 'seq_a_keyword', None),
+        seq_b_category=getattr(rule, 'seq_b_category', None),
+        seq_b_keyword=getattr(rule, 'seq_b_keyword', None),
+        seq_max_delay_seconds=getattr(rule, 'seq_max_delay_seconds', 0),
+        seq_lookback_days=getattr(rule, 'seq_lookback_days', 2),
+        uses_logic=uses_logic,
+        logic_tree=logic_tree,
+        condition_codes=tuple(extract_condition_codes(logic_tree)) if uses_logic and isinstance(logic_tree, dict) else (),
+    )
+
+
+class RulePlanCache:
+    """
+    Cache process-wide id de règle -> (objet règle, empreinte, plan).
+
+    Même objet règle : plan réutilisé directement (chemin chaud, aucune relecture des champs).
+    Nouvel objet (règles rechargées par un autre import / process) : l'empreinte décide
+    de la recompilation. Les modifications ORM passent par les listeners ci-dessous.
+    """
+
+    def __init__(self):
+        self._plans: Dict[Any, Tuple[Any, tuple, RulePlan]] = {}
+        self.compiled = 0
+
+    def get(self, rule) -> RulePlan:
+        if isinstance(rule, RulePlan):
+            return rule
+        rule_id = getattr(rule, 'id', None)
+        cached = self._plans.get(rule_id) if rule_id is not None else None
+        if cached is not None and cached[0] is rule:
+            return cached[2]
+
+        fingerprint = rule_fingerprint(rule)
+        if cached is not None and cached[1] == fingerprint:
+            plan = cached[2]
+        else:
+            plan = compile_rule(rule)
+            self.compiled += 1
+        # Règles non persistées (tester / dry-run d'un AlertRuleCreate) : pas de mise en cache
+        if rule_id is not None:
+            self._plans[rule_id] = (rule, fingerprint, plan)
+        return plan
+
+    def get_many(self, rules) -> List[RulePlan]:
+        return [self.get(rule) for rule in rules]
+
+    def invalidate(self, rule_id=None):
+        if rule_id is None:
+            self._plans.clear()
+        else:
+            self._plans.pop(rule_id, None)
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+
+rule_plan_cache = RulePlanCache()
+
+
+@sa_event.listens_for(AlertRule, "after_insert")
+@sa_event.listens_for(AlertRule, "after_update")
+@sa_event.listens_for(AlertRule, "after_delete")
+def _invalidate_rule_plan(mapper, connection, target: AlertRule):
+    rule_plan_cache.invalidate(target.id)
@@ -0,0 +1,211 @@
+"""
+État matérialisé des alertes actives / archivées.
+
+`alert_state` agrège les hits par (rule_name, site_code, zone_id) : premier / dernier
+hit, dernier event, nombre de hits. `alert_disparition_state` garde la dernière
+DISPARITION par (site_code, zone_id). Une alerte est active tant qu'aucune disparition
+n'est postérieure à son dernier hit : les écrans lisent ces deux petites tables au lieu
+de réagréger `event_rule_hits JOIN events` et tout `events` à chaque requête.
+
+Maintenance :
+- écriture des hits : `insert_hits_statement` (INSERT des hits + upsert de l'état dans
+  la même requête, seuls les hits réellement insérés sont comptés) ;
+- écriture des events : `apply_disparitions` (upsert GREATEST de last_disp_time) ;
+- suppressions (replay, purge d'import) : `refresh_sites` recalcule à l'identique
+  l'état des sites touchés ;
+- `rebuild` / `check` : reconstruction complète et contrôle de cohérence
+  (app/scripts/rebuild_alert_state.py).
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import Text, delete, except_, func, literal, literal_column, select, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import AlertDisparitionState, AlertState, Event, EventRuleHit
+
+logger = logging.getLogger("alert-state")
+
+DISPARITION_MARKER = "DISPARITION"
+
+_STATE_COLUMNS = ["rule_name", "site_code", "zone_id", "first_hit_time", "last_hit_time", "last_event_id", "count_hits"]
+_DISP_COLUMNS = ["site_code", "zone_id", "last_disp_time"]
+
+
+def _hits_aggregate(hits, site_codes: Optional[List[str]] = None):
+    """Agrégat (règle, site, zone) des hits de `hits` (table event_rule_hits ou CTE RETURNING)."""
+    # ->> 'zone_id' en littéral : expression identique dans le SELECT et le GROUP BY
+    zone = hits.c.hit_metadata.op("->>", return_type=Text)(literal_column("'zone_id'"))
+    stmt = (
+        select(
+            hits.c.rule_name,
+            Event.site_code,
+            zone.label("zone_id"),
+            func.min(Event.time),
+            func.max(Event.time),
+            func.max(Event.id),
+            func.count(hits.c.id),
+        )
+        .select_from(hits)
+        .join(Event, Event.id == hits.c.event_id)
+        .where(Event.site_code.isnot(None))
+        .group_by(hits.c.rule_name, Event.site_code, zone)
+    )
+    if site_codes is not None:
+        stmt = stmt.where(Event.site_code.in_(site_codes))
+    return stmt
+
+
+def _disparitions_aggregate(site_codes: Optional[List[str]] = None):
+    zone = Event.zone_id.cast(Text)
+    stmt = (
+        select(Event.site_code, zone.label("zone_id"), func.max(Event.time))
+        .where(Event.site_code.isnot(None), Event.normalized_type.like(f"%{DISPARITION_MARKER}%"))
+        .group_by(Event.site_code, zone)
+    )
+    if site_codes is not None:
+        stmt = stmt.where(Event.site_code.in_(site_codes))
+    return stmt
+
+
+def insert_hits_statement(rows: List[dict]):
+    """
+    INSERT ... ON CONFLICT (event_id, rule_id) DO NOTHING des hits, et dans la même requête
+    upsert de alert_state à partir des seules lignes insérées (RETURNING). Le rowcount reste
+    le nombre de hits insérés.
+    """
+    inserted = (
+        insert(EventRuleHit)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=['event_id', 'rule_id'])
+        .returning(EventRuleHit.id, EventRuleHit.event_id, EventRuleHit.rule_name, EventRuleHit.hit_metadata)
+        .cte("inserted_hits")
+    )
+    state = insert(AlertState).from_select(_STATE_COLUMNS, _hits_aggregate(inserted))
+    current = AlertState.__table__.c
+    state = state.on_conflict_do_update(
+        index_elements=['rule_name', 'site_code', 'zone_id'],
+        set_={
+            "first_hit_time": func.least(current.first_hit_time, state.excluded.first_hit_time),
+            "last_hit_time": func.greatest(current.last_hit_time, state.excluded.last_hit_time),
+            "last_event_id": func.greatest(current.last_event_id, state.excluded.last_event_id),
+            "count_hits": current.count_hits + state.excluded.count_hits,
+            "updated_at": func.now(),
+        },
+    ).cte("alert_state_upsert")
+    return select(inserted.c.event_id).add_cte(state)
+
+
+async def apply_disparitions(session: AsyncSession, rows: Iterable[dict]) -> int:
+    """
+    Reporte les DISPARITION d'un lot d'events (lignes `events` à insérer) dans
+    alert_disparition_state. Une requête par lot, aucune si le lot n'en contient pas.
+    """
+    latest: Dict[tuple, object] = {}
+    for row in rows:
+        if not row.get("site_code") or DISPARITION_MARKER not in (row.get("normalized_type") or ""):
+            continue
+        zone_id = row.get("zone_id")
+        key = (row["site_code"], str(zone_id) if zone_id is not None else None)
+        if key not in latest or row["time"] > latest[key]:
+            latest[key] = row["time"]
+    if not latest:
+        return 0
+
+    stmt = insert(AlertDisparitionState).values([
+        {"site_code": site_code, "zone_id": zone_id, "last_disp_time": disp_time}
+        for (site_code, zone_id), disp_time in latest.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['site_code', 'zone_id'],
+        set_={"last_disp_time": func.greatest(AlertDisparitionState.__table__.c.last_disp_time, stmt.excluded.last_disp_time)},
+    )
+    await session.execute(stmt)
+    return len(latest)
+
+
+async def sites_of_import(session: AsyncSession, import_id: int) -> Set[str]:
+    """Sites touchés par un import : à rafraîchir après suppression de ses events."""
+    result = await session.execute(
+        select(Event.site_code).where(Event.import_id == import_id, Event.site_code.isnot(None)).distinct()
+    )
+    return set(result.scalars().all())
+
+
+async def refresh_hits(session: AsyncSession, site_codes: Optional[Iterable[str]] = None) -> None:
+    """Recalcule alert_state depuis event_rule_hits pour `site_codes` (tous les sites si None)."""
+    sites = None if site_codes is None else sorted(set(site_codes))
+    if sites == []:
+        return
+    stmt = delete(AlertState)
+    if sites is not None:
+        stmt = stmt.where(AlertState.site_code.in_(sites))
+    await session.execute(stmt)
+    await session.execute(
+        insert(AlertState).from_select(_STATE_COLUMNS, _hits_aggregate(EventRuleHit.__table__, sites))
+    )
+
+
+async def refresh_disparitions(session: AsyncSession, site_codes: Optional[Iterable[str]] = None) -> None:
+    """Recalcule alert_disparition_state depuis events pour `site_codes` (tous les sites si None)."""
+    sites = None if site_codes is None else sorted(set(site_codes))
+    if sites == []:
+        return
+    stmt = delete(AlertDisparitionState)
+    if sites is not None:
+        stmt = stmt.where(AlertDisparitionState.site_code.in_(sites))
+    await session.execute(stmt)
+    await session.execute(
+        insert(AlertDisparitionState).from_select(_DISP_COLUMNS, _disparitions_aggregate(sites))
+    )
+
+
+async def refresh_sites(session: AsyncSession, site_codes: Iterable[str]) -> None:
+    """État exact des sites après suppression d'events ou de hits (replay, purge d'import)."""
+    sites = set(site_codes)
+    await refresh_hits(session, sites)
+    await refresh_disparitions(session, sites)
+    if sites:
+        logger.info(f"[METRIC] alert_state_refreshed sites={len(sites)}")
+
+
+async def clear_hits(session: AsyncSession) -> None:
+    """Tous les hits supprimés (replay FULL) : plus aucune alerte."""
+    await session.execute(delete(AlertState))
+
+
+async def rebuild(session: AsyncSession) -> Dict[str, int]:
+    """Reconstruction complète (backfill). Ne commit pas."""
+    await refresh_hits(session)
+    await refresh_disparitions(session)
+    counts = {
+        "alert_state": (await session.execute(select(func.count()).select_from(AlertState))).scalar() or 0,
+        "alert_disparition_state": (await session.execute(select(func.count()).select_from(AlertDisparitionState))).scalar() or 0,
+    }
+    logger.info(f"[METRIC] alert_state_rebuilt rows={counts['alert_state']} disparitions={counts['alert_disparition_state']}")
+    return counts
+
+
+async def _drift(session: AsyncSession, table, columns: List[str], expected) -> int:
+    stored = select(*[table.c[name] for name in columns])
+    expected = expected.subquery()
+    expected = select(*expected.c)
+    diff = union_all(
+        select(literal(1)).select_from(except_(stored, expected).subquery()),
+        select(literal(1)).select_from(except_(expected, stored).subquery()),
+    ).subquery()
+    return (await session.execute(select(func.count()).select_from(diff))).scalar() or 0
+
+
+async def check(session: AsyncSession) -> Dict[str, int]:
+    """
+    Compare les tables d'état à un recalcul complet depuis event_rule_hits / events.
+    Retourne le nombre de lignes divergentes par table (0 = cohérent).
+    """
+    return {
+        "alert_state": await _drift(session, AlertState.__table__, _STATE_COLUMNS, _hits_aggregate(EventRuleHit.__table__)),
+        "alert_disparition_state": await _drift(
+            session, AlertDisparitionState.__table__, _DISP_COLUMNS, _disparitions_aggregate()
+        ),
+    }
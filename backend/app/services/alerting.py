@@ -1,63 +1,46 @@
 import logging
-import pytz
 from app.ingestion.models import NormalizedEvent
-from app.services.calendar_service import CalendarService
+from app.services.alert_plan import EventContext, RulePlan, extract_condition_codes, rule_plan_cache
 from app.utils.text import normalize_text
 from app.db.models import EventRuleHit
-from app.core.config import settings
-from datetime import datetime, time, timedelta
 
 logger = logging.getLogger("alerting-engine")
 
 class AlertingService:
+    def compile_rules(self, rules: list) -> list:
+        """
+        Compiled plans for a list of rules (AlertRule, AlertRuleCreate, RulePlan...).
+        Callers looping over many events should compile once and pass the plans.
+        """
+        return rule_plan_cache.get_many(rules)
+
     async def check_and_trigger_alerts(self, event: NormalizedEvent, rules: list, repo=None):
         """
         Main entry point for live/replay alerting.
         """
-        for rule in rules:
-            if not getattr(rule, 'is_active', True):
+        ctx = EventContext.from_event(event)
+        for plan in self.compile_rules(rules):
+            if not plan.is_active:
                 continue
-                
-            res = await self.evaluate_rule(event, rule, repo)
+            # Cheap in-memory checks first: most (event, rule) pairs stop here
+            if not plan.may_trigger(ctx, repo is not None):
+                continue
+
+            res = await self._evaluate_plan(event, plan, ctx, repo)
             if res["triggered"]:
-                await self._trigger_alert(event, rule, repo)
+                await self._trigger_alert(event, plan, repo)
 
     async def evaluate_rule(self, event: NormalizedEvent, rule, repo=None, reference_time_override=None) -> dict:
         """
         Detailed evaluation of a rule against an event.
         Used by both real triggering and Dry Run.
         """
-        # 1. SETUP
-        # The base event time is ALWAYS UTC (enforced at ingestion)
-        evt_dt_utc = getattr(event, 'timestamp', None) or getattr(event, 'time', None)
-        
-        # Override time for deterministic tests
-        if reference_time_override:
-            if isinstance(reference_time_override, str):
-                from datetime import datetime
-                evt_dt = datetime.fromisoformat(reference_time_override.replace('Z', '+00:00'))
-            else:
-                evt_dt = reference_time_override
-        else:
-            evt_dt = evt_dt_utc
+        ctx = EventContext.from_event(event, reference_time_override)
+        return await self._evaluate_plan(event, self.compile_rules([rule])[0], ctx, repo)
 
-        if evt_dt.tzinfo is None:
-            evt_dt = pytz.UTC.localize(evt_dt)
-        else:
-            evt_dt = evt_dt.astimezone(pytz.UTC)
-
-        # Local conversion ONLY for schedule-matching (e.g. "Night", "Business Hours")
-        display_tz = pytz.timezone(settings.DEFAULT_DISPLAY_TIMEZONE)
-        evt_dt_local = evt_dt.astimezone(display_tz)
-            
-        evt_date_local = evt_dt_local.date()
-        evt_time_local = evt_dt_local.time()
-        
-        is_weekend = CalendarService.is_weekend(evt_date_local)
-        is_holiday = CalendarService.is_holiday(evt_date_local)
-        
+    async def _evaluate_plan(self, event, plan: RulePlan, ctx: EventContext, repo=None) -> dict:
         report = {
-            "rule_id": getattr(rule, 'id', None),
+            "rule_id": plan.id,
             "triggered": False,
             "condition_ok": False,
             "time_scope_ok": True,
@@ -67,71 +50,26 @@ class AlertingService:
         }
 
         # 2. SITE SCOPE CHECK
-        r_scope = getattr(rule, 'scope_site_code', None)
-        if r_scope and r_scope != getattr(event, 'site_code', None):
+        if plan.scope_site_code and plan.scope_site_code != ctx.site_code:
             report["time_scope_ok"] = False 
-            report["details"].append(f"Site mismatch: expected {r_scope}")
+            report["details"].append(f"Site mismatch: expected {plan.scope_site_code}")
             return report 
             
         # 3. TIME SCOPE CHECK
-        r_time_scope = getattr(rule, 'time_scope', 'NONE')
-        r_start = getattr(rule, 'schedule_start', None)
-        r_end = getattr(rule, 'schedule_end', None)
-        
-        in_schedule = True
-        if r_start and r_end:
-            try:
-                s_h, s_m = map(int, r_start.split(':'))
-                e_h, e_m = map(int, r_end.split(':'))
-                start_t = time(s_h, s_m)
-                end_t = time(e_h, e_m)
-                
-                if start_t <= end_t:
-                    in_schedule = (start_t <= evt_time_local <= end_t)
-                else:
-                    # Cross-midnight (ex: 18:00 -> 08:00)
-                    in_schedule = (evt_time_local >= start_t or evt_time_local <= end_t)
-            except Exception as e:
-                logger.error(f"Schedule error rule {getattr(rule, 'id', '?')}: {e}")
-        
-        if r_time_scope == 'WEEKEND' and not is_weekend:
-            report["time_scope_ok"] = False
-            report["details"].append("Not a weekend")
-        elif r_time_scope == 'HOLIDAYS' and not is_holiday:
+        failure = plan.time_scope_failure(ctx)
+        if failure:
             report["time_scope_ok"] = False
-            report["details"].append("Not a holiday")
-        elif r_time_scope == 'NIGHT':
-             # Default 22:00-06-00 if no start/end
-             if not (r_start and r_end):
-                 in_schedule = (evt_dt_local.hour >= 22 or evt_dt_local.hour < 6)
-             if not in_schedule: 
-                 report["time_scope_ok"] = False
-                 report["details"].append("Outside night hours (schedule)")
-        elif r_time_scope == 'BUSINESS_HOURS':
-            if is_weekend or is_holiday or not in_schedule:
-                report["time_scope_ok"] = False
-                report["details"].append("Outside business hours")
-        elif r_time_scope == 'OFF_BUSINESS_HOURS':
-            is_business = (not is_weekend and not is_holiday and in_schedule)
-            if is_business:
-                report["time_scope_ok"] = False
-                report["details"].append("Inside business hours")
-        
-        if report["time_scope_ok"]:
-            report["details"].append(f"Time scope OK ({r_time_scope})")
-
-        if not report["time_scope_ok"]:
+            report["details"].append(failure)
             return report
+        report["details"].append(f"Time scope OK ({plan.time_scope})")
 
         # 4. LOGIC TREE or LEGACY/V3 COEXISTENCE
-        if getattr(rule, 'logic_enabled', False) and getattr(rule, 'logic_tree', None) and repo:
+        if plan.uses_logic and repo:
             # Step 7: Logic Tree AST
-            tree = rule.logic_tree
-            codes = self._extract_condition_codes(tree)
-            cond_map = await repo.get_rule_conditions_by_codes(codes)
+            cond_map = await repo.get_rule_conditions_by_codes(list(plan.condition_codes))
             
             # Evaluate recursively
-            eval_tree = await self._evaluate_logic_node(tree, event, repo, cond_map, evt_dt)
+            eval_tree = await self._evaluate_logic_node(plan.logic_tree, event, repo, cond_map, ctx.evt_dt)
             report["logic_tree_eval"] = eval_tree
             report["triggered"] = eval_tree.get("result", False)
             if report["triggered"]:
@@ -142,91 +80,40 @@ class AlertingService:
 
         # --- LEGACY / SINGLE CONDITION LOGIC ---
         # 4. CONDITION CHECK (V3 Category + Keyword + B1 legacy)
-        r_type = getattr(rule, 'condition_type', None)
-        r_value = getattr(rule, 'value', None)
-        r_cat = getattr(rule, 'match_category', None)
-        r_key = getattr(rule, 'match_keyword', None)
-        
-        # Ensure defaults for numeric fields
-        r_freq = getattr(rule, 'frequency_count', 1) or 1
-        r_win = getattr(rule, 'frequency_window', 0) or 0
-        r_days = getattr(rule, 'sliding_window_days', 0) or 0
-        r_open_only = getattr(rule, 'is_open_only', False) or False
-        r_seq_enabled = getattr(rule, 'sequence_enabled', False) or False
-        
-        evt_msg = getattr(event, 'normalized_message', None) or normalize_text(getattr(event, 'raw_message', ''))
-        evt_cat = getattr(event, 'category', None)
-        evt_action = (getattr(event, 'normalized_type', None) or getattr(event, 'event_type', '')).upper()
-        
-        # Action Filter: Step 5 counts on APPARITION
-        action_match = ("APPARITION" in evt_action)
-        
-        # Category Filter
-        cat_match = True
-        if r_cat:
-            cat_match = (evt_cat == r_cat)
-            if not cat_match:
-                report["details"].append(f"Category mismatch: {evt_cat} != {r_cat}")
-            else:
-                report["details"].append(f"Category matched: {r_cat}")
-
-        # Keyword Filter
-        key_match = True
-        if r_key:
-            norm_key = normalize_text(r_key)
-            key_match = (norm_key in evt_msg)
-            if not key_match:
-                report["details"].append(f"Keyword '{norm_key}' not found in normalized message")
-            else:
-                report["details"].append(f"Keyword '{norm_key}' matched")
-
-        # Legacy B1 Logic
-        legacy_match = True
-        if r_type == 'SEVERITY':
-            evt_status = (getattr(event, 'status', None) or '').upper()
-            legacy_match = (evt_status == r_value.upper())
-            if not legacy_match: report["details"].append(f"Severity mismatch: {evt_status} != {r_value}")
-        elif r_type == 'KEYWORD' and not r_key: # Only if V3 keyword not set
-            legacy_match = (r_value.lower() in evt_msg.lower())
-            if not legacy_match: report["details"].append(f"Condition Keyword '{r_value}' not found")
-        elif r_type == 'REGEX':
-            import re
-            try:
-                legacy_match = bool(re.search(r_value, evt_msg, re.IGNORECASE))
-                if not legacy_match: report["details"].append(f"Regex '{r_value}' did not match")
-            except Exception as e:
-                legacy_match = False
-                report["details"].append(f"Invalid Regex: {e}")
-
-        # Overall Condition Trigger
-        report["condition_ok"] = (action_match and cat_match and key_match and legacy_match)
+        report["condition_ok"] = plan.match_condition(ctx, report["details"])
         if report["condition_ok"]:
             report["details"].append("General conditions matched (Action+Cat+Key+Legacy)")
 
         # 5. FREQUENCY / SLIDING WINDOW CHECK
         if report["condition_ok"] and report["time_scope_ok"]:
+            evt_dt = ctx.evt_dt
+            r_freq = plan.frequency_count
+            r_win = plan.frequency_window
+            r_days = plan.sliding_window_days
+            r_open_only = plan.is_open_only
+
             # Check if event is historical (has ID)
             is_hist = (getattr(event, 'id', None) is not None)
             
             # 5. SEQUENCE or FREQUENCY CHECK
-            if r_seq_enabled and repo:
+            if plan.sequence_enabled and repo:
                 # V3 SEQUENCE LOGIC: A -> B in Δt
                 # Note: We use the repository to find a matching pair in the lookback
                 match = await repo.find_sequence_match(
                     site_code=getattr(event, 'site_code', ''),
-                    a_cat=getattr(rule, 'seq_a_category', None),
-                    a_key=getattr(rule, 'seq_a_keyword', None),
-                    b_cat=getattr(rule, 'seq_b_category', None),
-                    b_key=getattr(rule, 'seq_b_keyword', None),
-                    max_delay_seconds=getattr(rule, 'seq_max_delay_seconds', 0),
-                    lookback_days=getattr(rule, 'seq_lookback_days', 2),
+                    a_cat=plan.seq_a_category,
+                    a_key=plan.seq_a_keyword,
+                    b_cat=plan.seq_b_category,
+                    b_key=plan.seq_b_keyword,
+                    max_delay_seconds=plan.seq_max_delay_seconds,
+                    lookback_days=plan.seq_lookback_days,
                     reference_time=evt_dt
                 )
                 
                 if match:
                     report["triggered"] = True
                     report["details"].append(f"SEQUENCE MATCHED: A(id:{match['a_id']}, time:{match['a_time']}) followed by B(id:{match['b_id']}, time:{match['b_time']})")
-                    report["details"].append(f"Delay: {(match['b_time'] - match['a_time']).total_seconds()}s (max allowed: {getattr(rule, 'seq_max_delay_seconds', 0)}s)")
+                    report["details"].append(f"Delay: {(match['b_time'] - match['a_time']).total_seconds()}s (max allowed: {plan.seq_max_delay_seconds}s)")
                 else:
                     report["frequency_ok"] = False
                     report["details"].append("No valid sequence (A->B) found in lookback window.")
@@ -235,8 +122,8 @@ class AlertingService:
                 # V3 FREQUENCY LOGIC
                 count = await repo.count_v3_matches(
                     site_code=getattr(event, 'site_code', ''),
-                    category=r_cat,
-                    keyword=r_key,
+                    category=plan.match_category,
+                    keyword=plan.match_keyword,
                     days=r_days,
                     open_only=r_open_only,
                     reference_time=evt_dt
@@ -253,7 +140,7 @@ class AlertingService:
             elif r_freq > 1 and r_win > 0 and repo:
                 # B1 LOGIC: frequency_window in seconds
                 count = await repo.count_recent_matches(
-                    getattr(event, 'site_code', ''), r_type, r_value, r_win, reference_time=evt_dt
+                    getattr(event, 'site_code', ''), plan.condition_type, plan.value, r_win, reference_time=evt_dt
                 )
                 if (count + 1) < r_freq:
                     report["frequency_ok"] = False
@@ -269,15 +156,7 @@ class AlertingService:
     # --- Step 7 Logic Engine ---
     
     def _extract_condition_codes(self, node: dict) -> list:
-        codes = []
-        if "ref" in node:
-            ref = node["ref"]
-            if ref.startswith("cond:"):
-                codes.append(ref.split(":")[1])
-        if "children" in node:
-            for child in node["children"]:
-                codes.extend(self._extract_condition_codes(child))
-        return list(set(codes))
+        return extract_condition_codes(node)
 
     async def _evaluate_logic_node(self, node: dict, event, repo, cond_map, evt_dt) -> dict:
         """Recursive AST evaluator."""
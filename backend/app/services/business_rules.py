@@ -8,13 +8,20 @@ Moteur d'évaluation des règles métier avec :
 import json
 import logging
 from datetime import datetime, timedelta
-from typing import List, Optional, Any, Dict
+from collections import defaultdict
+from typing import List, Optional, Any, Dict, FrozenSet, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_, delete
-from app.db.models import Event, EventRuleHit, AlertRule, Setting
+from app.db.models import Event, EventRuleHit, AlertRule
+from app.services import alert_state, rollups
+from app.services.settings_cache import settings_cache
+from app.utils.keyword_matcher import keyword_matcher
 
 logger = logging.getLogger("business-rules")
 
+# 6 colonnes par hit : reste sous la limite de 32767 paramètres d'asyncpg
+HIT_INSERT_CHUNK = 5000
+
 
 def _get_rules_config() -> Dict[str, Any]:
     """Charge la config monitoring.rules depuis config_loader avec fallbacks."""
@@ -34,16 +41,16 @@ async def _get_db_setting(
 ) -> Any:
     """
     Lire un setting depuis la table DB (override par rapport au YAML).
+    Servi par le cache process `settings_cache` (TTL + invalidation pub/sub).
     Robustesse : log WARNING si JSON invalide ou type incorrect.
     """
     try:
-        result = await session.execute(select(Setting).where(Setting.key == key))
-        setting = result.scalar_one_or_none()
-        if setting:
+        raw = await settings_cache.get(key, session)
+        if raw is not None:
             try:
-                val = json.loads(setting.value)
+                val = json.loads(raw)
             except json.JSONDecodeError:
-                logger.warning(f"[SETTINGS_OVERRIDE_INVALID_JSON] key={key} value={setting.value}")
+                logger.warning(f"[SETTINGS_OVERRIDE_INVALID_JSON] key={key} value={raw}")
                 return default
 
             # Validation de type
@@ -81,14 +88,19 @@ def rule_raw_code_match(event_raw_code: Optional[str], rule_config: Dict[str, An
         return False
 
     event_code = str(event_raw_code).strip()
+    return event_code in rule_raw_code_targets(rule_config, mode)
+
 
+def rule_raw_code_targets(rule_config: Dict[str, Any], mode: str = "IN") -> FrozenSet[str]:
+    """
+    Codes (normalisés par strip) qu'une config de règle accepte.
+    EXACT → {raw_code} ; IN → raw_codes / raw_code_list ; mode inconnu → aucun.
+    """
     # Mode override depuis la règle elle-même
     rule_mode = rule_config.get('raw_code_mode', mode).upper()
 
     if rule_mode == "EXACT":
-        target = str(rule_config.get('raw_code', '')).strip()
-        matched = event_code == target
-        return matched
+        return frozenset([str(rule_config.get('raw_code', '')).strip()])
 
     elif rule_mode == "IN":
         targets = rule_config.get('raw_codes', rule_config.get('raw_code_list', []))
@@ -98,10 +110,69 @@ def rule_raw_code_match(event_raw_code: Optional[str], rule_config: Dict[str, An
                 targets = json.loads(targets)
             except Exception:
                 targets = [targets]
-        targets_str = [str(t).strip() for t in targets]
-        return event_code in targets_str
+        return frozenset(str(t).strip() for t in targets)
 
-    return False
+    return frozenset()
+
+
+def db_rule_config(rule: AlertRule) -> Dict[str, Any]:
+    """Config de matching RAW_CODE d'une AlertRule : logic_tree, sinon `value` (code EXACT ou JSON liste)."""
+    if rule.logic_enabled and rule.logic_tree:
+        # logic_tree stocke la config de matching
+        return rule.logic_tree if isinstance(rule.logic_tree, dict) else {}
+
+    # Fallback : value = code EXACT ou JSON liste
+    raw_val = rule.value or ""
+    try:
+        parsed = json.loads(raw_val)
+        if isinstance(parsed, list):
+            return {'raw_codes': parsed}
+        return {'raw_code': str(parsed)}
+    except (json.JSONDecodeError, TypeError):
+        return {'raw_code': raw_val}
+
+
+class RawCodeRuleIndex:
+    """
+    Index inversé raw_code normalisé → positions des règles RAW_CODE candidates,
+    construit une fois par lot. Les règles scopées sont rangées par site_code.
+    Les codes acceptés par chaque règle (config JSON parsée) sont gardés pour
+    l'évaluation : plus de json.loads par event. Une règle dont la config ne se
+    laisse pas indexer reste évaluée règle par règle.
+    """
+
+    def __init__(self, active_rules: List[AlertRule], raw_code_mode: str):
+        self.rules = active_rules
+        self.raw_code_mode = raw_code_mode
+        self.by_code: Dict[str, List[int]] = defaultdict(list)
+        self.by_site: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+        self.unindexed: List[int] = []
+        self.targets: Dict[int, FrozenSet[str]] = {}
+
+        for pos, rule in enumerate(active_rules):
+            if not rule.is_active or rule.condition_type != "RAW_CODE":
+                continue  # _evaluate_single_db_rule → False
+            try:
+                targets = rule_raw_code_targets(db_rule_config(rule), raw_code_mode)
+            except Exception:
+                self.unindexed.append(pos)
+                continue
+            self.targets[pos] = targets
+            index = self.by_site[rule.scope_site_code] if rule.scope_site_code else self.by_code
+            for code in targets:
+                index[code].append(pos)
+
+    def candidates(self, event: Event) -> List[Tuple[AlertRule, Optional[FrozenSet[str]]]]:
+        """(règle, codes acceptés ou None si non indexée) pouvant matcher l'event, dans l'ordre de `active_rules`."""
+        if event.raw_code is None:
+            return []  # rule_raw_code_match → False pour toutes les règles
+        code = str(event.raw_code).strip()
+        positions = list(self.by_code.get(code, ()))
+        site_index = self.by_site.get(event.site_code)
+        if site_index:
+            positions += site_index.get(code, ())
+        positions += self.unindexed
+        return [(self.rules[pos], self.targets.get(pos)) for pos in sorted(set(positions))]
 
 
 class BusinessRuleEngine:
@@ -110,6 +181,10 @@ class BusinessRuleEngine:
         # Cache pour éviter les requêtes DB répétitives sur les mêmes settings (Phase 2A Optimization)
         self._rules_cfg: Optional[Dict[str, Any]] = None
         self._settings_cache: Dict[str, Any] = {}
+        # Hits collectés pendant l'évaluation, écrits en un INSERT par lot (flush_hits)
+        self._pending_hits: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self._system_rule_id: Optional[int] = None
+        self._rule_index: Optional[RawCodeRuleIndex] = None
 
     async def _rules_config(self) -> Dict[str, Any]:
         if self._rules_cfg is None:
@@ -165,6 +240,8 @@ class BusinessRuleEngine:
             # Moteur V2 : règles DB dynamiques
             await self.evaluate_db_rules(event, active_rules, raw_code_mode)
 
+        await self.flush_hits()
+
     async def _load_active_rules(self) -> List[AlertRule]:
         """Charge toutes les AlertRule actives de la DB."""
         result = await self.session.execute(
@@ -186,7 +263,7 @@ class BusinessRuleEngine:
     async def _rule_intrusion_maintenance(self, event: Event, cfg: dict):
         keywords = cfg.get("intrusion", {}).get("keywords", [])
         msg = (event.normalized_message or "").lower()
-        if any(k in msg for k in keywords):
+        if keyword_matcher(tuple(keywords)).any(msg):
             if event.in_maintenance:
                 return
             await self._record_hit(event, "INTRUSION_NO_MAINTENANCE", "Intrusion sans maintenance active")
@@ -194,7 +271,7 @@ class BusinessRuleEngine:
     async def _rule_absence_test(self, event: Event, cfg: dict):
         triggers = cfg.get("absence_test", {}).get("trigger_keywords", [])
         msg = (event.normalized_message or "").lower()
-        if any(t in msg for t in triggers):
+        if keyword_matcher(tuple(triggers)).any(msg):
             await self._record_hit(event, "ABSENCE_TEST", "Manque de test cyclique détecté")
 
     async def _rule_technical_faults(self, event: Event, cfg: dict):
@@ -250,8 +327,12 @@ class BusinessRuleEngine:
         normalization = params["normalization"]
         record_below = params["record_below"]
 
-        for rule in active_rules:
-            matched = self._evaluate_single_db_rule(event, rule, raw_code_mode)
+        index = self._rule_index
+        if index is None or index.rules is not active_rules or index.raw_code_mode != raw_code_mode:
+            index = self._rule_index = RawCodeRuleIndex(active_rules, raw_code_mode)
+
+        for rule, targets in index.candidates(event):
+            matched = self._evaluate_single_db_rule(event, rule, raw_code_mode, targets)
             if not matched:
                 continue
 
@@ -320,13 +401,15 @@ class BusinessRuleEngine:
         self,
         event: Event,
         rule: AlertRule,
-        global_raw_code_mode: str
+        global_raw_code_mode: str,
+        targets: Optional[FrozenSet[str]] = None
     ) -> bool:
         """
         Évalue une AlertRule sur un Event.
         Supporte :
           - condition_type == "RAW_CODE" : matching via logic_tree ou value
           - logic_tree avec clé raw_code / raw_codes
+        `targets` : codes acceptés déjà calculés (RawCodeRuleIndex), sinon lus depuis la règle.
         """
         if not rule.is_active:
             return False
@@ -337,24 +420,9 @@ class BusinessRuleEngine:
 
         # Matching RAW_CODE
         if rule.condition_type == "RAW_CODE":
-            rule_cfg: Dict[str, Any] = {}
-
-            if rule.logic_enabled and rule.logic_tree:
-                # logic_tree stocke la config de matching
-                rule_cfg = rule.logic_tree if isinstance(rule.logic_tree, dict) else {}
-            else:
-                # Fallback : value = code EXACT ou JSON liste
-                raw_val = rule.value or ""
-                try:
-                    parsed = json.loads(raw_val)
-                    if isinstance(parsed, list):
-                        rule_cfg = {'raw_codes': parsed}
-                    else:
-                        rule_cfg = {'raw_code': str(parsed)}
-                except (json.JSONDecodeError, TypeError):
-                    rule_cfg = {'raw_code': raw_val}
-
-            matched = rule_raw_code_match(event.raw_code, rule_cfg, global_raw_code_mode)
+            if targets is None:
+                targets = rule_raw_code_targets(db_rule_config(rule), global_raw_code_mode)
+            matched = event.raw_code is not None and str(event.raw_code).strip() in targets
             if matched:
                 logger.info(
                     f"[RULE_RAW_CODE_MATCH] rule_id={rule.id} rule_name={rule.name} "
@@ -376,33 +444,54 @@ class BusinessRuleEngine:
         score: Optional[float] = None,
         hit_metadata_override: Optional[dict] = None
     ):
-        """Enregistre un hit, en évitant les doublons (unique index event_id+rule_id)."""
-        rule_id = rule_id_override or await self._resolve_system_rule_id()
-
-        # Check doublon avant insertion (unique index peut lever une erreur)
-        existing = await self.session.execute(
-            select(EventRuleHit.id).where(
-                EventRuleHit.event_id == event.id,
-                EventRuleHit.rule_id == rule_id
-            )
-        )
-        if existing.scalar():
+        """
+        Met un hit en attente (écrit par flush_hits). Le premier hit d'un couple
+        (event_id, rule_id) l'emporte, comme avec l'index unique.
+        """
+        rule_id = rule_id_override or await self._get_system_rule_id()
+
+        key = (event.id, rule_id)
+        if key in self._pending_hits:
             return  # déjà enregistré
 
         metadata = {"explanation": explanation}
         if hit_metadata_override:
             metadata.update(hit_metadata_override)
 
-        hit = EventRuleHit(
-            event_id=event.id,
-            rule_id=rule_id,
-            rule_name=rule_code,
-            score=score,
-            hit_metadata=metadata
-        )
-        self.session.add(hit)
+        self._pending_hits[key] = {
+            "event_id": event.id,
+            "rule_id": rule_id,
+            "rule_name": rule_code,
+            "score": score,
+            "hit_metadata": metadata,
+        }
         logger.info(f"[RULE_HIT] {rule_code} (rule_id={rule_id}) event={event.id}")
 
+    async def flush_hits(self) -> int:
+        """
+        Écrit les hits en attente : INSERT ... ON CONFLICT (event_id, rule_id) DO NOTHING.
+        Les hits déjà en base (run précédent, AlertingService) sont conservés tels quels ;
+        alert_state est mis à jour dans la même requête à partir des hits insérés.
+        """
+        rows = list(self._pending_hits.values())
+        self._pending_hits.clear()
+        if not rows:
+            return 0
+
+        inserted = 0
+        for i in range(0, len(rows), HIT_INSERT_CHUNK):
+            stmt = alert_state.insert_hits_statement(rows[i:i + HIT_INSERT_CHUNK])
+            result = await self.session.execute(stmt)
+            inserted += max(result.rowcount or 0, 0)
+        logger.info(f"[METRIC] rule_hits_flushed pending={len(rows)} inserted={inserted}")
+        return inserted
+
+    async def _get_system_rule_id(self) -> int:
+        """ENGINE_V1 résolu une seule fois par moteur."""
+        if self._system_rule_id is None:
+            self._system_rule_id = await self._resolve_system_rule_id()
+        return self._system_rule_id
+
     async def _resolve_system_rule_id(self) -> int:
         """Trouve l'ID de la règle système ENGINE_V1. Strict mode."""
         stmt = select(AlertRule.id).where(AlertRule.name == 'ENGINE_V1').limit(1)
@@ -452,7 +541,10 @@ async def replay_all_rules(
 
     # Si mode FULL, on vide tout d'un coup (destructive)
     if mode.upper() == "FULL":
+        hit_days = await rollups.days_of_hits(session)
         await session.execute(delete(EventRuleHit))
+        await alert_state.clear_hits(session)
+        await rollups.refresh_days(session, hit_days=hit_days)
         await session.commit()
         logger.info(f"[REPLAY] FULL CLEAR of event_rule_hits completed ({count_before} rows deleted).")
 
@@ -478,7 +570,9 @@ async def replay_all_rules(
         min_id, max_id = min(event_ids), max(event_ids)
 
         # REPLACE : Supprimer hits uniquement pour ces events (atomic batch)
+        hit_days = set()
         if mode.upper() == "REPLACE":
+            hit_days = await rollups.days_of_hits(session, EventRuleHit.event_id.in_(event_ids))
             res_del = await session.execute(
                 delete(EventRuleHit).where(EventRuleHit.event_id.in_(event_ids))
             )
@@ -493,6 +587,12 @@ async def replay_all_rules(
             await engine.evaluate_db_rules(event, active_rules, raw_code_mode)
 
         # Commit de la tranche
+        await engine.flush_hits()
+        if mode.upper() == "REPLACE":
+            # Hits supprimés puis réinsérés : état exact des sites de la tranche
+            await alert_state.refresh_hits(session, {e.site_code for e in events if e.site_code})
+            # Hits réinsérés datés du jour : les jours des hits supprimés sont à recalculer
+            await rollups.refresh_days(session, hit_days=hit_days)
         await session.commit()
         total_processed += len(events)
         offset += batch_size
@@ -0,0 +1,97 @@
+"""
+Bus d'invalidation des caches process (API, worker) via Redis pub/sub.
+
+Chaque cache enregistre un scope (`register("settings", cache.invalidate)`). Un endpoint
+qui modifie la source publie le scope après son commit : le process émetteur est invalidé
+immédiatement, les autres à réception du message. À chaque (ré)abonnement tous les
+scopes sont invalidés (messages possiblement manqués) ; les TTL des caches bornent
+l'écart si Redis est indisponible.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger("cache-bus")
+
+CACHE_CHANNEL = "supervision:cache:invalidate"
+
+_handlers: Dict[str, Callable[[str], None]] = {}
+
+
+def register(scope: str, handler: Callable[[str], None]) -> None:
+    """`handler(reason)` est appelé à chaque invalidation du scope."""
+    _handlers[scope] = handler
+
+
+def invalidate_local(scope: Optional[str], reason: str) -> None:
+    """Invalide un scope (ou tous si None) dans ce process."""
+    scopes = _handlers if scope is None else {scope: _handlers[scope]} if scope in _handlers else {}
+    for name, handler in scopes.items():
+        try:
+            handler(reason)
+        except Exception as e:
+            logger.error(f"[CACHE_BUS] invalidation failed scope={name}: {e}")
+
+
+async def publish(scope: str, keys: Optional[Iterable] = None, redis_client=None) -> None:
+    """
+    À appeler après le commit d'une écriture : invalide ce process et prévient les autres.
+    Une erreur Redis est loguée, jamais remontée (TTL des caches en secours).
+    """
+    invalidate_local(scope, "write")
+    payload = json.dumps({
+        "scope": scope,
+        "keys": sorted(str(k) for k in keys) if keys is not None else None,
+        "pid": os.getpid(),
+    })
+    owns_client = redis_client is None
+    try:
+        if owns_client:
+            from app.db.redis import get_redis_client
+            redis_client = await get_redis_client()
+        await redis_client.publish(CACHE_CHANNEL, payload)
+    except Exception as e:
+        logger.warning(f"[CACHE_BUS] publish failed scope={scope}, other processes refresh on ttl: {e}")
+    finally:
+        if owns_client and redis_client is not None:
+            try:
+                await redis_client.close()
+            except Exception:
+                pass
+
+
+def handle_message(message: dict) -> None:
+    if message.get("type") != "message":
+        return
+    try:
+        data = json.loads(message.get("data") or "{}")
+    except (TypeError, ValueError):
+        data = {}
+    # Message illisible : on invalide tout plutôt que de garder un cache périmé
+    scope = data.get("scope") if isinstance(data, dict) else None
+    keys = data.get("keys") if isinstance(data, dict) else None
+    invalidate_local(scope, f"pubsub keys={keys}")
+
+
+async def listen(redis_client, retry_seconds: float = 5.0) -> None:
+    """Boucle d'écoute du canal d'invalidation (tâche de fond API / worker)."""
+    while True:
+        pubsub = redis_client.pubsub()
+        try:
+            await pubsub.subscribe(CACHE_CHANNEL)
+            invalidate_local(None, "subscribe")
+            logger.info(f"[CACHE_BUS] listening channel={CACHE_CHANNEL} scopes={sorted(_handlers)}")
+            async for message in pubsub.listen():
+                handle_message(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"[CACHE_BUS] pubsub error, retry in {retry_seconds}s: {e}")
+        finally:
+            try:
+                await pubsub.close()
+            except Exception:
+                pass
+        await asyncio.sleep(retry_seconds)
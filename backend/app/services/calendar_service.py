@@ -1,12 +1,15 @@
 from datetime import date, timedelta
-from typing import Set
+from functools import lru_cache
+from typing import FrozenSet
 
 class CalendarService:
     @staticmethod
-    def get_french_holidays(year: int) -> Set[date]:
+    @lru_cache(maxsize=32)
+    def get_french_holidays(year: int) -> FrozenSet[date]:
         """
         Returns a set of French public holidays for a given year.
         Includes fixed dates and calculated dates (Easter-based).
+        Cached per year (called for every alert evaluation).
         """
         holidays = set()
         
@@ -43,7 +46,7 @@ class CalendarService:
         holidays.add(easter + timedelta(days=39))  # Ascension
         holidays.add(easter + timedelta(days=50))  # Lundi de Pentecôte
         
-        return holidays
+        return frozenset(holidays)
 
     @staticmethod
     def is_holiday(d: date) -> bool:
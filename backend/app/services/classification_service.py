@@ -1,9 +1,9 @@
 import logging
-import re
 from typing import Optional, List
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.models import SmtpProviderRule, MonitoringProvider
+from app.db.models import MonitoringProvider
+from app.services.smtp_rule_index import smtp_rule_index
 
 logger = logging.getLogger("classification-service")
 
@@ -12,51 +12,22 @@ class ClassificationService:
     async def classify_email(session: AsyncSession, sender_email: str) -> int:
         """
         Classify an email based on its sender address.
-        Uses smtp_provider_rules in DB with priorities (lower priority = checked first).
+        Uses smtp_provider_rules in DB with priorities (lower priority = checked first),
+        through the process-wide SmtpRuleIndex.
         Returns provider_id or the ID for PROVIDER_UNCLASSIFIED if no match.
         """
         if not sender_email:
             return await ClassificationService.get_unclassified_id(session)
 
-        # 1. Fetch active rules ordered by priority (lower first)
-        stmt = (
-            select(SmtpProviderRule)
-            .where(SmtpProviderRule.is_active == True)
-            .order_by(SmtpProviderRule.priority.asc())
-        )
-        result = await session.execute(stmt)
-        rules = result.scalars().all()
-
-        for rule in rules:
-            match = False
-            match_type = rule.match_type.upper()
-            pattern = rule.match_value.lower()
-            sender_lower = sender_email.lower()
-
-            if match_type in ['EXACT', 'EMAIL']:
-                if sender_lower == pattern:
-                    match = True
-            elif match_type == 'DOMAIN':
-                # Handles both "@domain.com" and "domain.com"
-                domain_pattern = pattern if pattern.startswith('@') else f"@{pattern}"
-                if sender_lower.endswith(domain_pattern):
-                    match = True
-            elif match_type == 'CONTAINS':
-                if pattern in sender_lower:
-                    match = True
-            elif match_type == 'REGEX':
-                try:
-                    if re.search(pattern, sender_lower):
-                        match = True
-                except re.error as e:
-                    logger.error(f"Invalid regex pattern '{pattern}' for rule {rule.id}: {e}")
-
-            if match:
-                logger.info(f"[Resolver] MATCH rule_id={rule.id} type={match_type} value='{rule.match_value}' -> provider_id={rule.provider_id}")
-                return rule.provider_id
+        # 1. Index des règles actives (priorité croissante), partagé avec ProviderResolver
+        index = await smtp_rule_index.get(session)
+        rule = index.match(sender_email)
+        if rule:
+            logger.info(f"[Resolver] MATCH rule_id={rule.id} type={rule.match_type.upper()} value='{rule.match_value}' -> provider_id={rule.provider_id}")
+            return rule.provider_id
 
         # 2. No match found -> Return UNCLASSIFIED
-        unclassified_id = await ClassificationService.get_unclassified_id(session)
+        unclassified_id = index.unclassified_id
         logger.info(f"[Resolver] FALLBACK: No rules matched email {sender_email} -> provider_id={unclassified_id} (UNCLASSIFIED)")
         return unclassified_id
 
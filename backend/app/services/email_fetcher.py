@@ -5,9 +5,9 @@ import json
 import logging
 from datetime import datetime
 from email.header import decode_header
-from sqlalchemy import select
-from app.db.models import Setting, ImportLog, MonitoringProvider
+from app.db.models import ImportLog, MonitoringProvider
 from app.services.provider_resolver import ProviderResolver
+from app.services.settings_cache import settings_cache
 
 class EmailFetcher:
     def __init__(self, db_session=None):
@@ -15,11 +15,8 @@ class EmailFetcher:
         self.resolver = ProviderResolver()
 
     async def get_settings(self):
-        """Fetch all settings as a dict"""
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(select(Setting))
-            settings = {s.key: s.value for s in result.scalars().all()}
-        return settings
+        """Fetch all settings as a dict (cache process, cf. settings_cache)"""
+        return await settings_cache.get_all()
 
     async def fetch_emails(self):
         from app.db.session import AsyncSessionLocal
@@ -0,0 +1,161 @@
+"""
+Moteur de fréquence par import (alerting V3 / B1).
+
+Au lieu d'un COUNT(*) SQL par (event, règle de fréquence), la tranche d'events utile
+(sites du lot, [t_min - horizon, t_max]) est chargée une seule fois. Les comptages
+sont ensuite répondus par bisect sur des tableaux de timestamps triés, construits
+paresseusement par (site, filtre). Toute fenêtre qui dépasse la tranche chargée
+(ou un filtre non reproductible en mémoire) retourne None : l'appelant repasse en SQL.
+"""
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, any_, bindparam, true, String
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Event
+from app.core.config import settings
+from app.utils.text import normalize_text
+
+logger = logging.getLogger("frequency-engine")
+
+# (time, id, normalized_type, category, normalized_message, severity en majuscules)
+EventRow = Tuple[datetime, int, Optional[str], Optional[str], str, str]
+
+
+def keyword_needle(keyword: Optional[str]) -> Optional[str]:
+    """
+    Mot-clé d'une règle ramené à la forme de normalized_message (normalize_text), comme
+    l'évaluation Python (`norm_keyword in message`). None : pas de filtre (mot-clé absent,
+    ou vide une fois normalisé, qui est contenu dans tout message).
+    """
+    return (normalize_text(str(keyword)) or None) if keyword else None
+
+
+def keyword_clause(column, keyword: Optional[str]):
+    """
+    Filtre SQL équivalent : `normalized_message LIKE '%needle%'`, servi par l'index GIN
+    pg_trgm ix_events_normalized_message_trgm. normalize_text ne laisse que [a-z0-9 ] :
+    aucun joker LIKE à échapper.
+    """
+    needle = keyword_needle(keyword)
+    return column.like(f"%{needle}%") if needle else true()
+
+
+class FrequencyEngine:
+    def __init__(self, start: datetime, end: datetime, rows_by_site: Dict[str, List[EventRow]]):
+        self.start = start
+        self.end = end
+        self.rows_by_site = rows_by_site
+        self._times: Dict[tuple, List[datetime]] = {}
+        self.answered = 0
+        self.fallbacks = 0
+
+    @classmethod
+    async def prefetch(
+        cls,
+        session: AsyncSession,
+        events: Iterable,
+        horizon: timedelta,
+        lookahead: timedelta = timedelta(0),
+    ) -> Optional["FrequencyEngine"]:
+        """
+        Charge les events des sites du lot sur [t_min - horizon, t_max + lookahead].
+        (`lookahead` : délai max des séquences, dont le B peut suivre l'event évalué.)
+        Retourne None si le lot est vide ou si la tranche dépasse `frequency_prefetch_max_rows`.
+        """
+        sites = set()
+        times = []
+        for e in events:
+            t = getattr(e, 'time', None) or getattr(e, 'timestamp', None)
+            if t is None or t.tzinfo is None or not getattr(e, 'site_code', None):
+                continue
+            sites.add(e.site_code)
+            times.append(t)
+        if not sites:
+            return None
+
+        start, end = min(times) - horizon, max(times) + lookahead
+        max_rows = int(settings.INGESTION.get('frequency_prefetch_max_rows', 200000))
+        stmt = (
+            select(Event.time, Event.id, Event.normalized_type, Event.category, Event.normalized_message, Event.severity, Event.site_code)
+            .where(Event.site_code == any_(bindparam("sites", type_=ARRAY(String))))
+            .where(Event.time >= start)
+            .where(Event.time <= end)
+            .order_by(Event.time, Event.id)
+            .limit(max_rows + 1)
+        )
+        result = await session.execute(stmt, {"sites": sorted(sites)})
+        rows = result.all()
+        if len(rows) > max_rows:
+            logger.warning(f"[METRIC] frequency_prefetch_skipped rows>{max_rows} sites={len(sites)} horizon={horizon} lookahead={lookahead}")
+            return None
+
+        rows_by_site: Dict[str, List[EventRow]] = {site: [] for site in sites}
+        for r in rows:
+            rows_by_site[r.site_code].append(
+                (r.time, r.id, r.normalized_type, r.category, r.normalized_message or '', (r.severity or '').upper())
+            )
+        logger.info(f"[METRIC] frequency_prefetch rows={len(rows)} sites={len(sites)} horizon={horizon} lookahead={lookahead}")
+        return cls(start, end, rows_by_site)
+
+    def _covers(self, site_code: str, start: datetime, ref: datetime) -> bool:
+        return (
+            site_code in self.rows_by_site
+            and ref.tzinfo is not None
+            and start >= self.start
+            and ref <= self.end
+        )
+
+    def _count(self, site_code: str, key: tuple, predicate, start: datetime, ref: datetime) -> int:
+        times = self._times.get(key)
+        if times is None:
+            times = [row[0] for row in self.rows_by_site[site_code] if predicate(row)]
+            self._times[key] = times
+        self.answered += 1
+        # time >= start AND time <= ref
+        return bisect_right(times, ref) - bisect_left(times, start)
+
+    def count_v3(self, site_code: str, category: Optional[str], keyword: Optional[str], days: int, ref: datetime) -> Optional[int]:
+        """Équivalent de EventRepository.count_v3_matches (open_only=False), ou None hors tranche."""
+        start = ref - timedelta(days=days)
+        if not self._covers(site_code, start, ref):
+            self.fallbacks += 1
+            return None
+        kw = keyword_needle(keyword)
+
+        def predicate(row: EventRow) -> bool:
+            return (
+                row[2] == 'APPARITION'
+                and (not category or row[3] == category)
+                and (not kw or kw in row[4])
+            )
+
+        return self._count(site_code, (site_code, "v3", category or None, kw), predicate, start, ref)
+
+    def count_recent(self, site_code: str, condition_type: Optional[str], value: Optional[str], window_seconds: int, ref: datetime) -> Optional[int]:
+        """Équivalent de EventRepository.count_recent_matches (B1), ou None hors tranche."""
+        start = ref - timedelta(seconds=window_seconds)
+        if (
+            not self._covers(site_code, start, ref)
+            or (condition_type in ('SEVERITY', 'KEYWORD') and value is None)
+        ):
+            self.fallbacks += 1
+            return None
+
+        if condition_type == 'SEVERITY':
+            expected = value.upper()
+            predicate = lambda row: row[5] == expected
+            key = (site_code, "b1-severity", expected)
+        elif condition_type == 'KEYWORD':
+            kw = keyword_needle(value) or ''
+            predicate = lambda row: kw in row[4]
+            key = (site_code, "b1-keyword", kw)
+        else:
+            predicate = lambda row: True
+            key = (site_code, "b1-all")
+
+        return self._count(site_code, key, predicate, start, ref)
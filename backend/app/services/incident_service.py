@@ -2,8 +2,9 @@ import hashlib
 import re
 import logging
 from datetime import datetime
-from typing import List, Optional
-from sqlalchemy import select, update, and_, func
+from typing import List, Optional, Dict, Tuple
+from sqlalchemy import select, update, and_, or_, func
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models import Event, Incident
 
@@ -67,21 +68,163 @@ class IncidentService:
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def process_batch_incidents(self, import_id: int):
-        """
-        Processes events for a specific import to reconstruct incidents.
-        Events are sorted by time and ID to ensure determinism.
-        """
+    async def _load_import_events(self, import_id: int):
         # Fetch events for this import, sorted
         stmt = (
-            select(Event)
+            select(Event.id, Event.time, Event.site_code, Event.raw_message, Event.normalized_type)
             .where(Event.import_id == import_id)
             .where(Event.normalized_type != 'OPERATOR_ACTION')
             .order_by(Event.time.asc(), Event.id.asc())
         )
         result = await self.session.execute(stmt)
-        events = result.scalars().all()
-        
+        return result.all()
+
+    async def process_batch_incidents(self, import_id: int, batch_mode: bool = True):
+        """
+        Processes events for a specific import to reconstruct incidents.
+        Events are sorted by time and ID to ensure determinism.
+
+        batch_mode=True : préchargement des incidents concernés en 1 requête, appariement en
+        mémoire puis INSERT / UPDATE groupés. Même résultat que le mode event par event
+        (batch_mode=False), conservé comme référence.
+        """
+        events = await self._load_import_events(import_id)
+        if not batch_mode:
+            return await self._process_events_sequential(events)
+        return await self._process_events_batch(events)
+
+    async def _process_events_batch(self, events) -> int:
+        if not events:
+            return 0
+
+        keyed = [
+            (e, (e.normalized_type or e.raw_message or "").upper(), self.generate_incident_key(e.site_code, e.raw_message))
+            for e in events
+        ]
+        pairs = {(e.site_code, key) for e, _, key in keyed}
+        close_ids = [e.id for e, action, _ in keyed if "DISPARITION" in action and "APPARITION" not in action]
+
+        # 1. Preload: OPEN incidents + signatures in the batch time range for the (site, key) pairs,
+        #    and incidents already closed by one of the batch events
+        sites = list({p[0] for p in pairs})
+        keys = list({p[1] for p in pairs})
+        t_min = min(e.time for e in events)
+        t_max = max(e.time for e in events)
+        conditions = [
+            and_(
+                Incident.site_code.in_(sites),
+                Incident.incident_key.in_(keys),
+                or_(Incident.status == 'OPEN', Incident.opened_at.between(t_min, t_max)),
+            )
+        ]
+        if close_ids:
+            conditions.append(Incident.close_event_id.in_(close_ids))
+        stmt = select(
+            Incident.id, Incident.site_code, Incident.incident_key, Incident.opened_at,
+            Incident.status, Incident.close_event_id
+        ).where(or_(*conditions))
+        result = await self.session.execute(stmt)
+
+        signatures = set()
+        open_by_pair: Dict[Tuple[str, str], List[dict]] = {}
+        closed_by_event = set()
+        for row in result.all():
+            if row.close_event_id is not None:
+                closed_by_event.add(row.close_event_id)
+            if (row.site_code, row.incident_key) not in pairs:
+                continue
+            signatures.add((row.site_code, row.incident_key, row.opened_at))
+            if row.status == 'OPEN':
+                open_by_pair.setdefault((row.site_code, row.incident_key), []).append(
+                    {"id": row.id, "opened_at": row.opened_at}
+                )
+
+        def latest_open(pair) -> Optional[dict]:
+            # Same pick as get_open_incident (latest opened_at); id breaks ties deterministically
+            candidates = open_by_pair.get(pair)
+            if not candidates:
+                return None
+            return max(candidates, key=lambda inc: (inc["opened_at"], inc["id"] or 0))
+
+        # 2. Pair in memory
+        new_incidents: List[dict] = []
+        closed_updates: List[dict] = []
+        unmatched_close = 0
+
+        for event, action, key in keyed:
+            pair = (event.site_code, key)
+
+            if "APPARITION" in action:
+                if (event.site_code, key, event.time) in signatures:
+                    logger.debug(f"Incident already exists for {event.site_code}:{key} at {event.time}. Skipping.")
+                    continue
+
+                if latest_open(pair) is None:
+                    incident = {
+                        "id": None,
+                        "site_code": event.site_code,
+                        "incident_key": key,
+                        "label": event.raw_message, # Use first msg as label
+                        "opened_at": event.time,
+                        "status": 'OPEN',
+                        "open_event_id": event.id,
+                        "closed_at": None,
+                        "close_event_id": None,
+                        "duration_seconds": None,
+                    }
+                    new_incidents.append(incident)
+                    signatures.add((event.site_code, key, event.time))
+                    open_by_pair.setdefault(pair, []).append(incident)
+                else:
+                    logger.debug(f"Incident already OPEN for {event.site_code}:{key}. Skipping duplicate apparition.")
+
+            elif "DISPARITION" in action:
+                if event.id in closed_by_event:
+                    logger.debug(f"Event {event.id} already closed an incident. Skipping.")
+                    continue
+
+                open_inc = latest_open(pair)
+                if open_inc:
+                    delta = (event.time - open_inc["opened_at"]).total_seconds()
+                    close_values = {
+                        "closed_at": event.time,
+                        "status": 'CLOSED',
+                        "close_event_id": event.id,
+                        "duration_seconds": int(max(0, delta)),
+                    }
+                    open_by_pair[pair].remove(open_inc)
+                    closed_by_event.add(event.id)
+                    if open_inc["id"] is None:
+                        # Opened and closed within this batch: insert it already closed
+                        open_inc.update(close_values)
+                    else:
+                        closed_updates.append({"id": open_inc["id"], **close_values})
+                else:
+                    unmatched_close += 1
+                    logger.debug(f"Unmatched DISPARITION for {event.site_code}:{key}")
+
+        # 3. Bulk writes
+        if new_incidents:
+            rows = [{k: v for k, v in inc.items() if k != "id"} for inc in new_incidents]
+            # 10 bind params per row
+            for start in range(0, len(rows), 3000):
+                await self.session.execute(
+                    insert(Incident).values(rows[start:start + 3000]).on_conflict_do_nothing(
+                        constraint='uq_incident_unique'
+                    )
+                )
+        if closed_updates:
+            # ORM bulk UPDATE by primary key (executemany)
+            await self.session.execute(update(Incident), closed_updates)
+
+        logger.info(
+            f"[METRIC] incidents_batch events={len(events)} opened={len(new_incidents)} "
+            f"closed={len(closed_updates) + sum(1 for i in new_incidents if i['status'] == 'CLOSED')} unmatched_close={unmatched_close}"
+        )
+        return unmatched_close
+
+    async def _process_events_sequential(self, events) -> int:
+        """Chemin historique event par event (jusqu'à 3 SELECT + 1 flush par event)."""
         unmatched_close = 0
         
         for event in events:
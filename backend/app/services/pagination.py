@@ -0,0 +1,128 @@
+"""
+Pagination par curseur (keyset) et comptages optionnels des listings.
+
+Mode "cursor" : la page suivante reprend après la dernière clé vue,
+`WHERE (time, id) < (:t, :id) ORDER BY time DESC, id DESC LIMIT n` : coût constant
+quelle que soit la profondeur, contrairement à OFFSET qui relit toutes les lignes
+sautées. Le curseur est opaque pour le client (base64 url-safe des valeurs de clé).
+
+Comptage (`count`) :
+  - "exact"    : SELECT count(*) sur la requête filtrée (comportement historique) ;
+  - "estimate" : estimation du planner (EXPLAIN, statistiques pg_class.reltuples /
+                 pg_statistic), sans lire la table ;
+  - "none"     : pas de total.
+"""
+import base64
+import json
+import logging
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+logger = logging.getLogger("pagination")
+
+PAGINATION_MODES = ("offset", "cursor")
+COUNT_MODES = ("exact", "estimate", "none")
+# Validation des paramètres de requête (Query(pattern=...))
+PAGINATION_PATTERN = f"^({'|'.join(PAGINATION_MODES)})$"
+COUNT_PATTERN = f"^({'|'.join(COUNT_MODES)})$"
+
+
+class InvalidCursor(ValueError):
+    """Curseur illisible ou ne correspondant pas au tri demandé."""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = [_decode_value(v) for v in json.loads(raw)]
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor(f"Invalid cursor: {e}") from e
+    if len(values) != size or not all(isinstance(v, (str, int, float, datetime)) for v in values):
+        raise InvalidCursor("Cursor does not match the requested sort")
+    return values
+
+
+def keyset(stmt, keys: Sequence, descending: bool, cursor: Optional[str], limit: int):
+    """Ajoute au SELECT le filtre après le curseur, le tri sur `keys` et LIMIT limit + 1 (détection de page suivante)."""
+    if cursor:
+        after = tuple_(*[literal(value, key.type) for key, value in zip(keys, decode_cursor(cursor, len(keys)))])
+        position = tuple_(*keys)
+        stmt = stmt.where(position < after if descending else position > after)
+    order = [key.desc() if descending else key.asc() for key in keys]
+    return stmt.order_by(None).order_by(*order).limit(limit + 1)
+
+
+def next_page(rows: Sequence, limit: int, key_of: Callable[[Any], Tuple]) -> Tuple[List, Optional[str]]:
+    """(lignes de la page, curseur de la suivante ou None)."""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(key_of(rows[-1]))
+
+
+async def fetch_keyset_page(
+    session: AsyncSession,
+    stmt,
+    keys: Sequence,
+    descending: bool,
+    cursor: Optional[str],
+    limit: int,
+    key_of: Callable[[Any], Tuple],
+    scalars: bool = False,
+) -> Tuple[List, Optional[str]]:
+    """Exécute une page keyset de `stmt`. Lève InvalidCursor si le curseur est invalide."""
+    result = await session.execute(keyset(stmt, keys, descending, cursor, limit))
+    rows = result.scalars().all() if scalars else result.all()
+    return next_page(rows, limit, key_of)
+
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, stmt):
+        self.statement = stmt
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def estimate_count(session: AsyncSession, stmt) -> int:
+    """Nombre de lignes estimé par le planner pour `stmt` (non paginé)."""
+    plan = (await session.execute(_Explain(stmt.order_by(None)))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_rows(session: AsyncSession, stmt, mode: str = "exact") -> Optional[int]:
+    """Total de la requête filtrée selon `mode` (exact | estimate | none)."""
+    if mode == "none":
+        return None
+    if mode == "estimate":
+        return await estimate_count(session, stmt)
+    return (await session.execute(select(func.count()).select_from(stmt.order_by(None).subquery()))).scalar() or 0
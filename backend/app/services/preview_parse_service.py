@@ -8,7 +8,8 @@ from sqlalchemy import select
 
 from app.ingestion.worker import detect_file_format
 from app.parsers.factory import ParserFactory
-from app.ingestion.profile_manager import ProfileManager
+from app.parsers.executor import parser_executor
+from app.ingestion.profile_manager import ProfileManager, filename_matches
 from app.db.models import MonitoringProvider, DBIngestionProfile
 from app.schemas.response_models import ImportQualitySummary
 
@@ -30,20 +31,17 @@ class PreviewParseService:
         detected_kind = detect_file_format(file_path)
         
         await profile_manager.load_profiles(db)
-        profiles = profile_manager.list_profiles()
         
         # 1. Match Profile
         matched_profile = None
-        sorted_profiles = sorted(profiles, key=lambda x: x.priority, reverse=True)
+        sorted_profiles = profile_manager.list_by_priority()
         
         for p in sorted_profiles:
             if p.format_kind != detected_kind:
                 continue
             
             # Simple matching logic similar to worker
-            filename_match = False
-            if p.filename_regex and re.search(p.filename_regex, filename, re.IGNORECASE):
-                filename_match = True
+            filename_match = filename_matches(p.filename_regex, filename)
             
             provider_match = (provider_code and p.provider_code == provider_code)
             
@@ -70,7 +68,8 @@ class PreviewParseService:
         if not parser:
              return {"success": False, "error": f"No parser for {matched_profile.format_kind}"}
 
-        parsed_events = parser.parse(
+        parsed_events = await parser_executor.parse(
+            parser,
             str(file_path),
             source_timezone=matched_profile.source_timezone,
             parser_config={
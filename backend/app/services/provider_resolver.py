@@ -1,14 +1,14 @@
 """
 Provider Resolver: Résolution du télésurveilleur depuis l'email expéditeur SMTP.
-Ordre de priorité: EXACT > DOMAIN > REGEX, puis par priority DESC.
+Même index et même ordre que ClassificationService (SmtpRuleIndex : priorité croissante).
 """
-import re
 import logging
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.db.models import SmtpProviderRule, MonitoringProvider
+from app.db.models import MonitoringProvider
+from app.services.smtp_rule_index import SmtpRuleEntry, smtp_rule_index
 
 logger = logging.getLogger("provider-resolver")
 
@@ -20,7 +20,7 @@ class ProviderResolver:
         self, 
         from_email: str, 
         db: AsyncSession
-    ) -> Optional[SmtpProviderRule]:
+    ) -> Optional[SmtpRuleEntry]:
         """
         Résout la règle SMTP correspondante depuis l'email expéditeur.
         
@@ -29,56 +29,17 @@ class ProviderResolver:
             db: Session DB async
             
         Returns:
-            SmtpProviderRule si trouvé, None sinon
+            SmtpRuleEntry (id, provider_id, match_type, match_value, priority) si trouvé, None sinon
         """
         if not from_email:
             return None
             
-        from_email_lower = from_email.lower().strip()
-        
-        # Extraire le domaine
-        domain = None
-        if '@' in from_email_lower:
-            domain = from_email_lower.split('@')[1]
-        
-        # Récupérer toutes les règles actives, triées par priorité DESC
-        stmt = (
-            select(SmtpProviderRule)
-            .where(SmtpProviderRule.is_active == True)
-            .order_by(SmtpProviderRule.priority.desc())
-        )
-        result = await db.execute(stmt)
-        rules = result.scalars().all()
-        
-        # Séparer par type pour respecter l'ordre EXACT > DOMAIN > REGEX
-        exact_rules = [r for r in rules if r.match_type == 'EXACT']
-        domain_rules = [r for r in rules if r.match_type == 'DOMAIN']
-        regex_rules = [r for r in rules if r.match_type == 'REGEX']
-        
-        # 1. EXACT match
-        for rule in exact_rules:
-            if from_email_lower == rule.match_value.lower():
-                logger.debug(f"EXACT match: {from_email} -> rule_id={rule.id}")
-                return rule
-        
-        # 2. DOMAIN match
-        if domain:
-            for rule in domain_rules:
-                # match_value stocke le domaine sans @ (ex: spgo.fr)
-                if domain == rule.match_value.lower():
-                    logger.debug(f"DOMAIN match: {from_email} -> rule_id={rule.id}")
-                    return rule
-        
-        # 3. REGEX match
-        for rule in regex_rules:
-            try:
-                if re.search(rule.match_value, from_email_lower, re.IGNORECASE):
-                    logger.debug(f"REGEX match: {from_email} -> rule_id={rule.id}")
-                    return rule
-            except re.error as e:
-                logger.warning(f"Invalid regex in rule {rule.id}: {e}")
-                continue
-        
+        index = await smtp_rule_index.get(db)
+        rule = index.match(from_email.strip())
+        if rule:
+            logger.debug(f"{rule.match_type} match: {from_email} -> rule_id={rule.id}")
+            return rule
+
         logger.debug(f"No provider match for: {from_email}")
         return None
     
@@ -1,10 +1,11 @@
 import logging
 import pytz
-from typing import List, Dict, Optional
+from types import SimpleNamespace
+from typing import List, Dict, Optional, Union
 from datetime import datetime, timedelta, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, func
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import select, update, func, any_, bindparam, String
+from sqlalchemy.dialects.postgresql import insert, ARRAY
 from app.db.models import (
     Event, Site, ImportLog, AlertRule, EventRuleHit, SiteConnection, 
     RuleCondition, AuditLog, ProfileRevision, ReprocessJob, DBIngestionProfile,
@@ -12,12 +13,58 @@ from app.db.models import (
 )
 from app.ingestion.models import NormalizedEvent
 from app.ingestion.normalizer import normalize_site_code
+from app.utils.text import normalize_text
+from app.core.config import settings
+from app.services.site_cache import site_id_cache, stage_created_sites
+from app.services import alert_state, rollups
+from app.services.pagination import count_rows, fetch_keyset_page
+from app.services.frequency_engine import FrequencyEngine, keyword_clause
+from app.services.sequence_engine import SequenceEngine, FALLBACK as SEQUENCE_FALLBACK
 
 logger = logging.getLogger("db-repository")
 
+
+class InsertedEvent(SimpleNamespace):
+    """
+    Ligne `events` insérée en mode bulk : mêmes attributs que le modèle Event
+    (colonnes + id) mais sans état ORM ni identity map. Suffisant pour
+    l'alerting, le moteur de règles et les rapports qui suivent l'insertion.
+    """
+
 class EventRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
+        # Tranche d'events préchargée pour l'alerting d'un import (voir prefetch_alerting_window)
+        self.frequency_engine: Optional[FrequencyEngine] = None
+        self.sequence_engine: Optional[SequenceEngine] = None
+
+    async def prefetch_alerting_window(
+        self, events: List, horizon: timedelta, lookahead: timedelta = timedelta(0)
+    ) -> Optional[FrequencyEngine]:
+        """
+        Précharge une fois par lot les events des sites concernés sur `horizon` (+ `lookahead`) :
+        count_v3_matches / count_recent_matches / find_sequence_match y répondent ensuite
+        sans requête, et ne retombent en SQL qu'au-delà de la tranche chargée.
+        """
+        max_days = float(settings.INGESTION.get('frequency_prefetch_max_days', 7))
+        horizon = min(horizon, timedelta(days=max_days))
+        lookahead = min(lookahead, timedelta(days=max_days))
+        self.frequency_engine = self.sequence_engine = None
+        if events and (horizon > timedelta(0) or lookahead > timedelta(0)):
+            self.frequency_engine = await FrequencyEngine.prefetch(self.session, events, horizon, lookahead)
+        if self.frequency_engine is not None:
+            engine = self.frequency_engine
+            self.sequence_engine = SequenceEngine(engine.start, engine.end, engine.rows_by_site)
+        return self.frequency_engine
+
+    def release_alerting_window(self):
+        engine, self.frequency_engine = self.frequency_engine, None
+        seq_engine, self.sequence_engine = self.sequence_engine, None
+        if engine is not None:
+            logger.info(
+                f"[METRIC] alerting_window frequency_answered={engine.answered} frequency_sql={engine.fallbacks} "
+                f"sequence_answered={seq_engine.answered} sequence_sql={seq_engine.fallbacks}"
+            )
 
     async def get_monitoring_provider(self, provider_id: int) -> Optional[MonitoringProvider]:
         if not provider_id:
@@ -38,6 +85,17 @@ class EventRepository:
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
+    async def get_import_events_page(self, import_id: int, after_id: int = 0, limit: int = 5000) -> List[Event]:
+        """Events d'un import par pages (keyset sur id, ordre d'insertion)."""
+        stmt = (
+            select(Event)
+            .where(Event.import_id == import_id, Event.id > after_id)
+            .order_by(Event.id.asc())
+            .limit(limit)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
     async def get_or_create_site(self, code_client: str, secondary_code: Optional[str] = None) -> Site:
         # Cache layer could go here if needed
         stmt = select(Site).where(Site.code_client == code_client)
@@ -58,6 +116,60 @@ class EventRepository:
         
         return site
 
+    async def resolve_site_ids(self, codes: Dict[str, Optional[str]]) -> Dict[str, int]:
+        """
+        Résolution ensembliste code_client -> site_id pour un lot (remplace la boucle get_or_create_site).
+        1. LRU process-wide (site_id_cache)
+        2. un SELECT ... WHERE code_client = ANY(:codes)
+        3. un INSERT ... ON CONFLICT DO NOTHING RETURNING pour les codes inconnus
+           (+ re-SELECT des codes créés en parallèle par un autre worker)
+        `codes` : code_client -> secondary_code.
+        """
+        site_map = site_id_cache.get_many(codes.keys())
+        missing = [c for c in codes if c not in site_map]
+        if not missing:
+            return site_map
+
+        any_codes = bindparam("codes", type_=ARRAY(String))
+        select_stmt = select(Site.code_client, Site.id).where(Site.code_client == any_(any_codes))
+
+        result = await self.session.execute(select_stmt, {"codes": missing})
+        found = {code: site_id for code, site_id in result.all()}
+        site_id_cache.put_many(found)
+        site_map.update(found)
+
+        to_create = [c for c in missing if c not in found]
+        if to_create:
+            logger.warning(f"Unknown Sites detected: {len(to_create)} ({', '.join(to_create[:10])}). Creating on the fly.")
+            insert_stmt = (
+                insert(Site)
+                .values([
+                    {
+                        "code_client": code,
+                        "secondary_code": codes[code],
+                        "name": f"Site {code}", # Fallback name
+                        "status": 'UNKNOWN',
+                    }
+                    for code in to_create
+                ])
+                .on_conflict_do_nothing(index_elements=["code_client"])
+                .returning(Site.code_client, Site.id)
+            )
+            result = await self.session.execute(insert_stmt)
+            created = {code: site_id for code, site_id in result.all()}
+            # Only published to the shared cache once the transaction commits
+            stage_created_sites(self.session.sync_session, created)
+            site_map.update(created)
+
+            raced = [c for c in to_create if c not in created]
+            if raced:
+                result = await self.session.execute(select_stmt, {"codes": raced})
+                concurrent = {code: site_id for code, site_id in result.all()}
+                site_id_cache.put_many(concurrent)
+                site_map.update(concurrent)
+
+        return site_map
+
     async def get_import_by_hash(self, file_hash: str) -> Optional[ImportLog]:
         stmt = select(ImportLog).where(ImportLog.file_hash == file_hash).order_by(ImportLog.created_at.desc()).limit(1)
         result = await self.session.execute(stmt)
@@ -153,6 +265,11 @@ class EventRepository:
         from datetime import timedelta
         # Calculate cutoff time
         ref = reference_time or datetime.utcnow()
+        if self.frequency_engine is not None:
+            count = self.frequency_engine.count_recent(site_code, condition_type, value, window_seconds, ref)
+            if count is not None:
+                return count
+
         cutoff = ref - timedelta(seconds=window_seconds)
         
         stmt = select(func.count(Event.id)).where(Event.time >= cutoff)
@@ -166,7 +283,7 @@ class EventRepository:
         if condition_type == 'SEVERITY':
              stmt = stmt.where(func.upper(Event.severity) == value.upper())
         elif condition_type == 'KEYWORD':
-             stmt = stmt.where(Event.raw_message.ilike(f"%{value}%"))
+             stmt = stmt.where(keyword_clause(Event.normalized_message, value))
              
         result = await self.session.execute(stmt)
         return result.scalar() or 0
@@ -174,15 +291,14 @@ class EventRepository:
     async def record_rule_hit(self, event_id: int, rule_id: int, rule_name: str, hit_metadata: Optional[dict] = None):
         """
         Record that a specific rule matched an event. 
-        Idempotent via unique index (event_id, rule_id).
+        Idempotent via unique index (event_id, rule_id). Met à jour alert_state.
         """
-        from sqlalchemy.dialects.postgresql import insert
-        stmt = insert(EventRuleHit).values(
+        stmt = alert_state.insert_hits_statement([dict(
             event_id=event_id,
             rule_id=rule_id,
             rule_name=rule_name,
             hit_metadata=hit_metadata
-        ).on_conflict_do_nothing(index_elements=['event_id', 'rule_id'])
+        )])
         
         await self.session.execute(stmt)
         # Note: Do not commit here, handled by caller (e.g. at end of batch)
@@ -216,10 +332,14 @@ class EventRepository:
         conditions = result.scalars().all()
         return {c.code: c for c in conditions}
 
-    async def get_events_for_rule(self, rule_id: int, page: int = 1, limit: int = 50):
+    async def get_events_for_rule(
+        self, rule_id: int, page: int = 1, limit: int = 50,
+        cursor: Optional[str] = None, pagination: str = "offset", count: str = "exact",
+    ):
         """
         Drill-down: Fetch events that triggered a specific rule.
-        Returns (items, total).
+        Returns (items, total, next_cursor).
+        pagination="cursor" : keyset sur (created_at, id) du hit ; count : exact | estimate | none.
         """
         from app.db.models import EventRuleHit, MonitoringProvider
         
@@ -227,6 +347,7 @@ class EventRepository:
         stmt = (
             select(
                 Event,
+                EventRuleHit.id.label("hit_id"),
                 EventRuleHit.created_at.label("matched_at"),
                 EventRuleHit.hit_metadata.label("hit_metadata"),
                 MonitoringProvider.label.label("provider_label")
@@ -239,12 +360,18 @@ class EventRepository:
         )
         
         # Pagination
-        count_stmt = select(func.count()).select_from(stmt.subquery())
-        total = await self.session.scalar(count_stmt)
-        
-        stmt = stmt.offset((page - 1) * limit).limit(limit)
-        result = await self.session.execute(stmt)
-        rows = result.all()
+        total = await count_rows(self.session, stmt, count)
+
+        next_cursor = None
+        if pagination == "cursor":
+            rows, next_cursor = await fetch_keyset_page(
+                self.session, stmt, [EventRuleHit.created_at, EventRuleHit.id], True, cursor, limit,
+                key_of=lambda r: (r.matched_at, r.hit_id),
+            )
+        else:
+            stmt = stmt.offset((page - 1) * limit).limit(limit)
+            result = await self.session.execute(stmt)
+            rows = result.all()
         
         items = []
         for r in rows:
@@ -255,7 +382,7 @@ class EventRepository:
             evt.provider_label = r.provider_label
             items.append(evt)
             
-        return items, total or 0
+        return items, total, next_cursor
 
     async def count_v3_matches(
         self,
@@ -272,6 +399,12 @@ class EventRepository:
         """
         ref = reference_time or datetime.utcnow()
         start_date = ref - timedelta(days=days)
+
+        # Comptage en mémoire sur la tranche préchargée (open_only dépend des incidents : SQL)
+        if self.frequency_engine is not None and not open_only:
+            count = self.frequency_engine.count_v3(site_code, category, keyword, days, ref)
+            if count is not None:
+                return count
         
         if open_only:
             # Join Incidents with their opening Events
@@ -288,7 +421,7 @@ class EventRepository:
             if category:
                 stmt = stmt.where(Event.category == category)
             if keyword:
-                stmt = stmt.where(Event.raw_message.ilike(f"%{keyword}%"))
+                stmt = stmt.where(keyword_clause(Event.normalized_message, keyword))
             
             # Action constraint (APPARITION only for V3 counting)
             stmt = stmt.where(Event.normalized_type == 'APPARITION')
@@ -304,7 +437,7 @@ class EventRepository:
             if category:
                 stmt = stmt.where(Event.category == category)
             if keyword:
-                stmt = stmt.where(Event.raw_message.ilike(f"%{keyword}%"))
+                stmt = stmt.where(keyword_clause(Event.normalized_message, keyword))
                 
         result = await self.session.execute(stmt)
         return result.scalar() or 0
@@ -324,6 +457,13 @@ class EventRepository:
         Step 6: Finds if an event A is followed by event B within max_delay_seconds.
         """
         ref = reference_time or datetime.utcnow()
+        if self.sequence_engine is not None:
+            match = self.sequence_engine.find(
+                site_code, a_cat, a_key, b_cat, b_key, max_delay_seconds, lookback_days, ref
+            )
+            if match is not SEQUENCE_FALLBACK:
+                return match
+
         lookback_start = ref - timedelta(days=lookback_days)
         
         # We manually build the query to handle the complex self-join and filters
@@ -353,13 +493,13 @@ class EventRepository:
         if a_cat:
             stmt = stmt.where(EvA.category == a_cat)
         if a_key:
-            stmt = stmt.where(EvA.raw_message.ilike(f"%{a_key}%"))
+            stmt = stmt.where(keyword_clause(EvA.normalized_message, a_key))
             
         # B Filters
         if b_cat:
             stmt = stmt.where(EvB.category == b_cat)
         if b_key:
-            stmt = stmt.where(EvB.raw_message.ilike(f"%{b_key}%"))
+            stmt = stmt.where(keyword_clause(EvB.normalized_message, b_key))
             
         # Determinism
         stmt = stmt.order_by(EvA.time.asc(), EvA.id.asc(), EvB.time.asc(), EvB.id.asc()).limit(1)
@@ -376,49 +516,81 @@ class EventRepository:
             }
         return None
 
-    async def create_batch(self, events: List[NormalizedEvent], import_id: Optional[int] = None) -> List[Event]:
+    async def create_batch(
+        self, events: List[NormalizedEvent], import_id: Optional[int] = None, mode: Optional[str] = None
+    ) -> List[Union[Event, InsertedEvent]]:
+        """
+        Insère un lot d'events.
+        - mode "orm"  : objets Event ajoutés à la session (ids après flush).
+        - mode "bulk" : INSERT ... RETURNING id multi-lignes par chunks, ids immédiats,
+                        retourne des InsertedEvent (pas d'hydratation ORM).
+        Le mode par défaut vient de `ingestion.event_insert_mode`.
+        """
         if not events:
             return []
             
         # 1. Resolve Site UUIDs
         # Optimization: distinct sites only
         unique_site_codes = {e.site_code: e.secondary_code for e in events}
-        site_map = {} # Code -> ID
-        
-        for code, sec in unique_site_codes.items():
-            site = await self.get_or_create_site(code, sec)
-            site_map[code] = site.id
-            
-        # 2. Build Event Models
-        db_events = []
-        for e in events:
-            db_events.append(Event(
-                time=e.timestamp,
-                site_id=site_map.get(e.site_code),
-                site_code=e.site_code,
-                site_code_raw=e.site_code_raw,
-                client_name=e.client_name,
-                weekday_label=e.weekday_label,
-                # zone_id handled later
-                import_id=import_id,
-                raw_message=e.raw_message,
-                normalized_message=e.normalized_message,
-                raw_code=e.raw_code,
-                normalized_code=e.normalized_code,
-                normalized_type=e.normalized_type or e.event_type, # Prefer normalized
-                sub_type=e.sub_type,
-                severity=e.status, 
-                zone_label=e.zone_label,
-                event_metadata=e.metadata, # Pydantic model has 'metadata', DB has 'event_metadata'
-                source_file=e.source_file,
-                dup_count=e.dup_count or 0,
-                raw_data=e.raw_data,
-                category=e.category,
-                alertable_default=e.alertable_default
-            ))
+        site_map = await self.resolve_site_ids(unique_site_codes) # Code -> ID
             
-        self.session.add_all(db_events)
-        return db_events
+        # 2. Build Event rows
+        rows = [self._event_row(e, site_map.get(e.site_code), import_id) for e in events]
+
+        mode = (mode or settings.INGESTION.get("event_insert_mode", "orm")).lower()
+        if mode == "bulk":
+            inserted = await self._insert_events_bulk(rows)
+        else:
+            inserted = [Event(**row) for row in rows]
+            self.session.add_all(inserted)
+
+        # 3. DISPARITION : ferme les alertes du site / de la zone (alert_disparition_state)
+        await alert_state.apply_disparitions(self.session, rows)
+        return inserted
+
+    @staticmethod
+    def _event_row(e: NormalizedEvent, site_id: Optional[int], import_id: Optional[int]) -> dict:
+        return dict(
+            time=e.timestamp,
+            site_id=site_id,
+            site_code=e.site_code,
+            site_code_raw=e.site_code_raw,
+            client_name=e.client_name,
+            weekday_label=e.weekday_label,
+            # zone_id handled later
+            import_id=import_id,
+            raw_message=e.raw_message,
+            # Toujours renseigné : seule colonne des filtres mot-clé SQL (index pg_trgm)
+            normalized_message=e.normalized_message or normalize_text(e.raw_message),
+            raw_code=e.raw_code,
+            normalized_code=e.normalized_code,
+            normalized_type=e.normalized_type or e.event_type, # Prefer normalized
+            sub_type=e.sub_type,
+            severity=e.status, 
+            zone_label=e.zone_label,
+            event_metadata=e.metadata, # Pydantic model has 'metadata', DB has 'event_metadata'
+            source_file=e.source_file,
+            dup_count=e.dup_count or 0,
+            raw_data=e.raw_data,
+            category=e.category,
+            alertable_default=e.alertable_default
+        )
+
+    async def _insert_events_bulk(self, rows: List[dict]) -> List[InsertedEvent]:
+        """
+        Multi-row INSERT ... RETURNING id par chunks (insertmanyvalues).
+        sort_by_parameter_order garantit que les ids reviennent dans l'ordre des lignes.
+        """
+        chunk_size = int(settings.INGESTION.get("event_insert_chunk_size", 1000))
+        stmt = insert(Event).returning(Event.id, sort_by_parameter_order=True)
+
+        inserted = []
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            result = await self.session.execute(stmt, chunk)
+            for row, event_id in zip(chunk, result.scalars().all()):
+                inserted.append(InsertedEvent(id=event_id, zone_id=None, in_maintenance=False, created_at=None, **row))
+        return inserted
     
     async def populate_site_connections(
         self, 
@@ -504,6 +676,58 @@ class EventRepository:
             # Flush to ensure it's in the DB within the transaction
             await self.session.flush()
 
+    async def upsert_site_connections(self, provider_id: int, events: list) -> int:
+        """
+        Version ensembliste de upsert_site_connection pour tout un import.
+        Les events sont agrégés en mémoire par (provider_id, code_site canonique) puis écrits
+        en un seul INSERT ... ON CONFLICT DO UPDATE (total_events + n, last_seen_at GREATEST).
+        Compteurs identiques à l'appel event par event :
+        - total_events : +1 par event
+        - first_seen_at : 1er event du lot (création uniquement)
+        - client_name : dernier client_name non vide du lot, sinon inchangé
+        Retourne le nombre de connexions touchées.
+        """
+        groups: Dict[str, dict] = {}
+        for e in events:
+            code_site = normalize_site_code(e.site_code)
+            seen_at = e.time
+            g = groups.get(code_site)
+            if g is None:
+                groups[code_site] = {
+                    "provider_id": provider_id,
+                    "code_site": code_site,
+                    "client_name": e.client_name,
+                    "first_seen_at": seen_at,
+                    "last_seen_at": seen_at,
+                    "total_events": 1,
+                }
+                continue
+            g["total_events"] += 1
+            if seen_at > g["last_seen_at"]:
+                g["last_seen_at"] = seen_at
+            if e.client_name:
+                g["client_name"] = e.client_name
+
+        if not groups:
+            return 0
+
+        # Stable key order: concurrent workers lock rows in the same order
+        rows = [groups[k] for k in sorted(groups)]
+        # 6 bind params per row, stay well under the 32767 asyncpg limit
+        chunk_size = 2000
+        for start in range(0, len(rows), chunk_size):
+            stmt = insert(SiteConnection).values(rows[start:start + chunk_size])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[SiteConnection.provider_id, SiteConnection.code_site],
+                set_={
+                    "total_events": func.coalesce(SiteConnection.total_events, 0) + stmt.excluded.total_events,
+                    "last_seen_at": func.greatest(SiteConnection.last_seen_at, stmt.excluded.last_seen_at),
+                    "client_name": func.coalesce(func.nullif(stmt.excluded.client_name, ''), SiteConnection.client_name),
+                }
+            )
+            await self.session.execute(stmt)
+        return len(rows)
+
     async def get_business_summary(self):
         """Totals by provider"""
         stmt = (
@@ -528,17 +752,11 @@ class EventRepository:
         )
         await self.session.execute(stmt)
 
-    async def get_ingestion_health_summary(self, target_date: datetime) -> List[Dict]:
-        """
-        Aggregates ingestion metrics per provider for a given date.
-        """
-        from sqlalchemy import cast, Numeric, func as f
-        
-        start_date = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=1)
+    def _import_stats_stmt(self, start_date: datetime, end_date: datetime):
+        """Agrégat par provider des imports créés dans [start_date, end_date) (tables brutes)."""
+        from sqlalchemy import cast, Numeric
 
-        # Subquery for aggregation
-        stats_stmt = (
+        return (
             select(
                 ImportLog.provider_id,
                 func.count(ImportLog.id).label("total_imports"),
@@ -576,6 +794,30 @@ class EventRepository:
             .group_by(ImportLog.provider_id)
         ).subquery()
 
+    async def get_ingestion_health_summary(self, target_date: datetime) -> List[Dict]:
+        """
+        Aggregates ingestion metrics per provider for a given date.
+        """
+        start_date = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        end_date = start_date + timedelta(days=1)
+
+        # Jour clos déjà rafraîchi : lecture de la vue quotidienne, sinon agrégat sur imports
+        if await rollups.daily_view_covers(self.session, rollups.IMPORT_STATS_VIEW, end_date):
+            daily = rollups.import_stats_daily
+            stats_stmt = (
+                select(
+                    daily.c.provider_id,
+                    *[func.sum(daily.c[name]).label(name) for name in (
+                        "total_imports", "total_emails", "total_xls", "total_pdf", "total_events",
+                        "integrity_numerator", "integrity_denominator", "missing_pdf",
+                    )]
+                )
+                .where(daily.c.day >= start_date, daily.c.day < end_date)
+                .group_by(daily.c.provider_id)
+            ).subquery()
+        else:
+            stats_stmt = self._import_stats_stmt(start_date, end_date)
+
         # Final query joining with ALL active providers
         stmt = (
             select(
@@ -626,29 +868,38 @@ class EventRepository:
         """
         Agrège les déclenchements de règles par règle et par provider pour une date donnée.
         """
-        from sqlalchemy import distinct
-        
         start_date = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
         end_date = start_date + timedelta(days=1)
 
-        # On rejoint event_rule_hits -> events -> imports pour avoir le provider_id
-        stmt = (
-            select(
-                EventRuleHit.rule_id,
-                EventRuleHit.rule_name,
-                ImportLog.provider_id,
-                func.count(EventRuleHit.id).label("total_triggers"),
-                func.count(func.distinct(Event.site_code)).label("distinct_sites"),
-                func.max(EventRuleHit.created_at).label("last_trigger_at")
-            )
-            .join(Event, EventRuleHit.event_id == Event.id)
-            .join(ImportLog, Event.import_id == ImportLog.id)
-            .where(
-                EventRuleHit.created_at >= start_date,
-                EventRuleHit.created_at < end_date
+        if await rollups.daily_view_covers(self.session, rollups.RULE_HITS_VIEW, end_date):
+            daily = rollups.rule_hits_daily
+            stmt = select(
+                daily.c.rule_id,
+                daily.c.rule_name,
+                daily.c.provider_id,
+                daily.c.total_triggers,
+                daily.c.distinct_sites,
+                daily.c.last_trigger_at
+            ).where(daily.c.day >= start_date, daily.c.day < end_date)
+        else:
+            # On rejoint event_rule_hits -> events -> imports pour avoir le provider_id
+            stmt = (
+                select(
+                    EventRuleHit.rule_id,
+                    EventRuleHit.rule_name,
+                    ImportLog.provider_id,
+                    func.count(EventRuleHit.id).label("total_triggers"),
+                    func.count(func.distinct(Event.site_code)).label("distinct_sites"),
+                    func.max(EventRuleHit.created_at).label("last_trigger_at")
+                )
+                .join(Event, EventRuleHit.event_id == Event.id)
+                .join(ImportLog, Event.import_id == ImportLog.id)
+                .where(
+                    EventRuleHit.created_at >= start_date,
+                    EventRuleHit.created_at < end_date
+                )
+                .group_by(EventRuleHit.rule_id, EventRuleHit.rule_name, ImportLog.provider_id)
             )
-            .group_by(EventRuleHit.rule_id, EventRuleHit.rule_name, ImportLog.provider_id)
-        )
 
         result = await self.session.execute(stmt)
         rows = result.all()
@@ -672,6 +923,42 @@ class EventRepository:
             
         return summary
 
+    async def get_site_event_stats(self, site_code: str, since: datetime) -> Dict:
+        """
+        Volumétrie d'un site : events depuis `since`, total et dernier event.
+        Lu dans le continuous aggregate horaire quand il existe (heures pleines), la
+        première heure partielle [since, heure pleine suivante) étant comptée sur events.
+        """
+        if not await rollups.hourly_events_available(self.session):
+            events_count = await self.session.scalar(
+                select(func.count(Event.id)).where(Event.site_code == site_code, Event.time >= since)
+            )
+            total_events, last_event_at = (await self.session.execute(
+                select(func.count(Event.id), func.max(Event.time)).where(Event.site_code == site_code)
+            )).one()
+            return {"events_count": events_count or 0, "total_events": total_events or 0, "last_event_at": last_event_at}
+
+        hourly = rollups.events_hourly
+        boundary = rollups.hour_ceil(since)
+        row = (await self.session.execute(
+            select(
+                func.sum(hourly.c.events).filter(hourly.c.bucket >= boundary).label("recent"),
+                func.sum(hourly.c.events).label("total"),
+                func.max(hourly.c.last_time).label("last_event_at"),
+            ).where(hourly.c.site_code == site_code)
+        )).one()
+        partial = 0
+        if boundary > since:
+            partial = await self.session.scalar(
+                select(func.count(Event.id))
+                .where(Event.site_code == site_code, Event.time >= since, Event.time < boundary)
+            ) or 0
+        return {
+            "events_count": int(row.recent or 0) + partial,
+            "total_events": int(row.total or 0),
+            "last_event_at": row.last_event_at,
+        }
+
 class AdminRepository:
     async def update_provider_monitoring(self, provider_id: int, data: dict) -> Optional[MonitoringProvider]:
         stmt = select(MonitoringProvider).where(MonitoringProvider.id == provider_id)
@@ -754,7 +1041,11 @@ class AdminRepository:
         """
         from sqlalchemy import delete
         from app.db.models import Incident, Event, EventRuleHit, ImportLog
-        
+
+        sites = await alert_state.sites_of_import(self.session, import_id)
+        hit_days = await rollups.days_of_hits(self.session, Event.import_id == import_id)
+        import_days = await rollups.days_of_imports(self.session, ImportLog.id == import_id)
+
         # 1. Delete EventRuleHit
         hit_stmt = delete(EventRuleHit).where(EventRuleHit.event_id.in_(
             select(Event.id).where(Event.import_id == import_id)
@@ -772,6 +1063,7 @@ class AdminRepository:
         # 3. Delete Events
         evt_stmt = delete(Event).where(Event.import_id == import_id)
         await self.session.execute(evt_stmt)
+        await alert_state.refresh_sites(self.session, sites)
         
         # 4. Reset ImportLog status
         log_stmt = update(ImportLog).where(ImportLog.id == import_id).values(
@@ -781,6 +1073,8 @@ class AdminRepository:
             error_message=None
         )
         await self.session.execute(log_stmt)
+        # Jours anciens : le job horaire ne les recalcule plus
+        await rollups.refresh_days(self.session, import_days, hit_days)
 
     async def get_providers_health(self) -> List[dict]:
         """Calculates health status for all active providers."""
@@ -850,48 +1144,25 @@ class AdminRepository:
     async def get_active_alerts(self, skip: int = 0, limit: int = 100) -> List[dict]:
         """
         Retrieves currently active alerts (Latest Hit > Latest Disparition).
+        Lit l'état matérialisé (alert_state / alert_disparition_state, voir services.alert_state).
         """
-        # Using a raw SQL approach for complex grouping/joining logic
-        # We group by site_code, rule_name, and zone_id (from metadata)
         sql = """
-        WITH latest_hits AS (
-            SELECT 
-                erh.rule_name,
-                e.site_code,
-                erh.hit_metadata->>'zone_id' as zone_id,
-                MAX(e.time) as last_hit_time,
-                MIN(e.time) as first_hit_time,
-                MAX(e.id) as last_event_id,
-                COUNT(erh.id) as count_hits
-            FROM event_rule_hits erh
-            JOIN events e ON e.id = erh.event_id
-            GROUP BY 1, 2, 3
-        ),
-        latest_disps AS (
-            SELECT 
-                site_code,
-                zone_id::text as zone_id,
-                MAX(time) as last_disp_time
-            FROM events
-            WHERE normalized_type LIKE '%%DISPARITION%%'
-            GROUP BY 1, 2
-        )
         SELECT 
-            h.rule_name,
+            a.rule_name,
             'ACTIVE' as status,
-            h.site_code,
-            h.first_hit_time as first_seen,
-            h.last_hit_time as last_seen,
-            h.count_hits,
-            h.last_event_id as recent_event_id,
+            a.site_code,
+            a.first_hit_time as first_seen,
+            a.last_hit_time as last_seen,
+            a.count_hits,
+            a.last_event_id as recent_event_id,
             p.code as provider_code
-        FROM latest_hits h
-        LEFT JOIN latest_disps d ON d.site_code = h.site_code 
-            AND (d.zone_id = h.zone_id OR (d.zone_id IS NULL AND h.zone_id IS NULL))
-        JOIN site_connections s ON s.code_site = h.site_code
+        FROM alert_state a
+        LEFT JOIN alert_disparition_state d ON d.site_code = a.site_code
+            AND d.zone_id IS NOT DISTINCT FROM a.zone_id
+        JOIN site_connections s ON s.code_site = a.site_code
         JOIN monitoring_providers p ON p.id = s.provider_id
-        WHERE d.last_disp_time IS NULL OR d.last_disp_time < h.last_hit_time
-        ORDER BY h.last_hit_time DESC
+        WHERE d.last_disp_time IS NULL OR d.last_disp_time < a.last_hit_time
+        ORDER BY a.last_hit_time DESC
         OFFSET :skip LIMIT :limit
         """
         from sqlalchemy import text
@@ -903,44 +1174,22 @@ class AdminRepository:
         Retrieves archived alerts (Disparition occurred after the hit).
         """
         sql = """
-        WITH latest_hits AS (
-            SELECT 
-                erh.rule_name,
-                e.site_code,
-                erh.hit_metadata->>'zone_id' as zone_id,
-                MAX(e.time) as last_hit_time,
-                MIN(e.time) as first_hit_time,
-                MAX(e.id) as last_event_id,
-                COUNT(erh.id) as count_hits
-            FROM event_rule_hits erh
-            JOIN events e ON e.id = erh.event_id
-            GROUP BY 1, 2, 3
-        ),
-        latest_disps AS (
-            SELECT 
-                site_code,
-                zone_id::text as zone_id,
-                MAX(time) as last_disp_time
-            FROM events
-            WHERE normalized_type LIKE '%%DISPARITION%%'
-            GROUP BY 1, 2
-        )
         SELECT 
-            h.rule_name,
+            a.rule_name,
             'ARCHIVED' as status,
-            h.site_code,
-            h.first_hit_time as first_seen,
-            h.last_hit_time as last_seen,
+            a.site_code,
+            a.first_hit_time as first_seen,
+            a.last_hit_time as last_seen,
             d.last_disp_time as closed_at,
-            h.count_hits,
-            h.last_event_id as recent_event_id,
+            a.count_hits,
+            a.last_event_id as recent_event_id,
             p.code as provider_code
-        FROM latest_hits h
-        JOIN latest_disps d ON d.site_code = h.site_code 
-            AND (d.zone_id = h.zone_id OR (d.zone_id IS NULL AND h.zone_id IS NULL))
-        JOIN site_connections s ON s.code_site = h.site_code
+        FROM alert_disparition_state d
+        JOIN alert_state a ON a.site_code = d.site_code
+            AND a.zone_id IS NOT DISTINCT FROM d.zone_id
+        JOIN site_connections s ON s.code_site = a.site_code
         JOIN monitoring_providers p ON p.id = s.provider_id
-        WHERE d.last_disp_time >= h.last_hit_time
+        WHERE d.last_disp_time >= a.last_hit_time
           AND d.last_disp_time >= NOW() - INTERVAL '1 day' * :days
         ORDER BY d.last_disp_time DESC
         OFFSET :skip LIMIT :limit
@@ -1015,41 +1264,19 @@ class AdminRepository:
 
     async def get_active_alerts_by_site(self, site_code: str) -> List[dict]:
         sql = """
-        WITH latest_hits AS (
-            SELECT 
-                erh.rule_name,
-                e.site_code,
-                erh.hit_metadata->>'zone_id' as zone_id,
-                MAX(e.time) as last_hit_time,
-                MIN(e.time) as first_hit_time,
-                MAX(e.id) as last_event_id,
-                COUNT(erh.id) as count_hits
-            FROM event_rule_hits erh
-            JOIN events e ON e.id = erh.event_id
-            WHERE e.site_code = :site_code
-            GROUP BY 1, 2, 3
-        ),
-        latest_disps AS (
-            SELECT 
-                site_code,
-                zone_id::text as zone_id,
-                MAX(time) as last_disp_time
-            FROM events
-            WHERE site_code = :site_code AND normalized_type LIKE '%%DISPARITION%%'
-            GROUP BY 1, 2
-        )
         SELECT 
-            h.rule_name,
+            a.rule_name,
             'ACTIVE' as status,
-            h.site_code,
-            h.first_hit_time as first_seen,
-            h.last_hit_time as last_seen,
-            h.count_hits,
-            h.last_event_id as recent_event_id
-        FROM latest_hits h
-        LEFT JOIN latest_disps d ON d.site_code = h.site_code 
-            AND (d.zone_id = h.zone_id OR (d.zone_id IS NULL AND h.zone_id IS NULL))
-        WHERE d.last_disp_time IS NULL OR d.last_disp_time < h.last_hit_time
+            a.site_code,
+            a.first_hit_time as first_seen,
+            a.last_hit_time as last_seen,
+            a.count_hits,
+            a.last_event_id as recent_event_id
+        FROM alert_state a
+        LEFT JOIN alert_disparition_state d ON d.site_code = a.site_code
+            AND d.zone_id IS NOT DISTINCT FROM a.zone_id
+        WHERE a.site_code = :site_code
+          AND (d.last_disp_time IS NULL OR d.last_disp_time < a.last_hit_time)
         """
         from sqlalchemy import text
         result = await self.session.execute(text(sql), {"site_code": site_code})
@@ -1057,42 +1284,20 @@ class AdminRepository:
 
     async def get_archived_alerts_by_site(self, site_code: str, days: int) -> List[dict]:
         sql = """
-        WITH latest_hits AS (
-            SELECT 
-                erh.rule_name,
-                e.site_code,
-                erh.hit_metadata->>'zone_id' as zone_id,
-                MAX(e.time) as last_hit_time,
-                MIN(e.time) as first_hit_time,
-                MAX(e.id) as last_event_id,
-                COUNT(erh.id) as count_hits
-            FROM event_rule_hits erh
-            JOIN events e ON e.id = erh.event_id
-            WHERE e.site_code = :site_code
-            GROUP BY 1, 2, 3
-        ),
-        latest_disps AS (
-            SELECT 
-                site_code,
-                zone_id::text as zone_id,
-                MAX(time) as last_disp_time
-            FROM events
-            WHERE site_code = :site_code AND normalized_type LIKE '%%DISPARITION%%'
-            GROUP BY 1, 2
-        )
         SELECT 
-            h.rule_name,
+            a.rule_name,
             'ARCHIVED' as status,
-            h.site_code,
-            h.first_hit_time as first_seen,
-            h.last_hit_time as last_seen,
+            a.site_code,
+            a.first_hit_time as first_seen,
+            a.last_hit_time as last_seen,
             d.last_disp_time as closed_at,
-            h.count_hits,
-            h.last_event_id as recent_event_id
-        FROM latest_hits h
-        JOIN latest_disps d ON d.site_code = h.site_code 
-            AND (d.zone_id = h.zone_id OR (d.zone_id IS NULL AND h.zone_id IS NULL))
-        WHERE d.last_disp_time >= h.last_hit_time
+            a.count_hits,
+            a.last_event_id as recent_event_id
+        FROM alert_state a
+        JOIN alert_disparition_state d ON d.site_code = a.site_code
+            AND d.zone_id IS NOT DISTINCT FROM a.zone_id
+        WHERE a.site_code = :site_code
+          AND d.last_disp_time >= a.last_hit_time
           AND d.last_disp_time >= NOW() - INTERVAL '1 day' * :days
         """
         from sqlalchemy import text
@@ -0,0 +1,163 @@
+"""
+Agrégats pré-calculés des tableaux de bord (migrations alembic 7c1e4b9d2a36, a4c7e2d91b36).
+
+  - events_hourly_site_type : continuous aggregate TimescaleDB sur `events`
+    (hypertable), events par heure / site / normalized_type. Créé avec
+    materialized_only = false : les heures non encore matérialisées (bucket ouvert)
+    sont lues en temps réel sur `events` par TimescaleDB lui-même.
+  - import_stats_daily / rule_hits_daily : `imports` et `event_rule_hits` ne sont pas
+    des hypertables (clés étrangères / ON CONFLICT (event_id, rule_id)), donc pas de
+    continuous aggregate possible : tables par jour tenues par un job TimescaleDB
+    horaire (procédure refresh_daily_rollups). Chaque passage ne recalcule que les
+    jours touchés depuis le précédent (created_at >= dernier rafraîchissement) et les
+    `recent_days` derniers jours (config du job, 3 par défaut) ; les jours plus anciens
+    restent figés (recalcul complet : CALL refresh_daily_rollups(NULL, '{"full": true}')).
+    L'heure de chaque passage est tracée dans rollup_refresh_log. Les écritures qui
+    modifient des jours anciens (replay / reprocess des règles, purge ou reparse d'import)
+    recalculent ces jours dans leur transaction : `days_of_hits` / `days_of_imports` avant
+    la modification, `refresh_days` après (procédure refresh_rollup_days, c5e8b1a3f762).
+
+Un jour n'est lu dans une vue quotidienne que s'il est clos ET qu'un rafraîchissement
+a démarré après sa fin ; sinon (jour courant, vue absente, agrégats désactivés via
+ingestion.continuous_aggregates) les méthodes appelantes agrègent les tables brutes.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Set
+
+from sqlalchemy import (
+    BigInteger, DateTime, Integer, Numeric, String, bindparam, column, func, literal_column, select, table, text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import Event, EventRuleHit, ImportLog
+
+logger = logging.getLogger("rollups")
+
+HOURLY_EVENTS_VIEW = "events_hourly_site_type"
+IMPORT_STATS_VIEW = "import_stats_daily"
+RULE_HITS_VIEW = "rule_hits_daily"
+REFRESH_LOG = "rollup_refresh_log"
+DAYS_REFRESH_PROC = "refresh_rollup_days(timestamptz[], timestamptz[])"
+
+events_hourly = table(
+    HOURLY_EVENTS_VIEW,
+    column("bucket", DateTime(timezone=True)),
+    column("site_code", String),
+    column("normalized_type", String),
+    column("events", BigInteger),
+    column("first_time", DateTime(timezone=True)),
+    column("last_time", DateTime(timezone=True)),
+)
+
+import_stats_daily = table(
+    IMPORT_STATS_VIEW,
+    column("day", DateTime(timezone=True)),
+    column("provider_id", Integer),
+    column("total_imports", BigInteger),
+    column("total_emails", BigInteger),
+    column("total_xls", BigInteger),
+    column("total_pdf", BigInteger),
+    column("total_events", BigInteger),
+    column("integrity_numerator", Numeric),
+    column("integrity_denominator", Numeric),
+    column("missing_pdf", BigInteger),
+)
+
+rule_hits_daily = table(
+    RULE_HITS_VIEW,
+    column("day", DateTime(timezone=True)),
+    column("rule_id", Integer),
+    column("rule_name", String),
+    column("provider_id", Integer),
+    column("total_triggers", BigInteger),
+    column("distinct_sites", BigInteger),
+    column("last_trigger_at", DateTime(timezone=True)),
+)
+
+
+def enabled() -> bool:
+    return bool(settings.INGESTION.get('continuous_aggregates', True))
+
+
+def _utc(value: datetime) -> datetime:
+    # Les bornes naïves des endpoints sont envoyées telles quelles (UTC) par asyncpg
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def hour_ceil(value: datetime) -> datetime:
+    """Début de la première heure pleine à partir de `value`."""
+    floor = value.replace(minute=0, second=0, microsecond=0)
+    return floor if floor == value else floor + timedelta(hours=1)
+
+
+async def _exists(session: AsyncSession, name: str) -> bool:
+    return (await session.execute(select(func.to_regclass(name).isnot(None)))).scalar()
+
+
+async def hourly_events_available(session: AsyncSession) -> bool:
+    return enabled() and await _exists(session, HOURLY_EVENTS_VIEW)
+
+
+async def daily_view_covers(session: AsyncSession, view: str, day_end: datetime) -> bool:
+    """Vrai si `view` a été rafraîchie après `day_end` (jour clos, lisible dans la vue)."""
+    if not enabled() or _utc(day_end) > datetime.now(timezone.utc):
+        return False
+    if not await _exists(session, REFRESH_LOG):
+        return False
+    refreshed_at = (await session.execute(
+        text(f"SELECT refreshed_at FROM {REFRESH_LOG} WHERE view_name = :view"), {"view": view}
+    )).scalar()
+    covered = refreshed_at is not None and refreshed_at >= _utc(day_end)
+    if not covered:
+        logger.debug(f"{view} not refreshed since {day_end} (last: {refreshed_at}), falling back to raw tables")
+    return covered
+
+
+def _day(value):
+    # Même découpage que les vues quotidiennes : jour UTC
+    return func.time_bucket(literal_column("INTERVAL '1 day'"), value)
+
+
+async def days_refresh_available(session: AsyncSession) -> bool:
+    return (await session.execute(select(func.to_regprocedure(DAYS_REFRESH_PROC).isnot(None)))).scalar()
+
+
+async def days_of_hits(session: AsyncSession, *criteria) -> Set[datetime]:
+    """Jours de rule_hits_daily des hits filtrés par `criteria` (sur EventRuleHit / Event) : à lire avant de les supprimer."""
+    if not await days_refresh_available(session):
+        return set()
+    result = await session.execute(
+        select(_day(EventRuleHit.created_at))
+        .join(Event, Event.id == EventRuleHit.event_id)
+        .where(*criteria)
+        .distinct()
+    )
+    return set(result.scalars().all())
+
+
+async def days_of_imports(session: AsyncSession, *criteria) -> Set[datetime]:
+    """Jours de import_stats_daily des imports filtrés par `criteria`."""
+    if not await days_refresh_available(session):
+        return set()
+    result = await session.execute(select(_day(ImportLog.created_at)).where(*criteria).distinct())
+    return set(result.scalars().all())
+
+
+async def refresh_days(
+    session: AsyncSession, import_days: Iterable[datetime] = (), hit_days: Iterable[datetime] = ()
+) -> None:
+    """Recalcule les jours donnés de import_stats_daily / rule_hits_daily, dans la transaction courante."""
+    import_days, hit_days = sorted(set(import_days)), sorted(set(hit_days))
+    if not (import_days or hit_days) or not await days_refresh_available(session):
+        return
+    days = ARRAY(DateTime(timezone=True))
+    await session.execute(
+        text("CALL refresh_rollup_days(:import_days, :hit_days)").bindparams(
+            bindparam("import_days", type_=days), bindparam("hit_days", type_=days),
+        ),
+        {"import_days": import_days, "hit_days": hit_days},
+    )
+    logger.info(f"[METRIC] rollup_days_refreshed import_days={len(import_days)} hit_days={len(hit_days)}")
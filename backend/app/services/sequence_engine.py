@@ -0,0 +1,102 @@
+"""
+Moteur de séquences A -> B (Δt) par import, sur la tranche préchargée du FrequencyEngine.
+
+Pour une définition de séquence (filtres A, filtres B, délai max) et un site, un seul
+parcours deux pointeurs des events triés par (time, id) associe à chaque A son premier B
+(time > A.time, time <= A.time + Δt). Chaque évaluation (règle ou RuleCondition SEQUENCE)
+se résout ensuite par bisect : premier A valide dans [ref - lookback, ref].
+Même déterminisme que `ORDER BY a.time, a.id, b.time, b.id LIMIT 1`.
+"""
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from app.services.frequency_engine import EventRow, keyword_needle
+
+logger = logging.getLogger("sequence-engine")
+
+# Réponse "hors tranche" : l'appelant repasse en SQL (None = aucune séquence trouvée)
+FALLBACK = object()
+
+# (a_time, a_id, b_time, b_id), trié par (a_time, a_id)
+Pair = Tuple[datetime, int, datetime, int]
+
+
+def _row_filter(category: Optional[str], keyword: Optional[str]):
+    kw = keyword_needle(keyword)
+
+    def predicate(row: EventRow) -> bool:
+        return (
+            row[2] == 'APPARITION'
+            and (not category or row[3] == category)
+            and (not kw or kw in row[4])
+        )
+    return predicate
+
+
+class SequenceEngine:
+    def __init__(self, start: datetime, end: datetime, rows_by_site: Dict[str, List[EventRow]]):
+        self.start = start
+        self.end = end
+        self.rows_by_site = rows_by_site
+        self._pairs: Dict[tuple, Tuple[List[datetime], List[Pair]]] = {}
+        self.answered = 0
+        self.fallbacks = 0
+
+    def _valid_pairs(self, site_code: str, key: tuple, a_pred, b_pred, max_delay: timedelta):
+        cached = self._pairs.get(key)
+        if cached is not None:
+            return cached
+
+        rows = self.rows_by_site[site_code]
+        b_rows = [row for row in rows if b_pred(row)]
+        b_times = [row[0] for row in b_rows]
+        pairs: List[Pair] = []
+        j = 0
+        for a in rows:
+            if not a_pred(a):
+                continue
+            # Premier B strictement après A ; les A étant triés, le pointeur ne recule jamais
+            j = bisect_right(b_times, a[0], lo=j)
+            if j < len(b_rows) and b_times[j] <= a[0] + max_delay:
+                b = b_rows[j]
+                pairs.append((a[0], a[1], b[0], b[1]))
+
+        cached = ([p[0] for p in pairs], pairs)
+        self._pairs[key] = cached
+        return cached
+
+    def find(
+        self,
+        site_code: str,
+        a_cat: Optional[str],
+        a_key: Optional[str],
+        b_cat: Optional[str],
+        b_key: Optional[str],
+        max_delay_seconds: int,
+        lookback_days: int,
+        ref: datetime,
+    ):
+        """Équivalent de EventRepository.find_sequence_match, ou FALLBACK hors tranche."""
+        max_delay = timedelta(seconds=max_delay_seconds)
+        start = ref - timedelta(days=lookback_days)
+        if (
+            site_code not in self.rows_by_site
+            or ref.tzinfo is None
+            or start < self.start
+            # Les B d'un A <= ref peuvent aller jusqu'à ref + Δt
+            or ref + max_delay > self.end
+        ):
+            self.fallbacks += 1
+            return FALLBACK
+
+        key = (site_code, a_cat or None, keyword_needle(a_key), b_cat or None, keyword_needle(b_key), max_delay)
+        a_times, pairs = self._valid_pairs(site_code, key, _row_filter(a_cat, a_key), _row_filter(b_cat, b_key), max_delay)
+        self.answered += 1
+
+        i = bisect_left(a_times, start)
+        if i < len(pairs) and a_times[i] <= ref:
+            a_time, a_id, b_time, b_id = pairs[i]
+            return {"a_id": a_id, "b_id": b_id, "a_time": a_time, "b_time": b_time}
+        return None
@@ -0,0 +1,106 @@
+"""
+Cache process de la table `settings` (overrides DB du YAML, config IMAP/SMTP).
+
+La table est petite : elle est chargée en entier (une requête) puis servie depuis
+la mémoire pendant `settings_cache_ttl_seconds`. Lecteurs : `_get_db_setting`
+(business rules), `settings.get_monitoring_settings`, `EmailAdapter._get_imap_config`,
+`EmailFetcher.get_settings`.
+
+Invalidation :
+  - toute écriture ORM d'un Setting dans ce process (flush, UPDATE/DELETE en masse) ;
+  - les endpoints d'écriture publient le scope "settings" sur le bus Redis (cache_bus),
+    écouté par l'API et le worker → les autres process rechargent au prochain accès.
+Le TTL borne l'écart si un message pub/sub est perdu (Redis indisponible, écriture SQL directe).
+"""
+import logging
+import time
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import select, event as sa_event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import Setting
+from app.services import cache_bus
+
+logger = logging.getLogger("settings-cache")
+
+SETTINGS_SCOPE = "settings"
+
+
+class SettingsCache:
+    def __init__(self, ttl_seconds: Optional[float] = None, clock=time.monotonic):
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._values: Optional[Dict[str, str]] = None
+        self._loaded_at = 0.0
+        # Incrémenté à chaque invalidation : un chargement commencé avant n'est pas conservé
+        self._generation = 0
+        self.loads = 0
+        self.hits = 0
+
+    @property
+    def ttl(self) -> float:
+        if self._ttl is not None:
+            return self._ttl
+        return float(settings.INGESTION.get('settings_cache_ttl_seconds', 60))
+
+    def _fresh(self) -> bool:
+        return self._values is not None and (self._clock() - self._loaded_at) < self.ttl
+
+    async def get_all(self, session=None) -> Dict[str, str]:
+        """{key: value} brut de la table settings (copie, modifiable par l'appelant)."""
+        if self._fresh():
+            self.hits += 1
+            return dict(self._values)
+
+        generation = self._generation
+        if session is None:
+            from app.db.session import AsyncSessionLocal
+            async with AsyncSessionLocal() as own_session:
+                values = await self._load(own_session)
+        else:
+            values = await self._load(session)
+
+        if generation == self._generation:
+            self._values = values
+            self._loaded_at = self._clock()
+        return dict(values)
+
+    async def _load(self, session) -> Dict[str, str]:
+        result = await session.execute(select(Setting.key, Setting.value))
+        self.loads += 1
+        return {key: value for key, value in result.all()}
+
+    async def get(self, key: str, session=None) -> Optional[str]:
+        return (await self.get_all(session)).get(key)
+
+    def invalidate(self, reason: str = "") -> None:
+        self._generation += 1
+        if self._values is not None:
+            logger.debug(f"[SETTINGS_CACHE] invalidated reason={reason or 'local'}")
+        self._values = None
+
+    async def publish_invalidation(self, keys: Optional[Iterable[str]] = None, redis_client=None) -> None:
+        """À appeler après le commit d'une écriture de settings (cf. cache_bus.publish)."""
+        await cache_bus.publish(SETTINGS_SCOPE, keys, redis_client)
+
+
+settings_cache = SettingsCache()
+cache_bus.register(SETTINGS_SCOPE, settings_cache.invalidate)
+
+
+@sa_event.listens_for(Setting, "after_insert")
+@sa_event.listens_for(Setting, "after_update")
+@sa_event.listens_for(Setting, "after_delete")
+def _invalidate_on_flush(mapper, connection, target: Setting):
+    settings_cache.invalidate(f"orm key={target.key}")
+
+
+@sa_event.listens_for(Session, "do_orm_execute")
+def _invalidate_on_bulk_write(orm_execute_state):
+    # update(Setting) / delete(Setting) exécutés via la session : pas d'événement de mapper
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and any(
+        m.class_ is Setting for m in orm_execute_state.all_mappers
+    ):
+        settings_cache.invalidate("orm bulk write")
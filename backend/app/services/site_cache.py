@@ -0,0 +1,87 @@
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.db.models import Site
+
+logger = logging.getLogger("site-cache")
+
+# Clé de Session.info où sont stockés les sites créés dans la transaction en cours
+PENDING_KEY = "site_cache_pending"
+
+
+class SiteIdCache:
+    """
+    LRU process-wide code_client -> site_id, partagé par tous les imports d'un worker.
+
+    Seuls des ids committés y entrent : les sites créés pendant une transaction
+    sont mis en attente dans `session.info` et publiés au commit (jetés au rollback).
+    Toute modification / suppression ORM d'un Site invalide son entrée.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, codes: Iterable[str]) -> Dict[str, int]:
+        found = {}
+        for code in codes:
+            site_id = self._data.get(code)
+            if site_id is None:
+                self.misses += 1
+                continue
+            self._data.move_to_end(code)
+            found[code] = site_id
+            self.hits += 1
+        return found
+
+    def put_many(self, mapping: Dict[str, int]):
+        for code, site_id in mapping.items():
+            self._data[code] = site_id
+            self._data.move_to_end(code)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, code: Optional[str] = None):
+        if code is None:
+            self._data.clear()
+        else:
+            self._data.pop(code, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+site_id_cache = SiteIdCache()
+
+
+def stage_created_sites(session: Session, mapping: Dict[str, int]):
+    session.info.setdefault(PENDING_KEY, {}).update(mapping)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_created_sites(session: Session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if pending:
+        site_id_cache.put_many(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_created_sites(session: Session):
+    session.info.pop(PENDING_KEY, None)
+
+
+@event.listens_for(Site, "after_update")
+@event.listens_for(Site, "after_delete")
+def _invalidate_site(mapper, connection, target: Site):
+    site_id_cache.invalidate(target.code_client)
+    # code_client peut avoir changé : l'ancienne valeur est dans l'historique
+    state = getattr(target, "_sa_instance_state", None)
+    if state is not None:
+        for old_code in state.attrs.code_client.history.deleted or ():
+            site_id_cache.invalidate(old_code)
@@ -0,0 +1,195 @@
+"""
+Index de classification SMTP (expéditeur → SmtpProviderRule), partagé par
+ClassificationService (worker) et ProviderResolver (email fetcher, debug).
+
+Construit une fois depuis les règles actives, triées par priorité croissante
+(plus petite = testée en premier) puis id :
+  - EXACT / EMAIL : dict adresse → rang ;
+  - DOMAIN        : dict domaine (texte après le dernier '@') → rang ;
+  - CONTAINS      : KeywordMatcher (un seul passage sur l'adresse) ;
+  - REGEX         : regex précompilées, parcourues par rang.
+La règle retenue est celle de plus petit rang parmi les candidates, comme le
+parcours linéaire d'origine. Les résultats récents sont mémorisés par expéditeur.
+
+Invalidation : écriture ORM d'une règle / d'un provider dans ce process (flush ou
+INSERT/UPDATE/DELETE en masse), scope "smtp_rules" publié par connections.py et
+admin_providers.py (cache_bus), et TTL en secours.
+"""
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Pattern, Tuple
+
+from sqlalchemy import select, event as sa_event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import SmtpProviderRule, MonitoringProvider
+from app.services import cache_bus
+from app.utils.keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger("smtp-rule-index")
+
+SMTP_RULES_SCOPE = "smtp_rules"
+MEMO_MAX = 2048
+
+
+class SmtpRuleEntry(NamedTuple):
+    id: int
+    provider_id: int
+    match_type: str
+    match_value: str
+    priority: int
+
+
+class SmtpRuleIndex:
+    def __init__(self, rules, unclassified_id: Optional[int] = None):
+        """`rules` : règles actives déjà triées (priorité croissante)."""
+        self.unclassified_id = unclassified_id
+        self.entries: List[SmtpRuleEntry] = []
+        self._exact: Dict[str, int] = {}
+        self._domains: Dict[str, int] = {}
+        # Domaines contenant '@' : test endswith conservé tel quel
+        self._domain_suffixes: List[Tuple[str, int]] = []
+        self._regexes: List[Tuple[int, Pattern]] = []
+        contains: List[Tuple[str, int]] = []
+
+        for rank, rule in enumerate(rules):
+            self.entries.append(SmtpRuleEntry(rule.id, rule.provider_id, rule.match_type, rule.match_value, rule.priority))
+            match_type = rule.match_type.upper()
+            pattern = rule.match_value.lower()
+
+            if match_type in ('EXACT', 'EMAIL'):
+                self._exact.setdefault(pattern, rank)
+            elif match_type == 'DOMAIN':
+                # "@domain.com" et "domain.com" sont équivalents
+                domain = pattern[1:] if pattern.startswith('@') else pattern
+                if '@' in domain:
+                    self._domain_suffixes.append((f"@{domain}", rank))
+                else:
+                    self._domains.setdefault(domain, rank)
+            elif match_type == 'CONTAINS':
+                contains.append((pattern, rank))
+            elif match_type == 'REGEX':
+                try:
+                    self._regexes.append((rank, re.compile(pattern)))
+                except re.error as e:
+                    logger.error(f"Invalid regex pattern '{pattern}' for rule {rule.id}: {e}")
+
+        self._contains = KeywordMatcher(contains) if contains else None
+        self._memo: "OrderedDict[str, Optional[int]]" = OrderedDict()
+
+    def _best_rank(self, sender_lower: str) -> Optional[int]:
+        candidates = [self._exact.get(sender_lower)]
+        if '@' in sender_lower:
+            candidates.append(self._domains.get(sender_lower.rsplit('@', 1)[1]))
+        for suffix, rank in self._domain_suffixes:
+            if sender_lower.endswith(suffix):
+                candidates.append(rank)
+                break
+        if self._contains is not None:
+            candidates.append(self._contains.first(sender_lower))
+        best = min((r for r in candidates if r is not None), default=None)
+
+        for rank, regex in self._regexes:
+            if best is not None and rank >= best:
+                break
+            if regex.search(sender_lower):
+                best = rank
+                break
+        return best
+
+    def match(self, sender_email: str) -> Optional[SmtpRuleEntry]:
+        """Règle de plus haute priorité qui matche l'expéditeur (insensible à la casse), ou None."""
+        if not sender_email:
+            return None
+        sender_lower = sender_email.lower()
+        if sender_lower in self._memo:
+            self._memo.move_to_end(sender_lower)
+            rank = self._memo[sender_lower]
+        else:
+            rank = self._best_rank(sender_lower)
+            self._memo[sender_lower] = rank
+            if len(self._memo) > MEMO_MAX:
+                self._memo.popitem(last=False)
+        return self.entries[rank] if rank is not None else None
+
+
+class SmtpRuleRegistry:
+    """Index courant du process, reconstruit après invalidation ou expiration du TTL."""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._index: Optional[SmtpRuleIndex] = None
+        self._built_at = 0.0
+        self._generation = 0
+        self.builds = 0
+
+    @property
+    def ttl(self) -> float:
+        return float(settings.INGESTION.get('smtp_rule_index_ttl_seconds', 300))
+
+    async def get(self, session: AsyncSession) -> SmtpRuleIndex:
+        if self._index is not None and (self._clock() - self._built_at) < self.ttl:
+            return self._index
+
+        generation = self._generation
+        stmt = (
+            select(SmtpProviderRule)
+            .where(SmtpProviderRule.is_active == True)
+            .order_by(SmtpProviderRule.priority.asc(), SmtpProviderRule.id.asc())
+        )
+        rules = (await session.execute(stmt)).scalars().all()
+        result = await session.execute(
+            select(MonitoringProvider.id).where(MonitoringProvider.code == 'PROVIDER_UNCLASSIFIED')
+        )
+        unclassified_id = result.scalar_one_or_none()
+        if not unclassified_id:
+            logger.error("PROVIDER_UNCLASSIFIED not found in monitoring_providers. Seed might be missing.")
+
+        index = SmtpRuleIndex(rules, unclassified_id)
+        self.builds += 1
+        logger.info(f"[METRIC] smtp_rule_index_built rules={len(index.entries)}")
+        if generation == self._generation:
+            self._index = index
+            self._built_at = self._clock()
+        return index
+
+    def invalidate(self, reason: str = "") -> None:
+        self._generation += 1
+        if self._index is not None:
+            logger.debug(f"[SMTP_RULE_INDEX] invalidated reason={reason or 'local'}")
+        self._index = None
+
+    async def publish_invalidation(self, redis_client=None) -> None:
+        """À appeler après le commit d'une écriture de règles / providers (cf. cache_bus.publish)."""
+        await cache_bus.publish(SMTP_RULES_SCOPE, redis_client=redis_client)
+
+
+smtp_rule_index = SmtpRuleRegistry()
+cache_bus.register(SMTP_RULES_SCOPE, smtp_rule_index.invalidate)
+
+
+# Provider : seuls création / suppression comptent (id UNCLASSIFIED, règles en cascade) ;
+# les mises à jour de suivi d'import, fréquentes, ne touchent pas l'index
+@sa_event.listens_for(SmtpProviderRule, "after_insert")
+@sa_event.listens_for(SmtpProviderRule, "after_update")
+@sa_event.listens_for(SmtpProviderRule, "after_delete")
+@sa_event.listens_for(MonitoringProvider, "after_insert")
+@sa_event.listens_for(MonitoringProvider, "after_delete")
+def _invalidate_smtp_rule_index(mapper, connection, target):
+    smtp_rule_index.invalidate(f"orm {mapper.class_.__name__}")
+
+
+@sa_event.listens_for(Session, "do_orm_execute")
+def _invalidate_smtp_rule_index_on_bulk_write(orm_execute_state):
+    # insert/update/delete(SmtpProviderRule), delete(MonitoringProvider) via la session :
+    # pas d'événement de mapper
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    for mapper in orm_execute_state.all_mappers:
+        if mapper.class_ is SmtpProviderRule or (mapper.class_ is MonitoringProvider and orm_execute_state.is_delete):
+            smtp_rule_index.invalidate(f"orm bulk write {mapper.class_.__name__}")
+            return
@@ -0,0 +1,271 @@
+"""
+Politiques de stockage de l'hypertable `events` (TimescaleDB) : taille des chunks,
+compression (segmentby site_code, orderby time), rétention.
+
+Valeurs initiales posées par la migration alembic 3f9a6c0d8e14 (docs/PERFORMANCE_PLAN.md :
+compression après 7 jours), ajustables ensuite via /admin/storage.
+
+Rétention désactivée par défaut. Activée, elle n'utilise pas add_retention_policy
+(drop_chunks seul laisserait hits, incidents, alert_state et rule_hits_daily orphelins)
+mais le job `events_retention` (migration 6d1b8f3e2a95) qui purge ces dépendances dans
+la même transaction. Le start_offset de la politique du continuous aggregate
+events_hourly_site_type est alors plafonné sous drop_after : un rafraîchissement ne
+recalcule jamais les heures dont les events ont été supprimés (l'agrégat les conserve).
+
+Requêtes sur chunks compressés : les index B-tree des chunks ne servent plus, seuls
+restent l'index du chunk compressé (site_code + bornes min/max de time par segment)
+et l'exclusion de chunks (sur time, et sur id / import_id via enable_chunk_skipping).
+`explain_hot_queries` vérifie sur la base réelle que les requêtes chaudes
+d'EventRepository ne décompressent pas tout l'historique.
+"""
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger("storage-policies")
+
+HYPERTABLE = "events"
+RETENTION_JOB = "events_retention"
+HOURLY_CAGG = "events_hourly_site_type"
+
+
+class StorageUnavailable(RuntimeError):
+    """TimescaleDB absent ou `events` n'est pas une hypertable."""
+
+
+async def _ensure_hypertable(session: AsyncSession) -> None:
+    available = (await session.execute(
+        text("SELECT to_regclass('timescaledb_information.hypertables') IS NOT NULL")
+    )).scalar()
+    if available:
+        available = (await session.execute(
+            text("SELECT count(*) FROM timescaledb_information.hypertables WHERE hypertable_name = :name"),
+            {"name": HYPERTABLE},
+        )).scalar()
+    if not available:
+        raise StorageUnavailable(f"{HYPERTABLE} is not a TimescaleDB hypertable")
+
+
+def _interval_days(value) -> Optional[float]:
+    # Intervalles JSON des jobs ("7 days") ou timedelta selon la source
+    if value is None:
+        return None
+    if hasattr(value, "total_seconds"):
+        return value.total_seconds() / 86400
+    parts = str(value).split()
+    return float(parts[0]) if len(parts) == 2 and parts[1].startswith("day") else None
+
+
+async def get_summary(session: AsyncSession) -> Dict[str, Any]:
+    """Intervalle de chunk, réglages de compression, politiques actives et taux de compression."""
+    await _ensure_hypertable(session)
+
+    interval = (await session.execute(text(
+        "SELECT time_interval FROM timescaledb_information.dimensions "
+        "WHERE hypertable_name = :name AND column_name = 'time'"
+    ), {"name": HYPERTABLE})).scalar()
+
+    settings_rows = (await session.execute(text(
+        "SELECT attname, segmentby_column_index, orderby_column_index, orderby_asc "
+        "FROM timescaledb_information.compression_settings WHERE hypertable_name = :name"
+    ), {"name": HYPERTABLE})).all()
+    segmentby = [r.attname for r in sorted(settings_rows, key=lambda r: r.segmentby_column_index or 0)
+                 if r.segmentby_column_index is not None]
+    orderby = [f"{r.attname} {'ASC' if r.orderby_asc else 'DESC'}"
+               for r in sorted(settings_rows, key=lambda r: r.orderby_column_index or 0)
+               if r.orderby_column_index is not None]
+
+    # events_retention est un job utilisateur : pas de hypertable_name
+    jobs = (await session.execute(text(
+        "SELECT j.job_id, j.proc_name, j.schedule_interval, j.config, s.last_run_status, s.next_start "
+        "FROM timescaledb_information.jobs j "
+        "LEFT JOIN timescaledb_information.job_stats s ON s.job_id = j.job_id "
+        "WHERE (j.hypertable_name = :name AND j.proc_name = 'policy_compression') OR j.proc_name = :retention"
+    ), {"name": HYPERTABLE, "retention": RETENTION_JOB})).all()
+    policies = {}
+    for job in jobs:
+        config = job.config if isinstance(job.config, dict) else json.loads(job.config or "{}")
+        key = "compression" if job.proc_name == "policy_compression" else "retention"
+        policies[key] = {
+            "job_id": job.job_id,
+            "after_days": _interval_days(config.get("compress_after") or config.get("drop_after")),
+            "schedule_interval": str(job.schedule_interval),
+            "last_run_status": job.last_run_status,
+            "next_start": job.next_start,
+        }
+
+    stats = (await session.execute(text(
+        "SELECT total_chunks, number_compressed_chunks, before_compression_total_bytes, after_compression_total_bytes "
+        "FROM hypertable_compression_stats(CAST(:name AS regclass))"
+    ), {"name": HYPERTABLE})).first()
+    total_bytes = (await session.execute(text("SELECT hypertable_size(CAST(:name AS regclass))"), {"name": HYPERTABLE})).scalar()
+
+    before = getattr(stats, "before_compression_total_bytes", None)
+    after = getattr(stats, "after_compression_total_bytes", None)
+    return {
+        "hypertable": HYPERTABLE,
+        "chunk_time_interval_days": _interval_days(interval),
+        "compression_segmentby": segmentby,
+        "compression_orderby": orderby,
+        "compression_policy": policies.get("compression"),
+        "retention_policy": policies.get("retention"),
+        "total_bytes": total_bytes,
+        "total_chunks": getattr(stats, "total_chunks", None),
+        "compressed_chunks": getattr(stats, "number_compressed_chunks", None),
+        "before_compression_bytes": before,
+        "after_compression_bytes": after,
+        "compression_ratio": round(before / after, 2) if before and after else None,
+    }
+
+
+async def list_chunks(session: AsyncSession, limit: int = 200) -> List[Dict[str, Any]]:
+    """Chunks les plus récents d'abord, avec taille et taux de compression par chunk."""
+    await _ensure_hypertable(session)
+    rows = (await session.execute(text(
+        "SELECT c.chunk_name, c.range_start, c.range_end, c.is_compressed, s.total_bytes, "
+        "       cs.before_compression_total_bytes, cs.after_compression_total_bytes "
+        "FROM timescaledb_information.chunks c "
+        "LEFT JOIN chunks_detailed_size(CAST(:name AS regclass)) s "
+        "       ON s.chunk_schema = c.chunk_schema AND s.chunk_name = c.chunk_name "
+        "LEFT JOIN chunk_compression_stats(CAST(:name AS regclass)) cs "
+        "       ON cs.chunk_schema = c.chunk_schema AND cs.chunk_name = c.chunk_name "
+        "WHERE c.hypertable_name = :name "
+        "ORDER BY c.range_start DESC LIMIT :limit"
+    ), {"name": HYPERTABLE, "limit": limit})).all()
+    return [
+        {
+            "chunk_name": r.chunk_name,
+            "range_start": r.range_start,
+            "range_end": r.range_end,
+            "is_compressed": r.is_compressed,
+            "total_bytes": r.total_bytes,
+            "before_compression_bytes": r.before_compression_total_bytes,
+            "after_compression_bytes": r.after_compression_total_bytes,
+            "compression_ratio": (
+                round(r.before_compression_total_bytes / r.after_compression_total_bytes, 2)
+                if r.is_compressed and r.after_compression_total_bytes else None
+            ),
+        }
+        for r in rows
+    ]
+
+
+async def update_policies(
+    session: AsyncSession,
+    chunk_time_interval_days: Optional[int] = None,
+    compress_after_days: Optional[int] = None,
+    retention_days: Optional[int] = None,
+) -> None:
+    """
+    None = inchangé, 0 = politique supprimée. Le nouvel intervalle de chunk ne
+    s'applique qu'aux chunks créés ensuite.
+    """
+    await _ensure_hypertable(session)
+    params = {"name": HYPERTABLE}
+    if chunk_time_interval_days:
+        await session.execute(text(
+            "SELECT set_chunk_time_interval(CAST(:name AS regclass), make_interval(days => :days))"
+        ), {**params, "days": chunk_time_interval_days})
+    if compress_after_days is not None:
+        await session.execute(text("SELECT remove_compression_policy(CAST(:name AS regclass), if_exists => TRUE)"), params)
+        if compress_after_days:
+            await session.execute(text(
+                "SELECT add_compression_policy(CAST(:name AS regclass), compress_after => make_interval(days => :days))"
+            ), {**params, "days": compress_after_days})
+    if retention_days is not None:
+        await session.execute(text("SELECT remove_retention_policy(CAST(:name AS regclass), if_exists => TRUE)"), params)
+        await session.execute(text(
+            "SELECT delete_job(job_id) FROM timescaledb_information.jobs WHERE proc_name = :retention"
+        ), {"retention": RETENTION_JOB})
+        if retention_days:
+            await session.execute(text(
+                "SELECT add_job(:retention, INTERVAL '1 day', "
+                "config => jsonb_build_object('drop_after', make_interval(days => :days)::text))"
+            ), {"retention": RETENTION_JOB, "days": retention_days})
+        await _cap_hourly_aggregate(session, retention_days)
+    logger.info(
+        f"[METRIC] storage_policies_updated=1 chunk_days={chunk_time_interval_days} "
+        f"compress_after_days={compress_after_days} retention_days={retention_days}"
+    )
+
+
+async def _cap_hourly_aggregate(session: AsyncSession, retention_days: int) -> None:
+    """start_offset de la politique du continuous aggregate : drop_after - 1 heure, ou NULL sans rétention."""
+    exists = (await session.execute(text("SELECT to_regclass(:view) IS NOT NULL"), {"view": HOURLY_CAGG})).scalar()
+    if not exists:
+        return
+    await session.execute(text(
+        "SELECT remove_continuous_aggregate_policy(CAST(:view AS regclass), if_exists => TRUE)"
+    ), {"view": HOURLY_CAGG})
+    await session.execute(text(
+        "SELECT add_continuous_aggregate_policy(CAST(:view AS regclass), "
+        "start_offset => CASE WHEN :days > 0 THEN make_interval(days => :days) - INTERVAL '1 hour' END, "
+        "end_offset => INTERVAL '1 hour', schedule_interval => INTERVAL '30 minutes')"
+    ), {"view": HOURLY_CAGG, "days": retention_days})
+
+
+# Requêtes chaudes d'EventRepository / endpoints, sur un event ancien (chunk compressé probable)
+HOT_QUERIES = {
+    "frequency_count": (
+        "SELECT count(id) FROM events WHERE site_code = :site_code "
+        "AND time >= CAST(:time AS timestamptz) - INTERVAL '1 day' AND time <= :time"
+    ),
+    "site_timeline": (
+        "SELECT id, time FROM events WHERE site_code = :site_code AND time <= :time "
+        "ORDER BY time DESC, id DESC LIMIT 50"
+    ),
+    "import_events": "SELECT id FROM events WHERE import_id = :import_id",
+    "event_by_id": "SELECT id FROM events WHERE id = :id",
+}
+
+
+def _walk(node: Dict[str, Any]):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk(child)
+
+
+def summarize_plan(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Résumé d'un plan EXPLAIN (FORMAT JSON) : chunks décompressés, et parcours séquentiels
+    de chunks compressés (compress_hyper_*), qui décompressent tout le chunk.
+    """
+    decompress, compressed_seq, index_scans = 0, 0, 0
+    for node in _walk(plan["Plan"]):
+        provider = node.get("Custom Plan Provider") or ""
+        if provider in ("DecompressChunk", "ColumnarScan"):
+            decompress += 1
+        relation = node.get("Relation Name") or ""
+        if node["Node Type"] == "Seq Scan" and relation.startswith("compress_hyper_"):
+            compressed_seq += 1
+        if "Index" in node["Node Type"]:
+            index_scans += 1
+    return {
+        "decompressed_chunks": decompress,
+        "compressed_seq_scans": compressed_seq,
+        "index_scans": index_scans,
+        "index_friendly": compressed_seq == 0,
+    }
+
+
+async def explain_hot_queries(session: AsyncSession) -> Dict[str, Any]:
+    await _ensure_hypertable(session)
+    sample = (await session.execute(text(
+        "SELECT id, time, site_code, import_id FROM events "
+        "WHERE site_code IS NOT NULL AND import_id IS NOT NULL ORDER BY time ASC LIMIT 1"
+    ))).first()
+    if sample is None:
+        return {}
+    params = {"id": sample.id, "time": sample.time, "site_code": sample.site_code, "import_id": sample.import_id}
+    report = {}
+    for name, sql in HOT_QUERIES.items():
+        plan = (await session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params)).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        report[name] = summarize_plan(plan[0])
+        if not report[name]["index_friendly"]:
+            logger.warning(f"{name}: sequential scan of compressed chunks ({report[name]})")
+    return report
@@ -5,6 +5,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models import EventCodeCatalog
 from app.utils.text import normalize_text
+from app.utils.keyword_matcher import KeywordMatcher
 from app.ingestion.models import NormalizedEvent
 
 logger = logging.getLogger(__name__)
@@ -13,6 +14,9 @@ class TaggingService:
     def __init__(self, session: AsyncSession):
         self.session = session
         self._cache: Dict[str, Any] = {}
+        # Fallback mot-clé : codes + libellés normalisés du catalogue, rang = ordre du cache
+        self._catalog_items: List[Dict[str, Any]] = []
+        self._catalog_matcher: Optional[KeywordMatcher] = None
 
     async def _ensure_cache(self):
         """Loads the catalog into memory for fast lookup during batch processing."""
@@ -31,6 +35,15 @@ class TaggingService:
                 "label": item.label
             }
         
+        patterns = []
+        for rank, (c_code, c_data) in enumerate(self._cache.items()):
+            if c_code != "UNKNOWN":
+                patterns.append((c_code.lower(), rank))
+            if c_data.get("label"):
+                patterns.append((normalize_text(c_data["label"]), rank))
+        self._catalog_items = list(self._cache.values())
+        self._catalog_matcher = KeywordMatcher(patterns)
+
         logger.debug(f"Tagging cache initialized with {len(self._cache)} items.")
 
     def _extract_code(self, event: NormalizedEvent) -> str:
@@ -70,21 +83,11 @@ class TaggingService:
         if code != "UNKNOWN":
             mapping = self._cache.get(code)
         
-        # 2. Keyword Match (iterate over catalog to find matches in message)
-        if not mapping:
-            # We look for catalog items where either the CODE or the LABEL exists in the message
-            for c_code, c_data in self._cache.items():
-                # Check Code
-                if c_code != "UNKNOWN" and c_code.lower() in evt_msg:
-                    mapping = c_data
-                    break
-                # Check Label
-                label = c_data.get("label")
-                if label:
-                    norm_label = normalize_text(label)
-                    if norm_label in evt_msg:
-                        mapping = c_data
-                        break
+        # 2. Keyword Match: first catalog item (cache order) whose CODE or LABEL exists in the message
+        if not mapping and self._catalog_matcher is not None:
+            rank = self._catalog_matcher.first(evt_msg)
+            if rank is not None:
+                mapping = self._catalog_items[rank]
         
         # 3. Fallback to UNKNOWN
         if not mapping:
@@ -0,0 +1,124 @@
+"""
+Recherche multi-motifs (Aho-Corasick) : toutes les sous-chaînes d'une liste de motifs
+trouvées en un seul passage sur le message, au lieu d'un `k in msg` par motif.
+
+Chaque motif porte un rang (sa position dans la liste d'origine) : `first()` rend le
+plus petit rang trouvé, ce qui reproduit la sémantique « premier match » d'une boucle
+`for k in keywords: if k in msg: ...`.
+
+Pour quelques motifs (mots-clés ENGINE_V1), la recherche de sous-chaîne native (C)
+reste plus rapide qu'un automate parcouru en Python : en dessous de LINEAR_MAX motifs,
+le matcher garde la boucle `in`, avec la même interface.
+"""
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+LINEAR_MAX = 16
+
+
+class KeywordMatcher:
+    def __init__(self, patterns: Iterable[Tuple[str, int]]):
+        """`patterns` : couples (motif, rang). Un même rang peut porter plusieurs motifs."""
+        # Motif vide : sous-chaîne de tout message (`"" in msg` est toujours vrai)
+        always: Set[int] = set()
+
+        entries = []
+        for pattern, rank in patterns:
+            if not pattern:
+                always.add(rank)
+            else:
+                entries.append((pattern, rank))
+        self._always_all: Set[int] = always
+        self._always: Optional[int] = min(always) if always else None
+
+        # Peu de motifs : boucle native, triée par rang pour que first() s'arrête au premier trouvé
+        self._linear: Optional[List[Tuple[str, int]]] = None
+        if len(entries) <= LINEAR_MAX:
+            self._linear = sorted(entries, key=lambda e: e[1])
+            self.size = len(entries)
+            return
+
+        goto: List[Dict[str, int]] = [{}]
+        out: List[Set[int]] = [set()]
+        for pattern, rank in entries:
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(set())
+                state = nxt
+            out[state].add(rank)
+
+        # Liens d'échec (BFS) puis table de transitions complète : un seul dict.get par caractère
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            out[state] |= out[fail[state]]
+            delta[state] = dict(delta[fail[state]])
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0) if state else 0
+                delta[state][ch] = nxt
+                queue.append(nxt)
+
+        self._delta = delta
+        self._out: List[Tuple[int, ...]] = [tuple(sorted(o)) for o in out]
+        self._min_out: List[Optional[int]] = [o[0] if o else None for o in self._out]
+        self.size = len(goto)
+
+    def find_all(self, text: str) -> Set[int]:
+        """Rangs de tous les motifs présents dans `text`."""
+        found: Set[int] = set(self._always_all)
+        if self._linear is not None:
+            found.update(rank for pattern, rank in self._linear if pattern in text)
+            return found
+        delta, out = self._delta, self._out
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def first(self, text: str) -> Optional[int]:
+        """Plus petit rang présent dans `text` (None si aucun)."""
+        best = self._always
+        if self._linear is not None:
+            for pattern, rank in self._linear:
+                if best is not None and rank >= best:
+                    break
+                if pattern in text:
+                    return rank
+            return best
+        delta, min_out = self._delta, self._min_out
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            rank = min_out[state]
+            if rank is not None and (best is None or rank < best):
+                best = rank
+        return best
+
+    def any(self, text: str) -> bool:
+        if self._always is not None:
+            return True
+        if self._linear is not None:
+            return any(pattern in text for pattern, _ in self._linear)
+        delta, out = self._delta, self._out
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                return True
+        return False
+
+
+@lru_cache(maxsize=64)
+def keyword_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    """Matcher partagé pour une liste de mots-clés de config (rang = position)."""
+    return KeywordMatcher((k, i) for i, k in enumerate(keywords))
@@ -0,0 +1,166 @@
+"""
+Benchmark: évaluation des règles d'alerte, chemin d'ingestion d'avant les plans compilés
+(AlertingService.check_and_trigger_alerts sur les AlertRule brutes) vs plans compilés
+(compile_rules + pré-filtre en mémoire).
+
+Usage (dans le conteneur backend, dépôt git requis pour la version de référence) :
+    python benchmark_alert_rules.py [nb_events] [nb_rules] [baseline_rev]
+
+La version de référence de app/services/alerting.py est lue via `git show` au parent du
+commit qui a introduit app/services/alert_plan.py (ou `baseline_rev`), et exécutée avec
+le calendrier non mis en cache, comme avant. Le repository est un mock (fréquence
+toujours atteinte) : seul le coût CPU de l'évaluation est mesuré. Les deux passes
+doivent déclencher exactement les mêmes couples (event, règle).
+"""
+import asyncio
+import subprocess
+import sys
+import time
+import types
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytz
+
+from app.ingestion.models import NormalizedEvent
+from app.services.alert_plan import rule_plan_cache
+from app.services.alerting import AlertingService
+from app.services.calendar_service import CalendarService
+
+ROOT = Path(__file__).resolve().parent
+
+
+def baseline_revision() -> str:
+    added = subprocess.check_output(
+        ["git", "log", "--diff-filter=A", "--format=%H", "--", "app/services/alert_plan.py"],
+        cwd=ROOT, text=True,
+    ).split()
+    return f"{added[-1]}^"
+
+
+def load_baseline_service(rev: str):
+    source = subprocess.check_output(
+        ["git", "show", f"{rev}:./app/services/alerting.py"], cwd=ROOT, text=True,
+    )
+    module = types.ModuleType("alerting_baseline")
+    exec(compile(source, f"{rev}:app/services/alerting.py", "exec"), module.__dict__)
+    return module.AlertingService()
+
+
+def build_rules(n: int):
+    kinds = [
+        dict(match_category="INTRUSION"),
+        dict(match_keyword="Zône 1"),
+        dict(condition_type="KEYWORD", value="secteur"),
+        dict(condition_type="KEYWORD", value="Défaut"),  # accent : jamais déclenchée avant, ni après
+        dict(condition_type="REGEX", value=r"zone\s+[0-9]"),
+        dict(condition_type="SEVERITY", value="alarm"),
+    ]
+    scopes = [
+        dict(time_scope="NONE"),
+        dict(time_scope="NIGHT"),
+        dict(time_scope="BUSINESS_HOURS", schedule_start="08:00", schedule_end="18:00"),
+        dict(time_scope="OFF_BUSINESS_HOURS", schedule_start="08:00", schedule_end="18:00"),
+        dict(time_scope="NIGHT", schedule_start="20:00", schedule_end="07:30"),
+        dict(time_scope="WEEKEND"),
+        dict(time_scope="HOLIDAYS"),
+    ]
+    rules = []
+    for i in range(n):
+        fields = dict(
+            id=i, name=f"RULE {i}", is_active=True, scope_site_code="SITE_3" if i % 10 == 0 else None,
+            time_scope="NONE", schedule_start=None, schedule_end=None,
+            condition_type=None, value=None, match_category=None, match_keyword=None,
+            frequency_count=2 if i % 4 == 0 else 1, frequency_window=0, sliding_window_days=1 if i % 4 == 0 else 0,
+            is_open_only=False, sequence_enabled=False, logic_enabled=False, logic_tree=None,
+        )
+        fields.update(kinds[i % len(kinds)])
+        fields.update(scopes[i % len(scopes)])
+        rules.append(SimpleNamespace(**fields))
+    return rules
+
+
+def build_events(n: int):
+    base = datetime(2026, 5, 1, 0, 0, tzinfo=pytz.UTC)  # 1er mai : férié
+    messages = ["INTRUSION ZONE 1", "DEFAUT SECTEUR", "Zone 4 alarme", "TEST CYCLIQUE"]
+    return [
+        NormalizedEvent(
+            timestamp=base + timedelta(minutes=37 * i),
+            site_code=f"SITE_{i % 7}",
+            event_type="ALARM",
+            normalized_type="APPARITION" if i % 3 else "DISPARITION",
+            category="INTRUSION" if i % 2 else "TECHNIQUE",
+            raw_message=messages[i % len(messages)],
+            status="ALARM" if i % 5 else "INFO",
+            tenant_id="benchmark",
+            source_file="benchmark.xlsx",
+        )
+        for i in range(n)
+    ]
+
+
+def build_repo():
+    repo = AsyncMock()
+    repo.count_v3_matches.return_value = 1
+    repo.count_recent_matches.return_value = 0
+    return repo
+
+
+async def run_baseline(service, events, rules):
+    hits = []
+    service._trigger_alert = AsyncMock(side_effect=lambda evt, rule, repo: hits.append((id(evt), rule.id)))
+    repo = build_repo()
+    cached = CalendarService.get_french_holidays
+    # Avant : jours fériés recalculés à chaque évaluation
+    CalendarService.get_french_holidays = staticmethod(cached.__wrapped__)
+    try:
+        t0 = time.perf_counter()
+        for event in events:
+            await service.check_and_trigger_alerts(event, rules, repo=repo)
+        elapsed = time.perf_counter() - t0
+    finally:
+        CalendarService.get_french_holidays = cached
+    return elapsed, hits
+
+
+async def run_compiled(events, rules):
+    service = AlertingService()
+    hits = []
+    service._trigger_alert = AsyncMock(side_effect=lambda evt, plan, repo: hits.append((id(evt), plan.id)))
+    repo = build_repo()
+    rule_plan_cache.invalidate()
+    t0 = time.perf_counter()
+    plans = service.compile_rules(rules)
+    for event in events:
+        await service.check_and_trigger_alerts(event, plans, repo=repo)
+    return time.perf_counter() - t0, hits
+
+
+async def benchmark(n_events: int, n_rules: int, rev: str):
+    events = build_events(n_events)
+    rules = build_rules(n_rules)
+    pairs = n_events * n_rules
+    baseline = load_baseline_service(rev)
+
+    # Warm-up (regex, fuseau, imports paresseux)
+    await run_baseline(baseline, events[:20], rules)
+    await run_compiled(events[:20], rules)
+
+    print(f"--- alert rules benchmark: {n_events} events x {n_rules} rules (baseline {rev}) ---")
+    base_s, base_hits = await run_baseline(baseline, events, rules)
+    print(f"[BENCHMARK] baseline: {pairs / base_s:,.0f} evaluations/s ({base_s:.2f}s)")
+    comp_s, comp_hits = await run_compiled(events, rules)
+    print(f"[BENCHMARK] compiled: {pairs / comp_s:,.0f} evaluations/s ({comp_s:.2f}s)")
+
+    assert sorted(base_hits) == sorted(comp_hits), "compiled plans must trigger the same (event, rule) pairs"
+    print(f"[BENCHMARK] speedup x{base_s / comp_s:.1f}, {len(comp_hits)} identical triggers")
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 50,
+        sys.argv[3] if len(sys.argv) > 3 else baseline_revision(),
+    ))
@@ -0,0 +1,65 @@
+"""
+Benchmark: DeduplicationService.is_duplicate (2 EVALSHA / event) vs check_batch (1 EVALSHA / chunk).
+
+Usage (dans le conteneur backend, Redis requis) :
+    python benchmark_dedup.py [nb_events]
+
+Chaque passe utilise un tenant_id unique : les clés des deux passes ne se chevauchent pas,
+et les flags obtenus doivent être identiques (doublons intra-lot compris).
+"""
+import asyncio
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytz
+
+from app.db.redis import get_redis_client
+from app.ingestion.deduplication import DeduplicationService
+from app.ingestion.models import NormalizedEvent
+
+
+def build_events(n: int, tenant_id: str):
+    base = datetime(2026, 3, 2, 8, 0, tzinfo=pytz.UTC)
+    events = []
+    for i in range(n):
+        # ~10% exact repeats (raw dup) and bursts of the same alarm within a few seconds (burst dup)
+        j = i - 1 if i % 10 == 9 else i
+        events.append(NormalizedEvent(
+            timestamp=base + timedelta(seconds=(j // 3) * 2),
+            site_code=f"{69000 + (j % 5)}",
+            event_type="APPARITION",
+            normalized_type="INTRUSION" if j % 4 else "DEFAUT SECTEUR",
+            raw_message=f"INTRUSION ZONE {j % 7} #{j}",
+            status="ALARM",
+            tenant_id=tenant_id,
+            source_file="benchmark.xlsx",
+        ))
+    return events
+
+
+async def benchmark(n: int):
+    redis_client = await get_redis_client()
+    service = DeduplicationService(redis_client)
+
+    print(f"--- dedup benchmark: {n} events ---")
+
+    seq_events = build_events(n, f"bench-{uuid.uuid4().hex[:8]}")
+    t0 = time.perf_counter()
+    seq_flags = [await service.is_duplicate(e) for e in seq_events]
+    seq_s = time.perf_counter() - t0
+    print(f"[BENCHMARK] mode=per_event duration={seq_s:.3f}s events_per_s={n / seq_s:,.0f} duplicates={sum(seq_flags)}")
+
+    batch_events = build_events(n, f"bench-{uuid.uuid4().hex[:8]}")
+    t0 = time.perf_counter()
+    batch_flags = await service.check_batch(batch_events)
+    batch_s = time.perf_counter() - t0
+    print(f"[BENCHMARK] mode=batch     duration={batch_s:.3f}s events_per_s={n / batch_s:,.0f} duplicates={sum(batch_flags)}")
+
+    assert seq_flags == batch_flags, "check_batch must return the same flags as the sequential loop"
+    print(f"[BENCHMARK] speedup x{seq_s / batch_s:.1f}, flags identical")
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
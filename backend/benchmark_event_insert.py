@@ -0,0 +1,66 @@
+"""
+Benchmark: EventRepository.create_batch, mode ORM vs mode BULK (INSERT ... RETURNING).
+
+Usage (dans le conteneur backend) :
+    python benchmark_event_insert.py [nb_rows]
+
+Chaque mode insère le même lot dans une transaction annulée à la fin (aucune donnée conservée).
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+from app.db.session import AsyncSessionLocal
+from app.ingestion.models import NormalizedEvent
+from app.services.repository import EventRepository
+
+
+def build_events(n: int):
+    base = datetime(2026, 3, 2, 8, 0, tzinfo=pytz.UTC)
+    return [
+        NormalizedEvent(
+            timestamp=base + timedelta(seconds=i),
+            site_code=f"{69000 + (i % 300)}",
+            client_name=f"CLIENT {i % 300}",
+            event_type="APPARITION",
+            raw_message=f"INTRUSION ZONE {i % 12}",
+            normalized_message=f"intrusion zone {i % 12}",
+            raw_code="130",
+            status="ALARM",
+            source_file="benchmark.xlsx",
+            tenant_id="benchmark",
+            metadata={"row": i},
+        )
+        for i in range(n)
+    ]
+
+
+async def run(mode: str, events) -> float:
+    async with AsyncSessionLocal() as session:
+        repo = EventRepository(session)
+        t0 = time.perf_counter()
+        inserted = await repo.create_batch(events, import_id=None, mode=mode)
+        await session.flush()
+        ids = [e.id for e in inserted]
+        elapsed = time.perf_counter() - t0
+        assert len(ids) == len(events) and all(ids)
+        await session.rollback()
+    return elapsed
+
+
+async def benchmark(n: int):
+    events = build_events(n)
+    # Warm-up (sites, connexions, caches de statements)
+    await run("orm", events[:50])
+
+    print(f"--- create_batch benchmark: {n} rows ---")
+    for mode in ("orm", "bulk"):
+        elapsed = await run(mode, events)
+        print(f"[BENCHMARK] mode={mode:<4} duration={elapsed:.3f}s rows_per_s={n / elapsed:,.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1800))
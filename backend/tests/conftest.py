@@ -5,6 +5,7 @@ Stratégie :
 - `init_test_db` : crée les tables une seule fois (scope=session).
 - `db_cleanup`   : TRUNCATE avant chaque test (autouse=True) → isolation parfaite.
 - `db_session`   : engine dédié par test → pas de fuite de boucle asyncio.
+- `reset_process_caches` : vide les caches process (settings, index SMTP) avant chaque test.
 - `redis_client` : stub MagicMock → aucune dépendance Redis.
 """
 
@@ -36,6 +37,7 @@ async def init_test_db():
              raise RuntimeError(f"CRITICAL: drop_all blocked! Database '{db_name}' is not a test database.")
         
         await conn.run_sync(Base.metadata.drop_all)
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
     yield
     await init_engine.dispose()
@@ -60,6 +62,20 @@ async def db_cleanup(init_test_db):
     yield
 
 
+# ──────────────────────────────────────────────
+# Caches process : repartir d'un état vide à chaque test
+# ──────────────────────────────────────────────
+
+@pytest.fixture(autouse=True)
+def reset_process_caches():
+    """Settings et index SMTP sont mis en cache par process : pas de fuite entre tests (sessions mockées)."""
+    from app.services import cache_bus
+    import app.services.settings_cache  # noqa: F401
+    import app.services.smtp_rule_index  # noqa: F401
+    cache_bus.invalidate_local(None, "test")
+    yield
+
+
 # ──────────────────────────────────────────────
 # DB: per-test session with its own engine
 # ──────────────────────────────────────────────
@@ -0,0 +1,50 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.ingestion.deduplication import DeduplicationService
+from app.ingestion.models import NormalizedEvent
+
+
+def _events(n: int = 2500):
+    """Import réaliste : lignes répétées (raw), rafales même type/statut (burst), events distincts."""
+    rng = random.Random(42)
+    start = datetime(2026, 3, 1, 8, 0, 0)
+    events = []
+    for i in range(n):
+        if events and rng.random() < 0.15:
+            # Même ligne de log répétée dans le fichier -> doublon raw intra-batch
+            events.append(events[rng.randrange(len(events))].model_copy())
+            continue
+        events.append(NormalizedEvent(
+            timestamp=start + timedelta(seconds=rng.randrange(0, 3600)),
+            site_code=f"C-{rng.randrange(20):05d}",
+            event_type="BURGLARY",
+            normalized_type=rng.choice(["BURGLARY", "FIRE", "AC_LOSS"]),
+            raw_message=f"Zone {rng.randrange(8)} line {i}",
+            status=rng.choice(["ALARM", "RESTORE"]),
+            tenant_id="default-tenant",
+            source_file="import.xls",
+        ))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_check_batch_matches_sequential_is_duplicate():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+
+    events = _events()
+
+    sequential = DeduplicationService(fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer()))
+    expected = [await sequential.is_duplicate(e) for e in events]
+
+    batched = DeduplicationService(fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer()))
+    batched.batch_size = 300  # plusieurs EVALSHA, dernier lot incomplet
+    flags = await batched.check_batch(events)
+
+    assert len(flags) == len(events)
+    assert flags == expected
+    # Le jeu couvre bien doublons raw, rafales et events nouveaux
+    assert 0 < sum(expected) < len(events)
@@ -0,0 +1,76 @@
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.parsers.executor import ParserExecutor
+from app.parsers.parse_cache import parse_cache
+from app.parsers.tsv_parser import TsvParser
+from app.parsers.pdf_parser import PdfParser
+
+FIXTURE = Path(__file__).parent.parent / "fixtures" / "ingestion" / "sample_ypsilon.xls"
+
+
+@pytest.mark.asyncio
+async def test_pool_parse_matches_inline_parse():
+    """Le parsing en process fils rend les mêmes events et recopie last_metrics."""
+    inline_parser = TsvParser()
+    inline_events = inline_parser.parse(str(FIXTURE))
+
+    executor = ParserExecutor()
+    executor.enabled = True
+    try:
+        pooled_parser = TsvParser()
+        with patch.object(parse_cache, "enabled", False):
+            pooled_events = await executor.parse(pooled_parser, str(FIXTURE))
+    finally:
+        executor.shutdown()
+
+    assert pooled_events == inline_events
+    assert pooled_parser.last_metrics == inline_parser.last_metrics
+
+
+@pytest.mark.asyncio
+async def test_patched_parser_runs_inline():
+    """Un parser patché (tests, plugins) ne peut pas partir dans le pool : exécution inline."""
+    executor = ParserExecutor()
+    with patch.object(PdfParser, "parse", return_value=[]):
+        assert not executor._runs_in_pool(PdfParser())
+        assert await executor.parse(PdfParser(), "/nonexistent.pdf") == []
+    assert executor._pool is None
+
+
+@pytest.mark.asyncio
+async def test_streaming_batches_match_parse():
+    """TSV lu en flux : lots de taille fixe, mêmes events et métriques que parse()."""
+    inline_parser = TsvParser()
+    inline_events = inline_parser.parse(str(FIXTURE))
+
+    executor = ParserExecutor()
+    streamed_parser = TsvParser()
+    batches = [batch async for batch in executor.iter_batches(streamed_parser, str(FIXTURE), batch_size=7)]
+
+    assert executor._pool is None  # pas de pool pour un parser streaming
+    assert all(len(batch) == 7 for batch in batches[:-1]) and 0 < len(batches[-1]) <= 7
+    assert [e for batch in batches for e in batch] == inline_events
+    assert streamed_parser.last_metrics == inline_parser.last_metrics
+
+
+@pytest.mark.asyncio
+async def test_non_streaming_parser_is_sliced():
+    executor = ParserExecutor()
+    with patch.object(PdfParser, "parse", return_value=list(range(5))):
+        batches = [batch async for batch in executor.iter_batches(PdfParser(), "/nonexistent.pdf", batch_size=2)]
+    assert batches == [[0, 1], [2, 3], [4]]
+
+
+@pytest.mark.asyncio
+async def test_stream_timeout_ignores_consumer_time():
+    """Le timeout du flux ne compte que la production des lots, pas le traitement entre deux lots."""
+    import asyncio
+
+    executor = ParserExecutor()
+    batches = 0
+    async for _ in executor.iter_batches(TsvParser(), str(FIXTURE), batch_size=1, timeout=0.5):
+        batches += 1
+        await asyncio.sleep(0.2)  # insertion / alerting du lot
+    assert batches > 3
@@ -0,0 +1,162 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.ingestion.slot_pool import IngestionSlotPool
+from app.ingestion.adapters.base import AdapterItem
+
+
+def _item(name, msg_id=None):
+    return AdapterItem(
+        filename=name, path=f"/tmp/{name}", size_bytes=1, mtime=0.0,
+        source="email", source_message_id=msg_id, metadata={}
+    )
+
+
+@pytest.mark.asyncio
+async def test_slot_pool_caps_parallelism():
+    """Jamais plus de `size` jobs en vol simultanément."""
+    pool = IngestionSlotPool(3)
+    state = {"running": 0, "peak": 0}
+
+    async def job():
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await asyncio.sleep(0.01)
+        state["running"] -= 1
+        return "ok"
+
+    results = await pool.run_all([job for _ in range(10)])
+
+    assert results == ["ok"] * 10
+    assert state["peak"] == 3
+    snap = pool.snapshot()
+    assert snap["max_concurrency"] == 3
+    assert sum(s["items"] for s in snap["slots"]) == 10
+    assert all(0.0 <= s["utilization"] <= 1.0 for s in snap["slots"])
+    # Reset after snapshot
+    assert sum(s["items"] for s in pool.snapshot()["slots"]) == 0
+
+
+@pytest.mark.asyncio
+async def test_slot_pool_isolates_failures():
+    pool = IngestionSlotPool(2)
+
+    async def boom():
+        raise ValueError("parse failed")
+
+    async def ok():
+        return 1
+
+    results = await pool.run_all([boom, ok])
+    assert isinstance(results[0], ValueError)
+    assert results[1] == 1
+    assert pool.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_email_group_keeps_xls_then_pdf_order():
+    """Les groupes tournent en parallèle mais l'ordre XLS -> PDF est conservé dans un groupe."""
+    from app.ingestion import worker
+
+    calls = []
+
+    async def fake_process(adapter, item, redis_lock, redis_client, poll_run_id="", existing_import_id=None, collect_events=True):
+        assert collect_events  # contrôle d'intégrité XLS / PDF du groupe
+        calls.append((item.source_message_id, item.filename, existing_import_id))
+        await asyncio.sleep(0.01)
+        return (42 if item.filename.endswith(".xls") else None), []
+
+    pool = IngestionSlotPool(2)
+    groups = {
+        "m1": [(MagicMock(), _item("support.pdf", "m1")), (MagicMock(), _item("data.xls", "m1"))],
+        "m2": [(MagicMock(), _item("b.pdf", "m2")), (MagicMock(), _item("a.xls", "m2"))],
+    }
+
+    with patch.object(worker, "process_ingestion_item", side_effect=fake_process):
+        await pool.run_all([
+            (lambda m=m, g=g: worker.process_email_group(m, g, MagicMock(), AsyncMock(), "run", []))
+            for m, g in groups.items()
+        ])
+
+    for msg_id in ("m1", "m2"):
+        seq = [c for c in calls if c[0] == msg_id]
+        assert seq[0][1].endswith(".xls") and seq[0][2] is None
+        assert seq[1][1].endswith(".pdf") and seq[1][2] == 42
+
+    # Both groups started before either finished
+    assert {calls[0][0], calls[1][0]} == {"m1", "m2"}
+
+
+@pytest.mark.asyncio
+async def test_daily_quota_is_serialized_per_provider():
+    """Groupes concurrents d'un même provider : comptage + création sous verrou, quota jamais dépassé."""
+    import fakeredis
+    from types import SimpleNamespace
+    from app.ingestion import worker
+    from app.ingestion.redis_lock import RedisLock
+
+    committed = []
+
+    class Session:
+        def __init__(self):
+            self.pending = []
+
+        async def commit(self):
+            await asyncio.sleep(0.01)
+            committed.extend(log for log in self.pending if log not in committed)
+
+    class Repo:
+        def __init__(self, session):
+            self.session = session
+
+        async def count_imports_today_tz(self, provider_id):
+            await asyncio.sleep(0.01)  # laisse les autres groupes s'intercaler
+            return sum(1 for log in committed if log.status != "DAILY_QUOTA_EXCEEDED")
+
+        async def create_import_log(self, filename, **kwargs):
+            log = SimpleNamespace(filename=filename, status="PENDING")
+            self.session.pending.append(log)
+            return log
+
+    async def run(i):
+        session = Session()
+        log = await worker._create_import_log_within_quota(
+            session, Repo(session), lock, adapter, _item(f"f{i}.xls", f"m{i}"), provider, 1, "PROV"
+        )
+        return log.status
+
+    lock = RedisLock(fakeredis.FakeAsyncRedis())
+    adapter = MagicMock()
+    adapter.ack_unmatched = AsyncMock(return_value=None)
+    provider = SimpleNamespace(id=1, max_emails_per_day=2)
+
+    statuses = await asyncio.gather(*(run(i) for i in range(5)))
+
+    assert sorted(statuses) == ["DAILY_QUOTA_EXCEEDED"] * 3 + ["PENDING"] * 2
+    assert adapter.ack_unmatched.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_file_stops_when_scheduler_stalls(tmp_path):
+    """Le fichier du healthcheck n'est plus touché si aucun slot ni cycle n'a progressé."""
+    from app.ingestion import worker
+
+    pool = IngestionSlotPool(2)
+    path = tmp_path / "heartbeat"
+    redis_client = AsyncMock()
+
+    async def one_beat():
+        task = asyncio.create_task(worker.heartbeat_loop(redis_client, pool, [], path, interval=60))
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    await one_beat()
+    assert path.exists()
+
+    path.unlink()
+    pool.last_progress -= 3600
+    await one_beat()
+    assert not path.exists()
+    payload = redis_client.set.await_args.args[1]
+    assert '"status": "STALLED"' in payload
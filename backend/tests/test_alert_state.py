@@ -0,0 +1,105 @@
+"""
+alert_state / alert_disparition_state : tenus à jour à l'écriture des hits et des
+DISPARITION, recalculés à l'identique après purge d'un import, cohérents avec un
+recalcul complet (alert_state.check).
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+
+from app.db.models import AlertRule, AlertState
+from app.ingestion.models import NormalizedEvent
+from app.services import alert_state
+from app.services.business_rules import BusinessRuleEngine
+from app.services.repository import AdminRepository, EventRepository
+
+BASE = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)
+
+
+def _event(minutes: int, site_code: str, event_type: str = "APPARITION"):
+    return NormalizedEvent(
+        timestamp=BASE + timedelta(minutes=minutes),
+        site_code=site_code,
+        client_name="CLIENT",
+        event_type=event_type,
+        raw_message=f"{event_type} INTRUSION",
+        raw_code="130",
+        status="ALARM",
+        source_file="state.xlsx",
+        tenant_id="test-tenant",
+    )
+
+
+async def _hits(session, events, rule_id, zone_id=None):
+    engine = BusinessRuleEngine(session)
+    for event in events:
+        await engine._record_hit(event, "STATE_RULE", "match", rule_id_override=rule_id,
+                                 hit_metadata_override={"zone_id": zone_id} if zone_id else None)
+    return await engine.flush_hits()
+
+
+@pytest.mark.asyncio
+async def test_state_follows_hits_and_disparitions(db_session):
+    rule = AlertRule(name="STATE_RULE", condition_type="RAW_CODE", value="130")
+    db_session.add(rule)
+    await db_session.flush()
+    repo = EventRepository(db_session)
+    admin = AdminRepository(db_session)
+
+    imp = await repo.create_import_log("state.xlsx", file_hash="alert-state-1")
+    first = await repo.create_batch([_event(0, "STATE-1"), _event(5, "STATE-1"), _event(6, "STATE-2")],
+                                    import_id=imp.id, mode="bulk")
+    assert await _hits(db_session, first[:2], rule.id) == 2
+    assert await _hits(db_session, first[2:], rule.id, zone_id="4") == 1
+    assert await _hits(db_session, first, rule.id) == 0  # déjà en base : pas de double comptage
+
+    [active] = await admin.get_active_alerts_by_site("STATE-1")
+    assert (active["rule_name"], active["count_hits"], active["recent_event_id"]) == ("STATE_RULE", 2, first[1].id)
+    assert (active["first_seen"], active["last_seen"]) == (BASE, BASE + timedelta(minutes=5))
+
+    # DISPARITION sans zone : ferme STATE-1, pas la zone 4 de STATE-2
+    later = await repo.create_batch([_event(30, "STATE-1", "DISPARITION"), _event(31, "STATE-2", "DISPARITION")],
+                                    mode="bulk")
+    assert await admin.get_active_alerts_by_site("STATE-1") == []
+    [archived] = await admin.get_archived_alerts_by_site("STATE-1", days=36500)
+    assert archived["closed_at"] == later[0].time
+    assert len(await admin.get_active_alerts_by_site("STATE-2")) == 1
+
+    # Nouveau hit après la disparition : l'alerte redevient active
+    reopened = await repo.create_batch([_event(45, "STATE-1")], mode="bulk")
+    await _hits(db_session, reopened, rule.id)
+    [active] = await admin.get_active_alerts_by_site("STATE-1")
+    assert active["count_hits"] == 3
+    assert await alert_state.check(db_session) == {"alert_state": 0, "alert_disparition_state": 0}
+
+    # Purge de l'import : état recalculé depuis les hits restants
+    await admin.delete_import_data(imp.id)
+    rows = (await db_session.execute(
+        select(AlertState.site_code, AlertState.zone_id, AlertState.count_hits).order_by(AlertState.site_code)
+    )).all()
+    assert rows == [("STATE-1", None, 1)]
+    assert await alert_state.check(db_session) == {"alert_state": 0, "alert_disparition_state": 0}
+
+
+@pytest.mark.asyncio
+async def test_rebuild_matches_incremental_state(db_session):
+    rule = AlertRule(name="STATE_RULE", condition_type="RAW_CODE", value="130")
+    db_session.add(rule)
+    await db_session.flush()
+    repo = EventRepository(db_session)
+
+    events = await repo.create_batch([_event(i, f"REBUILD-{i % 3}") for i in range(12)], mode="orm")
+    await db_session.flush()
+    await _hits(db_session, events[::2], rule.id)
+    await repo.create_batch([_event(20, "REBUILD-0", "DISPARITION")], mode="orm")
+    await db_session.flush()
+
+    columns = (AlertState.rule_name, AlertState.site_code, AlertState.first_hit_time,
+               AlertState.last_hit_time, AlertState.last_event_id, AlertState.count_hits)
+    incremental = (await db_session.execute(select(*columns).order_by(AlertState.site_code))).all()
+
+    counts = await alert_state.rebuild(db_session)
+    rebuilt = (await db_session.execute(select(*columns).order_by(AlertState.site_code))).all()
+
+    assert counts == {"alert_state": 3, "alert_disparition_state": 1}
+    assert rebuilt == incremental
@@ -0,0 +1,140 @@
+import pytest
+import pytz
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from app.ingestion.models import NormalizedEvent
+from app.services.alert_plan import RulePlanCache, EventContext, compile_rule
+from app.services.alerting import AlertingService
+from app.services.calendar_service import CalendarService
+
+
+def _rule(i: int, **overrides):
+    kinds = [
+        dict(match_category="INTRUSION"),
+        dict(match_keyword="Zône 1"),
+        dict(condition_type="KEYWORD", value="secteur"),
+        dict(condition_type="REGEX", value=r"zone\s+[0-9]"),
+        dict(condition_type="SEVERITY", value="alarm"),
+    ]
+    scopes = [
+        dict(time_scope="NONE"),
+        dict(time_scope="NIGHT"),
+        dict(time_scope="BUSINESS_HOURS", schedule_start="08:00", schedule_end="18:00"),
+        dict(time_scope="OFF_BUSINESS_HOURS", schedule_start="08:00", schedule_end="18:00"),
+        dict(time_scope="NIGHT", schedule_start="20:00", schedule_end="07:30"),
+        dict(time_scope="WEEKEND"),
+        dict(time_scope="HOLIDAYS"),
+    ]
+    fields = dict(
+        id=i, name=f"RULE {i}", is_active=True, scope_site_code="SITE_3" if i % 10 == 0 else None,
+        time_scope="NONE", schedule_start=None, schedule_end=None,
+        condition_type=None, value=None, match_category=None, match_keyword=None,
+        frequency_count=2 if i % 4 == 0 else 1, frequency_window=0, sliding_window_days=1 if i % 4 == 0 else 0,
+        is_open_only=False, sequence_enabled=False, logic_enabled=False, logic_tree=None,
+    )
+    fields.update(kinds[i % len(kinds)])
+    fields.update(scopes[i % len(scopes)])
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+def _events(n: int):
+    base = datetime(2026, 5, 1, 0, 0, tzinfo=pytz.UTC)  # 1er mai : férié
+    messages = ["INTRUSION ZONE 1", "DEFAUT SECTEUR", "Zone 4 alarme", "TEST CYCLIQUE"]
+    return [
+        NormalizedEvent(
+            timestamp=base + timedelta(minutes=37 * i),
+            site_code=f"SITE_{i % 7}",
+            event_type="ALARM",
+            normalized_type="APPARITION" if i % 3 else "DISPARITION",
+            category="INTRUSION" if i % 2 else "TECHNIQUE",
+            raw_message=messages[i % len(messages)],
+            status="ALARM" if i % 5 else "INFO",
+            tenant_id="plan-tenant",
+            source_file="plan.xlsx",
+        )
+        for i in range(n)
+    ]
+
+
+def _repo():
+    repo = AsyncMock()
+    repo.count_v3_matches.return_value = 1
+    repo.count_recent_matches.return_value = 0
+    return repo
+
+
+def test_plan_is_compiled_once_and_recompiled_on_change():
+    cache = RulePlanCache()
+    rule = _rule(1, match_keyword="Défaut Secteur")
+
+    plan = cache.get(rule)
+    assert plan.norm_keyword == "defaut secteur"
+    assert cache.get(rule) is plan
+    assert cache.compiled == 1
+
+    # Rules reloaded from DB are new objects: same fields -> same plan
+    assert cache.get(_rule(1, match_keyword="Défaut Secteur")) is plan
+    assert cache.compiled == 1
+
+    edited = _rule(1, match_keyword="Intrusion")
+    assert cache.get(edited).norm_keyword == "intrusion"
+    assert cache.compiled == 2
+
+    cache.invalidate(rule.id)
+    assert len(cache) == 0
+
+
+def test_invalid_schedule_and_regex_are_compiled_once():
+    plan = RulePlanCache().get(_rule(
+        3, condition_type="REGEX", value="(unclosed", time_scope="BUSINESS_HOURS",
+        schedule_start="25h", schedule_end="18:00",
+    ))
+    assert plan.window is None and plan.has_schedule
+    assert plan.regex is None and plan.regex_error
+
+
+def test_holidays_are_cached_per_year():
+    assert CalendarService.get_french_holidays(2026) is CalendarService.get_french_holidays(2026)
+    assert CalendarService.is_holiday(datetime(2026, 5, 25).date())  # Lundi de Pentecôte
+
+
+@pytest.mark.asyncio
+async def test_fast_path_triggers_same_rules_as_detailed_evaluation():
+    service = AlertingService()
+    repo = _repo()
+    rules = [_rule(i) for i in range(50)]
+    events = _events(300)
+
+    expected = []
+    for idx, event in enumerate(events):
+        for rule in rules:
+            if (await service.evaluate_rule(event, rule, repo=repo))["triggered"]:
+                expected.append((idx, rule.id))
+
+    hits = []
+    service._trigger_alert = AsyncMock(side_effect=lambda evt, plan, repo: hits.append((events.index(evt), plan.id)))
+    plans = service.compile_rules(rules)
+    for event in events:
+        await service.check_and_trigger_alerts(event, plans, repo=repo)
+
+    assert expected
+    assert hits == expected
+
+
+def test_event_context_uses_display_timezone():
+    event = _events(1)[0]
+    ctx = EventContext.from_event(event)
+    assert ctx.local_hour == 2  # 00:00 UTC -> 02:00 Europe/Paris (CEST)
+    assert ctx.is_holiday and not ctx.is_weekend
+    assert ctx.message == "intrusion zone 1"
+
+
+def test_keyword_condition_keeps_plain_substring_semantics():
+    # Comme avant compilation : value.lower() dans le message, sans normalize_text de la valeur
+    ctx = EventContext.from_event(_events(2)[1])  # "DEFAUT SECTEUR"
+    assert compile_rule(_rule(2, value="SECTEUR")).match_condition(ctx)
+    assert not compile_rule(_rule(2, value="Défaut")).match_condition(ctx)
+    assert not compile_rule(_rule(2, value="defaut-secteur")).match_condition(ctx)
@@ -229,3 +229,48 @@ class TestSiteConnectionUpsert:
         row = result.scalars().first()
         assert row.first_seen_at == t1, "first_seen_at ne doit pas être écrasé"
         assert row.last_seen_at == t2, "last_seen_at doit être mis à jour"
+
+    @pytest.mark.asyncio
+    @pytest.mark.integration
+    async def test_batch_upsert_matches_per_event_upsert(self, db_session):
+        """
+        upsert_site_connections (1 requête / import) == N appels upsert_site_connection.
+        """
+        from types import SimpleNamespace
+        from app.services.repository import EventRepository
+        from sqlalchemy import select
+        from app.db.models import SiteConnection, MonitoringProvider
+
+        repo = EventRepository(db_session)
+        db_session.add_all([
+            MonitoringProvider(id=1, code="P1", label="Provider 1"),
+            MonitoringProvider(id=2, code="P2", label="Provider 2"),
+        ])
+        await db_session.flush()
+
+        t0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        # Existing row on both providers, then the same import applied both ways
+        for pid in (1, 2):
+            await repo.upsert_site_connection(provider_id=pid, code_site='BATCH1', client_name='Old', seen_at=t0)
+
+        events = [
+            SimpleNamespace(site_code='BATCH1', client_name='New', time=datetime(2025, 2, 1, tzinfo=timezone.utc)),
+            SimpleNamespace(site_code='BATCH1', client_name=None, time=datetime(2025, 3, 1, tzinfo=timezone.utc)),
+            SimpleNamespace(site_code='BATCH2', client_name='Fresh', time=datetime(2025, 2, 5, tzinfo=timezone.utc)),
+            SimpleNamespace(site_code='BATCH2', client_name='', time=datetime(2025, 2, 6, tzinfo=timezone.utc)),
+        ]
+        for e in events:
+            await repo.upsert_site_connection(provider_id=1, code_site=e.site_code, client_name=e.client_name, seen_at=e.time)
+        await repo.upsert_site_connections(2, events)
+        await db_session.flush()
+        db_session.expire_all()  # rows touched by the core UPSERT are stale in the identity map
+
+        result = await db_session.execute(
+            select(SiteConnection).where(SiteConnection.code_site.in_(['BATCH1', 'BATCH2']))
+        )
+        rows = {(r.provider_id, r.code_site): r for r in result.scalars().all()}
+        for code in ('BATCH1', 'BATCH2'):
+            a, b = rows[(1, code)], rows[(2, code)]
+            assert (a.total_events, a.client_name, a.first_seen_at, a.last_seen_at) == \
+                   (b.total_events, b.client_name, b.first_seen_at, b.last_seen_at)
+        assert rows[(2, 'BATCH1')].total_events == 3
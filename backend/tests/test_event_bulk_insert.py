@@ -0,0 +1,73 @@
+"""
+Tests create_batch : mode "bulk" (INSERT ... RETURNING id) vs mode "orm".
+Les deux modes doivent produire exactement les mêmes lignes en base.
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+
+from app.db.models import Event
+from app.ingestion.models import NormalizedEvent
+from app.services.repository import EventRepository, InsertedEvent
+
+
+def _events(n: int, tag: str):
+    base = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)
+    return [
+        NormalizedEvent(
+            timestamp=base + timedelta(minutes=i),
+            site_code=f"BULK{i % 3}",
+            client_name=f"CLIENT {i % 3}",
+            event_type="APPARITION",
+            raw_message=f"INTRUSION {tag} {i}",
+            raw_code="130",
+            status="ALARM",
+            source_file=f"{tag}.xlsx",
+            tenant_id="test-tenant",
+            metadata={"row": i},
+        )
+        for i in range(n)
+    ]
+
+
+COLUMNS = (
+    "time", "site_id", "site_code", "client_name", "raw_message", "raw_code",
+    "normalized_type", "severity", "event_metadata", "dup_count", "in_maintenance",
+)
+
+
+@pytest.mark.asyncio
+async def test_bulk_mode_returns_ids_in_input_order(db_session):
+    repo = EventRepository(db_session)
+    events = _events(25, "bulk")
+
+    inserted = await repo.create_batch(events, mode="bulk")
+
+    assert len(inserted) == 25
+    assert all(isinstance(e, InsertedEvent) for e in inserted)
+    assert [e.raw_message for e in inserted] == [e.raw_message for e in events]
+
+    res = await db_session.execute(select(Event).where(Event.id.in_([e.id for e in inserted])))
+    by_id = {e.id: e for e in res.scalars().all()}
+    for row in inserted:
+        assert by_id[row.id].raw_message == row.raw_message
+        assert by_id[row.id].time == row.time
+
+
+@pytest.mark.asyncio
+async def test_bulk_and_orm_modes_write_identical_rows(db_session):
+    repo = EventRepository(db_session)
+
+    orm_rows = await repo.create_batch(_events(10, "same"), mode="orm")
+    await db_session.flush()
+    bulk_rows = await repo.create_batch(_events(10, "same"), mode="bulk")
+
+    res = await db_session.execute(
+        select(Event).where(Event.id.in_([e.id for e in orm_rows + bulk_rows])).order_by(Event.id)
+    )
+    rows = res.scalars().all()
+    orm_db = [r for r in rows if r.id in {e.id for e in orm_rows}]
+    bulk_db = [r for r in rows if r.id in {e.id for e in bulk_rows}]
+
+    for a, b in zip(orm_db, bulk_db):
+        assert {c: getattr(a, c) for c in COLUMNS} == {c: getattr(b, c) for c in COLUMNS}
@@ -0,0 +1,106 @@
+"""
+ExcelParser, profils à mapping : parcours en colonnes (ffill du contexte site / client,
+to_datetime vectorisé, str.extract des codes). Mêmes events et métriques que le
+parcours ligne à ligne d'origine.
+"""
+import time
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from app.parsers.excel_parser import ExcelParser
+
+HISTOCORS_FILE = Path(__file__).resolve().parents[2] / "2026-03-02-19-YPSILON_HISTOCORS.xlsx"
+HISTOCORS_CONFIG = {
+    "mapping": {"site_code": 0, "client_name": 1, "timestamp": 6, "raw_message": 8, "raw_code": 11},
+    "action_config": {},
+    "provider_code": "YPSILON_HISTO",
+    "format": "HISTO",
+}
+
+
+def _row(site="", client="", ts="", msg="", code="", op_ts="", op_msg=""):
+    row = [None] * 13
+    row[0], row[1], row[6], row[8], row[11], row[9], row[12] = site, client, ts, msg, code, op_ts, op_msg
+    return row
+
+
+def _parse(rows, config=HISTOCORS_CONFIG):
+    parser = ExcelParser()
+    with patch("pandas.read_excel", return_value=pd.DataFrame(rows)):
+        events = parser.parse("synthetic.xlsx", parser_config=config)
+    return events, parser.last_metrics
+
+
+def _parse_file():
+    parser = ExcelParser()
+    events = parser.parse(str(HISTOCORS_FILE), parser_config=HISTOCORS_CONFIG)
+    return events, parser.last_metrics
+
+
+def test_mapped_rows_context_dates_and_codes():
+    rows = [
+        _row(site="HEADER", ts="ignored"),
+        _row(ts="01/03/2026 10:00:00", msg="AVANT SITE"),                       # pas de contexte site
+        _row(site="00032308", client="PUGET", ts="02/03/2026 13:44:16", msg="TEST CYCLIQUE"),
+        _row(ts="2026-03-02 14:00:00", msg="1234  ALARM INTRUSION"),           # site / client hérités
+        _row(client="nan", ts="2/3/2026 9:05:00", msg="defaut $AB12, zone 2"),  # format non zéro-paddé
+        _row(ts="02/03/2026 15:30", msg="MISE EN SERVICE 0003"),
+        _row(ts="31/02/2026 10:00:00", msg="date invalide"),
+        _row(msg="sans date"),
+        _row(op_ts="02/03/2026 16:00:00", msg="ignoré", op_msg="Appel client $OP7"),
+        _row(site="OH002280", ts=datetime(2026, 3, 2, 17, 10, 54), msg="RETARD", code="$ZZ"),
+    ]
+    events, metrics = _parse(rows)
+
+    assert [(e.row_index, e.site_code, e.client_name) for e in events] == [
+        (3, "32308", "PUGET"), (4, "32308", "PUGET"), (5, "32308", "PUGET"),
+        (6, "32308", "PUGET"), (9, "32308", "PUGET"), (10, "2280", "PUGET"),
+    ]
+    assert [e.timestamp for e in events] == [
+        datetime(2026, 3, 2, 13, 44, 16), datetime(2026, 3, 2, 14, 0), datetime(2026, 3, 2, 9, 5),
+        datetime(2026, 3, 2, 15, 30), datetime(2026, 3, 2, 16, 0), datetime(2026, 3, 2, 17, 10, 54),
+    ]
+    assert [(e.raw_code, e.normalized_code, e.event_type) for e in events] == [
+        ("", None, "TEST CYCLIQUE"),
+        ("1234", "1234", "APPARITION"),
+        ("$AB12", "AB12", "UNKNOWN"),
+        ("0003", "0003", "MISE EN SERVICE"),
+        ("$OP7", "OP7", "OPERATOR_ACTION"),
+        ("$ZZ", "ZZ", "DISPARITION"),
+    ]
+    assert events[4].raw_message == "Appel client $OP7"
+
+    assert metrics["events_created"] == 6
+    assert metrics["site_blocks_detected"] == 2
+    assert metrics["with_code_count"] == 5
+    assert metrics["skipped_reasons"] == {"NO_SITE_CONTEXT": 1, "DATE_PARSE_ERROR": 1, "MISSING_DATE_TIME": 1}
+    assert [(s["row"], s["reason"]) for s in metrics["skipped_samples"]] == [
+        (2, "NO_SITE_CONTEXT"), (7, "DATE_PARSE_ERROR"), (8, "MISSING_DATE_TIME"),
+    ]
+
+
+def test_histocors_golden_file():
+    if not HISTOCORS_FILE.exists():
+        pytest.skip(f"Golden file {HISTOCORS_FILE.name} not found")
+
+    t0 = time.perf_counter()
+    events, metrics = _parse_file()
+    duration = time.perf_counter() - t0
+
+    print(f"\n[BENCHMARK] HISTOCORS: {metrics['rows_detected']} rows in {duration:.2f}s "
+          f"({metrics['rows_detected'] / duration:.0f} rows/sec)")
+
+    assert metrics["rows_detected"] == 2238
+    assert metrics["events_created"] == len(events) == 1832
+    assert metrics["skipped_reasons"] == {"MISSING_DATE_TIME": 405}
+    assert metrics["site_blocks_detected"] == 405
+    assert metrics["with_code_count"] == 686
+    assert sum(e.event_type == "OPERATOR_ACTION" for e in events) == 123
+    first, last = events[0], events[-1]
+    assert (first.row_index, first.site_code, first.site_code_raw, first.client_name, first.timestamp) == (
+        3, "32308", "00032308", "PUGET ANNETTE", datetime(2026, 3, 2, 13, 44, 16))
+    assert (last.row_index, last.site_code, last.client_name) == (2238, "2280", "CARSAT VALENCE")
@@ -0,0 +1,119 @@
+"""
+Moteur de fréquence par import : les comptages en mémoire (bisect sur la tranche préchargée)
+doivent être identiques aux COUNT(*) SQL de count_v3_matches / count_recent_matches.
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from types import SimpleNamespace
+
+from app.ingestion.models import NormalizedEvent
+from app.services.alert_plan import compile_rule, frequency_horizon
+from app.db.models import Event
+from app.services.frequency_engine import FrequencyEngine, keyword_clause, keyword_needle
+from app.services.repository import EventRepository
+
+T0 = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)
+
+
+def _row(minutes, action="APPARITION", category="INTRUSION", message="intrusion zone 1", severity="ALARM", id_=0):
+    return (T0 + timedelta(minutes=minutes), id_, action, category, message.lower(), severity.upper())
+
+
+def _engine():
+    rows = [
+        _row(0), _row(10, message="DEFAUT SECTEUR", category="TECHNIQUE"),
+        _row(20), _row(30, action="DISPARITION"), _row(40, severity="INFO"),
+    ]
+    return FrequencyEngine(T0 - timedelta(days=1), T0 + timedelta(hours=1), {"S1": rows})
+
+
+def test_counts_use_inclusive_bounds():
+    engine = _engine()
+    ref = T0 + timedelta(minutes=20)
+    # [ref - 20min, ref] : bornes incluses comme `time >= start AND time <= ref`
+    assert engine.count_recent("S1", None, None, 20 * 60, ref) == 3
+    assert engine.count_recent("S1", "SEVERITY", "alarm", 3600, T0 + timedelta(minutes=40)) == 4
+    assert engine.count_recent("S1", "KEYWORD", "Secteur", 3600, T0 + timedelta(minutes=40)) == 1
+    assert engine.count_v3("S1", "INTRUSION", "ZONE", 1, T0 + timedelta(minutes=40)) == 3
+    assert engine.answered == 4
+
+
+def test_out_of_window_requests_fall_back_to_sql():
+    engine = _engine()
+    assert engine.count_v3("S1", None, None, 2, T0) is None            # avant la tranche
+    assert engine.count_v3("S1", None, None, 1, T0 + timedelta(hours=2)) is None  # après la tranche
+    assert engine.count_v3("S2", None, None, 1, T0) is None            # site non préchargé
+    assert engine.count_recent("S1", "KEYWORD", None, 60, T0) is None
+    assert engine.fallbacks == 4
+    # Mot-clé normalisé comme normalized_message (plus de jokers ILIKE) : répondu en mémoire
+    assert engine.count_v3("S1", None, "Zone_1", 1, T0) == 1
+
+
+def test_keyword_clause_matches_python_normalization():
+    assert keyword_needle("Défaut  Secteur!") == "defaut secteur"
+    assert keyword_needle("***") is None and keyword_needle(None) is None
+    clause = keyword_clause(Event.normalized_message, "Défaut_Secteur")
+    assert str(clause) == "events.normalized_message LIKE :normalized_message_1"
+    assert clause.right.value == "%defaut secteur%"
+    assert str(keyword_clause(Event.normalized_message, "***")) == "true"
+
+
+def test_horizon_covers_largest_frequency_window():
+    rule = lambda **kw: compile_rule(SimpleNamespace(id=None, **kw))
+    plans = [
+        rule(sliding_window_days=2),
+        rule(sliding_window_days=30, is_open_only=True),  # incidents OPEN : toujours en SQL
+        rule(frequency_count=3, frequency_window=7200),
+        rule(sequence_enabled=True, sliding_window_days=90),
+    ]
+    assert frequency_horizon(plans) == timedelta(days=2)
+    condition = SimpleNamespace(type="SIMPLE_V3", payload={"sliding_window_days": 5})
+    assert frequency_horizon(plans, [condition]) == timedelta(days=5)
+
+
+@pytest.mark.asyncio
+async def test_prefetched_counts_match_sql(db_session):
+    repo = EventRepository(db_session)
+    events = [
+        NormalizedEvent(
+            timestamp=T0 + timedelta(minutes=7 * i),
+            site_code=f"FREQ{i % 2}",
+            event_type="APPARITION",
+            normalized_type="APPARITION" if i % 5 else "DISPARITION",
+            category="INTRUSION" if i % 3 else "TECHNIQUE",
+            raw_message=f"Intrusion Zone {i % 4}",
+            status="ALARM" if i % 4 else "INFO",
+            source_file="freq.xlsx",
+            tenant_id="test-tenant",
+        )
+        for i in range(60)
+    ]
+    inserted = await repo.create_batch(events)
+    await db_session.flush()
+
+    queries = []
+    for e in inserted[::3]:
+        ref = e.time
+        queries += [
+            ("v3", dict(site_code=e.site_code, category="INTRUSION", keyword="zone 1", days=1, reference_time=ref)),
+            ("v3", dict(site_code=e.site_code, category=None, keyword=None, days=1, reference_time=ref)),
+            ("b1", dict(site_code=e.site_code, condition_type="SEVERITY", value="alarm", window_seconds=1800, reference_time=ref)),
+            ("b1", dict(site_code=e.site_code, condition_type="KEYWORD", value="ZONE 2", window_seconds=3600, reference_time=ref)),
+            ("b1", dict(site_code=e.site_code, condition_type=None, value=None, window_seconds=600, reference_time=ref)),
+        ]
+
+    async def run_all():
+        out = []
+        for kind, args in queries:
+            count = repo.count_v3_matches if kind == "v3" else repo.count_recent_matches
+            out.append(await count(**args))
+        return out
+
+    sql_counts = await run_all()
+    engine = await repo.prefetch_alerting_window(inserted, timedelta(days=1))
+    mem_counts = await run_all()
+    repo.release_alerting_window()
+
+    assert engine is not None and engine.answered == len(queries)
+    assert mem_counts == sql_counts
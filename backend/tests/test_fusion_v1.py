@@ -65,6 +65,7 @@ async def test_worker_fusion_grouping(tmp_path):
     redis_client = AsyncMock()
     redis_lock = MagicMock()
     redis_lock.acquire = AsyncMock(return_value="token")
+    redis_lock.acquire_wait = AsyncMock(return_value=True)
     redis_lock.release = AsyncMock()
     
     from app.ingestion.worker import process_ingestion_item
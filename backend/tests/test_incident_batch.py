@@ -0,0 +1,100 @@
+"""
+Reconstruction d'incidents : mode batch (préchargement + écritures groupées)
+vs mode historique event par event. Les incidents produits doivent être identiques.
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+
+from app.db.models import Incident
+from app.ingestion.models import NormalizedEvent
+from app.services.incident_service import IncidentService
+from app.services.repository import EventRepository
+
+T0 = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)
+
+
+def _scenario(prefix: str):
+    """APPARITION / DISPARITION mêlées : doublons, ouverture+fermeture dans le lot, fermeture orpheline."""
+    spec = [
+        (0, "S1", "APPARITION", "INTRUSION ZONE 1"),
+        (1, "S1", "APPARITION", "INTRUSION ZONE 1 CAM 2"),   # same key: duplicate apparition
+        (2, "S2", "APPARITION", "DEFAUT SECTEUR"),
+        (3, "S1", "DISPARITION", "INTRUSION ZONE 1"),        # closes S1 opened in batch
+        (4, "S1", "APPARITION", "INTRUSION ZONE 1"),         # re-opens
+        (5, "S3", "DISPARITION", "AUTOPROTECTION"),           # unmatched close
+        (6, "S4", "DISPARITION", "MEDICAL"),                  # closes pre-existing OPEN incident
+        (7, "S2", "OPERATOR_ACTION", "APPEL CLIENT"),        # ignored
+    ]
+    return [
+        NormalizedEvent(
+            timestamp=T0 + timedelta(minutes=m),
+            site_code=f"{prefix}{site}",
+            event_type=action,
+            normalized_type=action,
+            raw_message=msg,
+            status="ALARM",
+            source_file=f"{prefix}.xlsx",
+            tenant_id="test-tenant",
+        )
+        for m, site, action, msg in spec
+    ]
+
+
+async def _seed(session, prefix: str):
+    repo = EventRepository(session)
+    service = IncidentService(session)
+    session.add(Incident(
+        site_code=f"{prefix}S4",
+        incident_key=service.generate_incident_key(f"{prefix}S4", "MEDICAL"),
+        label="MEDICAL",
+        opened_at=T0 - timedelta(hours=1),
+        status="OPEN",
+    ))
+    import_log = await repo.create_import_log(f"{prefix}.xlsx", file_hash=f"hash-{prefix}")
+    await repo.create_batch(_scenario(prefix), import_id=import_log.id)
+    await session.flush()
+    return import_log.id
+
+
+async def _incidents(session, prefix: str):
+    session.expire_all()
+    res = await session.execute(
+        select(Incident).where(Incident.site_code.like(f"{prefix}%")).order_by(Incident.opened_at, Incident.site_code)
+    )
+    return [
+        (i.site_code[len(prefix):], i.label, i.opened_at, i.closed_at, i.status, i.duration_seconds,
+         i.open_event_id is not None, i.close_event_id is not None)
+        for i in res.scalars().all()
+    ]
+
+
+@pytest.mark.asyncio
+async def test_batch_mode_matches_sequential_mode(db_session):
+    service = IncidentService(db_session)
+
+    seq_import = await _seed(db_session, "SEQ-")
+    bat_import = await _seed(db_session, "BAT-")
+
+    seq_unmatched = await service.process_batch_incidents(seq_import, batch_mode=False)
+    bat_unmatched = await service.process_batch_incidents(bat_import, batch_mode=True)
+
+    assert seq_unmatched == bat_unmatched == 1
+    seq = await _incidents(db_session, "SEQ-")
+    bat = await _incidents(db_session, "BAT-")
+    assert seq == bat
+    assert [row[4] for row in bat] == ["CLOSED", "CLOSED", "OPEN", "OPEN"]
+
+
+@pytest.mark.asyncio
+async def test_batch_mode_is_idempotent(db_session):
+    service = IncidentService(db_session)
+    import_id = await _seed(db_session, "IDEM-")
+
+    await service.process_batch_incidents(import_id)
+    first = await _incidents(db_session, "IDEM-")
+    unmatched_again = await service.process_batch_incidents(import_id)
+    second = await _incidents(db_session, "IDEM-")
+
+    assert first == second
+    assert unmatched_again == 1
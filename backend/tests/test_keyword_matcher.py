@@ -0,0 +1,91 @@
+"""
+KeywordMatcher (Aho-Corasick) : mêmes résultats que les boucles `k in msg`
+qu'il remplace (ENGINE_V1 et fallback catalogue du TaggingService).
+"""
+import random
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, AsyncMock
+
+from app.ingestion.models import NormalizedEvent
+from app.services.tagging_service import TaggingService
+from app.utils.keyword_matcher import KeywordMatcher, keyword_matcher
+from app.utils.text import normalize_text
+
+ALPHABET = "ab c"
+
+
+def _word(rng, max_len=5):
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_len)))
+
+
+@pytest.mark.parametrize("n_patterns", [5, 30])
+@pytest.mark.parametrize("seed", range(5))
+def test_matcher_agrees_with_substring_search(seed, n_patterns):
+    rng = random.Random(seed)
+    patterns = [_word(rng) for _ in range(n_patterns)]
+    matcher = keyword_matcher(tuple(patterns))
+    for _ in range(300):
+        text = _word(rng, 40)
+        expected = {i for i, p in enumerate(patterns) if p in text}
+        assert matcher.find_all(text) == expected
+        assert matcher.first(text) == (min(expected) if expected else None)
+        assert matcher.any(text) == any(p in text for p in patterns)
+
+
+def test_overlapping_and_nested_patterns():
+    words = ["he", "she", "his", "hers"] + [f"x{i}" for i in range(20)]
+    matcher = KeywordMatcher((w, i) for i, w in enumerate(words))
+    assert matcher.find_all("ushers") == {0, 1, 3}
+    assert matcher.first("ushers") == 0
+    assert not matcher.any("xyz")
+
+
+def _catalog_session(items):
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = items
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+def _legacy_keyword_lookup(cache, evt_msg):
+    """Boucle d'origine du fallback catalogue."""
+    for c_code, c_data in cache.items():
+        if c_code != "UNKNOWN" and c_code.lower() in evt_msg:
+            return c_data
+        label = c_data.get("label")
+        if label and normalize_text(label) in evt_msg:
+            return c_data
+    return None
+
+
+@pytest.mark.asyncio
+async def test_catalog_fallback_keeps_first_match_order():
+    items = [
+        SimpleNamespace(code=code, label=label, category=f"CAT_{i}", severity="info", alertable_default=False)
+        for i, (code, label) in enumerate([
+            ("UNKNOWN", "Inconnu"),
+            ("130", "Intrusion"),
+            ("CAM", "Caméra"),
+            ("E570", "Éjection"),
+            ("MHS", "Mise hors service"),
+            ("INT2", "Intrusion zone 2"),
+            ("SECT", "Défaut secteur"),
+        ])
+    ]
+    service = TaggingService(_catalog_session(items))
+    await service._ensure_cache()
+
+    messages = [
+        "intrusion zone 2", "defaut secteur", "camera 3 hors ligne", "cam2 mhs", "ras",
+        "e570 ejection", "mise hors service int2", "inconnu", "",
+    ]
+    for msg in messages:
+        event = NormalizedEvent(
+            timestamp="2026-03-02T08:00:00Z", site_code="S1", event_type="X", raw_message=msg,
+            normalized_message=msg, status="INFO", tenant_id="test-tenant", source_file="t.xlsx",
+        )
+        expected = _legacy_keyword_lookup(service._cache, msg) or service._cache["UNKNOWN"]
+        await service.tag_event(event)
+        assert event.category == expected["category"], msg
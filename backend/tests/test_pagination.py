@@ -0,0 +1,75 @@
+"""
+Pagination par curseur (keyset) : curseur opaque, pages sans trou ni doublon,
+même ordre que la pagination OFFSET ; comptage exact / estimé / absent.
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.db.models import Event
+from app.ingestion.models import NormalizedEvent
+from app.services.pagination import (
+    InvalidCursor, count_rows, decode_cursor, encode_cursor, fetch_keyset_page, keyset, next_page,
+)
+from app.services.repository import EventRepository
+
+
+def test_cursor_roundtrip_and_validation():
+    values = [datetime(2026, 3, 2, 8, 30, tzinfo=timezone.utc), 42]
+    cursor = encode_cursor(values)
+    assert "=" not in cursor and "/" not in cursor
+    assert decode_cursor(cursor, 2) == values
+
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, 1)
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor", 2)
+
+
+def test_keyset_clause_and_next_page():
+    cursor = encode_cursor([datetime(2026, 3, 2, tzinfo=timezone.utc), 7])
+    stmt = keyset(select(Event.id).order_by(Event.created_at), [Event.time, Event.id], True, cursor, 10)
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert "(events.time, events.id) < (" in sql
+    assert "ORDER BY events.time DESC, events.id DESC" in sql and "created_at" not in sql
+
+    rows = [(i,) for i in range(11)]
+    page, next_cursor = next_page(rows, 10, key_of=lambda r: r)
+    assert len(page) == 10 and decode_cursor(next_cursor, 1) == [9]
+    assert next_page(rows[:10], 10, key_of=lambda r: r) == (rows[:10], None)
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_match_offset_order(db_session):
+    base = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)
+    events = [
+        NormalizedEvent(
+            timestamp=base + timedelta(minutes=i // 3),  # égalités de time : départage par id
+            site_code="PAGE",
+            event_type="APPARITION",
+            raw_message=f"PAGE {i}",
+            status="INFO",
+            source_file="page.xlsx",
+            tenant_id="test-tenant",
+        )
+        for i in range(23)
+    ]
+    await EventRepository(db_session).create_batch(events, mode="bulk")
+    stmt = select(Event).where(Event.site_code == "PAGE")
+
+    expected = (await db_session.execute(stmt.order_by(Event.time.desc(), Event.id.desc()))).scalars().all()
+    seen, cursor = [], None
+    while True:
+        page, cursor = await fetch_keyset_page(
+            db_session, stmt, [Event.time, Event.id], True, cursor, 5,
+            key_of=lambda e: (e.time, e.id), scalars=True,
+        )
+        seen.extend(page)
+        if cursor is None:
+            break
+
+    assert [e.id for e in seen] == [e.id for e in expected]
+    assert await count_rows(db_session, stmt, "exact") == 23
+    assert await count_rows(db_session, stmt, "none") is None
+    assert await count_rows(db_session, stmt, "estimate") >= 0
@@ -0,0 +1,87 @@
+"""
+Cache de résultats de parsing : aller-retour exact des events, clé (sha256, parser,
+profil, version), éviction par taille, replay servi sans re-parsing.
+"""
+import os
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.parsers.executor import ParserExecutor
+from app.parsers import executor as executor_module
+from app.parsers.parse_cache import ParseCache
+from app.parsers.tsv_parser import TsvParser
+
+FIXTURE = Path(__file__).parent / "fixtures" / "ingestion" / "sample_ypsilon.xls"
+PROFILE_V1 = SimpleNamespace(profile_id="YPSILON_TSV", version_number=1)
+PROFILE_V2 = SimpleNamespace(profile_id="YPSILON_TSV", version_number=2)
+
+
+def test_roundtrip_and_key(tmp_path):
+    cache = ParseCache(directory=str(tmp_path), max_bytes=10**9, enabled=True)
+    parser = TsvParser()
+    events = parser.parse(str(FIXTURE), source_timezone="Europe/Paris")
+    assert events
+
+    key = cache.key_for(parser, str(FIXTURE), "Europe/Paris", {}, PROFILE_V1)
+    assert cache.get(key) is None
+    cache.put(key, events, parser.last_metrics)
+
+    cached_events, metrics = cache.get(key)
+    assert cached_events == events
+    assert [e.timestamp.tzinfo for e in cached_events] == [e.timestamp.tzinfo for e in events]
+    assert metrics == parser.last_metrics
+    assert cached_events[0] is not events[0]
+
+    # Nouvelle version du profil, autre fuseau ou autre config : autre entrée
+    assert cache.get(cache.key_for(parser, str(FIXTURE), "Europe/Paris", {}, PROFILE_V2)) is None
+    assert cache.get(cache.key_for(parser, str(FIXTURE), "UTC", {}, PROFILE_V1)) is None
+    assert cache.get(cache.key_for(parser, str(FIXTURE), "Europe/Paris", {"mapping": {"site_code": 0}}, PROFILE_V1)) is None
+    assert cache.hits == 1
+
+
+def test_eviction_keeps_recent_entries(tmp_path):
+    cache = ParseCache(directory=str(tmp_path), max_bytes=10**9, enabled=True)
+    parser = TsvParser()
+    events = parser.parse(str(FIXTURE))
+    keys = [cache.key_for(parser, str(FIXTURE), profile=SimpleNamespace(profile_id=f"P{i}", version_number=1))
+            for i in range(4)]
+    for key in keys:
+        cache.put(key, events)
+    entry_size = max(cache._path(key).stat().st_size for key in keys)
+
+    # Entrée 0 relue : la plus ancienne devient l'entrée 1
+    for i, key in enumerate(keys):
+        os.utime(cache._path(key), (time.time() - 100 + i, time.time() - 100 + i))
+    assert cache.get(keys[0]) is not None
+
+    cache.max_bytes = entry_size * 2 + 64
+    assert cache.evict() == 2
+    assert cache.get(keys[0]) is not None and cache.get(keys[3]) is not None
+    assert cache.get(keys[1]) is None and cache.get(keys[2]) is None
+
+
+@pytest.mark.asyncio
+async def test_replay_skips_parsing(tmp_path):
+    cache = ParseCache(directory=str(tmp_path), max_bytes=10**9, enabled=True)
+    executor = ParserExecutor()
+    executor.enabled = False
+    with patch.object(executor_module, "parse_cache", cache):
+        first_parser = TsvParser()
+        first = await executor.parse(first_parser, str(FIXTURE), profile=PROFILE_V1)
+
+        replay_parser = TsvParser()
+        with patch.object(executor, "_parse", AsyncMock(side_effect=AssertionError("re-parsed"))):
+            replay = await executor.parse(replay_parser, str(FIXTURE), profile=PROFILE_V1)
+            batches = [b async for b in executor.iter_batches(TsvParser(), str(FIXTURE), profile=PROFILE_V1)]
+
+        # Profil modifié : nouveau parsing
+        await executor.parse(TsvParser(), str(FIXTURE), profile=PROFILE_V2)
+
+    assert replay == first
+    assert replay_parser.last_metrics == first_parser.last_metrics
+    assert cache.hits == 1 and cache.misses == 2
+    assert sum(len(b) for b in batches) == len(first)  # TSV en flux : pas de cache
@@ -0,0 +1,72 @@
+"""
+PdfParser : regex précompilées + dispatch combiné par ligne, extraction des pages
+en parallèle dans le pool de ParserExecutor avec assemblage séquentiel (contexte
+site / date conservé entre pages).
+"""
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.core.config import settings
+from app.parsers.executor import ParserExecutor
+from app.parsers.parse_cache import parse_cache
+from app.parsers.pdf_parser import (
+    PdfParser, dispatch_line, page_ranges, RE_SITE_CODE_C, RE_SITE_CODE_NUM, RE_EVENT_HEADER, RE_SUB_EVENT,
+)
+
+SPGO_PDF = Path(__file__).resolve().parents[1] / "fixtures" / "2026-03-02-18-YPSILON_3SPGO.pdf"
+
+LINES = [
+    "C-69000 NOM CLIENT",
+    "SITE : C-12 X",
+    "00032009 NOM CLIENT",
+    "SITE : 00032308 NOM CLIENT",
+    "1234567 TROP COURT",
+    "Mar 27/01/2026 16:24:25 X330 APPARITION INTRUSION",
+    "LU02/02/2026 09:37:02TEST CYCLIQUE",
+    "Sam 27/01/2026 16:24",
+    "16:24:28 Appel client",
+    "16:24:28",
+    "SITE SANS CODE",
+    "",
+]
+
+
+def _sequential(line):
+    """Ordre des tests ligne à ligne d'origine."""
+    for kind, regex in (("site_c", RE_SITE_CODE_C), ("site_num", RE_SITE_CODE_NUM),
+                        ("header", RE_EVENT_HEADER), ("sub", RE_SUB_EVENT)):
+        match = regex.match(line)
+        if match:
+            return kind, match.groups()
+    return None, None
+
+
+@pytest.mark.parametrize("line", LINES)
+def test_dispatch_matches_sequential_patterns(line):
+    assert dispatch_line(line) == _sequential(line)
+
+
+@pytest.mark.asyncio
+async def test_parallel_extraction_same_events(caplog):
+    """Tranches de pages extraites par le pool de ParserExecutor : mêmes events qu'en séquentiel."""
+    if not SPGO_PDF.exists():
+        pytest.skip(f"Fixture {SPGO_PDF.name} not found")
+
+    sequential = PdfParser().parse(str(SPGO_PDF), source_timezone="Europe/Paris")
+
+    executor = ParserExecutor()
+    executor.enabled = True
+    executor.max_workers = 3
+    caplog.set_level("INFO", logger="parser-executor")
+    try:
+        with patch.dict(settings.INGESTION, {"pdf_parallel_min_pages": 2}), patch.object(parse_cache, "enabled", False):
+            parallel = await executor.parse(PdfParser(), str(SPGO_PDF), source_timezone="Europe/Paris")
+    finally:
+        executor.shutdown()
+
+    assert page_ranges(str(SPGO_PDF), 3, 2) == [(0, 2), (2, 4), (4, 6)]
+    assert "pdf_parallel_extract pages=6 ranges=3" in caplog.text
+    assert len(sequential) == 319
+    assert parallel == sequential
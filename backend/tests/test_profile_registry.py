@@ -0,0 +1,88 @@
+"""
+Registre de profils : rechargement uniquement si l'empreinte DB / YAML change,
+regex de nom de fichier précompilées, liste triée par priorité.
+"""
+import os
+import pytest
+import yaml
+from unittest.mock import patch
+from sqlalchemy import select
+
+from app.db.models import DBIngestionProfile
+from app.ingestion.profile_manager import ProfileManager, filename_matches
+from app.schemas.ingestion_profile import IngestionProfile, DetectionRules
+
+
+def _write(p_dir, name, profile_id, priority=5):
+    (p_dir / name).write_text(yaml.dump({
+        "profile_id": profile_id,
+        "name": profile_id,
+        "priority": priority,
+        "detection": {"extensions": [".xml"], "filename_pattern": r"^export_\d+"},
+        "filename_regex": r"EXPORT_.*\.XML$",
+        "mapping": [],
+    }))
+
+
+@pytest.mark.asyncio
+async def test_yaml_reload_only_on_change(tmp_path):
+    _write(tmp_path, "a.yaml", "yaml_a", priority=1)
+    _write(tmp_path, "b.yaml", "yaml_b", priority=9)
+
+    with patch("app.ingestion.profile_manager.settings") as mock_settings:
+        mock_settings.PROFILE_SOURCE_MODE = "DB_FALLBACK_YAML"
+        manager = ProfileManager(profiles_dir=str(tmp_path))
+        await manager.load_profiles(db=None)
+        await manager.load_profiles(db=None)
+        assert manager.reloads == 1
+        assert [p.profile_id for p in manager.list_by_priority()] == ["yaml_b", "yaml_a"]
+
+        _write(tmp_path, "a.yaml", "yaml_a", priority=20)
+        stat = os.stat(tmp_path / "a.yaml")
+        os.utime(tmp_path / "a.yaml", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        await manager.load_profiles(db=None)
+        assert manager.reloads == 2
+        assert manager.list_by_priority()[0].profile_id == "yaml_a"
+
+        (tmp_path / "b.yaml").unlink()
+        await manager.load_profiles(db=None)
+        assert manager.reloads == 3
+        assert list(manager.profiles) == ["yaml_a"]
+
+
+def test_direct_assignment_and_filename_regex():
+    manager = ProfileManager(profiles_dir="non_existent_dir")
+    low = IngestionProfile(profile_id="low", name="Low", priority=1, detection=DetectionRules())
+    high = IngestionProfile(profile_id="high", name="High", priority=10, detection=DetectionRules())
+    manager.profiles = {"low": low, "high": high}
+
+    assert [p.profile_id for p in manager.list_by_priority()] == ["high", "low"]
+    assert filename_matches(r"EXPORT_.*\.XML$", "export_2026.xml")  # IGNORECASE
+    assert not filename_matches(r"^export_\d+", "report.xml")
+    assert not filename_matches("([unclosed", "([unclosed")  # regex invalide : jamais de match
+    assert not filename_matches(None, "export_1.xml")
+
+
+@pytest.mark.asyncio
+async def test_db_version_change_triggers_reload(db_session):
+    db_session.add(DBIngestionProfile(
+        profile_id="registry_db", name="Registry DB", priority=3,
+        detection={"extensions": [".xls"]}, mapping=[], is_active=True,
+    ))
+    await db_session.commit()
+
+    manager = ProfileManager(profiles_dir="non_existent_dir")
+    await manager.load_profiles(db_session)
+    await manager.load_profiles(db_session)
+    assert manager.reloads == 1
+
+    model = (await db_session.execute(
+        select(DBIngestionProfile).where(DBIngestionProfile.profile_id == "registry_db")
+    )).scalar_one()
+    model.version_number += 1
+    model.priority = 30
+    await db_session.commit()
+
+    await manager.load_profiles(db_session)
+    assert manager.reloads == 2
+    assert manager.get_profile("registry_db").priority == 30
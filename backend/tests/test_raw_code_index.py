@@ -0,0 +1,81 @@
+"""
+Index raw_code → règles candidates (evaluate_db_rules) : mêmes matchs, dans le même ordre,
+que la boucle sur toutes les règles actives, en modes EXACT et IN.
+"""
+import random
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from app.services.business_rules import BusinessRuleEngine, RawCodeRuleIndex
+
+
+def _rules(rng: random.Random):
+    configs = [
+        lambda: dict(value=rng.choice(["570", " 0600 ", "", "01401-MHS"])),
+        lambda: dict(value='["0600", "0911", 344]'),
+        lambda: dict(value="344"),
+        lambda: dict(logic_enabled=True, logic_tree={"raw_code": "570", "raw_code_mode": "EXACT"}),
+        lambda: dict(logic_enabled=True, logic_tree={"raw_codes": ["0600", " 130"], "raw_code_mode": "IN"}),
+        lambda: dict(logic_enabled=True, logic_tree={"raw_code_list": '["570", "0911"]'}),
+        lambda: dict(logic_enabled=True, logic_tree={"raw_code": "570", "raw_code_mode": "REGEX"}),
+    ]
+    rules = []
+    for i in range(60):
+        fields = dict(
+            id=i, name=f"R{i}", is_active=rng.random() > 0.1,
+            condition_type="RAW_CODE" if rng.random() > 0.15 else "KEYWORD",
+            scope_site_code=rng.choice([None, None, "S1", "S2"]),
+            logic_enabled=False, logic_tree=None, value=None,
+        )
+        fields.update(rng.choice(configs)())
+        rules.append(SimpleNamespace(**fields))
+    return rules
+
+
+def _events(rng: random.Random, n: int = 300):
+    codes = [None, "570", " 570 ", "0600", "344", "0911", "130", "", "01401-MHS", "999"]
+    return [
+        SimpleNamespace(id=i, raw_code=rng.choice(codes), site_code=rng.choice(["S1", "S2", "S3"]))
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("mode", ["EXACT", "IN"])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_index_matches_full_scan(mode, seed):
+    rng = random.Random(seed)
+    engine = BusinessRuleEngine(MagicMock())
+    rules = _rules(rng)
+    index = RawCodeRuleIndex(rules, mode)
+
+    scanned = candidates = 0
+    for event in _events(rng):
+        expected = [r.id for r in rules if engine._evaluate_single_db_rule(event, r, mode)]
+        picked = index.candidates(event)
+        actual = [r.id for r, targets in picked if engine._evaluate_single_db_rule(event, r, mode, targets)]
+        assert actual == expected
+        scanned += len(rules)
+        candidates += len(picked)
+
+    assert candidates < scanned / 4
+
+
+def test_unindexable_rule_keeps_per_event_evaluation():
+    broken = SimpleNamespace(id=1, name="BROKEN", is_active=True, condition_type="RAW_CODE", scope_site_code=None,
+                             logic_enabled=True, logic_tree={"raw_codes": 570}, value=None)
+    index = RawCodeRuleIndex([broken], "IN")
+    assert index.unindexed == [0]
+    assert index.candidates(SimpleNamespace(raw_code="570", site_code="S1")) == [(broken, None)]
+    assert index.candidates(SimpleNamespace(raw_code=None, site_code="S1")) == []
+
+
+def test_indexed_rules_are_not_reparsed_per_event():
+    rng = random.Random(4)
+    engine = BusinessRuleEngine(MagicMock())
+    rules = _rules(rng)
+    index = RawCodeRuleIndex(rules, "IN")
+    with patch("app.services.business_rules.db_rule_config", side_effect=AssertionError("config reparsed")):
+        for event in _events(rng):
+            for rule, targets in index.candidates(event):
+                engine._evaluate_single_db_rule(event, rule, "IN", targets)
@@ -0,0 +1,126 @@
+"""
+Agrégats des tableaux de bord : bornes horaires, repli sur les tables brutes
+quand les vues (alembic 7c1e4b9d2a36) n'existent pas (schéma create_all des tests),
+recalcul des jours anciens après une purge d'import (procédure c5e8b1a3f762).
+"""
+import importlib.util
+from pathlib import Path
+
+import pytest
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text, update
+
+from app.db.models import AlertRule, EventRuleHit, ImportLog
+from app.ingestion.models import NormalizedEvent
+from app.services import rollups
+from app.services.business_rules import BusinessRuleEngine
+from app.services.repository import AdminRepository, EventRepository
+
+DAYS_REVISION = Path(__file__).resolve().parents[1] / "alembic" / "versions" / "c5e8b1a3f762_rollup_days_refresh.py"
+
+
+def test_hour_ceil():
+    assert rollups.hour_ceil(datetime(2026, 3, 2, 8, 0)) == datetime(2026, 3, 2, 8, 0)
+    assert rollups.hour_ceil(datetime(2026, 3, 2, 8, 0, 1)) == datetime(2026, 3, 2, 9, 0)
+    assert rollups.hour_ceil(datetime(2026, 3, 2, 23, 30)) == datetime(2026, 3, 3, 0, 0)
+
+
+@pytest.mark.asyncio
+async def test_raw_fallback_without_views(db_session):
+    base = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)
+    repo = EventRepository(db_session)
+    await repo.create_batch([
+        NormalizedEvent(
+            timestamp=base + timedelta(minutes=20 * i),
+            site_code="ROLLUP",
+            event_type="APPARITION",
+            raw_message=f"ROLLUP {i}",
+            status="INFO",
+            source_file="rollup.xlsx",
+            tenant_id="test-tenant",
+        )
+        for i in range(6)
+    ], mode="bulk")
+
+    assert not await rollups.hourly_events_available(db_session)
+    assert not await rollups.daily_view_covers(db_session, rollups.RULE_HITS_VIEW, base)
+
+    stats = await repo.get_site_event_stats("ROLLUP", base + timedelta(minutes=30))
+    assert stats == {"events_count": 4, "total_events": 6, "last_event_at": base + timedelta(minutes=100)}
+    assert await repo.get_rule_trigger_summary(base) == []
+
+
+async def _install_daily_rollups(session):
+    """Tables quotidiennes (temporaires, annulées avec la session) et procédure de la révision c5e8b1a3f762."""
+    await session.execute(text("""
+        CREATE TEMP TABLE import_stats_daily (
+            day TIMESTAMPTZ NOT NULL, provider_id INTEGER, total_imports BIGINT NOT NULL,
+            total_emails BIGINT NOT NULL, total_xls BIGINT NOT NULL, total_pdf BIGINT NOT NULL,
+            total_events BIGINT, integrity_numerator NUMERIC, integrity_denominator NUMERIC,
+            missing_pdf BIGINT NOT NULL
+        )
+    """))
+    await session.execute(text("""
+        CREATE TEMP TABLE rule_hits_daily (
+            day TIMESTAMPTZ NOT NULL, rule_id INTEGER NOT NULL, rule_name VARCHAR(100) NOT NULL,
+            provider_id INTEGER, total_triggers BIGINT NOT NULL, distinct_sites BIGINT NOT NULL,
+            last_trigger_at TIMESTAMPTZ NOT NULL
+        )
+    """))
+    spec = importlib.util.spec_from_file_location("rollup_days_revision", DAYS_REVISION)
+    revision = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(revision)
+
+    def upgrade(sync_conn):
+        with Operations.context(MigrationContext.configure(sync_conn)):
+            revision.upgrade()
+
+    await (await session.connection()).run_sync(upgrade)
+
+
+@pytest.mark.asyncio
+async def test_import_purge_refreshes_old_rollup_days(db_session):
+    if not (await db_session.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'timescaledb'"))).scalar():
+        pytest.skip("time_bucket requires TimescaleDB")
+    await _install_daily_rollups(db_session)
+
+    old_day = datetime(2026, 3, 2, tzinfo=timezone.utc)
+    rule = AlertRule(name="ROLLUP_RULE", condition_type="RAW_CODE", value="130")
+    db_session.add(rule)
+    await db_session.flush()
+    repo = EventRepository(db_session)
+    imp = await repo.create_import_log("rollup.xlsx", file_hash="rollup-days-1")
+    events = await repo.create_batch([
+        NormalizedEvent(
+            timestamp=old_day + timedelta(hours=8, minutes=i),
+            site_code=f"ROLLUP-{i}",
+            event_type="APPARITION",
+            raw_message="INTRUSION",
+            raw_code="130",
+            status="ALARM",
+            source_file="rollup.xlsx",
+            tenant_id="test-tenant",
+        )
+        for i in range(3)
+    ], import_id=imp.id, mode="bulk")
+    engine = BusinessRuleEngine(db_session)
+    for event in events:
+        await engine._record_hit(event, "ROLLUP_RULE", "match", rule_id_override=rule.id)
+    await engine.flush_hits()
+    # Jour ancien : hors de la fenêtre recent_days du job horaire
+    await db_session.execute(update(EventRuleHit).values(created_at=old_day + timedelta(hours=9)))
+    await db_session.execute(update(ImportLog).where(ImportLog.id == imp.id).values(created_at=old_day, events_count=3))
+    await rollups.refresh_days(db_session, {old_day}, {old_day})
+
+    async def daily(view, column):
+        return (await db_session.execute(text(f"SELECT sum({column}) FROM {view} WHERE day = :day"), {"day": old_day})).scalar()
+
+    assert await daily("rule_hits_daily", "total_triggers") == 3
+    assert await daily("import_stats_daily", "total_events") == 3
+
+    await AdminRepository(db_session).delete_import_data(imp.id)
+
+    assert await daily("rule_hits_daily", "total_triggers") is None
+    assert await daily("import_stats_daily", "total_events") == 0
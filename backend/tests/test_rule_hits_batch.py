@@ -0,0 +1,67 @@
+"""
+BusinessRuleEngine : hits collectés en mémoire puis écrits en un INSERT ... ON CONFLICT DO NOTHING.
+"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy import select
+
+from app.db.models import AlertRule, EventRuleHit
+from app.services.business_rules import BusinessRuleEngine
+
+
+def _event(event_id: int):
+    return SimpleNamespace(id=event_id, dup_count=0, raw_code="570", normalized_message="zone *** inhibee",
+                           in_maintenance=False, site_code="HIT-SITE")
+
+
+@pytest.mark.asyncio
+async def test_hits_are_buffered_and_system_rule_resolved_once():
+    session = MagicMock()
+    system_rule = MagicMock()
+    system_rule.scalar.return_value = 42
+    system_rule.rowcount = 200
+    session.execute = AsyncMock(return_value=system_rule)
+    engine = BusinessRuleEngine(session)
+
+    for event_id in range(1, 101):
+        await engine._record_hit(_event(event_id), "EJECTION_48H", "Éjection")
+        await engine._record_hit(_event(event_id), "ZONE_INHIBITION", "Zone inhibée")  # même (event, ENGINE_V1)
+        await engine._record_hit(_event(event_id), "TEST_RAW", "[V2] match", rule_id_override=7)
+
+    # Une seule résolution ENGINE_V1, aucune requête par hit
+    assert session.execute.await_count == 1
+    assert len(engine._pending_hits) == 200
+    assert engine._pending_hits[(1, 42)]["rule_name"] == "EJECTION_48H"
+
+    session.execute.reset_mock()
+    assert await engine.flush_hits() == 200
+    assert session.execute.await_count == 1
+    assert engine._pending_hits == {}
+
+
+@pytest.mark.asyncio
+async def test_flush_keeps_existing_hits(db_session):
+    system_rule = AlertRule(name="ENGINE_V1", condition_type="SYSTEM", value="")
+    db_rule = AlertRule(name="TEST_RAW", condition_type="RAW_CODE", value="570")
+    db_session.add_all([system_rule, db_rule])
+    await db_session.flush()
+    db_session.add(EventRuleHit(event_id=1, rule_id=db_rule.id, rule_name="ALREADY_THERE"))
+    await db_session.flush()
+
+    engine = BusinessRuleEngine(db_session)
+    await engine._record_hit(_event(1), "TEST_RAW", "[V2] match", rule_id_override=db_rule.id)
+    await engine._record_hit(_event(1), "EJECTION_48H", "Éjection")
+    await engine._record_hit(_event(2), "EJECTION_48H", "Éjection")
+    inserted = await engine.flush_hits()
+
+    assert inserted == 2
+    db_session.expire_all()
+    res = await db_session.execute(
+        select(EventRuleHit.event_id, EventRuleHit.rule_id, EventRuleHit.rule_name).order_by(EventRuleHit.event_id, EventRuleHit.rule_id)
+    )
+    assert sorted(res.all()) == sorted([
+        (1, system_rule.id, "EJECTION_48H"),
+        (1, db_rule.id, "ALREADY_THERE"),
+        (2, system_rule.id, "EJECTION_48H"),
+    ])
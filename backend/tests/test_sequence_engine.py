@@ -0,0 +1,113 @@
+"""
+Moteur de séquences A -> B : même résultat (et même couple A,B le plus ancien)
+que la self-join SQL de find_sequence_match.
+"""
+import random
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from app.ingestion.models import NormalizedEvent
+from app.services.repository import EventRepository
+from app.services.sequence_engine import SequenceEngine, FALLBACK
+
+T0 = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)
+
+
+def _rows(seed: int, n: int = 400):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        # secondes entières : beaucoup d'ex aequo sur time, départagés par id
+        t = T0 + timedelta(seconds=rng.randint(0, 3 * 86400) // 60 * 60)
+        rows.append((
+            t, i + 1,
+            "APPARITION" if rng.random() < 0.8 else "DISPARITION",
+            rng.choice(["INTRUSION", "TECHNIQUE", None]),
+            rng.choice(["intrusion zone 1", "defaut secteur", "porte ouverte"]),
+            "ALARM",
+        ))
+    return sorted(rows, key=lambda r: (r[0], r[1]))
+
+
+def _brute_force(rows, a_cat, a_key, b_cat, b_key, delay, lookback_days, ref):
+    """Traduction littérale de la requête SQL (self-join + ORDER BY ... LIMIT 1)."""
+    def ok(row, cat, key):
+        return row[2] == "APPARITION" and (not cat or row[3] == cat) and (not key or key.lower() in row[4])
+
+    start = ref - timedelta(days=lookback_days)
+    pairs = [
+        (a[0], a[1], b[0], b[1])
+        for a in rows if ok(a, a_cat, a_key) and start <= a[0] <= ref
+        for b in rows if ok(b, b_cat, b_key) and a[0] < b[0] <= a[0] + timedelta(seconds=delay)
+    ]
+    if not pairs:
+        return None
+    a_time, a_id, b_time, b_id = min(pairs)
+    return {"a_id": a_id, "b_id": b_id, "a_time": a_time, "b_time": b_time}
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_engine_matches_brute_force(seed):
+    rows = _rows(seed)
+    engine = SequenceEngine(T0 - timedelta(days=3), T0 + timedelta(days=4), {"S1": rows})
+    specs = [
+        ("INTRUSION", None, "TECHNIQUE", None, 600, 1),
+        (None, "zone", None, "Secteur", 3600, 2),
+        ("INTRUSION", "porte", "INTRUSION", None, 120, 1),
+        (None, None, None, None, 60, 1),
+    ]
+    rng = random.Random(seed)
+    for spec in specs:
+        for _ in range(40):
+            ref = T0 + timedelta(seconds=rng.randint(0, 3 * 86400))
+            assert engine.find("S1", *spec, ref) == _brute_force(rows, *spec, ref)
+
+
+def test_out_of_window_requests_fall_back():
+    engine = SequenceEngine(T0, T0 + timedelta(days=1), {"S1": _rows(4, 10)})
+    ref = T0 + timedelta(hours=12)
+    assert engine.find("S2", None, None, None, None, 60, 0, ref) is FALLBACK
+    assert engine.find("S1", None, None, None, None, 60, 1, ref) is FALLBACK          # lookback avant la tranche
+    assert engine.find("S1", None, None, None, None, 86400, 0, ref) is FALLBACK       # B possibles après la tranche
+    assert engine.fallbacks == 3
+    # Mot-clé normalisé (normalize_text) : "Zone%" == "zone", répondu en mémoire
+    assert engine.find("S1", None, "Zone%", None, None, 60, 0, ref) == engine.find("S1", None, "zone", None, None, 60, 0, ref)
+    assert engine.fallbacks == 3
+
+
+@pytest.mark.asyncio
+async def test_prefetched_sequences_match_sql(db_session):
+    repo = EventRepository(db_session)
+    events = [
+        NormalizedEvent(
+            timestamp=T0 + timedelta(minutes=5 * i),
+            site_code=f"SEQ{i % 2}",
+            event_type="APPARITION",
+            normalized_type="APPARITION",
+            category="INTRUSION" if i % 3 else "TECHNIQUE",
+            raw_message=f"Intrusion Zone {i % 4}",
+            status="ALARM",
+            source_file="seq.xlsx",
+            tenant_id="test-tenant",
+        )
+        for i in range(40)
+    ]
+    inserted = await repo.create_batch(events)
+    await db_session.flush()
+
+    queries = [
+        dict(site_code=e.site_code, a_cat="TECHNIQUE", a_key=None, b_cat="INTRUSION", b_key="zone 2",
+             max_delay_seconds=delay, lookback_days=1, reference_time=e.time)
+        for e in inserted[::4]
+        for delay in (300, 1800)
+    ]
+
+    sql = [await repo.find_sequence_match(**q) for q in queries]
+    await repo.prefetch_alerting_window(inserted, timedelta(days=1), timedelta(seconds=1800))
+    mem = [await repo.find_sequence_match(**q) for q in queries]
+    engine = repo.sequence_engine
+    repo.release_alerting_window()
+
+    assert engine.answered == len(queries)
+    assert any(sql)
+    assert mem == sql
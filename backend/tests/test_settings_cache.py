@@ -0,0 +1,81 @@
+"""
+Cache process de la table settings : TTL, invalidation locale (ORM) et via pub/sub.
+"""
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.db.models import Setting
+from app.services.business_rules import _get_db_setting
+from app.services import cache_bus
+from app.services.settings_cache import SettingsCache, SETTINGS_SCOPE, settings_cache
+
+
+def _session(values: dict):
+    session = MagicMock()
+    result = MagicMock()
+    result.all.side_effect = lambda: list(values.items())
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+@pytest.mark.asyncio
+async def test_ttl_and_invalidation():
+    now = [0.0]
+    cache = SettingsCache(ttl_seconds=60, clock=lambda: now[0])
+    values = {"imap_host": "mail.example", "monitoring.rules.exclude_dup_count": "false"}
+    session = _session(values)
+
+    assert (await cache.get_all(session))["imap_host"] == "mail.example"
+    values["imap_host"] = "other.example"
+    now[0] = 59
+    assert await cache.get("imap_host", session) == "mail.example"
+    assert session.execute.await_count == 1
+
+    now[0] = 61  # TTL expiré
+    assert await cache.get("imap_host", session) == "other.example"
+    assert session.execute.await_count == 2
+
+    values["imap_host"] = "third.example"
+    cache.invalidate()
+    assert await cache.get("imap_host", session) == "third.example"
+    assert cache.loads == 3
+
+
+@pytest.mark.asyncio
+async def test_pubsub_message_invalidates_scope():
+    await settings_cache.get_all(_session({"a": "1"}))
+    cache_bus.handle_message({"type": "subscribe", "data": 1})  # accusé d'abonnement : ignoré
+    cache_bus.handle_message({"type": "message", "data": json.dumps({"scope": "other", "keys": None})})
+    assert settings_cache._fresh()
+    cache_bus.handle_message({"type": "message", "data": json.dumps({"scope": SETTINGS_SCOPE, "keys": ["a"]})})
+    assert not settings_cache._fresh()
+
+
+@pytest.mark.asyncio
+async def test_publish_invalidates_and_notifies():
+    await settings_cache.get_all(_session({"a": "1"}))
+    redis_client = MagicMock()
+    redis_client.publish = AsyncMock(return_value=1)
+
+    await settings_cache.publish_invalidation(["b", "a"], redis_client=redis_client)
+
+    channel, payload = redis_client.publish.await_args.args
+    assert channel == cache_bus.CACHE_CHANNEL
+    message = json.loads(payload)
+    assert (message["scope"], message["keys"]) == (SETTINGS_SCOPE, ["a", "b"])
+    assert not settings_cache._fresh()
+
+
+@pytest.mark.asyncio
+async def test_db_override_visible_after_orm_write(db_session):
+    settings_cache.invalidate()
+    key = "monitoring.rules.exclude_dup_count"
+    assert await _get_db_setting(db_session, key, True, expected_type=bool) is True
+
+    db_session.add(Setting(key=key, value="false"))
+    await db_session.flush()  # after_insert → invalidation du cache process
+    assert await _get_db_setting(db_session, key, True, expected_type=bool) is False
+
+    await db_session.rollback()
+    settings_cache.invalidate()
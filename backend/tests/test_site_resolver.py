@@ -0,0 +1,56 @@
+"""
+Tests résolution ensembliste des sites (resolve_site_ids) + LRU process-wide.
+"""
+import pytest
+from sqlalchemy import select
+
+from app.db.models import Site
+from app.services.repository import EventRepository
+from app.services.site_cache import SiteIdCache, site_id_cache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = SiteIdCache(maxsize=2)
+    cache.put_many({"A": 1, "B": 2})
+    assert cache.get_many(["A"]) == {"A": 1}  # A devient le plus récent
+    cache.put_many({"C": 3})
+    assert cache.get_many(["A", "B", "C"]) == {"A": 1, "C": 3}
+    cache.invalidate("A")
+    assert cache.get_many(["A"]) == {}
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_resolve_site_ids_creates_and_reuses(db_session):
+    site_id_cache.invalidate()
+    repo = EventRepository(db_session)
+
+    existing = await repo.get_or_create_site("RES-EXIST")
+    site_map = await repo.resolve_site_ids({"RES-EXIST": None, "RES-NEW1": "S1", "RES-NEW2": None})
+
+    assert site_map["RES-EXIST"] == existing.id
+    res = await db_session.execute(select(Site).where(Site.code_client.in_(["RES-NEW1", "RES-NEW2"])))
+    created = {s.code_client: s for s in res.scalars().all()}
+    assert site_map["RES-NEW1"] == created["RES-NEW1"].id
+    assert created["RES-NEW1"].secondary_code == "S1"
+    assert created["RES-NEW1"].status == "UNKNOWN"
+
+    # Sites created in an uncommitted transaction never reach the shared cache
+    assert site_id_cache.get_many(["RES-NEW1"]) == {}
+    # Second resolution: no new site
+    again = await repo.resolve_site_ids({"RES-NEW1": None, "RES-NEW2": None})
+    assert again == {"RES-NEW1": site_map["RES-NEW1"], "RES-NEW2": site_map["RES-NEW2"]}
+
+
+@pytest.mark.asyncio
+async def test_site_update_invalidates_cache(db_session):
+    site_id_cache.invalidate()
+    repo = EventRepository(db_session)
+    site = await repo.get_or_create_site("RES-EDIT")
+    site_id_cache.put_many({"RES-EDIT": site.id})
+
+    site.code_client = "RES-EDIT-2"
+    await db_session.flush()
+
+    assert site_id_cache.get_many(["RES-EDIT", "RES-EDIT-2"]) == {}
@@ -0,0 +1,157 @@
+"""
+Index de classification SMTP : même résultat que le parcours linéaire des règles
+(priorité croissante, premier match), partagé par ClassificationService et ProviderResolver.
+"""
+import random
+import re
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services.classification_service import ClassificationService
+from app.services.provider_resolver import ProviderResolver
+from app.services.smtp_rule_index import SmtpRuleIndex, smtp_rule_index
+
+
+def _linear_match(rules, sender_email):
+    """Parcours d'origine de ClassificationService.classify_email."""
+    sender_lower = sender_email.lower()
+    for rule in rules:
+        match_type = rule.match_type.upper()
+        pattern = rule.match_value.lower()
+        if match_type in ['EXACT', 'EMAIL']:
+            match = sender_lower == pattern
+        elif match_type == 'DOMAIN':
+            match = sender_lower.endswith(pattern if pattern.startswith('@') else f"@{pattern}")
+        elif match_type == 'CONTAINS':
+            match = pattern in sender_lower
+        elif match_type == 'REGEX':
+            try:
+                match = re.search(pattern, sender_lower) is not None
+            except re.error:
+                match = False
+        else:
+            match = False
+        if match:
+            return rule.id
+    return None
+
+
+def _session(rules, unclassified_id=99):
+    session = AsyncMock()
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = rules
+    result.scalar_one_or_none.return_value = unclassified_id
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+def test_index_matches_linear_scan():
+    rng = random.Random(16)
+    domains = ["alpha.pro", "beta.com", "mail.beta.com", "gamma-surveillance.fr", "cors-online.fr"]
+    users = ["alerts", "noreply", "robot", "Sentry", "x"]
+    senders = [f"{u}@{d}" for u in users for d in domains] + ["", "no-at-sign", "a@b@beta.com", "ALERTS@ALPHA.PRO"]
+
+    for _ in range(200):
+        rules = []
+        for rule_id in range(rng.randint(0, 40)):
+            kind = rng.choice(["EXACT", "email", "DOMAIN", "CONTAINS", "REGEX", "UNKNOWN"])
+            if kind in ("EXACT", "email"):
+                value = rng.choice(senders[:25]).upper() if rng.random() < 0.3 else rng.choice(senders[:25])
+            elif kind == "DOMAIN":
+                value = rng.choice(["@", ""]) + rng.choice(domains + ["b@beta.com"])
+            elif kind == "CONTAINS":
+                value = rng.choice(["alpha", "beta", "ROBOT", "surveillance", "@", ""])
+            elif kind == "REGEX":
+                value = rng.choice([r"^alerts@", r"\.fr$", r"beta\.(com|pro)", r"([broken", r"\Dx"])
+            else:
+                value = "alpha"
+            rules.append(SimpleNamespace(id=rule_id, provider_id=rule_id * 10, match_type=kind,
+                                         match_value=value, priority=rule_id))
+
+        index = SmtpRuleIndex(rules)
+        for sender in senders:
+            expected = _linear_match(rules, sender) if sender else None
+            entry = index.match(sender)
+            assert (entry.id if entry else None) == expected, (sender, rules)
+            # Mémo : même réponse au second appel
+            assert index.match(sender) == entry
+
+
+@pytest.mark.asyncio
+async def test_classification_and_resolver_share_index():
+    rules = [
+        SimpleNamespace(id=1, provider_id=2, match_type="DOMAIN", match_value="spgo.fr", priority=5),
+        SimpleNamespace(id=2, provider_id=3, match_type="REGEX", match_value=r"cors-online\.(com|fr)$", priority=10),
+    ]
+    session = _session(rules)
+    smtp_rule_index.invalidate()
+
+    assert await ClassificationService.classify_email(session, "robot@SPGO.fr") == 2
+    assert await ClassificationService.classify_email(session, "alertes@cors-online.com") == 3
+    assert await ClassificationService.classify_email(session, "unknown@gmail.com") == 99
+
+    resolver = ProviderResolver()
+    assert (await resolver.resolve_provider(" robot@spgo.fr ", session)).provider_id == 2
+    assert (await resolver.resolve_provider("info@cors-online.fr", session)).id == 2
+    assert await resolver.resolve_provider("unknown@gmail.com", session) is None
+
+    # Règles + id UNCLASSIFIED : deux requêtes, une seule construction pour tous les appels
+    assert session.execute.await_count == 2
+    assert smtp_rule_index.builds >= 1
+
+    redis_client = MagicMock()
+    redis_client.publish = AsyncMock(return_value=1)
+    await smtp_rule_index.publish_invalidation(redis_client=redis_client)
+    await ClassificationService.classify_email(session, "robot@spgo.fr")
+    assert session.execute.await_count == 4
+
+
+def test_bulk_writes_invalidate_index():
+    from sqlalchemy import create_engine, delete, update
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import Session
+    from app.db.models import MonitoringProvider, SmtpProviderRule
+
+    session = Session(create_engine("sqlite://"))
+    statements = [
+        delete(SmtpProviderRule).where(SmtpProviderRule.id == 1),
+        update(SmtpProviderRule).where(SmtpProviderRule.id == 1).values(is_active=False),
+        delete(MonitoringProvider).where(MonitoringProvider.id == 1),
+    ]
+    for stmt in statements:
+        smtp_rule_index._index = SmtpRuleIndex([])
+        # Tables absentes : l'événement do_orm_execute passe avant l'exécution SQL
+        with pytest.raises(OperationalError):
+            session.execute(stmt)
+        assert smtp_rule_index._index is None, stmt
+
+    # Suivi d'import des providers : pas d'invalidation
+    smtp_rule_index._index = SmtpRuleIndex([])
+    with pytest.raises(OperationalError):
+        session.execute(update(MonitoringProvider).values(last_successful_import_at=None))
+    assert smtp_rule_index._index is not None
+    smtp_rule_index.invalidate()
+
+
+@pytest.mark.asyncio
+async def test_admin_rule_endpoints_publish_invalidation(monkeypatch):
+    from app.api.v1.endpoints import admin_providers
+    from app.services import cache_bus
+
+    published = []
+    monkeypatch.setattr(cache_bus, "publish", AsyncMock(side_effect=lambda scope, *a, **kw: published.append(scope)))
+    rule = SimpleNamespace(id=1, provider_id=2, match_type="DOMAIN", match_value="spgo.fr", priority=5, is_active=True)
+    db = AsyncMock()
+    db.add = MagicMock()
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = rule
+    db.execute = AsyncMock(return_value=result)
+    payload = admin_providers.SmtpProviderRuleSchema(
+        match_type="DOMAIN", match_value="spgo.fr", priority=5, is_active=True,
+    )
+
+    await admin_providers.create_provider_rule(2, payload, db=db, current_user=None)
+    await admin_providers.update_rule(1, payload, db=db, current_user=None)
+    await admin_providers.delete_rule(1, db=db, current_user=None)
+    assert published == ["smtp_rules"] * 3
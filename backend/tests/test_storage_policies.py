@@ -0,0 +1,74 @@
+"""
+Politiques de stockage de `events` : lecture des intervalles TimescaleDB,
+détection des parcours séquentiels de chunks compressés dans les plans EXPLAIN,
+rétention par le job de purge events_retention.
+"""
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.storage_policies import _interval_days, summarize_plan, update_policies
+
+
+def _decompress(relation, scan):
+    return {
+        "Node Type": "Custom Scan",
+        "Custom Plan Provider": "DecompressChunk",
+        "Relation Name": "_hyper_1_12_chunk",
+        "Plans": [{"Node Type": scan, "Relation Name": relation}],
+    }
+
+
+def test_interval_days():
+    assert _interval_days("7 days") == 7
+    assert _interval_days("90 days") == 90
+    assert _interval_days(timedelta(hours=12)) == 0.5
+    assert _interval_days(None) is None
+
+
+def test_summarize_plan_flags_compressed_seq_scans():
+    by_site = {"Plan": {"Node Type": "Append", "Plans": [
+        _decompress("compress_hyper_3_40_chunk", "Index Scan"),
+        {"Node Type": "Index Only Scan", "Relation Name": "_hyper_1_13_chunk"},
+    ]}}
+    assert summarize_plan(by_site) == {
+        "decompressed_chunks": 1, "compressed_seq_scans": 0, "index_scans": 2, "index_friendly": True,
+    }
+
+    by_import = {"Plan": {"Node Type": "Append", "Plans": [
+        _decompress("compress_hyper_3_40_chunk", "Seq Scan"),
+        _decompress("compress_hyper_3_41_chunk", "Seq Scan"),
+    ]}}
+    summary = summarize_plan(by_import)
+    assert summary["decompressed_chunks"] == 2 and summary["compressed_seq_scans"] == 2
+    assert summary["index_friendly"] is False
+
+
+class _RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, stmt, params=None):
+        self.statements.append((str(stmt), params or {}))
+        return SimpleNamespace(scalar=lambda: True)
+
+
+@pytest.mark.asyncio
+async def test_retention_uses_purge_job_and_caps_hourly_aggregate():
+    session = _RecordingSession()
+    await update_policies(session, retention_days=90)
+    sql = [s for s, _ in session.statements]
+
+    # Pas de drop_chunks natif : le job purge hits / incidents / alert_state avec les chunks
+    assert not any("add_retention_policy" in s for s in sql)
+    add_job = next(p for s, p in session.statements if "add_job" in s)
+    assert add_job == {"retention": "events_retention", "days": 90}
+    cagg = next(p for s, p in session.statements if "add_continuous_aggregate_policy" in s)
+    assert cagg["days"] == 90
+    assert "make_interval(days => :days) - INTERVAL '1 hour'" in next(s for s in sql if "add_continuous_aggregate_policy" in s)
+
+    session = _RecordingSession()
+    await update_policies(session, retention_days=0)
+    sql = [s for s, _ in session.statements]
+    assert any("delete_job" in s for s in sql) and not any("add_job" in s for s in sql)